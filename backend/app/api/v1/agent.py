@@ -1,6 +1,7 @@
 """Agent APIs for strategy generation, tuning, and reporting."""
 from __future__ import annotations
 
+from datetime import datetime, time as dt_time, timezone
 import logging
 import time
 
@@ -45,8 +46,17 @@ from ...services.agent_service import (
     trial_objective_value,
 )
 from ...services.agent_report_observability import record_agent_report_event
+from ...services.indicator_cache import IndicatorSeries
 from ...services.knowledge_base import resolve_governance_policy
-from .backtest import run_backtest
+from ...services.tune_validation import VALIDATION_STRATEGY_TYPES, build_time_series_folds, evaluate_trial
+from ...services.vectorized_backtest import align_closes
+from .backtest import (
+    _annualization_factor,
+    _load_local_bars,
+    _normalize_symbols,
+    _resolve_market_for_symbol,
+    run_backtest,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -157,6 +167,73 @@ async def generate_strategy(payload: AgentGenerateRequest, db: Session = Depends
     )
 
 
+def _cross_validate_trials(
+    db: Session,
+    payload: AgentTuneRequest,
+    strategy_type: str,
+    base_parameters: dict,
+    trials: list[dict],
+) -> tuple[dict[int, dict], dict]:
+    """Score every trial on walk-forward folds from one vectorized pass per trial."""
+    if (strategy_type or "").strip().lower() not in VALIDATION_STRATEGY_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"validation supports {', '.join(sorted(VALIDATION_STRATEGY_TYPES))} strategies",
+        )
+    interval = str(base_parameters.get("interval", "1d")).strip().lower()
+    start_dt = datetime.combine(payload.start_date, dt_time.min, tzinfo=timezone.utc)
+    end_dt = datetime.combine(payload.end_date, dt_time.max, tzinfo=timezone.utc)
+    raw_series = []
+    instrument_ids: list[int] = []
+    for symbol in _normalize_symbols(payload.symbols):
+        market = _resolve_market_for_symbol(symbol, base_parameters)
+        bars, instrument = _load_local_bars(db, symbol, market, interval, start_dt, end_dt)
+        raw_series.append(([item.ts for item in bars], [item.close for item in bars]))
+        instrument_ids.append(instrument.id)
+    _, closes = align_closes(raw_series)
+    series = [IndicatorSeries(row, instrument_id, interval) for row, instrument_id in zip(closes, instrument_ids)]
+
+    try:
+        folds = build_time_series_folds(closes.shape[1], payload.validation.folds, payload.validation.mode)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    annualization = _annualization_factor(interval)
+
+    scored: dict[int, dict] = {}
+    for idx, params in enumerate(trials, start=1):
+        try:
+            evaluation = evaluate_trial(strategy_type, params, series, folds, annualization)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Trial {idx} cannot be validated: {exc}") from exc
+        in_sample = [trial_objective_value(item, payload.objective) for item in evaluation["in_sample"]]
+        out_of_sample = [trial_objective_value(item, payload.objective) for item in evaluation["out_of_sample"]]
+        scored[idx] = {
+            "in_sample_objective": round(sum(in_sample) / len(in_sample), 4),
+            "out_of_sample_objective": round(sum(out_of_sample) / len(out_of_sample), 4),
+            "folds": [
+                {
+                    "fold": fold_no,
+                    "train": list(fold.train),
+                    "test": list(fold.test),
+                    "in_sample": train_metrics,
+                    "out_of_sample": test_metrics,
+                }
+                for fold_no, (fold, train_metrics, test_metrics) in enumerate(
+                    zip(folds, evaluation["in_sample"], evaluation["out_of_sample"]), start=1
+                )
+            ],
+        }
+
+    summary = {
+        "folds": len(folds),
+        "mode": payload.validation.mode,
+        "bars": int(closes.shape[1]),
+        "trials_evaluated": len(trials),
+        "indicator_arrays": sum(item.computed for item in series),
+    }
+    return scored, summary
+
+
 @router.post("/strategy/tune", response_model=AgentTuneResponse)
 async def tune_strategy(payload: AgentTuneRequest, db: Session = Depends(get_db)):
     if payload.start_date > payload.end_date:
@@ -188,8 +265,20 @@ async def tune_strategy(payload: AgentTuneRequest, db: Session = Depends(get_db)
     if not trials:
         raise HTTPException(status_code=400, detail="No parameter trials generated")
 
+    candidates = list(enumerate(trials, start=1))
+    scored: dict[int, dict] = {}
+    validation_summary = None
+    if payload.validation is not None:
+        # Rank on out-of-sample folds; only the shortlisted trials get a persisted backtest.
+        scored, validation_summary = _cross_validate_trials(
+            db, payload, strategy.strategy_type, base_parameters, trials
+        )
+        candidates.sort(key=lambda item: scored[item[0]]["out_of_sample_objective"], reverse=True)
+        candidates = candidates[: payload.top_k]
+        validation_summary["backtests_run"] = len(candidates)
+
     trial_results: list[dict] = []
-    for idx, params in enumerate(trials, start=1):
+    for idx, params in candidates:
         backtest = await run_backtest(
             BacktestCreate(
                 strategy_id=payload.strategy_id,
@@ -212,10 +301,12 @@ async def tune_strategy(payload: AgentTuneRequest, db: Session = Depends(get_db)
                 "sharpe_ratio": float(backtest.sharpe_ratio or 0.0),
                 "max_drawdown": float(backtest.max_drawdown or 0.0),
                 "win_rate": float(backtest.win_rate or 0.0),
+                **scored.get(idx, {}),
             }
         )
 
-    trial_results.sort(key=lambda item: trial_objective_value(item, payload.objective), reverse=True)
+    if payload.validation is None:
+        trial_results.sort(key=lambda item: trial_objective_value(item, payload.objective), reverse=True)
     top_items = trial_results[: payload.top_k]
     best_item = top_items[0]
 
@@ -231,6 +322,7 @@ async def tune_strategy(payload: AgentTuneRequest, db: Session = Depends(get_db)
         best_trial=AgentTuneTrial(**best_item),
         top_trials=[AgentTuneTrial(**item) for item in top_items],
         created_version_id=created_version_id,
+        validation=validation_summary,
     )
 
 
@@ -3,25 +3,50 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date, datetime, time, timezone
+from functools import partial
 import math
 import statistics
 from typing import Any, Callable
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+import numpy as np
 from sqlalchemy.orm import Session
 
-from ...database import get_db
+from ...database import get_db, get_read_db
 from ...models.backtest import Backtest, Trade
-from ...models.market_data import Bar1d, Bar1m, Instrument
+from ...models.market_data import Instrument
 from ...models.portfolio import Portfolio
 from ...models.strategy import Strategy
 from ...models.strategy_version import StrategyVersion
+from ...models.task_queue import TaskJob
 from ...schemas.backtest import (
+    BacktestCompareItem,
+    BacktestCompareRequest,
+    BacktestCompareResponse,
     BacktestCreate,
     BacktestDetailResponse,
+    BacktestExtendRequest,
+    BacktestJobResponse,
     BacktestResponse,
+    BacktestSensitivityRequest,
+    BacktestSensitivityResponse,
     BacktestTradeResponse,
 )
+from ...services.backtest_comparison import compare_equity_curves, parse_equity_curve, to_json_rows
+from ...services.bar_rollups import ROLLUP_INTERVALS, read_interval_bars
+from ...services.bulk_write import BulkWriteStats, bulk_insert
+from ...services.indicator_cache import IndicatorSeries
+from ...services.multi_timeframe import HigherTimeframeSeries, TimeframeContext, parse_higher_intervals
+from ...services.panel_engine import PANEL_STRATEGY_TYPES, PricePanel, run_panel_strategy
+from ...services.strategy_dsl import StrategyExpressionError
+from ...services.strategy_signals import (
+    compile_custom_signal,
+    history_window,
+    signal_for_strategy,
+    signal_masks,
+)
+from ...services.task_queue import LeaseLostError, PermanentTaskError, enqueue, hold_lease
+from ...services.vectorized_backtest import align_closes, ma_crossover_surface
 
 router = APIRouter()
 
@@ -46,109 +71,6 @@ class BarPoint:
     close: float
 
 
-def _mean(values: list[float]) -> float:
-    return sum(values) / len(values) if values else 0.0
-
-
-def _calc_rsi(prices: list[float], period: int) -> float:
-    if len(prices) <= period:
-        return 50.0
-    gains: list[float] = []
-    losses: list[float] = []
-    window = prices[-(period + 1) :]
-    for idx in range(1, len(window)):
-        delta = window[idx] - window[idx - 1]
-        if delta >= 0:
-            gains.append(delta)
-            losses.append(0.0)
-        else:
-            gains.append(0.0)
-            losses.append(abs(delta))
-    avg_gain = _mean(gains)
-    avg_loss = _mean(losses)
-    if avg_loss <= 1e-12:
-        return 100.0
-    rs = avg_gain / avg_loss
-    return 100.0 - (100.0 / (1.0 + rs))
-
-
-def _signal_for_strategy(
-    strategy_type: str,
-    history: list[float],
-    parameters: dict[str, Any],
-    custom_signal: Callable[[list[float], dict[str, Any]], str] | None = None,
-) -> str:
-    strategy = (strategy_type or "").strip().lower()
-    price = history[-1]
-
-    if strategy == "custom":
-        if not custom_signal:
-            return "HOLD"
-        try:
-            raw_signal = str(custom_signal(history, parameters)).strip().upper()
-        except Exception:
-            return "HOLD"
-        return raw_signal if raw_signal in {"BUY", "SELL", "HOLD"} else "HOLD"
-
-    if strategy == "rsi":
-        period = int(parameters.get("rsi_period", 14))
-        buy_threshold = float(parameters.get("rsi_buy", 30))
-        sell_threshold = float(parameters.get("rsi_sell", 70))
-        rsi = _calc_rsi(history, max(2, period))
-        if rsi <= buy_threshold:
-            return "BUY"
-        if rsi >= sell_threshold:
-            return "SELL"
-        return "HOLD"
-
-    if strategy == "momentum":
-        period = int(parameters.get("momentum_period", 10))
-        threshold = float(parameters.get("momentum_threshold", 0.015))
-        if len(history) <= period:
-            return "HOLD"
-        past_price = history[-(period + 1)]
-        change = (price - past_price) / past_price if past_price > 0 else 0.0
-        if change >= threshold:
-            return "BUY"
-        if change <= -threshold:
-            return "SELL"
-        return "HOLD"
-
-    # Default: moving-average crossover.
-    short_window = int(parameters.get("short_window", 5))
-    long_window = int(parameters.get("long_window", 20))
-    if len(history) < max(short_window, long_window):
-        return "HOLD"
-    short_ma = _mean(history[-short_window:])
-    long_ma = _mean(history[-long_window:])
-    if short_ma > long_ma * 1.0001:
-        return "BUY"
-    if short_ma < long_ma * 0.9999:
-        return "SELL"
-    return "HOLD"
-
-
-def _compile_custom_signal(code: str) -> Callable[[list[float], dict[str, Any]], str]:
-    safe_builtins = {
-        "abs": abs,
-        "min": min,
-        "max": max,
-        "sum": sum,
-        "len": len,
-        "range": range,
-        "float": float,
-        "int": int,
-        "round": round,
-    }
-    globals_dict: dict[str, Any] = {"__builtins__": safe_builtins, "math": math}
-    locals_dict: dict[str, Any] = {}
-    exec(code, globals_dict, locals_dict)
-    fn = locals_dict.get("signal") or globals_dict.get("signal")
-    if not callable(fn):
-        raise ValueError("custom strategy code must define callable signal(prices, params)")
-    return fn
-
-
 def _resolve_market_for_symbol(symbol: str, parameters: dict[str, Any]) -> str | None:
     markets = parameters.get("markets")
     if isinstance(markets, dict):
@@ -178,10 +100,6 @@ def _resolve_instrument(db: Session, symbol: str, market: str | None) -> Instrum
     return items[0]
 
 
-def _get_bar_model(interval: str):
-    return Bar1m if interval == "1m" else Bar1d
-
-
 def _load_local_bars(
     db: Session,
     symbol: str,
@@ -189,28 +107,63 @@ def _load_local_bars(
     interval: str,
     start_dt: datetime | None,
     end_dt: datetime | None,
-) -> tuple[list[BarPoint], str]:
+    required: bool = True,
+) -> tuple[list[BarPoint], Instrument]:
     instrument = _resolve_instrument(db, symbol, market)
-    model = _get_bar_model(interval)
-    query = db.query(model.ts, model.close).filter(model.instrument_id == instrument.id)
-    if start_dt:
-        query = query.filter(model.ts >= start_dt)
-    if end_dt:
-        query = query.filter(model.ts <= end_dt)
-    rows = query.order_by(model.ts.asc()).all()
-    if not rows:
+    columns = read_interval_bars(db, instrument.id, interval, start_dt, end_dt)
+    if not len(columns) and required:
         raise HTTPException(
             status_code=400,
             detail=f"No local bars available for {instrument.symbol} {instrument.market}",
         )
-    bars = [BarPoint(ts=row[0], close=float(row[1])) for row in rows]
-    return bars, instrument.market
+    bars = [BarPoint(ts=ts, close=close) for ts, close in zip(columns.timestamps(), columns.close.tolist())]
+    return bars, instrument
+
+
+def _load_timeframe_context(
+    db: Session,
+    symbols: list[str],
+    markets: dict[str, str | None],
+    parameters: dict[str, Any],
+    interval: str,
+    end_dt: datetime | None,
+    bars_by_symbol: dict[str, list[BarPoint]],
+) -> TimeframeContext | None:
+    try:
+        higher_intervals = parse_higher_intervals(interval, parameters)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if not higher_intervals:
+        return None
+
+    series: dict[str, dict[str, HigherTimeframeSeries]] = {}
+    for symbol in symbols:
+        fine_ts = [item.ts for item in bars_by_symbol[symbol]]
+        series[symbol] = {}
+        for higher in higher_intervals:
+            # No start bound: coarse history before the window seeds trend lookbacks.
+            coarse, _ = _load_local_bars(db, symbol, markets.get(symbol), higher, None, end_dt, required=False)
+            series[symbol][higher] = HigherTimeframeSeries.build(
+                higher,
+                [item.ts for item in coarse],
+                [item.close for item in coarse],
+                fine_ts,
+            )
+    trend_interval = str(parameters.get("trend_interval") or "").strip().lower() or None
+    return TimeframeContext(
+        series=series,
+        trend_interval=trend_interval,
+        trend_window=max(int(parameters.get("trend_window", 20)), 1),
+    )
+
+
+# Rollup intervals (5m/15m/1h/1w) are read from the materialized rollup tables.
+BACKTEST_INTERVALS = ("1m", "1d", *ROLLUP_INTERVALS)
+_BARS_PER_YEAR = {"1m": 252.0 * 390.0, "5m": 252.0 * 78.0, "15m": 252.0 * 26.0, "1h": 252.0 * 6.5, "1w": 52.0}
 
 
 def _annualization_factor(interval: str) -> float:
-    if interval == "1m":
-        return 252.0 * 390.0
-    return 252.0
+    return _BARS_PER_YEAR.get(interval, 252.0)
 
 
 def _compute_performance_metrics(
@@ -253,6 +206,83 @@ def _compute_performance_metrics(
     }
 
 
+@dataclass
+class EngineState:
+    """Mutable simulation state that can be checkpointed and resumed."""
+
+    cash: float
+    positions: dict[str, float]
+    average_cost: dict[str, float]
+    history: dict[str, list[float]]
+    last_price: dict[str, float | None]
+    last_ts: datetime | None = None
+
+    @classmethod
+    def initial(cls, symbols: list[str], initial_capital: float) -> "EngineState":
+        return cls(
+            cash=float(initial_capital),
+            positions={symbol: 0.0 for symbol in symbols},
+            average_cost={symbol: 0.0 for symbol in symbols},
+            history={symbol: [] for symbol in symbols},
+            last_price={symbol: None for symbol in symbols},
+        )
+
+    def to_checkpoint(self, history_window: int) -> dict[str, Any]:
+        return {
+            "last_ts": self.last_ts.isoformat() if self.last_ts else None,
+            "cash": float(self.cash),
+            "positions": dict(self.positions),
+            "average_cost": dict(self.average_cost),
+            "last_price": dict(self.last_price),
+            "history": {
+                symbol: [float(item) for item in values[-history_window:]]
+                for symbol, values in self.history.items()
+            },
+        }
+
+    @classmethod
+    def from_checkpoint(cls, payload: dict[str, Any]) -> "EngineState":
+        last_ts = payload.get("last_ts")
+        return cls(
+            cash=float(payload["cash"]),
+            positions={key: float(value) for key, value in payload["positions"].items()},
+            average_cost={key: float(value) for key, value in payload["average_cost"].items()},
+            history={key: [float(item) for item in values] for key, values in payload["history"].items()},
+            last_price={
+                key: (float(value) if value is not None else None)
+                for key, value in payload["last_price"].items()
+            },
+            last_ts=datetime.fromisoformat(last_ts) if last_ts else None,
+        )
+
+
+def _close_position(
+    state: EngineState,
+    symbol: str,
+    price: float,
+    commission_rate: float,
+    ts: datetime,
+) -> tuple[dict[str, Any], float]:
+    quantity = state.positions[symbol]
+    notional = quantity * price
+    commission = notional * commission_rate
+    pnl = notional - commission - quantity * state.average_cost[symbol]
+    state.cash += notional - commission
+    state.positions[symbol] = 0.0
+    state.average_cost[symbol] = 0.0
+    event = {
+        "symbol": symbol,
+        "action": "SELL",
+        "quantity": float(quantity),
+        "price": float(price),
+        "commission": float(commission),
+        "timestamp": ts,
+        "pnl": float(pnl),
+        "is_simulated": False,
+    }
+    return event, float(pnl)
+
+
 def _run_backtest_local(
     strategy: Strategy,
     symbols: list[str],
@@ -260,22 +290,27 @@ def _run_backtest_local(
     initial_capital: float,
     parameters: dict[str, Any],
     interval: str,
+    state: EngineState | None = None,
+    min_bars: int = 3,
+    timeframes: TimeframeContext | None = None,
+    instrument_ids: dict[str, int] | None = None,
 ) -> dict[str, Any]:
     timeline = sorted({item.ts for bars in bars_by_symbol.values() for item in bars})
-    if len(timeline) < 3:
-        raise HTTPException(status_code=400, detail="Backtest period must include at least 3 bars")
+    if len(timeline) < min_bars:
+        raise HTTPException(status_code=400, detail=f"Backtest period must include at least {min_bars} bars")
 
-    cash = float(initial_capital)
+    if state is None:
+        state = EngineState.initial(symbols, initial_capital)
     allocation = float(parameters.get("allocation_per_trade", 0.25))
     allocation = min(max(allocation, 0.05), 0.95)
     commission_rate = float(parameters.get("commission_rate", 0.001))
     commission_rate = min(max(commission_rate, 0.0), 0.02)
 
-    positions: dict[str, float] = {symbol: 0.0 for symbol in symbols}
-    average_cost: dict[str, float] = {symbol: 0.0 for symbol in symbols}
+    positions = state.positions
+    average_cost = state.average_cost
+    history = state.history
+    last_price = state.last_price
     indices: dict[str, int] = {symbol: 0 for symbol in symbols}
-    history: dict[str, list[float]] = {symbol: [] for symbol in symbols}
-    last_price: dict[str, float | None] = {symbol: None for symbol in symbols}
     trade_events: list[dict[str, Any]] = []
     closed_trade_pnls: list[float] = []
     equity_curve: list[dict[str, Any]] = []
@@ -284,9 +319,30 @@ def _run_backtest_local(
         if not strategy.code:
             raise HTTPException(status_code=400, detail="Custom strategy requires code")
         try:
-            custom_signal = _compile_custom_signal(strategy.code)
+            custom_signal = compile_custom_signal(strategy.code)
         except Exception as exc:
             raise HTTPException(status_code=400, detail=f"Invalid custom strategy code: {exc}") from exc
+    # Vectorizable strategies are evaluated for all bars up front from cached
+    # indicator arrays; the loop below only looks their signals up.
+    precomputed: dict[str, tuple[int, np.ndarray, np.ndarray]] = {}
+    if custom_signal is None:
+        try:
+            for symbol in symbols:
+                warmup = history[symbol]
+                closes = np.array(warmup + [item.close for item in bars_by_symbol[symbol]], dtype=np.float64)
+                series = IndicatorSeries(closes, (instrument_ids or {}).get(symbol, symbol), interval)
+                masks = signal_masks(strategy.strategy_type, parameters, series)
+                if masks is None:
+                    precomputed.clear()
+                    break
+                precomputed[symbol] = (len(warmup), masks[0], masks[1])
+        except StrategyExpressionError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid strategy expression: {exc}") from exc
+    signal_parameters = parameters
+    timeframe_view = None
+    if timeframes is not None:
+        timeframe_view = timeframes.view()
+        signal_parameters = {**parameters, "timeframes": timeframe_view}
 
     for ts in timeline:
         for symbol in symbols:
@@ -306,22 +362,31 @@ def _run_backtest_local(
             price = last_price[symbol]
             if price is None:
                 continue
-            signal = _signal_for_strategy(
-                strategy.strategy_type,
-                history[symbol],
-                parameters,
-                custom_signal=custom_signal,
-            )
+            if timeframe_view is not None:
+                timeframe_view.seek(symbol, idx - 1)
+            if precomputed:
+                offset, buy, sell = precomputed[symbol]
+                bar_idx = offset + idx - 1
+                signal = "BUY" if buy[bar_idx] else "SELL" if sell[bar_idx] else "HOLD"
+            else:
+                signal = signal_for_strategy(
+                    strategy.strategy_type,
+                    history[symbol],
+                    signal_parameters,
+                    custom_signal=custom_signal,
+                )
+            if signal == "BUY" and timeframes is not None and not timeframes.allows_entry(symbol, idx - 1):
+                signal = "HOLD"
             quantity = positions[symbol]
 
             if signal == "BUY" and quantity <= 1e-8:
-                budget = cash * allocation
+                budget = state.cash * allocation
                 unit_cost = price * (1.0 + commission_rate)
                 buy_qty = math.floor(budget / unit_cost)
                 if buy_qty >= 1:
                     notional = buy_qty * price
                     commission = notional * commission_rate
-                    cash -= notional + commission
+                    state.cash -= notional + commission
                     positions[symbol] = float(buy_qty)
                     average_cost[symbol] = float(price)
                     trade_events.append(
@@ -338,59 +403,33 @@ def _run_backtest_local(
                     )
 
             elif signal == "SELL" and quantity > 1e-8:
-                notional = quantity * price
-                commission = notional * commission_rate
-                pnl = notional - commission - quantity * average_cost[symbol]
-                cash += notional - commission
-                positions[symbol] = 0.0
-                average_cost[symbol] = 0.0
-                closed_trade_pnls.append(float(pnl))
-                trade_events.append(
-                        {
-                            "symbol": symbol,
-                            "action": "SELL",
-                            "quantity": float(quantity),
-                            "price": float(price),
-                            "commission": float(commission),
-                            "timestamp": ts,
-                            "pnl": float(pnl),
-                            "is_simulated": False,
-                        }
-                    )
+                event, pnl = _close_position(state, symbol, price, commission_rate, ts)
+                closed_trade_pnls.append(pnl)
+                trade_events.append(event)
 
-        equity = cash + sum(
+        equity = state.cash + sum(
             positions[symbol] * (last_price[symbol] or 0.0) for symbol in symbols
         )
         equity_curve.append({"timestamp": ts.isoformat(), "value": round(float(equity), 4)})
 
+    # Checkpoint before the forced close so an extension can resume the open positions.
+    state.last_ts = timeline[-1]
+    checkpoint = state.to_checkpoint(history_window(strategy.strategy_type, parameters))
+    checkpoint["pre_liquidation_equity"] = equity_curve[-1]["value"]
+
     # Force close all remaining positions on the final day for stable realized metrics.
     close_ts = timeline[-1]
+    liquidation_trades = 0
     for symbol in symbols:
-        quantity = positions[symbol]
-        if quantity <= 1e-8:
+        if positions[symbol] <= 1e-8:
             continue
-        price = last_price[symbol] or 0.0
-        notional = quantity * price
-        commission = notional * commission_rate
-        pnl = notional - commission - quantity * average_cost[symbol]
-        cash += notional - commission
-        positions[symbol] = 0.0
-        average_cost[symbol] = 0.0
-        closed_trade_pnls.append(float(pnl))
-        trade_events.append(
-            {
-                "symbol": symbol,
-                "action": "SELL",
-                "quantity": float(quantity),
-                "price": float(price),
-                "commission": float(commission),
-                "timestamp": close_ts,
-                "pnl": float(pnl),
-                "is_simulated": False,
-            }
-        )
+        event, pnl = _close_position(state, symbol, last_price[symbol] or 0.0, commission_rate, close_ts)
+        closed_trade_pnls.append(pnl)
+        trade_events.append(event)
+        liquidation_trades += 1
+    checkpoint["liquidation_trades"] = liquidation_trades
 
-    final_value = float(cash)
+    final_value = float(state.cash)
     if equity_curve:
         # Keep equity curve terminal value consistent with forced liquidation costs.
         equity_curve[-1]["value"] = round(final_value, 4)
@@ -419,10 +458,101 @@ def _run_backtest_local(
             "strategy_type": strategy.strategy_type,
             "parameters_used": parameters,
             "interval": interval,
+            "checkpoint": checkpoint,
         },
     }
 
 
+def _run_panel_backtest(
+    strategy: Strategy,
+    symbols: list[str],
+    bars_by_symbol: dict[str, list[BarPoint]],
+    initial_capital: float,
+    parameters: dict[str, Any],
+    interval: str,
+) -> dict[str, Any]:
+    """Universe-ranking strategies: rebalance the whole symbol panel at once."""
+    panel = PricePanel.build(
+        {
+            symbol: ([item.ts for item in bars_by_symbol[symbol]], [item.close for item in bars_by_symbol[symbol]])
+            for symbol in symbols
+        }
+    )
+    if len(panel.timeline) < 3:
+        raise HTTPException(status_code=400, detail="Backtest period must include at least 3 bars")
+    try:
+        simulation = run_panel_strategy(strategy.strategy_type, parameters, panel, initial_capital)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    equity_curve = [
+        {"timestamp": ts.isoformat(), "value": round(float(value), 4)}
+        for ts, value in zip(panel.timeline, simulation.equity.tolist())
+    ]
+    metrics = _compute_performance_metrics(
+        initial_capital=initial_capital,
+        final_value=simulation.final_value,
+        equity_values=[float(point["value"]) for point in equity_curve],
+        closed_trade_pnls=simulation.closed_trade_pnls,
+        interval=interval,
+    )
+    return {
+        "final_value": round(simulation.final_value, 4),
+        **metrics,
+        "trade_count": len(simulation.trades),
+        "trades": simulation.trades,
+        "results": {
+            "equity_curve": equity_curve,
+            "closed_trade_pnls": [round(float(item), 4) for item in simulation.closed_trade_pnls],
+            "symbols": symbols,
+            "bars": len(panel.timeline),
+            "strategy_type": strategy.strategy_type,
+            "parameters_used": parameters,
+            "interval": interval,
+            "rebalances": simulation.rebalances,
+            "latest_ranks": simulation.latest_ranks,
+        },
+    }
+
+
+_TRADE_COLUMNS = (
+    "backtest_id",
+    "portfolio_id",
+    "symbol",
+    "action",
+    "quantity",
+    "price",
+    "commission",
+    "timestamp",
+    "pnl",
+    "is_simulated",
+)
+
+
+def _persist_trades(
+    db: Session,
+    backtest_id: int,
+    portfolio_id: int | None,
+    trades: list[dict[str, Any]],
+) -> BulkWriteStats:
+    rows = (
+        (
+            backtest_id,
+            portfolio_id,
+            item["symbol"],
+            item["action"],
+            item["quantity"],
+            item["price"],
+            item["commission"],
+            item["timestamp"],
+            item["pnl"],
+            False,
+        )
+        for item in trades
+    )
+    return bulk_insert(db, Trade.__table__, _TRADE_COLUMNS, rows)
+
+
 def _get_backtest_or_404(db: Session, backtest_id: int) -> Backtest:
     item = db.query(Backtest).filter(Backtest.id == backtest_id).first()
     if not item:
@@ -430,9 +560,8 @@ def _get_backtest_or_404(db: Session, backtest_id: int) -> Backtest:
     return item
 
 
-@router.post("/", response_model=BacktestResponse, status_code=201)
-async def run_backtest(payload: BacktestCreate, db: Session = Depends(get_db)):
-    """Create and run a backtest synchronously."""
+def _prepare_backtest(db: Session, payload: BacktestCreate) -> Backtest:
+    """Validate a launch request and build its (unsaved) Backtest row."""
     if payload.start_date > payload.end_date:
         raise HTTPException(status_code=400, detail="start_date must be earlier than or equal to end_date")
 
@@ -462,21 +591,10 @@ async def run_backtest(payload: BacktestCreate, db: Session = Depends(get_db)):
     merged_parameters = dict(base_parameters or {})
     merged_parameters.update(payload.parameters or {})
     interval = str(merged_parameters.get("interval", "1d")).strip().lower()
-    if interval not in {"1m", "1d"}:
-        raise HTTPException(status_code=400, detail="interval must be 1m or 1d")
-
-    start_dt = datetime.combine(payload.start_date, time.min, tzinfo=timezone.utc)
-    end_dt = datetime.combine(payload.end_date, time.max, tzinfo=timezone.utc)
+    if interval not in BACKTEST_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(BACKTEST_INTERVALS)}")
 
-    bars_by_symbol: dict[str, list[BarPoint]] = {}
-    markets_used: dict[str, str] = {}
-    for symbol in symbols:
-        market = _resolve_market_for_symbol(symbol, merged_parameters)
-        bars, resolved_market = _load_local_bars(db, symbol, market, interval, start_dt, end_dt)
-        bars_by_symbol[symbol] = bars
-        markets_used[symbol] = resolved_market
-
-    backtest = Backtest(
+    return Backtest(
         strategy_id=strategy.id,
         strategy_version_id=payload.strategy_version_id,
         portfolio_id=payload.portfolio_id,
@@ -485,21 +603,98 @@ async def run_backtest(payload: BacktestCreate, db: Session = Depends(get_db)):
         end_date=payload.end_date,
         initial_capital=payload.initial_capital,
         parameters=merged_parameters,
-        status="running",
+        status="pending",
     )
-    db.add(backtest)
+
+
+@dataclass
+class BacktestInputs:
+    bars_by_symbol: dict[str, list[BarPoint]]
+    instrument_ids: dict[str, int]
+    timeframes: TimeframeContext | None
+
+
+def _load_backtest_inputs(db: Session, backtest: Backtest) -> BacktestInputs:
+    parameters = dict(backtest.parameters or {})
+    interval = str(parameters.get("interval", "1d")).strip().lower()
+    start_dt = datetime.combine(backtest.start_date, time.min, tzinfo=timezone.utc)
+    end_dt = datetime.combine(backtest.end_date, time.max, tzinfo=timezone.utc)
+    symbols = list(backtest.symbols or [])
+
+    bars_by_symbol: dict[str, list[BarPoint]] = {}
+    markets_used: dict[str, str | None] = {}
+    instrument_ids: dict[str, int] = {}
+    for symbol in symbols:
+        market = _resolve_market_for_symbol(symbol, parameters)
+        bars, instrument = _load_local_bars(db, symbol, market, interval, start_dt, end_dt)
+        bars_by_symbol[symbol] = bars
+        markets_used[symbol] = instrument.market
+        instrument_ids[symbol] = instrument.id
+    timeframes = _load_timeframe_context(db, symbols, markets_used, parameters, interval, end_dt, bars_by_symbol)
+    return BacktestInputs(bars_by_symbol=bars_by_symbol, instrument_ids=instrument_ids, timeframes=timeframes)
+
+
+def _commit_fenced(db: Session, backtest_id: int, fence: Callable[[Session], bool] | None) -> None:
+    """Commit unless ``fence`` says another worker now owns the job; then roll back and raise."""
+    if fence is not None and not fence(db):
+        db.rollback()
+        raise LeaseLostError(f"Backtest {backtest_id} was reclaimed by another worker")
     db.commit()
-    db.refresh(backtest)
+
+
+def _fail_backtest(
+    db: Session,
+    backtest: Backtest,
+    error: str,
+    fence: Callable[[Session], bool] | None = None,
+) -> None:
+    backtest.status = "failed"
+    backtest.results = {"error": error}
+    backtest.completed_at = datetime.now(timezone.utc)
+    _commit_fenced(db, backtest.id, fence)
+
+
+def _execute_backtest(
+    db: Session,
+    backtest: Backtest,
+    inputs: BacktestInputs,
+    fence: Callable[[Session], bool] | None = None,
+) -> Backtest:
+    """Run the engine for a saved Backtest row and write metrics and trades back.
+
+    ``fence`` is checked in the same transaction as every status write (running,
+    completed or failed); when it returns False nothing is written and
+    ``LeaseLostError`` is raised.
+    """
+    strategy = db.query(Strategy).filter(Strategy.id == backtest.strategy_id).first()
+    if not strategy:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    parameters = dict(backtest.parameters or {})
+    backtest_id = backtest.id
+    backtest.status = "running"
+    _commit_fenced(db, backtest_id, fence)
 
     try:
-        simulation = _run_backtest_local(
-            strategy=strategy,
-            symbols=symbols,
-            bars_by_symbol=bars_by_symbol,
-            initial_capital=payload.initial_capital,
-            parameters=merged_parameters,
-            interval=interval,
-        )
+        if (strategy.strategy_type or "").strip().lower() in PANEL_STRATEGY_TYPES:
+            simulation = _run_panel_backtest(
+                strategy=strategy,
+                symbols=list(backtest.symbols or []),
+                bars_by_symbol=inputs.bars_by_symbol,
+                initial_capital=backtest.initial_capital,
+                parameters=parameters,
+                interval=str(parameters.get("interval", "1d")).strip().lower(),
+            )
+        else:
+            simulation = _run_backtest_local(
+                strategy=strategy,
+                symbols=list(backtest.symbols or []),
+                bars_by_symbol=inputs.bars_by_symbol,
+                initial_capital=backtest.initial_capital,
+                parameters=parameters,
+                interval=str(parameters.get("interval", "1d")).strip().lower(),
+                timeframes=inputs.timeframes,
+                instrument_ids=inputs.instrument_ids,
+            )
         backtest.final_value = simulation["final_value"]
         backtest.total_return = simulation["total_return"]
         backtest.sharpe_ratio = simulation["sharpe_ratio"]
@@ -507,38 +702,303 @@ async def run_backtest(payload: BacktestCreate, db: Session = Depends(get_db)):
         backtest.win_rate = simulation["win_rate"]
         backtest.trade_count = simulation["trade_count"]
         backtest.results = simulation["results"]
-        backtest.results["strategy_version_id"] = payload.strategy_version_id
+        backtest.results["strategy_version_id"] = backtest.strategy_version_id
         backtest.status = "completed"
         backtest.completed_at = datetime.now(timezone.utc)
 
-        for item in simulation["trades"]:
-            db.add(
-                Trade(
-                    backtest_id=backtest.id,
-                    portfolio_id=payload.portfolio_id,
-                    symbol=item["symbol"],
-                    action=item["action"],
-                    quantity=item["quantity"],
-                    price=item["price"],
-                    commission=item["commission"],
-                    timestamp=item["timestamp"],
-                    pnl=item["pnl"],
-                    is_simulated=False,
-                )
-            )
-        db.commit()
+        persistence = _persist_trades(db, backtest.id, backtest.portfolio_id, simulation["trades"])
+        backtest.results["trade_persistence"] = persistence.as_dict()
+        _commit_fenced(db, backtest_id, fence)
+    except LeaseLostError:
+        # The new owner is running it; leave the row to that attempt.
+        raise
     except HTTPException:
-        backtest.status = "failed"
-        backtest.results = {"error": "validation failed during local-data backtest"}
-        backtest.completed_at = datetime.now(timezone.utc)
-        db.commit()
+        db.rollback()
+        _fail_backtest(db, backtest, "validation failed during local-data backtest", fence)
         raise
     except Exception as exc:
-        backtest.status = "failed"
-        backtest.results = {"error": str(exc)}
+        db.rollback()
+        _fail_backtest(db, backtest, str(exc), fence)
+        raise HTTPException(status_code=500, detail="Backtest execution failed") from exc
+
+    db.refresh(backtest)
+    return backtest
+
+
+def run_backtest_task(db: Session, payload: dict[str, Any]) -> dict[str, Any]:
+    """Task-queue handler: execute a queued Backtest row (see run_backtest_worker.py)."""
+    backtest = db.query(Backtest).filter(Backtest.id == int(payload["backtest_id"])).first()
+    if not backtest:
+        raise PermanentTaskError(f"Backtest {payload['backtest_id']} not found")
+    if backtest.status == "completed":
+        return {"backtest_id": backtest.id, "status": backtest.status}
+    # A worker whose heartbeats failed keeps running; only the lease holder may write trades.
+    fence = None
+    if payload.get("job_id") and payload.get("worker_id"):
+        fence = partial(hold_lease, job_id=int(payload["job_id"]), worker_id=str(payload["worker_id"]))
+    try:
+        inputs = _load_backtest_inputs(db, backtest)
+        backtest = _execute_backtest(db, backtest, inputs, fence)
+    except HTTPException as exc:
+        if exc.status_code < 500:
+            if backtest.status != "failed":
+                _fail_backtest(db, backtest, str(exc.detail), fence)
+            raise PermanentTaskError(str(exc.detail)) from exc
+        raise
+    return {
+        "backtest_id": backtest.id,
+        "status": backtest.status,
+        "final_value": backtest.final_value,
+        "trade_count": backtest.trade_count,
+    }
+
+
+def _job_response(job: TaskJob) -> BacktestJobResponse:
+    return BacktestJobResponse(
+        job_id=job.id,
+        backtest_id=int((job.payload or {}).get("backtest_id") or 0),
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        worker_id=job.worker_id,
+        error=job.error,
+        result=job.result,
+        finished_at=job.finished_at,
+    )
+
+
+@router.post("/", response_model=BacktestResponse, status_code=201)
+async def run_backtest(payload: BacktestCreate, db: Session = Depends(get_db)):
+    """Create and run a backtest synchronously."""
+    backtest = _prepare_backtest(db, payload)
+    inputs = _load_backtest_inputs(db, backtest)
+    db.add(backtest)
+    db.commit()
+    db.refresh(backtest)
+    return _execute_backtest(db, backtest, inputs)
+
+
+@router.post("/jobs", response_model=BacktestJobResponse, status_code=202)
+async def enqueue_backtest(payload: BacktestCreate, db: Session = Depends(get_db)):
+    """Queue a backtest for a worker process (run_backtest_worker.py) instead of running it here."""
+    backtest = _prepare_backtest(db, payload)
+    db.add(backtest)
+    db.commit()
+    db.refresh(backtest)
+    job = enqueue(db, "backtest", {"backtest_id": backtest.id})
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=BacktestJobResponse)
+async def get_backtest_job(job_id: int, db: Session = Depends(get_read_db)):
+    """Poll a queued backtest; the Backtest itself is readable via GET /backtests/{backtest_id}."""
+    job = db.query(TaskJob).filter(TaskJob.id == job_id, TaskJob.kind == "backtest").first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Backtest job not found")
+    return _job_response(job)
+
+
+@router.post("/sensitivity", response_model=BacktestSensitivityResponse)
+async def backtest_sensitivity(payload: BacktestSensitivityRequest, db: Session = Depends(get_db)):
+    """Sweep MA short x long windows in one vectorized pass over bars loaded once."""
+    if payload.start_date > payload.end_date:
+        raise HTTPException(status_code=400, detail="start_date must be earlier than or equal to end_date")
+    short_windows = sorted({int(item) for item in payload.short_windows})
+    long_windows = sorted({int(item) for item in payload.long_windows})
+    if short_windows[0] < 1 or long_windows[0] < 1:
+        raise HTTPException(status_code=400, detail="windows must be positive integers")
+
+    merged_parameters: dict[str, Any] = {}
+    if payload.strategy_id is not None:
+        strategy = db.query(Strategy).filter(Strategy.id == payload.strategy_id).first()
+        if not strategy:
+            raise HTTPException(status_code=404, detail="Strategy not found")
+        if (strategy.strategy_type or "").strip().lower() != "moving_average":
+            raise HTTPException(status_code=400, detail="Sensitivity sweeps support moving_average strategies only")
+        merged_parameters.update(strategy.parameters or {})
+    merged_parameters.update(payload.parameters or {})
+    interval = str(merged_parameters.get("interval", "1d")).strip().lower()
+    if interval not in BACKTEST_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(BACKTEST_INTERVALS)}")
+    allocation = min(max(float(merged_parameters.get("allocation_per_trade", 0.25)), 0.05), 0.95)
+    commission_rate = min(max(float(merged_parameters.get("commission_rate", 0.001)), 0.0), 0.02)
+
+    start_dt = datetime.combine(payload.start_date, time.min, tzinfo=timezone.utc)
+    end_dt = datetime.combine(payload.end_date, time.max, tzinfo=timezone.utc)
+    series = []
+    instrument_ids: list[int] = []
+    for symbol in _normalize_symbols(payload.symbols):
+        market = _resolve_market_for_symbol(symbol, merged_parameters)
+        bars, instrument = _load_local_bars(db, symbol, market, interval, start_dt, end_dt)
+        series.append(([item.ts for item in bars], [item.close for item in bars]))
+        instrument_ids.append(instrument.id)
+    _, closes = align_closes(series)
+
+    surface = ma_crossover_surface(
+        closes,
+        short_windows,
+        long_windows,
+        allocation=allocation,
+        commission_rate=commission_rate,
+        annualization=_annualization_factor(interval),
+        series=[IndicatorSeries(row, instrument_id, interval) for row, instrument_id in zip(closes, instrument_ids)],
+    )
+    return surface.as_dict()
+
+
+@router.post("/compare", response_model=BacktestCompareResponse)
+async def compare_backtests(payload: BacktestCompareRequest, db: Session = Depends(get_read_db)):
+    """Align selected backtests' equity curves server-side and return one columnar overlay."""
+    backtest_ids = list(dict.fromkeys(payload.backtest_ids))
+    if len(backtest_ids) < 2:
+        raise HTTPException(status_code=400, detail="At least two distinct backtests are required")
+    rows = {item.id: item for item in db.query(Backtest).filter(Backtest.id.in_(backtest_ids)).all()}
+    missing = [item for item in backtest_ids if item not in rows]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Backtest not found: {missing}")
+
+    curves = []
+    for backtest_id in backtest_ids:
+        curve = parse_equity_curve(list((rows[backtest_id].results or {}).get("equity_curve") or []))
+        if not curve[0]:
+            raise HTTPException(status_code=400, detail=f"Backtest {backtest_id} has no equity curve")
+        curves.append(curve)
+
+    comparison = compare_equity_curves(curves, max_points=payload.max_points, normalize=payload.normalize)
+    items = [
+        BacktestCompareItem(
+            backtest_id=backtest_id,
+            strategy_id=rows[backtest_id].strategy_id,
+            total_return=float(rows[backtest_id].total_return or 0.0),
+            max_drawdown=float(rows[backtest_id].max_drawdown or 0.0),
+            relative_max_drawdown=(
+                round(float(value), 4) if math.isfinite(value) else None
+            ),
+        )
+        for backtest_id, value in zip(backtest_ids, comparison.relative_max_drawdowns.tolist())
+    ]
+    return BacktestCompareResponse(
+        backtest_ids=backtest_ids,
+        timestamps=comparison.timestamps,
+        equity=to_json_rows(comparison.equity, 4),
+        drawdowns=to_json_rows(comparison.drawdowns, 4),
+        correlations=to_json_rows(comparison.correlations, 4),
+        items=items,
+        points=len(comparison.timestamps),
+        source_points=comparison.source_points,
+    )
+
+
+@router.post("/{backtest_id}/extend", response_model=BacktestResponse)
+async def extend_backtest(
+    backtest_id: int,
+    payload: BacktestExtendRequest,
+    db: Session = Depends(get_db),
+):
+    """Resume a completed backtest from its checkpoint over bars ingested since it ran."""
+    backtest = _get_backtest_or_404(db, backtest_id)
+    results = dict(backtest.results or {})
+    checkpoint = results.get("checkpoint")
+    if backtest.status != "completed" or not checkpoint:
+        raise HTTPException(status_code=400, detail="Backtest has no checkpoint to extend; rerun it instead")
+
+    end_date = payload.end_date or datetime.now(timezone.utc).date()
+    if end_date < backtest.end_date:
+        raise HTTPException(status_code=400, detail="end_date must not be earlier than the backtest end_date")
+
+    strategy = db.query(Strategy).filter(Strategy.id == backtest.strategy_id).first()
+    if not strategy:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+
+    parameters = dict(results.get("parameters_used") or backtest.parameters or {})
+    interval = str(results.get("interval") or parameters.get("interval", "1d"))
+    symbols = list(backtest.symbols or [])
+    state = EngineState.from_checkpoint(checkpoint)
+    end_dt = datetime.combine(end_date, time.max, tzinfo=timezone.utc)
+
+    bars_by_symbol: dict[str, list[BarPoint]] = {}
+    markets: dict[str, str | None] = {}
+    instrument_ids: dict[str, int] = {}
+    for symbol in symbols:
+        market = _resolve_market_for_symbol(symbol, parameters)
+        bars, instrument = _load_local_bars(db, symbol, market, interval, state.last_ts, end_dt, required=False)
+        markets[symbol] = instrument.market
+        instrument_ids[symbol] = instrument.id
+        bars_by_symbol[symbol] = [item for item in bars if state.last_ts is None or item.ts > state.last_ts]
+    if not any(bars_by_symbol.values()):
+        return backtest
+    timeframes = _load_timeframe_context(db, symbols, markets, parameters, interval, end_dt, bars_by_symbol)
+
+    try:
+        # Undo the forced close of the previous run: drop its liquidation trades and
+        # restore the last equity point to its mark-to-market value.
+        liquidation_trades = int(checkpoint.get("liquidation_trades") or 0)
+        if liquidation_trades:
+            stale = (
+                db.query(Trade)
+                .filter(Trade.backtest_id == backtest.id)
+                .order_by(Trade.id.desc())
+                .limit(liquidation_trades)
+                .all()
+            )
+            for item in stale:
+                db.delete(item)
+        equity_curve = list(results.get("equity_curve") or [])
+        if equity_curve:
+            equity_curve[-1] = {**equity_curve[-1], "value": checkpoint["pre_liquidation_equity"]}
+        closed_trade_pnls = list(results.get("closed_trade_pnls") or [])
+        if liquidation_trades:
+            closed_trade_pnls = closed_trade_pnls[:-liquidation_trades]
+
+        simulation = _run_backtest_local(
+            strategy=strategy,
+            symbols=symbols,
+            bars_by_symbol=bars_by_symbol,
+            initial_capital=backtest.initial_capital,
+            parameters=parameters,
+            interval=interval,
+            state=state,
+            min_bars=1,
+            timeframes=timeframes,
+            instrument_ids=instrument_ids,
+        )
+        equity_curve.extend(simulation["results"]["equity_curve"])
+        closed_trade_pnls.extend(simulation["results"]["closed_trade_pnls"])
+        metrics = _compute_performance_metrics(
+            initial_capital=backtest.initial_capital,
+            final_value=simulation["final_value"],
+            equity_values=[float(point["value"]) for point in equity_curve],
+            closed_trade_pnls=closed_trade_pnls,
+            interval=interval,
+        )
+        persistence = _persist_trades(db, backtest.id, backtest.portfolio_id, simulation["trades"])
+
+        results.update(
+            {
+                "equity_curve": equity_curve,
+                "closed_trade_pnls": closed_trade_pnls,
+                "bars": int(results.get("bars") or 0) + simulation["results"]["bars"],
+                "checkpoint": simulation["results"]["checkpoint"],
+                "trade_persistence": persistence.as_dict(),
+                "extensions": int(results.get("extensions") or 0) + 1,
+            }
+        )
+        backtest.results = results
+        backtest.end_date = end_date
+        backtest.final_value = simulation["final_value"]
+        backtest.total_return = metrics["total_return"]
+        backtest.sharpe_ratio = metrics["sharpe_ratio"]
+        backtest.max_drawdown = metrics["max_drawdown"]
+        backtest.win_rate = metrics["win_rate"]
+        backtest.trade_count = int(backtest.trade_count or 0) - liquidation_trades + simulation["trade_count"]
         backtest.completed_at = datetime.now(timezone.utc)
         db.commit()
-        raise HTTPException(status_code=500, detail="Backtest execution failed") from exc
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as exc:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Backtest extension failed") from exc
 
     db.refresh(backtest)
     return backtest
@@ -548,7 +1008,7 @@ async def run_backtest(payload: BacktestCreate, db: Session = Depends(get_db)):
 async def list_backtests(
     status: str | None = Query(default=None),
     limit: int = Query(default=100, ge=1, le=500),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """List backtests sorted by latest created."""
     query = db.query(Backtest)
@@ -558,7 +1018,7 @@ async def list_backtests(
 
 
 @router.get("/{backtest_id}", response_model=BacktestDetailResponse)
-async def get_backtest(backtest_id: int, db: Session = Depends(get_db)):
+async def get_backtest(backtest_id: int, db: Session = Depends(get_read_db)):
     """Get one backtest with full trade records."""
     backtest = _get_backtest_or_404(db, backtest_id)
     trades = (
@@ -574,7 +1034,7 @@ async def get_backtest(backtest_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{backtest_id}/trades", response_model=list[BacktestTradeResponse])
-async def get_backtest_trades(backtest_id: int, db: Session = Depends(get_db)):
+async def get_backtest_trades(backtest_id: int, db: Session = Depends(get_read_db)):
     """List trades generated by one backtest."""
     _get_backtest_or_404(db, backtest_id)
     return (
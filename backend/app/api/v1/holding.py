@@ -12,6 +12,7 @@ from ...models.portfolio import Holding, Portfolio, PortfolioTrade
 from ...schemas.portfolio import HoldingCreate, HoldingResponse
 from ...schemas.trade import PortfolioTradeCreate, PortfolioTradeResponse
 from ...services.quote_service import AkshareQuoteProvider, QuoteFetchError, QuoteService, StooqQuoteProvider
+from ...services.write_coordinator import WriteQueueFull, get_write_coordinator
 
 router = APIRouter()
 settings = get_settings()
@@ -241,13 +242,8 @@ async def update_holding(
     return result_holding
 
 
-@router.post("/{portfolio_id}/trades", response_model=PortfolioTradeResponse, status_code=201)
-async def execute_trade(
-    portfolio_id: int,
-    trade: PortfolioTradeCreate,
-    db: Session = Depends(get_db),
-):
-    """Execute BUY/SELL trade with weighted-average cost accounting."""
+def _apply_trade(db: Session, portfolio_id: int, trade: PortfolioTradeCreate) -> PortfolioTradeResponse:
+    """Apply one trade inside the writer's transaction; runs on the write coordinator thread."""
     portfolio = _get_portfolio_or_404(db, portfolio_id)
     symbol = trade.symbol.strip().upper()
     amount = trade.quantity * trade.price
@@ -256,7 +252,6 @@ async def execute_trade(
     holding = _merge_duplicate_symbol_holdings(db, portfolio_id, symbol)
 
     if trade.action == "BUY":
-        _validate_buy_symbol(symbol)
         total_cost = amount + trade.commission
         if portfolio.cash_balance < total_cost:
             raise HTTPException(
@@ -321,9 +316,25 @@ async def execute_trade(
     db.add(db_trade)
 
     _refresh_portfolio_value(db, portfolio)
-    db.commit()
+    db.flush()
     db.refresh(db_trade)
-    return db_trade
+    return PortfolioTradeResponse.model_validate(db_trade)
+
+
+@router.post("/{portfolio_id}/trades", response_model=PortfolioTradeResponse, status_code=201)
+async def execute_trade(portfolio_id: int, trade: PortfolioTradeCreate):
+    """Execute BUY/SELL trade with weighted-average cost accounting.
+
+    The ledger update is queued on the single-writer coordinator so concurrent
+    trades share group commits instead of racing for SQLite's write lock.
+    """
+    if trade.action == "BUY":
+        # Quote lookups can be slow; keep them off the writer thread.
+        _validate_buy_symbol(trade.symbol.strip().upper())
+    try:
+        return await get_write_coordinator().write(lambda db: _apply_trade(db, portfolio_id, trade))
+    except WriteQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
 
 
 @router.get("/{portfolio_id}/trades", response_model=list[PortfolioTradeResponse])
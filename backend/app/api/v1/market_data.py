@@ -2,30 +2,49 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Literal
+from typing import Any, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from ...database import get_db
-from ...models.market_data import Bar1d, Bar1m, DataSourceMeta, IngestionLog, Instrument
+from ...database import get_db, get_read_db
+from ...models.market_data import DataSourceMeta, IngestionLog, Instrument
+from ...models.task_queue import TaskJob
 from ...schemas.market_data import (
+    BarExportFormat,
+    BarGapResponse,
+    BarInterval,
     BarResponse,
     DataHealthResponse,
     DataSourceMetaResponse,
     IngestionBatchResponse,
+    IngestionJobResponse,
+    IngestionJobSymbol,
     IngestionRequest,
     IngestionLogResponse,
     InstrumentResponse,
 )
-from ...services.market_data_providers import AkshareMarketDataProvider, UsYFinanceMarketDataProvider
+from ...services.bar_export import ENCODERS, MEDIA_TYPES, arrow_available, bar_chunks
+from ...services.bar_gaps import detect_gaps
+from ...services.bar_partitions import bar_stats
+from ...services.bar_rollups import read_interval_bars
+from ...services.market_data_providers import (
+    AkshareMarketDataProvider,
+    LocalFileMarketDataProvider,
+    UsYFinanceMarketDataProvider,
+)
 from ...services.market_data_service import MarketDataService
+from ...services.paper_trading import paper_trading_engine
+from ...services.task_queue import PermanentTaskError, enqueue
 
 router = APIRouter()
+# Gap ranges listed by /status; gap_estimate still counts every missing bar.
+MAX_STATUS_GAPS = 100
 market_data_service = MarketDataService(
-    providers=[AkshareMarketDataProvider(), UsYFinanceMarketDataProvider()],
+    providers=[AkshareMarketDataProvider(), UsYFinanceMarketDataProvider(), LocalFileMarketDataProvider()],
 )
+market_data_service.subscribe(paper_trading_engine.on_bars)
 
 
 def _get_instrument(db: Session, symbol: str, market: str) -> Instrument:
@@ -39,27 +58,11 @@ def _get_instrument(db: Session, symbol: str, market: str) -> Instrument:
     return instrument
 
 
-def _get_bar_model(interval: str):
-    return Bar1m if interval == "1m" else Bar1d
-
-
-def _estimate_gap(total_bars: int, start: datetime | None, end: datetime | None, interval: str) -> int:
-    if not start or not end:
-        return 0
-    if end < start:
-        return 0
-    seconds = 60 if interval == "1m" else 86400
-    expected = int((end - start).total_seconds() // seconds) + 1
-    if expected <= 0:
-        return 0
-    return max(expected - total_bars, 0)
-
-
 @router.get("/instruments", response_model=list[InstrumentResponse])
 async def list_instruments(
     market: str | None = Query(default=None),
     limit: int = Query(default=200, ge=1, le=2000),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     query = db.query(Instrument)
     if market:
@@ -71,41 +74,55 @@ async def list_instruments(
 async def get_bars(
     symbol: str = Query(..., description="Ticker symbol, e.g. 600519 or AAPL"),
     market: str = Query("CN", description="Market code, e.g. CN/US"),
-    interval: Literal["1m", "1d"] = Query("1m"),
+    interval: BarInterval = Query("1m", description="5m/15m/1h/1w are served from rollup tables"),
     start: datetime | None = Query(default=None),
     end: datetime | None = Query(default=None),
     limit: int = Query(default=2000, ge=1, le=200000),
-    db: Session = Depends(get_db),
+    export_format: BarExportFormat = Query(
+        "json",
+        alias="format",
+        description="json (default), or streamed ndjson/csv/columnar/arrow without per-row validation",
+    ),
+    db: Session = Depends(get_read_db),
 ):
     instrument = _get_instrument(db, symbol, market)
-    model = _get_bar_model(interval)
+    if export_format != "json":
+        if export_format == "arrow" and not arrow_available():
+            raise HTTPException(status_code=503, detail="Arrow export requires pyarrow")
+        chunks = bar_chunks(db, instrument.id, interval, start, end, limit)
+        body = ENCODERS[export_format](chunks, instrument.symbol, instrument.market, interval)
+        headers = {}
+        if export_format in {"csv", "arrow"}:
+            extension = "arrows" if export_format == "arrow" else "csv"
+            headers["Content-Disposition"] = (
+                f'attachment; filename="{instrument.symbol}_{instrument.market}_{interval}.{extension}"'
+            )
+        return StreamingResponse(body, media_type=MEDIA_TYPES[export_format], headers=headers)
 
-    query = db.query(model).filter(model.instrument_id == instrument.id)
-    if start:
-        query = query.filter(model.ts >= start)
-    if end:
-        query = query.filter(model.ts <= end)
-
-    rows = (
-        query.order_by(model.ts.asc())
-        .limit(limit)
-        .all()
-    )
+    columns = read_interval_bars(db, instrument.id, interval, start, end, limit)
 
     return [
         BarResponse(
             symbol=instrument.symbol,
             market=instrument.market,
             interval=interval,
-            ts=row.ts,
-            open=row.open,
-            high=row.high,
-            low=row.low,
-            close=row.close,
-            volume=int(row.volume) if row.volume is not None else None,
-            source=row.source,
+            ts=ts,
+            open=open_,
+            high=high,
+            low=low,
+            close=close,
+            volume=volume,
+            source=source,
+        )
+        for ts, open_, high, low, close, volume, source in zip(
+            columns.timestamps(),
+            columns.open.tolist(),
+            columns.high.tolist(),
+            columns.low.tolist(),
+            columns.close.tolist(),
+            columns.volumes(),
+            columns.source_names(),
         )
-        for row in rows
     ]
 
 
@@ -116,24 +133,11 @@ async def get_data_status(
     interval: Literal["1m", "1d"] = Query("1m"),
     start: datetime | None = Query(default=None),
     end: datetime | None = Query(default=None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     instrument = _get_instrument(db, symbol, market)
-    model = _get_bar_model(interval)
-
-    query = db.query(
-        func.count(model.id),
-        func.min(model.ts),
-        func.max(model.ts),
-    ).filter(model.instrument_id == instrument.id)
-
-    if start:
-        query = query.filter(model.ts >= start)
-    if end:
-        query = query.filter(model.ts <= end)
-
-    total_bars, first_ts, last_ts = query.one()
-    total_bars = int(total_bars or 0)
+    # Counts span bars_1m and any monthly partitions the window overlaps.
+    total_bars, first_ts, last_ts = bar_stats(db, instrument.id, interval, start, end)
 
     meta = (
         db.query(DataSourceMeta)
@@ -146,7 +150,10 @@ async def get_data_status(
         .first()
     )
 
-    gap_estimate = _estimate_gap(total_bars, start or first_ts, end or last_ts, interval)
+    window_start, window_end = start or first_ts, end or last_ts
+    gaps = []
+    if window_start and window_end and window_end >= window_start:
+        gaps = detect_gaps(db, instrument.id, interval, instrument.market, window_start, window_end)
 
     return DataHealthResponse(
         symbol=instrument.symbol,
@@ -157,7 +164,11 @@ async def get_data_status(
         last_bar_ts=last_ts,
         requested_start=start or first_ts,
         requested_end=end or last_ts,
-        gap_estimate=gap_estimate,
+        gap_estimate=sum(gap.missing for gap in gaps),
+        gaps=[
+            BarGapResponse(start_ts=gap.start, end_ts=gap.end, missing=gap.missing)
+            for gap in gaps[:MAX_STATUS_GAPS]
+        ],
         last_ingest=(
             DataSourceMetaResponse(
                 source=meta.source,
@@ -180,7 +191,7 @@ async def list_ingestions(
     symbol: str | None = Query(default=None),
     interval: str | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=200),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     query = db.query(IngestionLog)
     if market:
@@ -207,45 +218,128 @@ async def list_ingestions(
             end_ts=row.end_ts,
             status=row.status,
             message=row.message,
+            bar_count=row.bar_count,
+            job_id=row.job_id,
             created_at=row.created_at,
         )
         for row in rows
     ]
 
 
+def _ingest(db: Session, payload: IngestionRequest, job_id: int | None = None) -> dict[str, Any]:
+    outcomes = market_data_service.ingest_many(
+        db=db,
+        symbols=payload.symbols,
+        market=payload.market,
+        interval=payload.interval,
+        start=payload.start,
+        end=payload.end,
+        provider_name=payload.provider,
+        job_id=job_id,
+    )
+    results = [
+        {
+            "symbol": outcome.symbol,
+            "market": payload.market.upper(),
+            "interval": payload.interval,
+            "ingested": outcome.ingested,
+            "status": outcome.status,
+            "message": outcome.error,
+        }
+        for outcome in outcomes
+    ]
+    return {"results": results}
+
+
 @router.post("/ingest", response_model=IngestionBatchResponse)
-async def ingest_market_data(payload: IngestionRequest, db: Session = Depends(get_db)):
-    results = []
-    for symbol in payload.symbols:
-        try:
-            ingested = market_data_service.ingest_history(
-                db=db,
-                symbol=symbol,
-                market=payload.market,
-                interval=payload.interval,
-                start=payload.start,
-                end=payload.end,
-                provider_name=payload.provider,
-            )
-            results.append(
-                {
-                    "symbol": symbol.upper(),
-                    "market": payload.market.upper(),
-                    "interval": payload.interval,
-                    "ingested": ingested,
-                    "status": "completed",
-                    "message": None,
-                }
-            )
-        except Exception as exc:
-            results.append(
-                {
-                    "symbol": symbol.upper(),
-                    "market": payload.market.upper(),
-                    "interval": payload.interval,
-                    "ingested": 0,
-                    "status": "failed",
-                    "message": str(exc),
-                }
+def ingest_market_data(payload: IngestionRequest, db: Session = Depends(get_db)):
+    """Ingest synchronously (runs on the threadpool); prefer POST /ingest/jobs for large backfills."""
+    return _ingest(db, payload)
+
+
+def run_ingest_task(db: Session, payload: dict[str, Any]) -> dict[str, Any]:
+    """Task-queue handler: run a queued ingestion (see run_backtest_worker.py)."""
+    try:
+        request = IngestionRequest.model_validate(payload["request"])
+    except (KeyError, ValueError) as exc:
+        raise PermanentTaskError(f"Invalid ingestion payload: {exc}") from exc
+    return _ingest(db, request, job_id=payload.get("job_id"))
+
+
+def _ingest_job_response(db: Session, job: TaskJob) -> IngestionJobResponse:
+    request = (job.payload or {}).get("request") or {}
+    market = str(request.get("market") or "CN").upper()
+    interval = str(request.get("interval") or "1m")
+    symbols: dict[str, IngestionJobSymbol] = {
+        str(symbol).strip().upper(): IngestionJobSymbol(symbol=str(symbol).strip().upper(), status="pending")
+        for symbol in request.get("symbols") or []
+    }
+
+    # Outcomes recorded when the job finished cover symbols that never got a log
+    # (no provider for the market, bad symbol); logs then override with live detail.
+    for item in (job.result or {}).get("results") or []:
+        symbol = str(item.get("symbol") or "")
+        symbols[symbol] = IngestionJobSymbol(
+            symbol=symbol,
+            status=item.get("status") or "completed",
+            ingested=int(item.get("ingested") or 0),
+            message=item.get("message"),
+        )
+
+    logs = db.query(IngestionLog).filter(IngestionLog.job_id == job.id).order_by(IngestionLog.id.asc()).all()
+    latest = {log.symbol: log for log in logs}  # A retried job logs again; the newest attempt wins.
+    checkpoints: dict[tuple[str, str], datetime | None] = {}
+    if latest:
+        metas = (
+            db.query(DataSourceMeta)
+            .filter(
+                DataSourceMeta.market == market,
+                DataSourceMeta.interval == interval,
+                DataSourceMeta.symbol.in_(list(latest)),
             )
-    return {"results": results}
+            .all()
+        )
+        checkpoints = {(meta.source, meta.symbol): meta.last_success_ts for meta in metas}
+    for symbol, log in latest.items():
+        symbols[symbol] = IngestionJobSymbol(
+            symbol=symbol,
+            status=log.status,
+            ingested=int(log.bar_count or 0),
+            message=None if log.status == "completed" else log.message,
+            source=log.source,
+            last_success_ts=checkpoints.get((log.source, symbol)),
+        )
+
+    rows = list(symbols.values())
+    return IngestionJobResponse(
+        job_id=job.id,
+        status=job.status,
+        market=market,
+        interval=interval,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        worker_id=job.worker_id,
+        error=job.error,
+        symbols_total=len(rows),
+        symbols_done=sum(1 for row in rows if row.status in {"completed", "failed"}),
+        symbols_failed=sum(1 for row in rows if row.status == "failed"),
+        bars_ingested=sum(row.ingested for row in rows),
+        symbols=rows,
+        finished_at=job.finished_at,
+    )
+
+
+@router.post("/ingest/jobs", response_model=IngestionJobResponse, status_code=202)
+async def enqueue_ingestion(payload: IngestionRequest, db: Session = Depends(get_db)):
+    """Queue an ingestion for a worker process and return its job id immediately."""
+    job = enqueue(db, "ingest", {"request": payload.model_dump(mode="json")})
+    return _ingest_job_response(db, job)
+
+
+@router.get("/ingest/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(job_id: int, db: Session = Depends(get_read_db)):
+    """Poll a queued ingestion: per-symbol status, bars ingested and errors."""
+    job = db.query(TaskJob).filter(TaskJob.id == job_id, TaskJob.kind == "ingest").first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return _ingest_job_response(db, job)
@@ -0,0 +1,102 @@
+"""Paper-trading session API endpoints."""
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ...database import get_db
+from ...models.paper_trading import PaperTradingSession
+from ...models.portfolio import Portfolio
+from ...models.strategy import Strategy
+from ...models.strategy_version import StrategyVersion
+from ...schemas.paper_trading import PaperTradingSessionCreate, PaperTradingSessionResponse
+from ...services.paper_trading import paper_trading_engine
+
+router = APIRouter()
+
+
+def _get_session_or_404(db: Session, session_id: int) -> PaperTradingSession:
+    item = db.query(PaperTradingSession).filter(PaperTradingSession.id == session_id).first()
+    if not item:
+        raise HTTPException(status_code=404, detail="Paper trading session not found")
+    return item
+
+
+@router.post("/sessions", response_model=list[PaperTradingSessionResponse], status_code=201)
+async def create_sessions(payload: PaperTradingSessionCreate, db: Session = Depends(get_db)):
+    """Start paper sessions; indicator state is warmed up from locally stored bars."""
+    strategy = db.query(Strategy).filter(Strategy.id == payload.strategy_id).first()
+    if not strategy:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    if not db.query(Portfolio).filter(Portfolio.id == payload.portfolio_id).first():
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    base_parameters = strategy.parameters
+    if payload.strategy_version_id is not None:
+        version = db.query(StrategyVersion).filter(StrategyVersion.id == payload.strategy_version_id).first()
+        if not version:
+            raise HTTPException(status_code=404, detail="Strategy version not found")
+        if version.strategy_id != strategy.id:
+            raise HTTPException(status_code=400, detail="strategy_version_id does not belong to strategy_id")
+        base_parameters = version.parameters
+    parameters = dict(base_parameters or {})
+    parameters.update(payload.parameters or {})
+
+    symbols: list[str] = []
+    for symbol in payload.symbols:
+        value = str(symbol or "").strip().upper()
+        if value and value not in symbols:
+            symbols.append(value)
+    if not symbols:
+        raise HTTPException(status_code=400, detail="At least one valid symbol is required")
+
+    sessions: list[PaperTradingSession] = []
+    for symbol in symbols:
+        session = PaperTradingSession(
+            strategy_id=strategy.id,
+            strategy_version_id=payload.strategy_version_id,
+            portfolio_id=payload.portfolio_id,
+            symbol=symbol,
+            market=payload.market.strip().upper(),
+            interval=payload.interval,
+            parameters=parameters,
+            status="active",
+            state={},
+            fills=0,
+        )
+        paper_trading_engine.warm_up(db, session, strategy)
+        db.add(session)
+        sessions.append(session)
+    db.commit()
+    for session in sessions:
+        db.refresh(session)
+    return sessions
+
+
+@router.get("/sessions", response_model=list[PaperTradingSessionResponse])
+async def list_sessions(
+    status: str | None = Query(default=None),
+    portfolio_id: int | None = Query(default=None),
+    limit: int = Query(default=200, ge=1, le=2000),
+    db: Session = Depends(get_db),
+):
+    query = db.query(PaperTradingSession)
+    if status:
+        query = query.filter(PaperTradingSession.status == status)
+    if portfolio_id is not None:
+        query = query.filter(PaperTradingSession.portfolio_id == portfolio_id)
+    return query.order_by(PaperTradingSession.id.asc()).limit(limit).all()
+
+
+@router.get("/sessions/{session_id}", response_model=PaperTradingSessionResponse)
+async def get_session(session_id: int, db: Session = Depends(get_db)):
+    return _get_session_or_404(db, session_id)
+
+
+@router.post("/sessions/{session_id}/stop", response_model=PaperTradingSessionResponse)
+async def stop_session(session_id: int, db: Session = Depends(get_db)):
+    session = _get_session_or_404(db, session_id)
+    session.status = "stopped"
+    db.commit()
+    db.refresh(session)
+    return session
@@ -16,6 +16,15 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "sqlite:///./stocktracker.db"
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE_MB: int = 256
+    SQLITE_CACHE_SIZE_MB: int = 64
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    DB_READ_POOL_SIZE: int = 8  # Pooled read-only connections for query endpoints
+    WRITE_QUEUE_SIZE: int = 1024  # Pending writes before the API answers 503
+    WRITE_BATCH_MAX: int = 64  # Writes grouped into one commit
+    WRITE_BATCH_WAIT_MS: float = 2.0
 
     # LLM Configuration
     LLM_PROVIDER: str = "deepseek"
@@ -39,10 +48,20 @@ class Settings(BaseSettings):
     # Stock Data Providers
     TUSHARE_TOKEN: str = ""
     YFINANCE_TIMEOUT: int = 10
+    INGEST_MAX_WORKERS: int = 8  # Fetch threads for multi-symbol ingestion
+    INGEST_PROVIDER_CONCURRENCY: int = 4  # Defaults when a provider sets no limits of its own
+    INGEST_PROVIDER_RATE_PER_SEC: float = 2.0
+    LOCAL_BARS_DIR: str = ""  # <dir>/<MARKET>/<interval>/*.csv|*.csv.gz|*.parquet for the localfile provider
 
     # Cache Settings
     CACHE_QUOTE_TTL: int = 60  # seconds
     CACHE_HISTORY_TTL: int = 3600  # seconds
+    INDICATOR_CACHE_MAX_MB: int = 256
+    INDICATOR_CACHE_DIR: str = ""  # Empty keeps indicator arrays in memory only
+    BAR_STORE_DIR: str = "./data/bar_store"  # Memory-mapped bar columns; empty reads the tables directly
+    BAR_1M_HOT_MONTHS: int = 3  # Months of 1m bars kept in bars_1m; older months move to monthly tables
+    BAR_1M_RETENTION_MONTHS: int = 0  # Older monthly tables are rolled up and archived; 0 keeps them all
+    BAR_ARCHIVE_DIR: str = "./data/bar_archive"  # Compressed .npz exports of archived partitions
 
     # Knowledge base retrieval governance
     KB_MIN_SCORE: float = 0.08
@@ -59,6 +78,10 @@ class Settings(BaseSettings):
     ENABLE_WEBSOCKET: bool = False
     # Backtest mode
     ALLOW_SIM_BACKTEST: bool = False
+    # Task queue shared by backtest workers
+    TASK_LEASE_SECONDS: int = 60
+    TASK_MAX_ATTEMPTS: int = 3
+    TASK_RETRY_BASE_SECONDS: float = 5.0
 
     # CORS
     CORS_ORIGINS: list[str] = [
@@ -1,19 +1,25 @@
 """Database connection and session management."""
-from sqlalchemy import create_engine
 from sqlalchemy import text
 from sqlalchemy.orm import declarative_base, sessionmaker
 from .config import get_settings
+from .db_profile import SqliteProfile, create_profiled_engine, verify_profile
 
 settings = get_settings()
+profile = SqliteProfile.from_settings(settings)
 
-# Create SQLAlchemy engine
-engine = create_engine(
+# Write engine: ingestion, jobs and every endpoint that mutates state
+engine = create_profiled_engine(settings.DATABASE_URL, profile)
+# Pooled read-only engine for query endpoints; WAL lets it read while a write is in flight
+read_engine = create_profiled_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    profile,
+    read_only=True,
+    pool_size=settings.DB_READ_POOL_SIZE,
 )
 
-# Create session factory
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Create base class for models
 Base = declarative_base()
@@ -28,6 +34,15 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Dependency to get a read-only database session."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def init_db():
     """Initialize database tables."""
     # Ensure all SQLAlchemy models are registered before create_all.
@@ -35,6 +50,7 @@ def init_db():
 
     Base.metadata.create_all(bind=engine)
     _ensure_runtime_schema_compatibility()
+    verify_database_profile()
     try:
         from .services.knowledge_base import ensure_kb_schema
     except Exception:
@@ -42,14 +58,28 @@ def init_db():
     ensure_kb_schema(engine)
 
 
+def verify_database_profile() -> dict:
+    """Check WAL and pragmas on both engines; raises RuntimeError when they did not apply."""
+    return {
+        "write": verify_profile(engine, profile),
+        "read": verify_profile(read_engine, profile, read_only=True),
+    }
+
+
 def _ensure_runtime_schema_compatibility() -> None:
     """Apply lightweight SQLite schema patches for backward compatibility."""
     if engine.dialect.name != "sqlite":
         return
     with engine.begin() as conn:
         columns = conn.execute(text("PRAGMA table_info(backtests)")).fetchall()
-        if not columns:
-            return
         names = {str(row[1]) for row in columns}
-        if "strategy_version_id" not in names:
+        if columns and "strategy_version_id" not in names:
             conn.execute(text("ALTER TABLE backtests ADD COLUMN strategy_version_id INTEGER"))
+
+        columns = conn.execute(text("PRAGMA table_info(ingestion_logs)")).fetchall()
+        names = {str(row[1]) for row in columns}
+        if columns and "bar_count" not in names:
+            conn.execute(text("ALTER TABLE ingestion_logs ADD COLUMN bar_count INTEGER"))
+        if columns and "job_id" not in names:
+            conn.execute(text("ALTER TABLE ingestion_logs ADD COLUMN job_id INTEGER"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_ingestion_logs_job_id ON ingestion_logs (job_id)"))
@@ -0,0 +1,141 @@
+"""SQLite connection profile: WAL journaling and per-connection pragmas.
+
+Every pooled connection gets ``synchronous``, ``mmap_size``, ``cache_size`` and
+``busy_timeout`` applied on connect. WAL is persistent in the database file, so
+only the write engine switches the journal mode; read-only engines additionally
+set ``query_only`` so a stray write through a query endpoint fails loudly
+instead of taking the writer lock.
+
+Write engines take over transaction control from pysqlite (SQLAlchemy's
+documented savepoint recipe). The driver otherwise emits no ``BEGIN`` before a
+``SAVEPOINT``, so releasing the outermost savepoint commits on its own and the
+write coordinator's savepoint-per-write batches would commit once per write.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+
+from .config import Settings
+
+
+@dataclass(frozen=True)
+class SqliteProfile:
+    wal: bool = True
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size_kib: int = 64 * 1024
+    busy_timeout_ms: int = 5000
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "SqliteProfile":
+        return cls(
+            wal=settings.SQLITE_WAL,
+            synchronous=settings.SQLITE_SYNCHRONOUS.upper(),
+            mmap_size=max(settings.SQLITE_MMAP_SIZE_MB, 0) * 1024 * 1024,
+            cache_size_kib=max(settings.SQLITE_CACHE_SIZE_MB, 0) * 1024,
+            busy_timeout_ms=max(settings.SQLITE_BUSY_TIMEOUT_MS, 0),
+        )
+
+
+_SYNCHRONOUS_LEVELS = {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}
+
+
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _pragmas(profile: SqliteProfile, read_only: bool) -> list[str]:
+    statements = [
+        f"PRAGMA busy_timeout={profile.busy_timeout_ms}",
+        f"PRAGMA synchronous={profile.synchronous}",
+        f"PRAGMA mmap_size={profile.mmap_size}",
+        # Negative cache_size is in KiB rather than pages.
+        f"PRAGMA cache_size=-{profile.cache_size_kib}",
+    ]
+    if read_only:
+        statements.append("PRAGMA query_only=ON")
+    elif profile.wal:
+        statements.insert(0, "PRAGMA journal_mode=WAL")
+    return statements
+
+
+def create_profiled_engine(
+    url: str,
+    profile: SqliteProfile | None = None,
+    read_only: bool = False,
+    pool_size: int | None = None,
+) -> Engine:
+    """Engine for ``url`` with the profile installed on every new SQLite file connection."""
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(url)
+
+    options: dict[str, Any] = {"connect_args": {"check_same_thread": False}}  # Needed for SQLite
+    if pool_size and is_sqlite_file(url):
+        options.update(pool_size=pool_size, max_overflow=pool_size)
+    engine = create_engine(url, **options)
+
+    if not read_only:
+        _own_transactions(engine)
+    if profile is None or not is_sqlite_file(url):
+        return engine
+
+    statements = _pragmas(profile, read_only)
+
+    @event.listens_for(engine, "connect")
+    def _apply_profile(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def _own_transactions(engine: Engine) -> None:
+    """Disable pysqlite's implicit BEGIN and emit our own when SQLAlchemy starts a transaction."""
+
+    @event.listens_for(engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, _record) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn) -> None:
+        conn.exec_driver_sql("BEGIN")
+
+
+def verify_profile(engine: Engine, profile: SqliteProfile, read_only: bool = False) -> dict[str, Any]:
+    """Read the pragmas back from a live connection and fail if the profile did not stick."""
+    if engine.dialect.name != "sqlite" or not is_sqlite_file(str(engine.url)):
+        return {}
+    names = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout", "query_only")
+    with engine.connect() as conn:
+        actual = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
+
+    expected: dict[str, Any] = {
+        "synchronous": _SYNCHRONOUS_LEVELS.get(profile.synchronous, profile.synchronous),
+        "cache_size": -profile.cache_size_kib,
+        "busy_timeout": profile.busy_timeout_ms,
+        "query_only": 1 if read_only else 0,
+    }
+    if profile.wal:
+        expected["journal_mode"] = "wal"
+    mismatched = {
+        name: (value, actual[name])
+        for name, value in expected.items()
+        if str(actual[name]).lower() != str(value).lower()
+    }
+    # mmap_size is capped by SQLITE_MAX_MMAP_SIZE at compile time; only require it to be on.
+    if profile.mmap_size and not actual["mmap_size"]:
+        mismatched["mmap_size"] = (profile.mmap_size, actual["mmap_size"])
+    if mismatched:
+        role = "read" if read_only else "write"
+        detail = ", ".join(f"{name} expected {want!r} got {got!r}" for name, (want, got) in mismatched.items())
+        raise RuntimeError(f"SQLite {role} engine profile not applied: {detail}")
+    return actual
@@ -9,6 +9,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from .config import get_settings
 from .database import init_db
 from .services.llm_service import llm_runtime_info, probe_llm_connection
+from .services.write_coordinator import get_write_coordinator
 from .api.v1 import portfolio
 from .api.v1 import holding
 from .api.v1 import telemetry
@@ -20,6 +21,7 @@ from .api.v1 import market_data
 from .api.v1 import knowledge_base
 from .api.v1 import agent
 from .api.v1 import chat
+from .api.v1 import paper_trading
 
 settings = get_settings()
 
@@ -68,6 +70,7 @@ async def lifespan(_: FastAPI):
     init_db()
     _safe_log("[OK] Database initialized")
     yield
+    get_write_coordinator().stop()
 
 
 # Create FastAPI application
@@ -142,6 +145,7 @@ app.include_router(market_data.router, prefix="/api/v1/market-data", tags=["mark
 app.include_router(knowledge_base.router, prefix="/api/v1/kb", tags=["knowledge-base"])
 app.include_router(agent.router, prefix="/api/v1/agent", tags=["agent"])
 app.include_router(chat.router, prefix="/api/v1/chat", tags=["chat"])
+app.include_router(paper_trading.router, prefix="/api/v1/paper-trading", tags=["paper-trading"])
 
 
 if __name__ == "__main__":
@@ -4,9 +4,11 @@ from .strategy import Strategy
 from .backtest import Backtest, Trade
 from .chat import ChatSession, ChatMessage
 from .stock import StockCache, PriceAlert
-from .market_data import Instrument, Bar1m, Bar1d, IngestionLog, DataSourceMeta
+from .market_data import Instrument, Bar1m, Bar1d, BarRollup, BarPartition, BarGap, IngestionLog, DataSourceMeta
 from .knowledge_base import KnowledgeDocument, KnowledgeChunk
 from .strategy_version import StrategyVersion
+from .paper_trading import PaperTradingSession
+from .task_queue import TaskJob
 
 __all__ = [
     "Portfolio",
@@ -22,9 +24,14 @@ __all__ = [
     "Instrument",
     "Bar1m",
     "Bar1d",
+    "BarRollup",
+    "BarPartition",
+    "BarGap",
     "IngestionLog",
     "DataSourceMeta",
     "KnowledgeDocument",
     "KnowledgeChunk",
     "StrategyVersion",
+    "PaperTradingSession",
+    "TaskJob",
 ]
@@ -3,8 +3,21 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 
-from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    event,
+    update,
+)
+from sqlalchemy.orm import Session, relationship
 
 from ..database import Base
 
@@ -84,6 +97,90 @@ class Bar1d(Base):
     )
 
 
+@event.listens_for(Session, "after_flush")
+def _stamp_bar_writes(session: Session, _context) -> None:
+    """Bump ``Instrument.updated_at`` for bars written through the ORM.
+
+    The bar store fingerprints an instrument's bars by that stamp; bulk writers
+    (``_upsert_bars``) set it themselves.
+    """
+    touched = {
+        item.instrument_id
+        for item in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(item, (Bar1m, Bar1d))
+    }
+    if touched:
+        session.connection().execute(
+            update(Instrument.__table__).where(Instrument.__table__.c.id.in_(touched)).values(updated_at=_utcnow())
+        )
+
+
+class BarRollup(Base):
+    """OHLCV aggregated from bars_1m (5m/15m/1h) or bars_1d (1w), per source.
+
+    ``ts`` is the bucket start in UTC; weekly buckets start on Monday.
+    """
+
+    __tablename__ = "bar_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    instrument_id = Column(Integer, ForeignKey("instruments.id", ondelete="CASCADE"), nullable=False)
+    interval = Column(String(8), nullable=False)
+    ts = Column(DateTime, nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(BigInteger)
+    bar_count = Column(Integer, nullable=False, default=0)
+    source = Column(String(32), nullable=False, default="local")
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("instrument_id", "interval", "ts", "source", name="uq_bar_rollup_bucket"),
+        Index("ix_bar_rollup_lookup", "instrument_id", "interval", "ts"),
+    )
+
+
+class BarPartition(Base):
+    """Registry of monthly cold-storage tables split off ``bars_1m``."""
+
+    __tablename__ = "bar_partitions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    interval = Column(String(8), nullable=False, default="1m")
+    month = Column(String(7), nullable=False)  # YYYY-MM, UTC
+    table_name = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, default="active")  # active / archived
+    row_count = Column(Integer, nullable=False, default=0)
+    archive_path = Column(String(512))
+    created_at = Column(DateTime, default=_utcnow, nullable=False)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("interval", "month", name="uq_bar_partition_interval_month"),
+    )
+
+
+class BarGap(Base):
+    """A run of consecutive calendar timestamps missing from a raw bar table."""
+
+    __tablename__ = "bar_gaps"
+
+    id = Column(Integer, primary_key=True, index=True)
+    instrument_id = Column(Integer, ForeignKey("instruments.id", ondelete="CASCADE"), nullable=False)
+    interval = Column(String(8), nullable=False)
+    start_ts = Column(DateTime, nullable=False)  # First missing bar (naive UTC)
+    end_ts = Column(DateTime, nullable=False)  # Last missing bar, inclusive
+    missing = Column(Integer, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)  # Backfills that left it unfilled
+    detected_at = Column(DateTime, default=_utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("instrument_id", "interval", "start_ts", name="uq_bar_gap_instrument_interval_start"),
+    )
+
+
 class IngestionLog(Base):
     """Track data ingestion attempts for observability and replay."""
 
@@ -98,6 +195,8 @@ class IngestionLog(Base):
     end_ts = Column(DateTime)
     status = Column(String(16), default="pending", nullable=False)
     message = Column(String(512))
+    bar_count = Column(Integer)
+    job_id = Column(Integer, index=True)  # task_jobs.id when run by a queued ingest job
     created_at = Column(DateTime, default=_utcnow, nullable=False)
 
 
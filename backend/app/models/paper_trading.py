@@ -0,0 +1,34 @@
+"""Paper-trading session models."""
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, JSON, String
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class PaperTradingSession(Base):
+    """One strategy running forward on one symbol, fed by ingested bars."""
+
+    __tablename__ = "paper_trading_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    strategy_id = Column(Integer, ForeignKey("strategies.id"), nullable=False)
+    strategy_version_id = Column(Integer, ForeignKey("strategy_versions.id"), nullable=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), nullable=False, index=True)
+    symbol = Column(String(32), nullable=False)
+    market = Column(String(16), nullable=False)
+    interval = Column(String(8), nullable=False)
+    parameters = Column(JSON, nullable=True)
+    status = Column(String(16), default="active", nullable=False)  # active / stopped
+    state = Column(JSON, nullable=True)  # Streaming indicator state and open position
+    last_bar_ts = Column(DateTime, nullable=True)
+    fills = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    strategy = relationship("Strategy")
+    portfolio = relationship("Portfolio")
+
+    __table_args__ = (
+        Index("ix_paper_session_route", "market", "symbol", "interval", "status"),
+    )
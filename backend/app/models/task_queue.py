@@ -0,0 +1,32 @@
+"""Durable task queue models."""
+from sqlalchemy import Column, DateTime, Index, Integer, JSON, String, Text
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class TaskJob(Base):
+    """A unit of heavy work claimed by a worker process under a time-limited lease."""
+
+    __tablename__ = "task_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(32), nullable=False)  # e.g. backtest
+    payload = Column(JSON, nullable=True)
+    status = Column(String(16), default="queued", nullable=False)  # queued / running / completed / failed
+    priority = Column(Integer, default=0, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    worker_id = Column(String(128), nullable=True)
+    available_at = Column(DateTime, nullable=False)  # Naive UTC; delayed after a retryable failure
+    lease_expires_at = Column(DateTime, nullable=True)  # Naive UTC
+    heartbeat_at = Column(DateTime, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_task_jobs_claim", "status", "available_at", "priority"),
+    )
@@ -23,6 +23,11 @@ class AgentGenerateResponse(BaseModel):
     strategy: StrategyResponse | None = None
 
 
+class AgentTuneValidation(BaseModel):
+    folds: int = Field(default=3, ge=1, le=10)
+    mode: Literal["expanding", "rolling"] = "expanding"
+
+
 class AgentTuneRequest(BaseModel):
     strategy_id: int = Field(..., gt=0)
     strategy_version_id: int | None = Field(default=None, gt=0)
@@ -37,6 +42,7 @@ class AgentTuneRequest(BaseModel):
     max_trials: int = Field(default=30, ge=1, le=200)
     parameter_grid: dict[str, list[float | int]] = Field(default_factory=dict)
     persist_best_version: bool = False
+    validation: AgentTuneValidation | None = None
 
 
 class AgentTuneTrial(BaseModel):
@@ -47,6 +53,9 @@ class AgentTuneTrial(BaseModel):
     sharpe_ratio: float
     max_drawdown: float
     win_rate: float
+    in_sample_objective: float | None = None
+    out_of_sample_objective: float | None = None
+    folds: list[dict[str, Any]] | None = None
 
 
 class AgentTuneResponse(BaseModel):
@@ -54,6 +63,7 @@ class AgentTuneResponse(BaseModel):
     best_trial: AgentTuneTrial
     top_trials: list[AgentTuneTrial]
     created_version_id: int | None = None
+    validation: dict[str, Any] | None = None
 
 
 class AgentReportRequest(BaseModel):
@@ -11,13 +11,88 @@ class BacktestCreate(BaseModel):
     strategy_id: int = Field(..., gt=0)
     strategy_version_id: Optional[int] = Field(default=None, gt=0)
     portfolio_id: Optional[int] = Field(default=None, gt=0)
-    symbols: list[str] = Field(..., min_length=1, max_length=20)
+    # Cross-sectional (rank) strategies trade whole universes.
+    symbols: list[str] = Field(..., min_length=1, max_length=500)
     start_date: date
     end_date: date
     initial_capital: float = Field(..., gt=0)
     parameters: dict[str, Any] = Field(default_factory=dict)
 
 
+class BacktestExtendRequest(BaseModel):
+    """Input payload for extending a completed backtest over newly ingested bars."""
+
+    end_date: Optional[date] = None
+
+
+class BacktestSensitivityRequest(BaseModel):
+    """Input payload for a vectorized moving-average parameter sweep."""
+
+    strategy_id: Optional[int] = Field(default=None, gt=0)
+    symbols: list[str] = Field(..., min_length=1, max_length=20)
+    start_date: date
+    end_date: date
+    short_windows: list[int] = Field(..., min_length=1, max_length=200)
+    long_windows: list[int] = Field(..., min_length=1, max_length=200)
+    parameters: dict[str, Any] = Field(default_factory=dict)
+
+
+class BacktestSensitivityResponse(BaseModel):
+    """Metric surfaces indexed as [short_window][long_window]; null where short >= long."""
+
+    short_windows: list[int]
+    long_windows: list[int]
+    bars: int
+    symbols: int
+    elapsed_ms: float
+    surfaces: dict[str, list[list[Optional[float]]]]
+
+
+class BacktestCompareRequest(BaseModel):
+    """Input payload for overlaying several backtests' equity curves."""
+
+    backtest_ids: list[int] = Field(..., min_length=2, max_length=20)
+    max_points: Optional[int] = Field(default=None, ge=2, le=20000)
+    normalize: bool = False  # Rebase every curve to 1.0 at its first point
+
+
+class BacktestCompareItem(BaseModel):
+    """Per-backtest summary within a comparison."""
+
+    backtest_id: int
+    strategy_id: int
+    total_return: float
+    max_drawdown: float
+    relative_max_drawdown: Optional[float]  # Worst drawdown of this curve relative to the first one
+
+
+class BacktestCompareResponse(BaseModel):
+    """Columnar overlay: equity[i] and drawdowns[i] align with backtest_ids[i] and timestamps."""
+
+    backtest_ids: list[int]
+    timestamps: list[datetime]
+    equity: list[list[Optional[float]]]
+    drawdowns: list[list[Optional[float]]]
+    correlations: list[list[Optional[float]]]
+    items: list[BacktestCompareItem]
+    points: int
+    source_points: int
+
+
+class BacktestJobResponse(BaseModel):
+    """State of a backtest queued for a worker process."""
+
+    job_id: int
+    backtest_id: int
+    status: str
+    attempts: int
+    max_attempts: int
+    worker_id: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[dict[str, Any]] = None
+    finished_at: Optional[datetime] = None
+
+
 class BacktestTradeResponse(BaseModel):
     """Simulated trade record from a backtest run."""
 
@@ -17,10 +17,14 @@ class InstrumentResponse(BaseModel):
     is_active: bool
 
 
+BarInterval = Literal["1m", "5m", "15m", "1h", "1d", "1w"]
+BarExportFormat = Literal["json", "ndjson", "csv", "columnar", "arrow"]
+
+
 class BarResponse(BaseModel):
     symbol: str
     market: str
-    interval: Literal["1m", "1d"]
+    interval: BarInterval
     ts: datetime = Field(..., description="UTC timestamp")
     open: float
     high: float
@@ -33,7 +37,7 @@ class BarResponse(BaseModel):
 class BarQuery(BaseModel):
     symbol: str
     market: str = "CN"
-    interval: Literal["1m", "1d"] = "1m"
+    interval: BarInterval = "1m"
     start: datetime | None = None
     end: datetime | None = None
     limit: int = Field(default=2000, ge=1, le=200000)
@@ -59,9 +63,17 @@ class IngestionLogResponse(BaseModel):
     end_ts: datetime | None = None
     status: str
     message: str | None = None
+    bar_count: int | None = None
+    job_id: int | None = None
     created_at: datetime | None = None
 
 
+class BarGapResponse(BaseModel):
+    start_ts: datetime = Field(..., description="First missing bar (UTC)")
+    end_ts: datetime = Field(..., description="Last missing bar (UTC), inclusive")
+    missing: int
+
+
 class DataHealthResponse(BaseModel):
     symbol: str
     market: str
@@ -71,7 +83,8 @@ class DataHealthResponse(BaseModel):
     last_bar_ts: datetime | None = None
     requested_start: datetime | None = None
     requested_end: datetime | None = None
-    gap_estimate: int
+    gap_estimate: int = Field(..., description="Bars the trading calendar expects in the window but the store lacks")
+    gaps: list[BarGapResponse] = Field(default_factory=list)
     last_ingest: DataSourceMetaResponse | None = None
 
 
@@ -95,3 +108,31 @@ class IngestionResult(BaseModel):
 
 class IngestionBatchResponse(BaseModel):
     results: list[IngestionResult]
+
+
+class IngestionJobSymbol(BaseModel):
+    symbol: str
+    status: str = Field(..., description="pending / running / completed / failed")
+    ingested: int = 0
+    message: str | None = None
+    source: str | None = None
+    last_success_ts: datetime | None = None
+
+
+class IngestionJobResponse(BaseModel):
+    """State of an ingestion queued for a worker process, with per-symbol progress."""
+
+    job_id: int
+    status: str
+    market: str
+    interval: str
+    attempts: int
+    max_attempts: int
+    worker_id: str | None = None
+    error: str | None = None
+    symbols_total: int
+    symbols_done: int
+    symbols_failed: int
+    bars_ingested: int
+    symbols: list[IngestionJobSymbol]
+    finished_at: datetime | None = None
@@ -0,0 +1,35 @@
+"""Pydantic schemas for paper-trading sessions."""
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class PaperTradingSessionCreate(BaseModel):
+    """Start one paper session per symbol for a strategy and portfolio."""
+
+    strategy_id: int = Field(..., gt=0)
+    strategy_version_id: int | None = Field(default=None, gt=0)
+    portfolio_id: int = Field(..., gt=0)
+    symbols: list[str] = Field(..., min_length=1, max_length=500)
+    market: str = "CN"
+    interval: Literal["1m", "1d"] = "1m"
+    parameters: dict[str, Any] = Field(default_factory=dict)
+
+
+class PaperTradingSessionResponse(BaseModel):
+    id: int
+    strategy_id: int
+    strategy_version_id: int | None = None
+    portfolio_id: int
+    symbol: str
+    market: str
+    interval: str
+    parameters: dict[str, Any] | None = None
+    status: str
+    state: dict[str, Any] | None = None
+    last_bar_ts: datetime | None = None
+    fills: int
+    created_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -19,6 +19,7 @@ from .agent_backtest_analysis import (
     trial_objective_value,
 )
 from .llm_service import LLMUnavailableError, chat_json
+from .strategy_dsl import compile_strategy_expression
 
 logger = logging.getLogger(__name__)
 
@@ -140,6 +141,10 @@ def _generate_default_parameters(strategy_type: str, prompt: str) -> dict[str, A
 
 
 def _template_code(strategy_type: str, parameters: dict[str, Any]) -> str:
+    if strategy_type == "expression":
+        # Expression strategies run from parameters; the code field only documents them.
+        return f"# entry: {parameters.get('entry', '')}\n# exit: {parameters.get('exit', '')}\n"
+
     if strategy_type == "rsi":
         return (
             "from __future__ import annotations\n\n"
@@ -226,7 +231,7 @@ def _template_code(strategy_type: str, parameters: dict[str, Any]) -> str:
 
 def _normalize_strategy_type(value: str) -> str:
     normalized = (value or "").strip().lower()
-    if normalized in {"moving_average", "rsi", "momentum", "custom"}:
+    if normalized in {"moving_average", "rsi", "momentum", "custom", "expression"}:
         return normalized
     if normalized in {"ma", "moving-average"}:
         return "moving_average"
@@ -268,6 +273,9 @@ def _sanitize_parameters(strategy_type: str, payload: dict[str, Any], prompt: st
             0.001,
             min(0.2, float(candidate.get("momentum_threshold", base["momentum_threshold"]))),
         )
+    elif strategy_type == "expression":
+        # Raises StrategyExpressionError (a ValueError) so generation falls back cleanly.
+        compile_strategy_expression(candidate)
     else:
         candidate["lookback"] = max(3, int(candidate.get("lookback", base.get("lookback", 20))))
     return candidate
@@ -277,14 +285,22 @@ def _strategy_prompt_system() -> str:
     return (
         "You are a quantitative strategy assistant. "
         "Return one strict JSON object only. "
-        "Supported strategy_type values: moving_average, rsi, momentum, custom. "
+        "Supported strategy_type values: moving_average, rsi, momentum, expression, custom. "
         "Output schema: "
         '{"strategy_type":"...", "parameters":{}, "rationale":"...", "code":"..."} . '
-        "The code field must define function signal(prices: list[float], params: dict) -> str "
-        "and return BUY/SELL/HOLD only. "
-        "The signal function can only use the prices list and params. "
+        "Prefer strategy_type=expression when the idea is not classic MA/RSI/momentum: put boolean "
+        "rules in parameters.entry and parameters.exit, e.g. "
+        '"entry": "cross(sma(close, fast), sma(close, slow)) and rsi(close, 14) < 60", '
+        '"exit": "crossunder(sma(close, fast), sma(close, slow))", "fast": 5, "slow": 20. '
+        "Expressions may use the series close; functions sma, ema, std, rsi, highest, lowest, shift, "
+        "change (all (series, window)), cross, crossunder, abs, min, max; operators + - * / "
+        "< <= > >= and or not; numbers and names of numeric parameters. Windows must be integers "
+        "or parameter names. Leave code empty for expression strategies. "
+        "For strategy_type=custom the code field must define function "
+        "signal(prices: list[float], params: dict) -> str returning BUY/SELL/HOLD only, "
+        "using only the prices list and params. "
         "Keep allocation_per_trade within [0.01, 0.95] and commission_rate within [0.0, 0.02]. "
-        "If user idea is not classic MA/RSI/momentum, use strategy_type=custom."
+        "Use strategy_type=custom only when the rules cannot be written as an expression."
     )
 
 
@@ -299,7 +315,9 @@ def _generate_strategy_with_llm(prompt: str) -> GeneratedStrategy:
     parameters = _sanitize_parameters(strategy_type, payload.get("parameters") or {}, prompt)
     rationale = str(payload.get("rationale") or "").strip() or "Generated by LLM from user intent."
     code = str(payload.get("code") or "").strip()
-    if "def signal(" not in code:
+    if strategy_type == "expression":
+        code = _template_code(strategy_type, parameters)
+    elif "def signal(" not in code:
         code = _template_code(strategy_type, parameters)
         rationale = f"{rationale} Code fallback was applied because LLM code was invalid."
     return GeneratedStrategy(
@@ -0,0 +1,108 @@
+"""Server-side alignment of several backtests' equity curves for overlay charts."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import math
+from typing import Any
+
+import numpy as np
+
+from .vectorized_backtest import align_closes
+
+
+@dataclass
+class EquityComparison:
+    timestamps: list[datetime]
+    equity: np.ndarray  # (backtests, points); NaN before a backtest's first point
+    drawdowns: np.ndarray  # Percent below each curve's running peak
+    correlations: np.ndarray  # Pairwise correlation of step returns on shared bars
+    relative_max_drawdowns: np.ndarray  # Worst drawdown of equity / baseline equity
+    source_points: int
+
+
+def parse_equity_curve(points: list[dict[str, Any]]) -> tuple[list[datetime], list[float]]:
+    timestamps: list[datetime] = []
+    values: list[float] = []
+    for point in points:
+        ts = datetime.fromisoformat(str(point["timestamp"]).replace("Z", "+00:00"))
+        if timestamps and ts <= timestamps[-1]:
+            continue
+        timestamps.append(ts)
+        values.append(float(point["value"]))
+    return timestamps, values
+
+
+def _drawdowns(equity: np.ndarray) -> np.ndarray:
+    peaks = np.fmax.accumulate(equity, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(peaks > 0, (equity / peaks - 1.0) * 100.0, np.nan)
+
+
+def _pairwise_correlations(equity: np.ndarray, printed: np.ndarray) -> np.ndarray:
+    """Correlate returns between the points both curves printed; forward-filled points are skipped."""
+    count = equity.shape[0]
+    out = np.eye(count)
+    for i in range(count):
+        for j in range(i + 1, count):
+            shared = np.flatnonzero(printed[i] & printed[j])
+            value = np.nan
+            if len(shared) > 3:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    a = equity[i, shared[1:]] / equity[i, shared[:-1]] - 1.0
+                    b = equity[j, shared[1:]] / equity[j, shared[:-1]] - 1.0
+                finite = np.isfinite(a) & np.isfinite(b)
+                a, b = a[finite], b[finite]
+                if len(a) > 2 and a.std() > 1e-12 and b.std() > 1e-12:
+                    value = float(np.corrcoef(a, b)[0, 1])
+            out[i, j] = out[j, i] = value
+    return out
+
+
+def downsample_indices(points: int, max_points: int | None) -> np.ndarray:
+    """Evenly spaced indices that always keep the first and last point."""
+    if not max_points or points <= max_points:
+        return np.arange(points)
+    return np.unique(np.linspace(0, points - 1, max(max_points, 2)).round().astype(np.int64))
+
+
+def compare_equity_curves(
+    curves: list[tuple[list[datetime], list[float]]],
+    max_points: int | None = None,
+    normalize: bool = False,
+) -> EquityComparison:
+    """Align curves on the union timeline (forward-filled) and derive comparison statistics.
+
+    Statistics are computed on the full aligned grid; only the returned series
+    are downsampled.
+    """
+    timeline, equity = align_closes(curves, fill_leading=False)
+    position = {ts: idx for idx, ts in enumerate(timeline)}
+    printed = np.zeros(equity.shape, dtype=bool)
+    for row, (timestamps, _) in enumerate(curves):
+        printed[row, [position[ts] for ts in timestamps]] = True
+    if normalize and equity.size:
+        first = np.array([values[0] if values else np.nan for _, values in curves])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            equity = equity / first[:, None]
+    drawdowns = _drawdowns(equity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = _drawdowns(equity / equity[:1])
+    relative_max = np.where(np.isfinite(relative), relative, np.inf).min(axis=1, initial=np.inf)
+    relative_max[np.isinf(relative_max)] = np.nan
+
+    keep = downsample_indices(len(timeline), max_points)
+    return EquityComparison(
+        timestamps=[timeline[idx] for idx in keep],
+        equity=equity[:, keep],
+        drawdowns=drawdowns[:, keep],
+        correlations=_pairwise_correlations(equity, printed),
+        relative_max_drawdowns=relative_max,
+        source_points=len(timeline),
+    )
+
+
+def to_json_rows(values: np.ndarray, digits: int = 6) -> list[list[float | None]]:
+    """NaN-safe nested lists for JSON responses."""
+    rounded = np.round(values, digits)
+    return [[item if math.isfinite(item) else None for item in row] for row in rounded.tolist()]
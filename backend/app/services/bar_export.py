@@ -0,0 +1,216 @@
+"""Streaming bar export for ``GET /market-data/bars?format=...``.
+
+Bars are produced as ``BarColumns`` chunks and encoded straight from the numpy
+columns, with no per-row response models. With the bar store enabled, raw
+intervals are sliced from the memory-mapped file (zero copy); otherwise, and
+for rollup intervals, rows come from a server-side cursor fetched
+``chunk_rows`` at a time. Peak memory is one chunk whatever the row count.
+
+Formats:
+
+* ``ndjson``: one ``BarResponse``-shaped JSON object per line;
+* ``csv``: ``ts,open,high,low,close,volume,source`` with a header row;
+* ``columnar``: one JSON object of parallel arrays (``ts``, ``open``, ...) for
+  charting clients; columns are spooled to temporary files as chunks arrive;
+* ``arrow``: an Arrow IPC stream, one record batch per chunk (needs ``pyarrow``).
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import tempfile
+from datetime import datetime
+from typing import Callable, Iterator
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .bar_rollups import ROLLUP_INTERVALS, rollups_query
+from .bar_store import VOLUME_NULL, BarColumns, bars_query, get_bar_store
+
+CHUNK_ROWS = 10_000
+# Columnar spools stay in memory up to this size per column, then go to disk.
+SPOOL_BYTES = 1 << 20
+CSV_HEADER = ("ts", "open", "high", "low", "close", "volume", "source")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "columnar": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # type: ignore  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def _stream_query(query, limit: int, chunk_rows: int) -> Iterator[BarColumns]:
+    from .. import database
+
+    # A session of its own: the request's session is closed before the body is sent.
+    with database.ReadSessionLocal() as db:
+        result = db.connection().execution_options(stream_results=True, yield_per=chunk_rows).execute(query.limit(limit))
+        for rows in result.partitions(chunk_rows):
+            yield BarColumns.from_rows(rows)
+
+
+def _slice_chunks(columns: BarColumns, limit: int, chunk_rows: int) -> Iterator[BarColumns]:
+    for offset in range(0, min(limit, len(columns)), chunk_rows):
+        yield columns.slice(offset, min(offset + chunk_rows, limit))
+
+
+def bar_chunks(
+    db: Session,
+    instrument_id: int,
+    interval: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = CHUNK_ROWS,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[BarColumns]:
+    """Bars in ``[start, end]`` (first ``limit``) as consecutive chunks of at most ``chunk_rows``."""
+    if interval in ROLLUP_INTERVALS:
+        return _stream_query(rollups_query(instrument_id, interval, start, end), limit, chunk_rows)
+    store = get_bar_store()
+    if store is not None:
+        # Validated against the tables now, while the request session is open.
+        return _slice_chunks(store.read(db, instrument_id, interval, start, end), limit, chunk_rows)
+    return _stream_query(bars_query(db, instrument_id, interval, start, end), limit, chunk_rows)
+
+
+def _iso(ts: np.ndarray) -> list[str]:
+    """Naive UTC ISO strings, matching the JSON response (seconds unless sub-second)."""
+    unit = "us" if (ts % 1_000_000).any() else "s"
+    return np.datetime_as_string(ts.astype("datetime64[us]"), unit=unit).tolist()
+
+
+def _json_volumes(chunk: BarColumns) -> list[str]:
+    return ["null" if value == VOLUME_NULL else str(value) for value in chunk.volume.tolist()]
+
+
+def encode_ndjson(chunks: Iterator[BarColumns], symbol: str, market: str, interval: str) -> Iterator[bytes]:
+    prefix = '{"symbol":%s,"market":%s,"interval":%s,"ts":"' % (json.dumps(symbol), json.dumps(market), json.dumps(interval))
+    for chunk in chunks:
+        sources = [json.dumps(name) for name in chunk.sources]
+        lines = [
+            f'{prefix}{ts}","open":{open_!r},"high":{high!r},"low":{low!r},"close":{close!r},'
+            f'"volume":{volume},"source":{sources[code]}}}\n'
+            for ts, open_, high, low, close, volume, code in zip(
+                _iso(chunk.ts),
+                chunk.open.tolist(),
+                chunk.high.tolist(),
+                chunk.low.tolist(),
+                chunk.close.tolist(),
+                _json_volumes(chunk),
+                chunk.source.tolist(),
+            )
+        ]
+        yield "".join(lines).encode()
+
+
+def encode_csv(chunks: Iterator[BarColumns], symbol: str, market: str, interval: str) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    for chunk in chunks:
+        writer.writerows(
+            zip(
+                _iso(chunk.ts),
+                chunk.open.tolist(),
+                chunk.high.tolist(),
+                chunk.low.tolist(),
+                chunk.close.tolist(),
+                ["" if value is None else value for value in chunk.volumes()],
+                chunk.source_names(),
+            )
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_columnar(chunks: Iterator[BarColumns], symbol: str, market: str, interval: str) -> Iterator[bytes]:
+    spools = {name: tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode="w+b") for name in CSV_HEADER}
+    try:
+        rows = 0
+        for chunk in chunks:
+            values = {
+                "ts": ",".join(f'"{ts}"' for ts in _iso(chunk.ts)),
+                "open": ",".join(map(repr, chunk.open.tolist())),
+                "high": ",".join(map(repr, chunk.high.tolist())),
+                "low": ",".join(map(repr, chunk.low.tolist())),
+                "close": ",".join(map(repr, chunk.close.tolist())),
+                "volume": ",".join(_json_volumes(chunk)),
+                "source": ",".join(json.dumps(name) for name in chunk.source_names()),
+            }
+            for name, text in values.items():
+                if text:
+                    spools[name].write(((b"," if rows else b"") + text.encode()))
+            rows += len(chunk)
+
+        yield ('{"symbol":%s,"market":%s,"interval":%s,"count":%d' % (
+            json.dumps(symbol), json.dumps(market), json.dumps(interval), rows
+        )).encode()
+        for name, spool in spools.items():
+            yield f',"{name}":['.encode()
+            spool.seek(0)
+            while block := spool.read(SPOOL_BYTES):
+                yield block
+            yield b"]"
+        yield b"}"
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+
+def encode_arrow(chunks: Iterator[BarColumns], symbol: str, market: str, interval: str) -> Iterator[bytes]:
+    import pyarrow as pa  # type: ignore
+
+    schema = pa.schema(
+        [
+            ("ts", pa.timestamp("us", tz="UTC")),
+            ("open", pa.float64()),
+            ("high", pa.float64()),
+            ("low", pa.float64()),
+            ("close", pa.float64()),
+            ("volume", pa.int64()),
+            ("source", pa.string()),
+        ],
+        metadata={"symbol": symbol, "market": market, "interval": interval},
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(
+                pa.record_batch(
+                    [
+                        pa.array(chunk.ts, type=pa.int64()).cast(pa.timestamp("us", tz="UTC")),
+                        pa.array(chunk.open),
+                        pa.array(chunk.high),
+                        pa.array(chunk.low),
+                        pa.array(chunk.close),
+                        pa.array(chunk.volume, mask=chunk.volume == VOLUME_NULL),
+                        pa.array(chunk.source_names(), type=pa.string()),
+                    ],
+                    schema=schema,
+                )
+            )
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+ENCODERS: dict[str, Callable[[Iterator[BarColumns], str, str, str], Iterator[bytes]]] = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+    "columnar": encode_columnar,
+    "arrow": encode_arrow,
+}
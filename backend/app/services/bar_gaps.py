@@ -0,0 +1,146 @@
+"""Gap index: runs of trading-calendar timestamps missing from the raw bar tables.
+
+Stored timestamps are compared with ``TradingCalendar.expected_timestamps`` by a
+vectorized membership test; missing positions that are consecutive in the
+expected sequence collapse into one range, so a missing day of 1m bars is one
+row, not 241. Ranges persist in ``bar_gaps`` with a count of backfill attempts
+that left them unfilled (suspended trading, data the provider never had).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from ..models.market_data import BarGap
+from .bar_store import read_bars
+from .trading_calendar import get_calendar
+
+
+@dataclass(frozen=True)
+class GapRange:
+    start: datetime  # First missing bar, naive UTC
+    end: datetime  # Last missing bar, inclusive
+    missing: int
+
+
+def _from_micros(value: int) -> datetime:
+    return np.datetime64(int(value), "us").astype(datetime)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def find_gaps(stored: np.ndarray, expected: np.ndarray) -> list[GapRange]:
+    """Collapse expected stamps absent from ``stored`` (UTC micros) into ranges."""
+    if not len(expected):
+        return []
+    positions = np.flatnonzero(~np.isin(expected, stored))
+    if not len(positions):
+        return []
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    firsts = positions[np.concatenate(([0], breaks))]
+    lasts = positions[np.concatenate((breaks - 1, [len(positions) - 1]))]
+    return [
+        GapRange(start=_from_micros(expected[first]), end=_from_micros(expected[last]), missing=int(last - first + 1))
+        for first, last in zip(firsts.tolist(), lasts.tolist())
+    ]
+
+
+def detect_gaps(
+    db: Session,
+    instrument_id: int,
+    interval: str,
+    market: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[GapRange]:
+    """Gaps in ``[start, end]``; open bounds default to the first/last stored bar."""
+    columns = read_bars(db, instrument_id, interval, start, end)
+    if start is None or end is None:
+        if not len(columns):
+            return []
+        start = start or _from_micros(columns.ts[0])
+        end = end or _from_micros(columns.ts[-1])
+    expected = get_calendar(market).expected_timestamps(start, end, interval)
+    return find_gaps(columns.ts, expected)
+
+
+def refresh_gap_index(
+    db: Session,
+    instrument_id: int,
+    interval: str,
+    market: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[GapRange]:
+    """Recompute persisted gaps within ``[start, end]`` (whole history when open).
+
+    The window is widened to cover any stored gap it overlaps, so ranges are never
+    clipped; re-detected ranges inherit the attempt count of the rows they replace.
+    """
+    query = db.query(BarGap).filter(BarGap.instrument_id == instrument_id, BarGap.interval == interval)
+    if start is not None:
+        query = query.filter(BarGap.end_ts >= _naive_utc(start))
+    if end is not None:
+        query = query.filter(BarGap.start_ts <= _naive_utc(end))
+    previous = query.all()
+    if previous and start is not None:
+        start = min(_naive_utc(start), min(row.start_ts for row in previous))
+    if previous and end is not None:
+        end = max(_naive_utc(end), max(row.end_ts for row in previous))
+
+    gaps = detect_gaps(db, instrument_id, interval, market, start, end)
+    attempts = [(row.start_ts, row.end_ts, row.attempts) for row in previous]
+    if previous:
+        db.execute(delete(BarGap).where(BarGap.id.in_([row.id for row in previous])))
+    db.add_all(
+        BarGap(
+            instrument_id=instrument_id,
+            interval=interval,
+            start_ts=gap.start,
+            end_ts=gap.end,
+            missing=gap.missing,
+            attempts=max((tries for lo, hi, tries in attempts if lo <= gap.end and hi >= gap.start), default=0),
+        )
+        for gap in gaps
+    )
+    db.commit()
+    return gaps
+
+
+def read_gaps(
+    db: Session,
+    instrument_id: int,
+    interval: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    max_attempts: int | None = None,
+) -> list[BarGap]:
+    query = db.query(BarGap).filter(BarGap.instrument_id == instrument_id, BarGap.interval == interval)
+    if start is not None:
+        query = query.filter(BarGap.end_ts >= _naive_utc(start))
+    if end is not None:
+        query = query.filter(BarGap.start_ts <= _naive_utc(end))
+    if max_attempts is not None:
+        query = query.filter(BarGap.attempts < max_attempts)
+    return query.order_by(BarGap.start_ts.asc()).all()
+
+
+def record_attempt(db: Session, instrument_id: int, interval: str, start: datetime, end: datetime) -> None:
+    """Count a backfill of ``[start, end]`` against the gaps it failed to close."""
+    db.execute(
+        update(BarGap)
+        .where(
+            BarGap.instrument_id == instrument_id,
+            BarGap.interval == interval,
+            BarGap.end_ts >= _naive_utc(start),
+            BarGap.start_ts <= _naive_utc(end),
+        )
+        .values(attempts=BarGap.attempts + 1)
+    )
+    db.commit()
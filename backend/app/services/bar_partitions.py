@@ -0,0 +1,348 @@
+"""Monthly partitions and retention for 1m bars.
+
+``bars_1m`` keeps only the hot window (``BAR_1M_HOT_MONTHS``). ``compact`` moves
+each older month into its own ``bars_1m_YYYYMM`` table keyed by
+``(instrument_id, ts, source)`` WITHOUT ROWID: no surrogate id and a single
+clustered index, and a month never changes size once it is cold. The
+``bar_partitions`` registry lets the router answer range queries from the hot
+table plus only the months the range overlaps, and sends upserts of old bars
+(gap backfills) to the partition that owns their month.
+
+``apply_retention`` handles months older than ``BAR_1M_RETENTION_MONTHS``. It
+refreshes their 5m/15m/1h rollups, exports the raw rows to a compressed
+``.npz`` under ``BAR_ARCHIVE_DIR`` and drops the table. ``restore_partition``
+reverses this.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import logging
+from pathlib import Path
+import threading
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    PrimaryKeyConstraint,
+    String,
+    Table,
+    delete,
+    distinct,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from ..models.market_data import Bar1m, BarPartition
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMNS = ("instrument_id", "ts", "open", "high", "low", "close", "volume", "source", "created_at")
+
+_metadata = MetaData()
+_metadata_lock = threading.Lock()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def month_key(value: datetime) -> str:
+    value = _naive_utc(value)
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def shift_month(month: str, delta: int) -> str:
+    year, index = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + delta, 12)
+    return f"{year:04d}-{index + 1:02d}"
+
+
+def month_bounds(month: str) -> tuple[datetime, datetime]:
+    """``[first instant, first instant of the next month)`` as naive UTC."""
+    start = datetime(int(month[:4]), int(month[5:7]), 1)
+    following = shift_month(month, 1)
+    return start, datetime(int(following[:4]), int(following[5:7]), 1)
+
+
+def partition_table(month: str) -> Table:
+    name = f"bars_1m_{month.replace('-', '')}"
+    with _metadata_lock:
+        table = _metadata.tables.get(name)
+        if table is None:
+            table = Table(
+                name,
+                _metadata,
+                Column("instrument_id", Integer, nullable=False),
+                Column("ts", DateTime, nullable=False),
+                Column("open", Float, nullable=False),
+                Column("high", Float, nullable=False),
+                Column("low", Float, nullable=False),
+                Column("close", Float, nullable=False),
+                Column("volume", BigInteger),
+                Column("source", String(32), nullable=False),
+                Column("created_at", DateTime, nullable=False),
+                PrimaryKeyConstraint("instrument_id", "ts", "source"),
+                sqlite_with_rowid=False,
+            )
+        return table
+
+
+def active_partitions(db: Session, start: datetime | None = None, end: datetime | None = None) -> dict[str, Table]:
+    """Month -> table for the live partitions overlapping ``[start, end]``."""
+    query = select(BarPartition.month).where(BarPartition.interval == "1m", BarPartition.status == "active")
+    if start is not None:
+        query = query.where(BarPartition.month >= month_key(start))
+    if end is not None:
+        query = query.where(BarPartition.month <= month_key(end))
+    return {month: partition_table(month) for month in db.execute(query.order_by(BarPartition.month)).scalars()}
+
+
+def bar_tables(db: Session, interval: str, start: datetime | None = None, end: datetime | None = None) -> list[Table]:
+    """Every table holding ``interval`` bars in ``[start, end]``, hot table first."""
+    if interval != "1m":
+        from .bar_store import bar_table
+
+        return [bar_table(interval).__table__]
+    return [Bar1m.__table__, *active_partitions(db, start, end).values()]
+
+
+def partitions_version(db: Session) -> int:
+    """Changes whenever a 1m partition is written, archived or restored (UTC micros of the last change)."""
+    value = db.execute(select(func.max(BarPartition.updated_at)).where(BarPartition.interval == "1m")).scalar()
+    return int(np.datetime64(value, "us").astype(np.int64)) if value else 0
+
+
+def split_rows(rows: Iterable[Sequence[Any]], partitions: dict[str, Table], default: Table) -> dict[Table, list]:
+    """Route bar row tuples (ts at index 1) to the partition owning their month."""
+    groups: dict[Table, list] = {}
+    for row in rows:
+        table = partitions.get(month_key(row[1]), default)
+        groups.setdefault(table, []).append(row)
+    return groups
+
+
+def write_1m_rows(db: Session, rows: Iterable[Sequence[Any]], write: Callable[[Table, Iterable], int]) -> int:
+    """Send 1m row tuples through ``write(table, rows)`` to the table that owns each month.
+
+    Without live partitions this is a single pass-through to ``bars_1m``; bars of
+    archived months land in the hot table and wait for a restore.
+    """
+    partitions = active_partitions(db)
+    if not partitions:
+        return write(Bar1m.__table__, rows)
+    months = {table: month for month, table in partitions.items()}
+    total = 0
+    for table, chunk in split_rows(rows, partitions, Bar1m.__table__).items():
+        if table is Bar1m.__table__:
+            total += write(table, chunk)
+            continue
+        # Upserts report revised rows too; counting the chunk's key range gives the rows added.
+        before = _span_count(db, table, chunk)
+        total += write(table, chunk)
+        added = _span_count(db, table, chunk) - before
+        if added:
+            # updated_at is the partitions version; the writer stamps its instrument instead.
+            db.execute(
+                update(BarPartition)
+                .where(BarPartition.interval == "1m", BarPartition.month == months[table])
+                .values(row_count=BarPartition.row_count + added, updated_at=BarPartition.updated_at)
+            )
+    return total
+
+
+def _span_count(db: Session, table: Table, rows: list[Sequence[Any]]) -> int:
+    instrument_ids = {row[0] for row in rows}
+    stamps = [row[1] for row in rows]
+    query = select(func.count()).select_from(table).where(
+        table.c.instrument_id.in_(instrument_ids), table.c.ts >= min(stamps), table.c.ts <= max(stamps)
+    )
+    return int(db.execute(query).scalar() or 0)
+
+
+def bar_stats(
+    db: Session, instrument_id: int, interval: str, start: datetime | None = None, end: datetime | None = None
+) -> tuple[int, datetime | None, datetime | None]:
+    """(count, first ts, last ts) across the hot table and overlapping partitions."""
+    total, first, last = 0, None, None
+    for table in bar_tables(db, interval, start, end):
+        query = select(func.count(), func.min(table.c.ts), func.max(table.c.ts)).where(
+            table.c.instrument_id == instrument_id
+        )
+        if start:
+            query = query.where(table.c.ts >= start)
+        if end:
+            query = query.where(table.c.ts <= end)
+        count, low, high = db.execute(query).one()
+        total += int(count or 0)
+        first = low if first is None or (low is not None and low < first) else first
+        last = high if last is None or (high is not None and high > last) else last
+    return total, first, last
+
+
+def archived_through(db: Session) -> datetime | None:
+    """End of the newest archived month; 1m-based rollups before it have no raw rows behind them."""
+    month = db.execute(
+        select(func.max(BarPartition.month)).where(BarPartition.interval == "1m", BarPartition.status == "archived")
+    ).scalar()
+    return month_bounds(month)[1] if month else None
+
+
+def _registry(db: Session, month: str) -> BarPartition:
+    partition = db.query(BarPartition).filter(BarPartition.interval == "1m", BarPartition.month == month).first()
+    if partition is None:
+        partition = BarPartition(
+            interval="1m", month=month, table_name=partition_table(month).name, status="active", row_count=0
+        )
+        db.add(partition)
+    return partition
+
+
+def _count(db: Session, table: Table) -> int:
+    return int(db.execute(select(func.count()).select_from(table)).scalar() or 0)
+
+
+def compact_month(db: Session, month: str) -> int:
+    """Move one month of ``bars_1m`` into its partition table; returns rows moved."""
+    start, end = month_bounds(month)
+    table = partition_table(month)
+    hot = Bar1m.__table__
+    conn = db.connection()
+    table.create(bind=conn, checkfirst=True)
+    partition = _registry(db, month)
+    if partition.status != "active":
+        raise RuntimeError(f"Partition {month} is {partition.status}; restore it before writing")
+    window = (hot.c.ts >= start, hot.c.ts < end)
+    rows = select(*(hot.c[name] for name in PARTITION_COLUMNS)).where(*window)
+    moved = db.execute(
+        insert(table).prefix_with("OR REPLACE", dialect="sqlite").from_select(PARTITION_COLUMNS, rows)
+    ).rowcount
+    db.execute(delete(hot).where(*window))
+    partition.row_count = _count(db, table)
+    partition.updated_at = _utcnow()
+    db.commit()
+    return int(moved or 0)
+
+
+def compact(db: Session, hot_months: int, now: datetime | None = None) -> dict[str, int]:
+    """Partition every month of ``bars_1m`` older than the ``hot_months`` newest."""
+    if hot_months <= 0:
+        return {}
+    cutoff = shift_month(month_key(now or datetime.now(timezone.utc)), -(hot_months - 1))
+    oldest = db.execute(select(func.min(Bar1m.ts)).where(Bar1m.ts < month_bounds(cutoff)[0])).scalar()
+    archived = set(
+        db.execute(
+            select(BarPartition.month).where(BarPartition.interval == "1m", BarPartition.status == "archived")
+        ).scalars()
+    )
+    moved: dict[str, int] = {}
+    month = month_key(oldest) if oldest else cutoff
+    while month < cutoff:
+        start, end = month_bounds(month)
+        if month in archived:
+            logger.warning("[PARTITION] %s is archived; restore it to move its late bars out of bars_1m", month)
+        elif db.execute(select(Bar1m.id).where(Bar1m.ts >= start, Bar1m.ts < end).limit(1)).first():
+            moved[month] = compact_month(db, month)
+            logger.info("[PARTITION] moved %s rows of %s out of bars_1m", moved[month], month)
+        month = shift_month(month, 1)
+    return moved
+
+
+def _archive_path(archive_dir: Path, month: str) -> Path:
+    return archive_dir / f"{partition_table(month).name}.npz"
+
+
+def archive_partition(db: Session, month: str, archive_dir: Path) -> Path:
+    """Roll the month up, export it to a compressed ``.npz`` and drop its table."""
+    from .bar_rollups import refresh_rollups
+    from .bar_store import BarColumns
+
+    start, end = month_bounds(month)
+    table = partition_table(month)
+    instrument_ids = [int(value) for value in db.execute(select(distinct(table.c.instrument_id))).scalars()]
+    arrays: dict[str, np.ndarray] = {"instrument_ids": np.array(instrument_ids, dtype=np.int64)}
+    for instrument_id in instrument_ids:
+        refresh_rollups(db, "1m", instrument_id, start, end - timedelta(microseconds=1))
+        rows = db.execute(
+            select(table.c.ts, table.c.open, table.c.high, table.c.low, table.c.close, table.c.volume, table.c.source)
+            .where(table.c.instrument_id == instrument_id)
+            .order_by(table.c.ts.asc(), table.c.source.asc())
+        ).all()
+        columns = BarColumns.from_rows(rows)
+        for name in ("ts", "open", "high", "low", "close", "volume", "source"):
+            arrays[f"{instrument_id}_{name}"] = getattr(columns, name)
+        arrays[f"{instrument_id}_sources"] = np.array(columns.sources, dtype=str)
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = _archive_path(archive_dir, month)
+    with path.open("wb") as handle:
+        np.savez_compressed(handle, **arrays)
+
+    partition = _registry(db, month)
+    partition.status = "archived"
+    partition.archive_path = str(path)
+    partition.updated_at = _utcnow()
+    table.drop(bind=db.connection(), checkfirst=True)
+    db.commit()
+    return path
+
+
+def apply_retention(db: Session, retention_months: int, archive_dir: Path, now: datetime | None = None) -> list[str]:
+    """Archive every live partition older than ``retention_months``; returns the months archived."""
+    if retention_months <= 0:
+        return []
+    cutoff = shift_month(month_key(now or datetime.now(timezone.utc)), -(retention_months - 1))
+    archived = []
+    for month in active_partitions(db, end=month_bounds(cutoff)[0] - timedelta(microseconds=1)):
+        path = archive_partition(db, month, archive_dir)
+        logger.info("[PARTITION] archived %s to %s", month, path)
+        archived.append(month)
+    return archived
+
+
+def restore_partition(db: Session, month: str) -> int:
+    """Re-create an archived month from its ``.npz`` export; returns rows restored."""
+    from .bulk_write import bulk_insert
+
+    partition = _registry(db, month)
+    if partition.status != "archived" or not partition.archive_path:
+        raise RuntimeError(f"Partition {month} is not archived")
+    table = partition_table(month)
+    table.create(bind=db.connection(), checkfirst=True)
+    created_at = datetime.now(timezone.utc)
+    total = 0
+    with np.load(partition.archive_path) as archive:
+        for instrument_id in archive["instrument_ids"].tolist():
+            sources = archive[f"{instrument_id}_sources"].tolist()
+            ts = archive[f"{instrument_id}_ts"].astype("datetime64[us]").tolist()
+            volume = archive[f"{instrument_id}_volume"].tolist()
+            null = np.iinfo(np.int64).min
+            rows = zip(
+                [instrument_id] * len(ts),
+                ts,
+                archive[f"{instrument_id}_open"].tolist(),
+                archive[f"{instrument_id}_high"].tolist(),
+                archive[f"{instrument_id}_low"].tolist(),
+                archive[f"{instrument_id}_close"].tolist(),
+                [None if value == null else value for value in volume],
+                [sources[code] for code in archive[f"{instrument_id}_source"].tolist()],
+                [created_at] * len(ts),
+            )
+            total += bulk_insert(db, table, PARTITION_COLUMNS, rows).rows
+    partition.status = "active"
+    partition.row_count = total
+    partition.updated_at = _utcnow()
+    db.commit()
+    return total
+
@@ -0,0 +1,267 @@
+"""Materialized OHLCV rollups (5m/15m/1h from 1m bars, 1w from 1d bars).
+
+``refresh_rollups`` recomputes only the buckets overlapping a time range from
+the raw rows in that range, so ingestion keeps rollups current by refreshing the
+buckets its upsert touched; revised raw bars are picked up because buckets are
+rebuilt rather than patched. ``rebuild_rollups`` backfills full history.
+
+Intraday buckets are anchored to the instrument's trading sessions, so a US
+hour runs 09:30-10:30 and the CN afternoon starts a fresh bucket at 13:00;
+bars outside any session fall back to clock-aligned buckets. Weeks start on
+the exchange-local Monday, like the local-midnight stamps of daily bars.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..models.market_data import BarRollup, Instrument
+from .bar_partitions import archived_through
+from .bar_store import VOLUME_NULL, BarColumns, BarStore, read_bars, to_micros
+from .bulk_write import bulk_upsert
+from .trading_calendar import get_calendar
+
+if TYPE_CHECKING:
+    from .trading_calendar import TradingCalendar
+
+# Rollup interval -> (raw interval it is built from, bucket width in seconds).
+ROLLUP_INTERVALS: dict[str, tuple[str, int]] = {
+    "5m": ("1m", 300),
+    "15m": ("1m", 900),
+    "1h": ("1m", 3600),
+    "1w": ("1d", 7 * 86400),
+}
+# 1970-01-05 was a Monday; weekly buckets without a calendar are aligned to it.
+_WEEK_ANCHOR = 4 * 86400
+_MICROS = 1_000_000
+
+
+def rollups_for(base_interval: str) -> list[str]:
+    return [name for name, (base, _) in ROLLUP_INTERVALS.items() if base == base_interval]
+
+
+def bucket_start(micros: np.ndarray, interval: str, calendar: "TradingCalendar | None" = None) -> np.ndarray:
+    """Bucket start (UTC microseconds) for each raw bar timestamp."""
+    width = ROLLUP_INTERVALS[interval][1] * _MICROS
+    anchor = _WEEK_ANCHOR * _MICROS if interval == "1w" else 0
+    buckets = (micros - anchor) // width * width + anchor
+    if calendar is None or not len(micros):
+        return buckets
+    if interval == "1w":
+        return calendar.week_starts(micros)
+
+    opens, closes = calendar.session_bounds(int(micros.min()), int(micros.max()))
+    if not len(opens):
+        return buckets
+    session = np.searchsorted(opens, micros, side="right") - 1
+    found = session >= 0
+    session = np.maximum(session, 0)
+    if calendar.minute_label == "end":
+        # A bar stamped t covers (t - 1m, t]; the opening auction bar sits on the open itself.
+        inside = found & (micros <= closes[session])
+        offset = np.maximum(micros - 60 * _MICROS - opens[session], 0)
+    else:
+        inside = found & (micros < closes[session])
+        offset = micros - opens[session]
+    return np.where(inside, opens[session] + offset // width * width, buckets)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _from_micros(value: int) -> datetime:
+    return np.datetime64(int(value), "us").astype(datetime)
+
+
+def aggregate(columns: BarColumns, interval: str, calendar: "TradingCalendar | None" = None) -> list[dict[str, Any]]:
+    """Group raw bars (ordered by ts) into buckets per source with reduceat."""
+    if not len(columns):
+        return []
+    buckets = bucket_start(columns.ts, interval, calendar)
+    order = np.lexsort((columns.ts, buckets, columns.source))
+    buckets = buckets[order]
+    source = columns.source[order]
+    change = np.flatnonzero((np.diff(buckets) != 0) | (np.diff(source) != 0)) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.append(change, len(order)) - 1
+
+    volume = columns.volume[order]
+    has_volume = volume != VOLUME_NULL
+    volume_sum = np.add.reduceat(np.where(has_volume, volume, 0), starts)
+    volume_seen = np.add.reduceat(has_volume.astype(np.int64), starts)
+    high = np.maximum.reduceat(columns.high[order], starts)
+    low = np.minimum.reduceat(columns.low[order], starts)
+    opens = columns.open[order][starts]
+    closes = columns.close[order][ends]
+    counts = ends - starts + 1
+    return [
+        {
+            "interval": interval,
+            "ts": _from_micros(buckets[start]),
+            "open": float(opens[idx]),
+            "high": float(high[idx]),
+            "low": float(low[idx]),
+            "close": float(closes[idx]),
+            "volume": int(volume_sum[idx]) if volume_seen[idx] else None,
+            "bar_count": int(counts[idx]),
+            "source": columns.sources[int(source[start])],
+        }
+        for idx, start in enumerate(starts.tolist())
+    ]
+
+
+ROLLUP_COLUMNS = (
+    "instrument_id",
+    "interval",
+    "ts",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "bar_count",
+    "source",
+    "updated_at",
+)
+
+
+def _upsert_rollups(db: Session, instrument_id: int, rows: list[dict[str, Any]]) -> int:
+    if not rows:
+        return 0
+    now = datetime.now(timezone.utc)
+    stats = bulk_upsert(
+        db,
+        BarRollup.__table__,
+        ROLLUP_COLUMNS,
+        ((instrument_id, *(row[name] for name in ROLLUP_COLUMNS[1:-1]), now) for row in rows),
+        conflict_columns=("instrument_id", "interval", "ts", "source"),
+        update_columns=("open", "high", "low", "close", "volume", "bar_count", "updated_at"),
+    )
+    return stats.rows
+
+
+def _calendar(db: Session, instrument_id: int) -> "TradingCalendar":
+    market = db.execute(select(Instrument.market).where(Instrument.id == instrument_id)).scalar()
+    return get_calendar(market or "")
+
+
+def refresh_rollups(
+    db: Session,
+    base_interval: str,
+    instrument_id: int,
+    start: datetime,
+    end: datetime,
+) -> int:
+    """Recompute the rollup buckets of ``base_interval`` that overlap ``[start, end]``."""
+    intervals = rollups_for(base_interval)
+    if not intervals:
+        return 0
+    calendar = _calendar(db, instrument_id)
+    ranges = {}
+    for interval in intervals:
+        width = ROLLUP_INTERVALS[interval][1] * _MICROS
+        lo = int(bucket_start(np.array([to_micros(start)]), interval, calendar)[0])
+        last = int(bucket_start(np.array([to_micros(end)]), interval, calendar)[0])
+        if interval == "1w":
+            # Local weeks run 167-169 hours across DST changes; stop where the next one starts.
+            hi = int(bucket_start(np.array([last + width + 12 * 3600 * _MICROS]), interval, calendar)[0]) - 1
+        else:
+            hi = last + width - 1
+        ranges[interval] = (lo, hi)
+    # One read of the raw table covers every rollup's widened range. Raw table, not
+    # the mapped store: the store only catches up after commit.
+    columns = BarStore.load_from_db(
+        db,
+        instrument_id,
+        base_interval,
+        _from_micros(min(lo for lo, _ in ranges.values())),
+        _from_micros(max(hi for _, hi in ranges.values())),
+    )
+    written = 0
+    for interval, (lo, hi) in ranges.items():
+        window = columns.slice(
+            int(np.searchsorted(columns.ts, lo, side="left")),
+            int(np.searchsorted(columns.ts, hi, side="right")),
+        )
+        written += _upsert_rollups(db, instrument_id, aggregate(window, interval, calendar))
+    return written
+
+
+def rebuild_rollups(db: Session, instrument_id: int, intervals: list[str] | None = None) -> dict[str, int]:
+    """Drop and recompute rollups for one instrument from its full raw history.
+
+    Minute rollups of archived 1m partitions are kept: their raw bars are gone.
+    """
+    written: dict[str, int] = {}
+    calendar = _calendar(db, instrument_id)
+    archived_end = archived_through(db)
+    for interval in intervals or list(ROLLUP_INTERVALS):
+        base_interval = ROLLUP_INTERVALS[interval][0]
+        since = archived_end if base_interval == "1m" else None
+        stale = delete(BarRollup).where(BarRollup.instrument_id == instrument_id, BarRollup.interval == interval)
+        if since is not None:
+            stale = stale.where(BarRollup.ts >= since)
+        db.execute(stale)
+        columns = BarStore.load_from_db(db, instrument_id, base_interval, since)
+        written[interval] = _upsert_rollups(db, instrument_id, aggregate(columns, interval, calendar))
+    db.commit()
+    return written
+
+
+def rollups_query(
+    instrument_id: int,
+    interval: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    query = (
+        select(
+            BarRollup.ts,
+            BarRollup.open,
+            BarRollup.high,
+            BarRollup.low,
+            BarRollup.close,
+            BarRollup.volume,
+            BarRollup.source,
+        )
+        .where(BarRollup.instrument_id == instrument_id, BarRollup.interval == interval)
+        .order_by(BarRollup.ts.asc(), BarRollup.source.asc())
+    )
+    if start:
+        query = query.where(BarRollup.ts >= _naive_utc(start))
+    if end:
+        query = query.where(BarRollup.ts <= _naive_utc(end))
+    return query
+
+
+def read_rollups(
+    db: Session,
+    instrument_id: int,
+    interval: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int | None = None,
+) -> BarColumns:
+    query = rollups_query(instrument_id, interval, start, end)
+    if limit is not None:
+        query = query.limit(limit)
+    return BarColumns.from_rows(db.execute(query).all())
+
+
+def read_interval_bars(
+    db: Session,
+    instrument_id: int,
+    interval: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int | None = None,
+) -> BarColumns:
+    """First ``limit`` bars for any supported interval: rollup table for 5m/15m/1h/1w, bar store otherwise."""
+    if interval in ROLLUP_INTERVALS:
+        return read_rollups(db, instrument_id, interval, start, end, limit)
+    return read_bars(db, instrument_id, interval, start, end, limit)
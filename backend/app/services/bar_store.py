@@ -0,0 +1,427 @@
+"""Columnar, memory-mapped bar store used as a read-through cache over bars_1m/bars_1d.
+
+Each instrument x interval lives in one file: a 4 KiB JSON header followed by
+fixed-capacity columns (int64 ts in UTC microseconds, float64 OHLC, int64
+volume, int64 source code). Range reads are two ``searchsorted`` calls and
+zero-copy slices of the mapped columns.
+
+The database stays the source of truth. Every read compares the header's
+fingerprint (the instrument's bar write stamp, plus the 1m partition version)
+with a primary-key lookup, never a scan of the bars, and rebuilds the file from
+the tables when they differ. Every bar write bumps the stamp, ingestion
+explicitly and ORM flushes through a session hook, so bars written or revised by
+any other path are picked up. Ingestion appends bars newer than the file's last row in place, inside the
+reserved capacity, writing the header row count last; revisions of rows readers
+may already have mapped, and anything larger, are written to a temporary file
+and swapped in atomically. Writers hold a per-file lock shared across processes.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+from sqlalchemy import String, select, type_coerce, union_all
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.market_data import Bar1d, Bar1m, Instrument
+from .bar_partitions import bar_tables, partitions_version
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"STBARS01"
+HEADER_BYTES = 4096
+COLUMNS = ("ts", "open", "high", "low", "close", "volume", "source")
+_DTYPES = {"ts": np.int64, "volume": np.int64, "source": np.int64}
+VOLUME_NULL = np.iinfo(np.int64).min
+# Source codes are folded into a sort key as ts * MAX_SOURCES + code.
+MAX_SOURCES = 1024
+
+
+def _dtype(column: str):
+    return _DTYPES.get(column, np.float64)
+
+
+def to_micros(value: datetime) -> int:
+    """UTC microseconds; naive datetimes are taken as UTC like the bar tables."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int(np.datetime64(value, "us").astype(np.int64))
+
+
+def bar_table(interval: str):
+    return Bar1m if interval == "1m" else Bar1d
+
+
+def bars_query(
+    db: Session,
+    instrument_id: int,
+    interval: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    """(ts, open, high, low, close, volume, source) select ordered by (ts, source)."""
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    selects = []
+    # Monthly 1m partitions the range overlaps are read alongside the hot table.
+    for table in bar_tables(db, interval, start, end):
+        # SQLite stores DATETIME as ISO text; numpy parses it far faster than the ORM type.
+        ts = type_coerce(table.c.ts, String) if sqlite else table.c.ts
+        query = select(
+            ts.label("ts"), table.c.open, table.c.high, table.c.low, table.c.close, table.c.volume, table.c.source
+        ).where(table.c.instrument_id == instrument_id)
+        if start:
+            query = query.where(table.c.ts >= start)
+        if end:
+            query = query.where(table.c.ts <= end)
+        selects.append(query)
+    if len(selects) == 1:
+        query = selects[0].order_by(bar_table(interval).ts.asc(), bar_table(interval).source.asc())
+    else:
+        merged = union_all(*selects).subquery()
+        query = select(*merged.c).order_by(merged.c.ts.asc(), merged.c.source.asc())
+    return query
+
+
+@dataclass
+class BarColumns:
+    """Column views over a contiguous range of bars, ordered by (ts, source)."""
+
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    source: np.ndarray
+    sources: list[str]
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    @classmethod
+    def empty(cls) -> "BarColumns":
+        return cls(*(np.empty(0, dtype=_dtype(name)) for name in COLUMNS), sources=[])
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "BarColumns":
+        """Build from (ts, open, high, low, close, volume, source) rows ordered by ts."""
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        ts, opens, highs, lows, closes, volumes, sources = zip(*rows)
+        names = sorted(set(sources))
+        codes = {name: idx for idx, name in enumerate(names)}
+        return cls(
+            ts=np.array(ts, dtype="datetime64[us]").astype(np.int64),
+            open=np.array(opens, dtype=np.float64),
+            high=np.array(highs, dtype=np.float64),
+            low=np.array(lows, dtype=np.float64),
+            close=np.array(closes, dtype=np.float64),
+            volume=np.array([VOLUME_NULL if item is None else int(item) for item in volumes], dtype=np.int64),
+            source=np.array([codes[name] for name in sources], dtype=np.int64),
+            sources=names,
+        )
+
+    def column(self, name: str) -> np.ndarray:
+        return getattr(self, name)
+
+    def slice(self, start: int, stop: int) -> "BarColumns":
+        return BarColumns(*(self.column(name)[start:stop] for name in COLUMNS), sources=self.sources)
+
+    def between(self, start: datetime | None = None, end: datetime | None = None) -> "BarColumns":
+        lo = int(np.searchsorted(self.ts, to_micros(start), side="left")) if start else 0
+        hi = int(np.searchsorted(self.ts, to_micros(end), side="right")) if end else len(self)
+        return self.slice(lo, max(lo, hi))
+
+    def timestamps(self) -> list[datetime]:
+        return self.ts.astype("datetime64[us]").tolist()
+
+    def volumes(self) -> list[int | None]:
+        return [None if item == VOLUME_NULL else item for item in self.volume.tolist()]
+
+    def source_names(self) -> list[str]:
+        return [self.sources[code] for code in self.source.tolist()]
+
+
+def _read_header(handle) -> dict[str, Any] | None:
+    raw = handle.read(HEADER_BYTES)
+    if len(raw) < HEADER_BYTES or not raw.startswith(MAGIC):
+        return None
+    return json.loads(raw[len(MAGIC) :].rstrip(b"\0 ").decode("utf-8"))
+
+
+def _encode_header(meta: dict[str, Any]) -> bytes:
+    body = MAGIC + json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    if len(body) > HEADER_BYTES:
+        raise ValueError("bar store header overflow")
+    return body.ljust(HEADER_BYTES, b"\0")
+
+
+def _column_offset(column: str, capacity: int) -> int:
+    return HEADER_BYTES + COLUMNS.index(column) * capacity * 8
+
+
+class BarStore:
+    """One mapped file per instrument x interval under ``root``."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def path(self, instrument_id: int, interval: str) -> Path:
+        return self.root / f"{int(instrument_id)}_{'1m' if interval == '1m' else '1d'}.bars"
+
+    # -- file layout -------------------------------------------------------
+
+    def _open(self, path: Path) -> tuple[dict[str, Any], BarColumns] | None:
+        try:
+            with path.open("rb") as handle:
+                meta = _read_header(handle)
+            if meta is None:
+                return None
+            rows = int(meta["rows"])
+            if rows == 0:
+                return meta, BarColumns.empty()
+            mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        capacity = int(meta["capacity"])
+        columns = [
+            np.frombuffer(mapped, dtype=_dtype(name), count=rows, offset=_column_offset(name, capacity))
+            for name in COLUMNS
+        ]
+        return meta, BarColumns(*columns, sources=list(meta["sources"]))
+
+    def _write_full(self, path: Path, columns: BarColumns, fingerprint: list[int]) -> None:
+        rows = len(columns)
+        capacity = max(1024, int(2 ** np.ceil(np.log2(max(rows * 1.25, 1)))))
+        meta = {"rows": rows, "capacity": capacity, "sources": columns.sources, "fingerprint": fingerprint}
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("wb") as handle:
+            handle.write(_encode_header(meta))
+            for name in COLUMNS:
+                block = np.zeros(capacity, dtype=_dtype(name))
+                block[:rows] = columns.column(name)
+                handle.write(block.tobytes())
+        os.replace(tmp, path)
+
+    @contextmanager
+    def _exclusive(self, path: Path) -> Iterator[None]:
+        """Serialise writers of one file across threads and processes."""
+        with self._lock, path.with_suffix(".lock").open("a+b") as handle:
+            if fcntl is not None:
+                # Released when the handle closes.
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                yield
+                return
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _append(
+        self,
+        path: Path,
+        meta: dict[str, Any],
+        start: int,
+        tail: BarColumns,
+        fingerprint: list[int],
+    ) -> None:
+        """Write rows past the header's row count; rows readers can see are never touched."""
+        capacity = int(meta["capacity"])
+        with path.open("r+b") as handle:
+            for name in COLUMNS:
+                handle.seek(_column_offset(name, capacity) + start * 8)
+                handle.write(np.ascontiguousarray(tail.column(name), dtype=_dtype(name)).tobytes())
+            handle.flush()
+            # Readers size their views from the header, so it goes last.
+            handle.seek(0)
+            handle.write(
+                _encode_header(
+                    {**meta, "rows": start + len(tail), "sources": tail.sources, "fingerprint": fingerprint}
+                )
+            )
+
+    # -- database side -----------------------------------------------------
+
+    @staticmethod
+    def db_fingerprint(db: Session, instrument_id: int, interval: str) -> list[int]:
+        # A version stamp, not a scan of the bars: reads pay the same for any history length.
+        written = db.execute(select(Instrument.updated_at).where(Instrument.id == instrument_id)).scalar()
+        fingerprint = [to_micros(written) if written else 0]
+        if interval == "1m":
+            fingerprint.append(partitions_version(db))
+        return fingerprint
+
+    @staticmethod
+    def load_from_db(
+        db: Session,
+        instrument_id: int,
+        interval: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+    ) -> BarColumns:
+        query = bars_query(db, instrument_id, interval, start, end)
+        if limit is not None:
+            query = query.limit(limit)
+        return BarColumns.from_rows(db.connection().execute(query).all())
+
+    def rebuild(self, db: Session, instrument_id: int, interval: str) -> BarColumns:
+        fingerprint = self.db_fingerprint(db, instrument_id, interval)
+        columns = self.load_from_db(db, instrument_id, interval)
+        path = self.path(instrument_id, interval)
+        try:
+            with self._exclusive(path):
+                self._write_full(path, columns, fingerprint)
+        except OSError:
+            # A reader may still map the old file (Windows); serve from memory.
+            logger.warning("[BARSTORE] could not write %s", path, exc_info=True)
+            return columns
+        opened = self._open(path)
+        return opened[1] if opened else columns
+
+    def invalidate(self, instrument_id: int, interval: str) -> None:
+        try:
+            self.path(instrument_id, interval).unlink(missing_ok=True)
+        except OSError:
+            logger.warning("[BARSTORE] could not invalidate %s %s", instrument_id, interval, exc_info=True)
+
+    # -- public API ----------------------------------------------------------
+
+    def read(
+        self,
+        db: Session,
+        instrument_id: int,
+        interval: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+    ) -> BarColumns:
+        """First ``limit`` bars in ``[start, end]`` as zero-copy views, refreshing the file if the table changed."""
+        opened = self._open(self.path(instrument_id, interval))
+        if opened is not None and opened[0].get("fingerprint") == self.db_fingerprint(db, instrument_id, interval):
+            columns = opened[1]
+        else:
+            columns = self.rebuild(db, instrument_id, interval)
+        columns = columns.between(start, end)
+        return columns if limit is None else columns.slice(0, min(limit, len(columns)))
+
+    def apply(
+        self,
+        db: Session,
+        instrument_id: int,
+        interval: str,
+        bars: Iterable[Any],
+        before: list[int],
+        after: list[int],
+    ) -> None:
+        """Merge bars just upserted into the table, after commit.
+
+        ``bars`` is a columnar batch (anything with ``as_columns``) or ``BarRecord``-like objects.
+        ``before`` and ``after`` are the table's fingerprints read in the writing transaction
+        around the upsert; a file not at ``before`` missed other writes and is rebuilt instead.
+        """
+        if hasattr(bars, "as_columns"):
+            batch, records, incoming_sources = bars, [], {bars.source}
+        else:
+            batch, records = None, list(bars)
+            incoming_sources = {item.source for item in records}
+        if not (len(batch) if batch is not None else records):
+            return
+        path = self.path(instrument_id, interval)
+        opened = self._open(path)
+        if opened is None or opened[0].get("fingerprint") != before:
+            # The table holds rows this file never saw; resync from the source of truth.
+            self.rebuild(db, instrument_id, interval)
+            return
+        meta, existing = opened
+
+        sources = list(existing.sources)
+        for name in sorted(incoming_sources - set(sources)):
+            sources.append(name)
+        if len(sources) > MAX_SOURCES:
+            self.rebuild(db, instrument_id, interval)
+            return
+        codes = {name: idx for idx, name in enumerate(sources)}
+        incoming = batch.as_columns(sources) if batch is not None else BarColumns(
+            ts=np.array([to_micros(item.ts) for item in records], dtype=np.int64),
+            open=np.array([item.open for item in records], dtype=np.float64),
+            high=np.array([item.high for item in records], dtype=np.float64),
+            low=np.array([item.low for item in records], dtype=np.float64),
+            close=np.array([item.close for item in records], dtype=np.float64),
+            volume=np.array([VOLUME_NULL if item.volume is None else int(item.volume) for item in records], dtype=np.int64),
+            source=np.array([codes[item.source] for item in records], dtype=np.int64),
+            sources=sources,
+        )
+
+        # Only rows at or after the earliest incoming bar can change.
+        start = int(np.searchsorted(existing.ts, incoming.ts.min(), side="left"))
+        tail = existing.slice(start, len(existing))
+        combined = {name: np.concatenate((tail.column(name), incoming.column(name))) for name in COLUMNS}
+        key = combined["ts"] * MAX_SOURCES + combined["source"]
+        order = np.argsort(key, kind="stable")
+        key = key[order]
+        # Incoming rows sort after stored ones with the same key; keep the last.
+        keep = order[np.append(key[1:] != key[:-1], True)]
+        merged = BarColumns(*(combined[name][keep] for name in COLUMNS), sources=sources)
+
+        try:
+            with self._exclusive(path):
+                current = self._open(path)
+                if current is None or current[0] != meta:
+                    # Another writer got there first; its fingerprint decides whether reads resync.
+                    return
+                if start == len(existing) and start + len(merged) <= int(meta["capacity"]):
+                    self._append(path, meta, start, merged, after)
+                else:
+                    head = existing.slice(0, start)
+                    full = BarColumns(
+                        *(np.concatenate((head.column(name), merged.column(name))) for name in COLUMNS),
+                        sources=sources,
+                    )
+                    self._write_full(path, full, after)
+        except OSError:
+            logger.warning("[BARSTORE] could not update %s; next read rebuilds it", path, exc_info=True)
+
+
+@lru_cache()
+def get_bar_store() -> BarStore | None:
+    """Process-wide store, or None when ``BAR_STORE_DIR`` is empty (reads go to the tables)."""
+    root = str(get_settings().BAR_STORE_DIR or "").strip()
+    return BarStore(Path(root)) if root else None
+
+
+def read_bars(
+    db: Session,
+    instrument_id: int,
+    interval: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int | None = None,
+) -> BarColumns:
+    """Read-through helper: the mapped store when enabled, else a direct columnar table read."""
+    store = get_bar_store()
+    if store is not None:
+        return store.read(db, instrument_id, interval, start, end, limit)
+    return BarStore.load_from_db(db, instrument_id, interval, start, end, limit)
@@ -0,0 +1,257 @@
+"""Bulk write helpers for high-volume inserts (backtest trades, bars, ...)."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+import logging
+import sqlite3
+import time
+from typing import Any, Callable, Iterable, Sequence
+
+from sqlalchemy import DateTime, Float, Table, insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Rows handed to one executemany() call; bounds memory for very large writes.
+DEFAULT_CHUNK_ROWS = 10_000
+# Compile-time default before SQLite 3.32; newer builds report 32766 or more.
+SQLITE_DEFAULT_MAX_VARIABLES = 999
+# Past ~1000 rows per VALUES list, parse cost outweighs the saved statement steps.
+MAX_ROWS_PER_STATEMENT = 1000
+
+
+@dataclass(frozen=True)
+class BulkWriteStats:
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "table": self.table,
+            "rows": self.rows,
+            "seconds": round(self.seconds, 6),
+            "rows_per_sec": round(self.rows_per_sec, 2),
+        }
+
+
+def _sqlite_datetime(value: datetime | date | None) -> str | None:
+    # Same text layout as SQLAlchemy's SQLite DATETIME storage format, but via the
+    # C-level isoformat() instead of a Python-level % format per row.
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return value.isoformat(" ", "microseconds")[:26]
+
+
+def _column_converters(table: Table, columns: Sequence[str], dialect) -> list[Callable[[Any], Any] | None]:
+    converters: list[Callable[[Any], Any] | None] = []
+    for name in columns:
+        column_type = table.c[name].type
+        if dialect.name == "sqlite" and isinstance(column_type, DateTime):
+            converters.append(_sqlite_datetime)
+        else:
+            converters.append(column_type.bind_processor(dialect))
+    return converters
+
+
+def _chunks(rows: Iterable[Sequence[Any]], size: int) -> Iterable[list[Sequence[Any]]]:
+    chunk: list[Sequence[Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_insert(
+    db: Session,
+    table: Table,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    *,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> BulkWriteStats:
+    """Insert positional row tuples with one prepared statement per call.
+
+    Runs inside the session's current transaction; the caller commits. On SQLite the
+    rows go straight to the DBAPI cursor's executemany(), skipping ORM unit-of-work
+    and per-row parameter dict processing.
+    """
+    start = time.perf_counter()
+    columns = list(columns)
+    conn = db.connection()
+    dialect = conn.dialect
+    total = 0
+
+    if dialect.name == "sqlite":
+        compiled = insert(table).compile(dialect=dialect, column_keys=columns)
+        positions = [columns.index(name) for name in compiled.positiontup]
+        converters = _column_converters(table, compiled.positiontup, dialect)
+        plan = list(zip(positions, converters))
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            for chunk in _chunks(rows, max(int(chunk_rows), 1)):
+                params = [
+                    tuple(row[pos] if conv is None else conv(row[pos]) for pos, conv in plan)
+                    for row in chunk
+                ]
+                cursor.executemany(compiled.string, params)
+                total += len(params)
+        finally:
+            cursor.close()
+    else:
+        stmt = insert(table)
+        for chunk in _chunks(rows, max(int(chunk_rows), 1)):
+            db.execute(stmt, [dict(zip(columns, row)) for row in chunk])
+            total += len(chunk)
+
+    stats = BulkWriteStats(table=table.name, rows=total, seconds=time.perf_counter() - start)
+    if total:
+        logger.info(
+            "[BULK] table=%s rows=%s seconds=%.4f rows_per_sec=%.0f",
+            stats.table,
+            stats.rows,
+            stats.seconds,
+            stats.rows_per_sec,
+        )
+    return stats
+
+
+def _reuse_last(converter: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    # Columns stamped with one shared value (created_at, source) convert once per call.
+    last: list[Any] = [object(), None]
+
+    def convert(value: Any) -> Any:
+        if value is not last[0]:
+            last[0], last[1] = value, converter(value)
+        return last[1]
+
+    return convert
+
+
+def sqlite_max_variables(dbapi_connection) -> int:
+    """Runtime SQLITE_MAX_VARIABLE_NUMBER for a DBAPI connection (Python 3.11+ exposes getlimit)."""
+    getlimit = getattr(dbapi_connection, "getlimit", None)
+    if getlimit is None:
+        return SQLITE_DEFAULT_MAX_VARIABLES
+    try:
+        return int(getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER))
+    except (sqlite3.Error, AttributeError):
+        return SQLITE_DEFAULT_MAX_VARIABLES
+
+
+def rows_per_statement(max_variables: int, column_count: int) -> int:
+    return max(1, min(max_variables // max(column_count, 1), MAX_ROWS_PER_STATEMENT))
+
+
+def _sqlite_upsert_sql(
+    table: Table,
+    columns: Sequence[str],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+    row_count: int,
+    preparer,
+) -> str:
+    quote = preparer.quote
+    placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+    assignments = ", ".join(f"{quote(name)} = excluded.{quote(name)}" for name in update_columns)
+    return (
+        f"INSERT INTO {preparer.format_table(table)} ({', '.join(quote(name) for name in columns)}) "
+        f"VALUES {', '.join([placeholders] * row_count)} "
+        f"ON CONFLICT ({', '.join(quote(name) for name in conflict_columns)}) DO UPDATE SET {assignments}"
+    )
+
+
+def bulk_upsert(
+    db: Session,
+    table: Table,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+    *,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    max_variables: int | None = None,
+) -> BulkWriteStats:
+    """Insert-or-update positional row tuples, streaming ``rows`` in chunks.
+
+    On SQLite each chunk is split into multi-row ``INSERT ... ON CONFLICT DO UPDATE``
+    statements as wide as the connection's variable limit allows; the full-width
+    statement is prepared once and fed through executemany(), and the short tail
+    goes through the single-row statement. Runs inside the session's transaction.
+    """
+    start = time.perf_counter()
+    columns = list(columns)
+    conn = db.connection()
+    dialect = conn.dialect
+    total = 0
+
+    if dialect.name == "sqlite":
+        dbapi_connection = conn.connection.dbapi_connection
+        limit = max_variables or sqlite_max_variables(dbapi_connection)
+        width = rows_per_statement(limit, len(columns))
+        preparer = dialect.identifier_preparer
+        wide_sql = _sqlite_upsert_sql(table, columns, conflict_columns, update_columns, width, preparer)
+        single_sql = _sqlite_upsert_sql(table, columns, conflict_columns, update_columns, 1, preparer)
+        # Float columns bind natively (callers pass floats); datetimes are the real cost.
+        convert = [
+            (pos, _reuse_last(conv) if conv is _sqlite_datetime else conv)
+            for pos, conv in enumerate(_column_converters(table, columns, dialect))
+            if conv is not None and not isinstance(table.c[columns[pos]].type, Float)
+        ]
+        width_values = width * len(columns)
+        chunk_size = max(int(chunk_rows) // width, 1) * width
+        cursor = dbapi_connection.cursor()
+        try:
+            for chunk in _chunks(rows, chunk_size):
+                # One flat parameter list per chunk; statements take consecutive slices of it.
+                flat: list[Any] = []
+                for row in chunk:
+                    if convert:
+                        row = list(row)
+                        for pos, conv in convert:
+                            row[pos] = conv(row[pos])
+                    flat.extend(row)
+                full = (len(chunk) - len(chunk) % width) * len(columns)
+                if full:
+                    cursor.executemany(
+                        wide_sql, [flat[offset : offset + width_values] for offset in range(0, full, width_values)]
+                    )
+                if full < len(flat):
+                    cursor.executemany(
+                        single_sql, [flat[offset : offset + len(columns)] for offset in range(full, len(flat), len(columns))]
+                    )
+                total += len(chunk)
+        finally:
+            cursor.close()
+    else:
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        stmt = pg_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(conflict_columns),
+            set_={name: stmt.excluded[name] for name in update_columns},
+        )
+        for chunk in _chunks(rows, max(int(chunk_rows), 1)):
+            db.execute(stmt, [dict(zip(columns, row)) for row in chunk])
+            total += len(chunk)
+
+    stats = BulkWriteStats(table=table.name, rows=total, seconds=time.perf_counter() - start)
+    if total:
+        logger.info(
+            "[BULK] upsert table=%s rows=%s seconds=%.4f rows_per_sec=%.0f",
+            stats.table,
+            stats.rows,
+            stats.seconds,
+            stats.rows_per_sec,
+        )
+    return stats
@@ -0,0 +1,208 @@
+"""Shared cache of computed indicator arrays.
+
+Entries are keyed by (instrument_id, interval, indicator, params, fingerprint),
+where the fingerprint hashes the exact input closes. A changed bar or a
+different date range therefore never reuses a stale array. Arrays are kept in
+an in-process LRU bounded by bytes, and optionally persisted as ``.npy`` files
+so repeated tuning across restarts skips indicator computation too.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+import hashlib
+import logging
+from pathlib import Path
+import threading
+from typing import Any, Callable
+
+import numpy as np
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(values: np.ndarray) -> str:
+    data = np.ascontiguousarray(values, dtype=np.float64)
+    digest = hashlib.blake2b(data.tobytes(), digest_size=16)
+    digest.update(str(len(data)).encode())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class IndicatorKey:
+    instrument_id: int | str
+    interval: str
+    indicator: str
+    params: tuple[Any, ...]
+    fingerprint: str
+
+    def filename(self) -> str:
+        text = repr((self.instrument_id, self.interval, self.indicator, self.params, self.fingerprint))
+        return hashlib.sha1(text.encode()).hexdigest() + ".npy"
+
+
+@dataclass
+class IndicatorCacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "evictions": self.evictions}
+
+
+@dataclass
+class IndicatorStore:
+    """Thread-safe LRU of read-only float arrays with an optional disk layer."""
+
+    max_bytes: int
+    disk_dir: Path | None = None
+    stats: IndicatorCacheStats = field(default_factory=IndicatorCacheStats)
+
+    def __post_init__(self) -> None:
+        self._entries: OrderedDict[IndicatorKey, np.ndarray] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.stats = IndicatorCacheStats()
+
+    def _remember(self, key: IndicatorKey, value: np.ndarray) -> None:
+        if value.nbytes > self.max_bytes:
+            return
+        self._entries[key] = value
+        self._bytes += value.nbytes
+        while self._bytes > self.max_bytes and self._entries:
+            _, dropped = self._entries.popitem(last=False)
+            self._bytes -= dropped.nbytes
+            self.stats.evictions += 1
+
+    def get(self, key: IndicatorKey) -> np.ndarray | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return value
+        if self.disk_dir is None:
+            return None
+        path = self.disk_dir / key.filename()
+        try:
+            value = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        value.setflags(write=False)
+        with self._lock:
+            self.stats.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: IndicatorKey, value: np.ndarray) -> np.ndarray:
+        value = np.asarray(value, dtype=np.float64)
+        value.setflags(write=False)
+        with self._lock:
+            self._remember(key, value)
+        if self.disk_dir is not None:
+            path = self.disk_dir / key.filename()
+            tmp = path.with_suffix(".tmp")
+            try:
+                with tmp.open("wb") as handle:
+                    np.save(handle, value, allow_pickle=False)
+                tmp.replace(path)
+            except OSError:
+                logger.warning("[INDICATOR] failed to persist %s", path, exc_info=True)
+        return value
+
+    def get_or_compute(self, key: IndicatorKey, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            self.stats.misses += 1
+        return self.put(key, compute())
+
+
+@lru_cache()
+def get_indicator_cache() -> IndicatorStore:
+    settings = get_settings()
+    disk_dir = Path(settings.INDICATOR_CACHE_DIR) if settings.INDICATOR_CACHE_DIR else None
+    return IndicatorStore(max_bytes=int(settings.INDICATOR_CACHE_MAX_MB) * 1024 * 1024, disk_dir=disk_dir)
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if 0 < window <= len(values):
+        csum = np.concatenate(([0.0], np.cumsum(values)))
+        out[window - 1 :] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def simple_rsi(values: np.ndarray, period: int) -> np.ndarray:
+    """Same definition as ``strategy_signals.calc_rsi``: simple means over ``period`` deltas."""
+    out = np.full(values.shape, 50.0)
+    if len(values) > period:
+        deltas = np.diff(values)
+        gains = np.concatenate(([0.0], np.cumsum(np.clip(deltas, 0.0, None))))
+        losses = np.concatenate(([0.0], np.cumsum(np.clip(-deltas, 0.0, None))))
+        avg_gain = (gains[period:] - gains[:-period]) / period
+        avg_loss = (losses[period:] - losses[:-period]) / period
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[period:] = np.where(avg_loss <= 1e-12, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    return out
+
+
+def momentum_change(values: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if 0 < period < len(values):
+        past = values[:-period]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[period:] = np.where(past > 0, (values[period:] - past) / past, 0.0)
+    return out
+
+
+class IndicatorSeries:
+    """One instrument's closes with cached indicator accessors."""
+
+    def __init__(
+        self,
+        closes: np.ndarray,
+        instrument_id: int | str,
+        interval: str,
+        store: IndicatorStore | None = None,
+    ) -> None:
+        self.closes = np.asarray(closes, dtype=np.float64)
+        self.instrument_id = instrument_id
+        self.interval = interval
+        self.store = store if store is not None else get_indicator_cache()
+        self.fingerprint = fingerprint(self.closes)
+        self.computed = 0
+
+    def _cached(self, indicator: str, params: tuple[Any, ...], compute: Callable[[], np.ndarray]) -> np.ndarray:
+        key = IndicatorKey(self.instrument_id, self.interval, indicator, params, self.fingerprint)
+
+        def build() -> np.ndarray:
+            self.computed += 1
+            return compute()
+
+        return self.store.get_or_compute(key, build)
+
+    def sma(self, window: int) -> np.ndarray:
+        return self._cached("sma", (window,), lambda: rolling_mean(self.closes, window))
+
+    def rsi(self, period: int) -> np.ndarray:
+        return self._cached("rsi", (period,), lambda: simple_rsi(self.closes, period))
+
+    def momentum(self, period: int) -> np.ndarray:
+        return self._cached("momentum", (period,), lambda: momentum_change(self.closes, period))
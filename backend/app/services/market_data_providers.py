@@ -1,22 +1,17 @@
 """Market data providers for CN and US markets."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 import io
-import math
-import csv
+from pathlib import Path
+from typing import Any, Iterator
 from zoneinfo import ZoneInfo
 
-from .market_data_service import BarRecord
+import numpy as np
 
-
-def _to_datetime(value) -> datetime:
-    if isinstance(value, datetime):
-        return value
-    text = str(value)
-    # Handle "Z" suffix from ISO8601 values.
-    return datetime.fromisoformat(text.replace("Z", "+00:00"))
+from .bar_store import VOLUME_NULL, to_micros
+from .market_data_service import BarBatch
 
 
 def _to_utc(ts: datetime, assume_tz: str | None = None) -> datetime:
@@ -34,9 +29,86 @@ def _pick_column(frame, candidates: list[str]) -> str:
     raise KeyError(f"Missing columns: {candidates}")
 
 
+def _utc_micros(values, assume_tz: str) -> np.ndarray:
+    """Column-wise ``_to_utc``: naive stamps are localized to ``assume_tz``; NaT stays NaT."""
+    import pandas as pd
+
+    stamps = pd.DatetimeIndex(pd.to_datetime(values))
+    if stamps.tz is None:
+        stamps = stamps.tz_localize(assume_tz, ambiguous="NaT", nonexistent="shift_forward")
+    stamps = stamps.tz_convert("UTC").as_unit("us")
+    return np.where(stamps.isna(), np.iinfo(np.int64).min, stamps.asi8)
+
+
+def _local_text(value: datetime, tz: str) -> str:
+    """Wall-clock text in ``tz`` for APIs that take exchange-local bounds; naive values already are."""
+    if value.tzinfo is not None:
+        value = value.astimezone(ZoneInfo(tz))
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _frame_to_batch(
+    frame,
+    times,
+    price_columns: tuple[str, str, str, str],
+    volume_column: str | None,
+    assume_tz: str,
+    start: datetime | None,
+    end: datetime | None,
+    source: str,
+) -> BarBatch:
+    """Convert a provider DataFrame to a time-ordered ``BarBatch`` without touching rows."""
+    return _micros_to_batch(
+        frame, _utc_micros(times, assume_tz), price_columns, volume_column, assume_tz, start, end, source
+    )
+
+
+def _micros_to_batch(
+    frame,
+    ts: np.ndarray,
+    price_columns: tuple[str, str, str, str],
+    volume_column: str | None,
+    assume_tz: str,
+    start: datetime | None,
+    end: datetime | None,
+    source: str,
+) -> BarBatch:
+    """``_frame_to_batch`` with timestamps already parsed to UTC micros (NaT as int64 min)."""
+    import pandas as pd
+
+    opens, highs, lows, closes = (
+        pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=np.float64) for name in price_columns
+    )
+    if volume_column:
+        volume = pd.to_numeric(frame[volume_column], errors="coerce").to_numpy(dtype=np.float64)
+    else:
+        volume = np.full(len(ts), np.nan)
+
+    keep = (ts != np.iinfo(np.int64).min) & ~np.isnan(closes)
+    if start:
+        keep &= ts >= to_micros(_to_utc(start, assume_tz=assume_tz))
+    if end:
+        keep &= ts <= to_micros(_to_utc(end, assume_tz=assume_tz))
+    index = np.flatnonzero(keep)
+    index = index[np.argsort(ts[index], kind="stable")]
+    volume = volume[index]
+    return BarBatch(
+        ts=ts[index],
+        open=opens[index],
+        high=highs[index],
+        low=lows[index],
+        close=closes[index],
+        volume=np.where(np.isnan(volume), VOLUME_NULL, volume).astype(np.int64),
+        source=source,
+    )
+
+
 @dataclass
 class AkshareMarketDataProvider:
     name: str = "akshare"
+    # Eastmoney endpoints behind akshare throttle aggressively.
+    max_concurrency: int = 2
+    requests_per_second: float = 1.0
 
     def supports(self, market: str, interval: str) -> bool:
         return market.upper() == "CN" and interval in {"1m", "1d"}
@@ -47,7 +119,7 @@ class AkshareMarketDataProvider:
         start: datetime | None,
         end: datetime | None,
         interval: str,
-    ) -> list[BarRecord]:
+    ) -> BarBatch:
         try:
             import akshare  # type: ignore
         except Exception as exc:  # pragma: no cover
@@ -61,8 +133,8 @@ class AkshareMarketDataProvider:
             kwargs = {
                 "symbol": symbol,
                 "period": "1",
-                "start_date": start.strftime("%Y-%m-%d %H:%M:%S") if start else None,
-                "end_date": end.strftime("%Y-%m-%d %H:%M:%S") if end else None,
+                "start_date": _local_text(start, "Asia/Shanghai") if start else None,
+                "end_date": _local_text(end, "Asia/Shanghai") if end else None,
                 "adjust": "",
             }
             kwargs = {k: v for k, v in kwargs.items() if v is not None}
@@ -72,34 +144,23 @@ class AkshareMarketDataProvider:
             time_col = _pick_column(data, ["时间", "date", "日期"])
 
         if data is None or data.empty:
-            return []
+            return BarBatch.empty(self.name)
 
         open_col = _pick_column(data, ["开盘", "open", "开"])
         high_col = _pick_column(data, ["最高", "high", "高"])
         low_col = _pick_column(data, ["最低", "low", "低"])
         close_col = _pick_column(data, ["收盘", "close", "收"])
         volume_col = _pick_column(data, ["成交量", "volume", "量"])
-
-        records: list[BarRecord] = []
-        for _, row in data.iterrows():
-            ts = _to_utc(_to_datetime(row[time_col]), assume_tz="Asia/Shanghai")
-            records.append(
-                BarRecord(
-                    ts=ts,
-                    open=float(row[open_col]),
-                    high=float(row[high_col]),
-                    low=float(row[low_col]),
-                    close=float(row[close_col]),
-                    volume=int(row[volume_col]) if row[volume_col] is not None else None,
-                    source=self.name,
-                )
-            )
-
-        if start:
-            records = [item for item in records if item.ts >= _to_utc(start, assume_tz="Asia/Shanghai")]
-        if end:
-            records = [item for item in records if item.ts <= _to_utc(end, assume_tz="Asia/Shanghai")]
-        return records
+        return _frame_to_batch(
+            data,
+            data[time_col],
+            (open_col, high_col, low_col, close_col),
+            volume_col,
+            "Asia/Shanghai",
+            start,
+            end,
+            self.name,
+        )
 
 
 @dataclass
@@ -107,6 +168,10 @@ class UsYFinanceMarketDataProvider:
     """US market provider based on yfinance free data."""
 
     name: str = "yfinance"
+    max_concurrency: int = 4
+    requests_per_second: float = 2.0
+    # Tickers per yf.download call in fetch_history_many.
+    batch_size: int = 50
 
     def supports(self, market: str, interval: str) -> bool:
         return market.upper() == "US" and interval in {"1m", "1d"}
@@ -117,20 +182,19 @@ class UsYFinanceMarketDataProvider:
         start: datetime | None,
         end: datetime | None,
         interval: str,
-    ) -> list[BarRecord]:
+    ) -> BarBatch:
         try:
             import pandas as pd
             import yfinance as yf  # type: ignore
         except Exception as exc:  # pragma: no cover
             raise RuntimeError(f"yfinance dependencies import failed: {exc}") from exc
 
-        yf_interval = "1m" if interval == "1m" else "1d"
         try:
             history = yf.download(
                 tickers=symbol,
                 start=start,
                 end=end,
-                interval=yf_interval,
+                interval="1m" if interval == "1m" else "1d",
                 auto_adjust=False,
                 progress=False,
                 prepost=False,
@@ -146,103 +210,318 @@ class UsYFinanceMarketDataProvider:
                 fallback = self._fetch_stooq_daily(symbol, start, end)
                 if fallback:
                     return fallback
-            return []
+            return BarBatch.empty(self.name)
 
         frame = history.copy()
         if isinstance(frame.columns, pd.MultiIndex):
             frame.columns = [str(col[0]) for col in frame.columns]
+        return self._history_batch(frame, start, end)
+
+    def fetch_history_many(
+        self,
+        symbols: list[str],
+        start: datetime | None,
+        end: datetime | None,
+        interval: str,
+    ) -> dict[str, BarBatch]:
+        """Download several tickers in one request and split the (ticker, field) frame.
+
+        Tickers the response has no usable rows for are left out so the caller can
+        retry them through ``fetch_history`` (which also has the Stooq fallback).
+        """
+        try:
+            import pandas as pd
+            import yfinance as yf  # type: ignore
+        except Exception as exc:  # pragma: no cover
+            raise RuntimeError(f"yfinance dependencies import failed: {exc}") from exc
+
+        history = yf.download(
+            tickers=list(symbols),
+            start=start,
+            end=end,
+            interval="1m" if interval == "1m" else "1d",
+            auto_adjust=False,
+            progress=False,
+            prepost=False,
+            group_by="ticker",
+            threads=True,
+        )
+        if history is None or history.empty or not isinstance(history.columns, pd.MultiIndex):
+            return {}
+
+        tickers = set(history.columns.get_level_values(0))
+        batches: dict[str, BarBatch] = {}
+        for symbol in symbols:
+            if symbol not in tickers:
+                continue
+            frame = history[symbol]
+            try:
+                batch = self._history_batch(frame, start, end)
+            except RuntimeError:
+                continue
+            # Tickers yfinance failed on come back as all-NaN columns.
+            if len(batch):
+                batches[symbol] = batch
+        return batches
 
+    def _history_batch(self, frame, start: datetime | None, end: datetime | None) -> BarBatch:
         required = ["Open", "High", "Low", "Close"]
         missing = [col for col in required if col not in frame.columns]
         if missing:
             raise RuntimeError(f"yfinance missing columns: {missing}")
 
         volume_col = "Volume" if "Volume" in frame.columns else None
-        records: list[BarRecord] = []
-        for idx, row in frame.iterrows():
-            ts = _to_datetime(idx)
-            ts = _to_utc(ts, assume_tz="America/New_York")
-            volume_value = None
-            if volume_col:
-                raw = row[volume_col]
-                if raw is not None and not (isinstance(raw, float) and math.isnan(raw)):
-                    try:
-                        volume_value = int(raw)
-                    except Exception:
-                        volume_value = None
-            records.append(
-                BarRecord(
-                    ts=ts,
-                    open=float(row["Open"]),
-                    high=float(row["High"]),
-                    low=float(row["Low"]),
-                    close=float(row["Close"]),
-                    volume=volume_value,
-                    source=self.name,
-                )
-            )
-
-        if start:
-            records = [item for item in records if item.ts >= _to_utc(start, assume_tz="America/New_York")]
-        if end:
-            records = [item for item in records if item.ts <= _to_utc(end, assume_tz="America/New_York")]
-        return records
+        return _frame_to_batch(
+            frame,
+            frame.index,
+            ("Open", "High", "Low", "Close"),
+            volume_col,
+            "America/New_York",
+            start,
+            end,
+            self.name,
+        )
 
     def _fetch_stooq_daily(
         self,
         symbol: str,
         start: datetime | None,
         end: datetime | None,
-    ) -> list[BarRecord]:
+    ) -> BarBatch | None:
         try:
+            import pandas as pd
             import requests
         except Exception:
-            return []
+            return None
 
         url = "https://stooq.com/q/d/l/"
         params = {"s": f"{symbol.lower()}.us", "i": "d"}
         try:
             resp = requests.get(url, params=params, timeout=20)
             if resp.status_code != 200:
-                return []
+                return None
             text = resp.text or ""
         except Exception:
-            return []
+            return None
 
         if "No data" in text or "Exceeded the daily hits limit" in text:
+            return None
+
+        try:
+            frame = pd.read_csv(io.StringIO(text))
+        except Exception:
+            return None
+        required = ["Date", "Open", "High", "Low", "Close"]
+        if frame.empty or any(col not in frame.columns for col in required):
+            return None
+        frame = frame.dropna(subset=required)
+        if "Volume" in frame.columns:
+            # Stooq reports 0 when it has no volume for the day.
+            frame["Volume"] = pd.to_numeric(frame["Volume"], errors="coerce").replace(0, np.nan)
+        return _frame_to_batch(
+            frame,
+            pd.to_datetime(frame["Date"], errors="coerce"),
+            ("Open", "High", "Low", "Close"),
+            "Volume" if "Volume" in frame.columns else None,
+            "America/New_York",
+            start,
+            end,
+            f"{self.name}-stooq",
+        )
+
+
+_LOCAL_SUFFIXES = (".csv", ".csv.gz", ".parquet")
+# Column names seen in vendor archives, matched case-insensitively in this order.
+_LOCAL_DATETIME = ["ts", "timestamp", "datetime", "date_time", "trade_time", "bar_time"]
+_LOCAL_DATE = ["date", "trade_date", "day", "日期"]
+_LOCAL_TIME = ["time", "时间"]
+_LOCAL_OPEN = ["open", "o", "开盘", "开"]
+_LOCAL_HIGH = ["high", "h", "最高", "高"]
+_LOCAL_LOW = ["low", "l", "最低", "低"]
+_LOCAL_CLOSE = ["close", "c", "收盘", "收"]
+_LOCAL_VOLUME = ["volume", "vol", "v", "成交量", "量"]
+_LOCAL_SYMBOL = ["symbol", "ticker", "code", "ts_code", "代码"]
+
+
+def _match_column(columns, candidates: list[str]) -> str | None:
+    lookup = {str(name).strip().lower(): name for name in columns}
+    for name in candidates:
+        if name in lookup:
+            return lookup[name]
+    return None
+
+
+def _local_file_suffix(path: Path) -> str | None:
+    name = path.name.lower()
+    return next((suffix for suffix in _LOCAL_SUFFIXES if name.endswith(suffix)), None)
+
+
+def _infer_micros(values, assume_tz: str) -> np.ndarray:
+    """UTC micros from a vendor time column, inferring its encoding.
+
+    Integers shaped like ``YYYYMMDD[HHMM[SS]]`` are local wall-clock stamps; other
+    numbers are epoch seconds/ms/us/ns by magnitude. Text with UTC offsets keeps
+    them; naive text and wall-clock numbers are localized to ``assume_tz``.
+    """
+    import pandas as pd
+
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        numbers = pd.to_numeric(series, errors="coerce")
+        valid = numbers.dropna()
+        if not len(valid):
+            return np.full(len(series), np.iinfo(np.int64).min, dtype=np.int64)
+        digits = {len(str(int(value))) for value in (valid.min(), valid.max())}
+        wall_clock = {8: "%Y%m%d", 12: "%Y%m%d%H%M", 14: "%Y%m%d%H%M%S"}
+        if len(digits) == 1 and (fmt := wall_clock.get(digits.pop())) and 19 <= int(str(int(valid.iloc[0]))[:2]) <= 21:
+            text = numbers.astype("Int64").astype("string")
+            return _utc_micros(pd.to_datetime(text, format=fmt, errors="coerce"), assume_tz)
+        magnitude = float(valid.abs().max())
+        unit = "s" if magnitude < 1e11 else "ms" if magnitude < 1e14 else "us" if magnitude < 1e17 else "ns"
+        stamps = pd.DatetimeIndex(pd.to_datetime(numbers, unit=unit, utc=True)).as_unit("us")
+        return np.where(stamps.isna(), np.iinfo(np.int64).min, stamps.asi8)
+    if isinstance(series.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(series):
+        return _utc_micros(series, assume_tz)
+    try:
+        parsed = pd.to_datetime(series, errors="coerce", format="mixed")
+    except ValueError:
+        parsed = None
+    if parsed is None or parsed.dtype == object:
+        # Mixed UTC offsets (a DST change inside one file) only parse as UTC.
+        parsed = pd.to_datetime(series, errors="coerce", format="mixed", utc=True)
+    return _utc_micros(parsed, assume_tz)
+
+
+@dataclass
+class LocalFileMarketDataProvider:
+    """Offline provider over vendor CSV/Parquet archives.
+
+    Files live under ``<root>/<MARKET>/<interval>/``: either one or more files per
+    symbol (``AAPL.csv``, ``600519_2023.parquet``) or multi-symbol files with a
+    symbol column. Files are parsed ``chunk_rows`` at a time and yielded as
+    ``BarBatch`` chunks, so archives of any size ingest in bounded memory. Naive
+    timestamps are taken in the market's exchange timezone unless ``assume_tz``
+    is set. Ingestion binds the provider to one market with ``for_market``;
+    an unbound provider searches every market directory.
+    """
+
+    root: str | None = None  # Defaults to LOCAL_BARS_DIR
+    name: str = "localfile"
+    max_concurrency: int = 4
+    requests_per_second: float = 0.0
+    chunk_rows: int = 500_000
+    assume_tz: str | None = None
+    market: str | None = None
+
+    def for_market(self, market: str) -> "LocalFileMarketDataProvider":
+        return replace(self, market=market.upper())
+
+    def _root(self) -> Path | None:
+        from ..config import get_settings
+
+        root = str(self.root if self.root is not None else get_settings().LOCAL_BARS_DIR or "").strip()
+        return Path(root) if root else None
+
+    def supports(self, market: str, interval: str) -> bool:
+        root = self._root()
+        return root is not None and interval in {"1m", "1d"} and (root / market.upper() / interval).is_dir()
+
+    def files_for(self, symbol: str, interval: str) -> list[tuple[str, Path, bool]]:
+        """(market, path, per-symbol file) for every archive that may hold ``symbol``."""
+        root = self._root()
+        if root is None or not root.is_dir():
             return []
+        symbol = symbol.strip().upper()
+        found: list[tuple[str, Path, bool]] = []
+        markets = [root / self.market] if self.market else sorted(root.iterdir())
+        for market_dir in (path for path in markets if (path / interval).is_dir()):
+            files = sorted(path for path in (market_dir / interval).rglob("*") if path.is_file() and _local_file_suffix(path))
+            own = []
+            for path in files:
+                stem = path.name[: -len(_local_file_suffix(path))].upper()
+                if stem == symbol or (stem.startswith(symbol) and stem[len(symbol)] in "_-."):
+                    own.append(path)
+            market = market_dir.name.upper()
+            if own:
+                found.extend((market, path, True) for path in own)
+            else:
+                found.extend((market, path, False) for path in files)
+        return found
 
-        reader = csv.DictReader(io.StringIO(text))
-        records: list[BarRecord] = []
-        for row in reader:
-            date_text = row.get("Date")
-            open_text = row.get("Open")
-            high_text = row.get("High")
-            low_text = row.get("Low")
-            close_text = row.get("Close")
-            if not date_text or not open_text or not high_text or not low_text or not close_text:
-                continue
+    def fetch_history(
+        self,
+        symbol: str,
+        start: datetime | None,
+        end: datetime | None,
+        interval: str,
+    ) -> Iterator[BarBatch]:
+        files = self.files_for(symbol, interval)
+        if not files:
+            raise RuntimeError(f"No local {interval} files for {symbol} under {self._root()}")
+        return self._batches(symbol.strip().upper(), files, start, end)
+
+    def _batches(
+        self, symbol: str, files: list[tuple[str, Path, bool]], start: datetime | None, end: datetime | None
+    ) -> Iterator[BarBatch]:
+        from .trading_calendar import get_calendar
+
+        for market, path, own in files:
+            tz = self.assume_tz or get_calendar(market).tz
+            for frame in self._read_chunks(path):
+                batch = self._frame_batch(frame, None if own else symbol, tz, start, end, path)
+                if batch is not None and len(batch):
+                    yield batch
+
+    def _read_chunks(self, path: Path) -> Iterator[Any]:
+        if _local_file_suffix(path) == ".parquet":
             try:
-                ts = datetime.fromisoformat(date_text)
-                ts = _to_utc(ts, assume_tz="America/New_York")
-                volume_value = row.get("Volume")
-                volume = int(float(volume_value)) if volume_value not in (None, "", "0") else None
-                item = BarRecord(
-                    ts=ts,
-                    open=float(open_text),
-                    high=float(high_text),
-                    low=float(low_text),
-                    close=float(close_text),
-                    volume=volume,
-                    source=f"{self.name}-stooq",
-                )
-            except Exception:
-                continue
-            records.append(item)
-
-        records.sort(key=lambda x: x.ts)
-        if start:
-            records = [item for item in records if item.ts >= _to_utc(start, assume_tz="America/New_York")]
-        if end:
-            records = [item for item in records if item.ts <= _to_utc(end, assume_tz="America/New_York")]
-        return records
+                import pyarrow.parquet as pq  # type: ignore
+            except Exception as exc:  # pragma: no cover
+                raise RuntimeError(f"pyarrow is required to read {path.name}: {exc}") from exc
+            for record_batch in pq.ParquetFile(path).iter_batches(batch_size=self.chunk_rows):
+                yield record_batch.to_pandas()
+            return
+        import pandas as pd
+
+        with pd.read_csv(path, chunksize=self.chunk_rows) as reader:
+            yield from reader
+
+    def _frame_batch(
+        self, frame, symbol: str | None, tz: str, start: datetime | None, end: datetime | None, path: Path
+    ) -> BarBatch | None:
+        columns = frame.columns
+        if symbol is not None:
+            symbol_col = _match_column(columns, _LOCAL_SYMBOL)
+            if symbol_col is None:
+                return None  # A per-symbol file of another ticker.
+            codes = frame[symbol_col].astype("string").str.strip().str.upper()
+            frame = frame[((codes == symbol) | (codes.str.split(".").str[0] == symbol)).fillna(False).to_numpy(bool)]
+            if frame.empty:
+                return None
+
+        prices = tuple(_match_column(columns, names) for names in (_LOCAL_OPEN, _LOCAL_HIGH, _LOCAL_LOW, _LOCAL_CLOSE))
+        time_col = _match_column(columns, _LOCAL_DATETIME)
+        date_col, clock_col = _match_column(columns, _LOCAL_DATE), _match_column(columns, _LOCAL_TIME)
+        if None in prices or not (time_col or date_col or clock_col):
+            raise RuntimeError(f"{path.name}: cannot infer time/OHLC columns from {list(columns)}")
+        if time_col is not None:
+            ts = _infer_micros(frame[time_col], tz)
+        elif date_col is not None and clock_col is not None:
+            ts = _infer_micros(frame[date_col].astype("string") + " " + frame[clock_col].astype("string"), tz)
+        else:
+            ts = _infer_micros(frame[date_col or clock_col], tz)
+
+        batch = _micros_to_batch(frame, ts, prices, _match_column(columns, _LOCAL_VOLUME), tz, start, end, self.name)
+        # Vendor files repeat bars across overlapping exports; keep the last of each stamp.
+        keep = np.append(batch.ts[1:] != batch.ts[:-1], True)
+        if keep.all():
+            return batch
+        return BarBatch(
+            ts=batch.ts[keep],
+            open=batch.open[keep],
+            high=batch.high[keep],
+            low=batch.low[keep],
+            close=batch.close[keep],
+            volume=batch.volume[keep],
+            source=batch.source,
+        )
@@ -1,14 +1,28 @@
 """Market data ingestion service with pluggable providers."""
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Iterable, Protocol
-
-from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import logging
+import threading
+from typing import Any, Callable, Iterable, Iterator, Protocol
+
+import numpy as np
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
+from ..config import get_settings
 from ..models.market_data import Bar1d, Bar1m, DataSourceMeta, IngestionLog, Instrument
+from .bar_partitions import write_1m_rows
+from .bar_rollups import refresh_rollups
+from .bar_gaps import read_gaps, record_attempt, refresh_gap_index
+from .bar_store import VOLUME_NULL, BarColumns, get_bar_store, to_micros
+from .bulk_write import bulk_upsert
+from .rate_limit import ProviderThrottle
+from .trading_calendar import get_calendar
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -22,6 +36,93 @@ class BarRecord:
     source: str
 
 
+@dataclass(frozen=True)
+class BarBatch:
+    """Columnar bars from one provider call, ordered by time.
+
+    ``ts`` holds UTC epoch microseconds and missing volumes are ``VOLUME_NULL``.
+    Providers build it with column operations; the upsert path reads the arrays
+    directly, and iterating yields ``BarRecord``s for listeners that want rows.
+    """
+
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    source: str
+
+    @classmethod
+    def empty(cls, source: str) -> "BarBatch":
+        prices = np.empty(0, dtype=np.float64)
+        return cls(np.empty(0, dtype=np.int64), prices, prices, prices, prices, np.empty(0, dtype=np.int64), source)
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    def __getitem__(self, index: int) -> BarRecord:
+        return BarRecord(
+            ts=self._datetime(int(self.ts[index])),
+            open=float(self.open[index]),
+            high=float(self.high[index]),
+            low=float(self.low[index]),
+            close=float(self.close[index]),
+            volume=None if self.volume[index] == VOLUME_NULL else int(self.volume[index]),
+            source=self.source,
+        )
+
+    def __iter__(self) -> Iterator[BarRecord]:
+        for ts, open_, high, low, close, volume in zip(
+            self.timestamps(),
+            self.open.tolist(),
+            self.high.tolist(),
+            self.low.tolist(),
+            self.close.tolist(),
+            self.volumes(),
+        ):
+            yield BarRecord(ts.replace(tzinfo=timezone.utc), open_, high, low, close, volume, self.source)
+
+    @staticmethod
+    def _datetime(micros: int) -> datetime:
+        return np.datetime64(micros, "us").astype(datetime).replace(tzinfo=timezone.utc)
+
+    def timestamps(self) -> list[datetime]:
+        """Naive UTC datetimes, the form the bar tables store."""
+        return self.ts.astype("datetime64[us]").tolist()
+
+    def volumes(self) -> list[int | None]:
+        return [None if item == VOLUME_NULL else item for item in self.volume.tolist()]
+
+    def bounds(self) -> tuple[datetime, datetime]:
+        return self._datetime(int(self.ts.min())), self._datetime(int(self.ts.max()))
+
+    def rows(self, instrument_id: int, created_at: datetime) -> Iterator[tuple]:
+        """Positional rows in ``BAR_COLUMNS`` order for the bulk upsert."""
+        for ts, open_, high, low, close, volume in zip(
+            self.timestamps(),
+            self.open.tolist(),
+            self.high.tolist(),
+            self.low.tolist(),
+            self.close.tolist(),
+            self.volumes(),
+        ):
+            yield (instrument_id, ts, open_, high, low, close, volume, self.source, created_at)
+
+    def as_columns(self, sources: list[str]) -> BarColumns:
+        """Bar store layout, with this batch's source coded against ``sources``."""
+        return BarColumns(
+            ts=self.ts,
+            open=self.open,
+            high=self.high,
+            low=self.low,
+            close=self.close,
+            volume=self.volume,
+            source=np.full(len(self), sources.index(self.source), dtype=np.int64),
+            sources=sources,
+        )
+
+
 class MarketDataProvider(Protocol):
     name: str
 
@@ -33,7 +134,19 @@ class MarketDataProvider(Protocol):
         start: datetime | None,
         end: datetime | None,
         interval: str,
-    ) -> list[BarRecord]: ...
+    ) -> list[BarRecord] | BarBatch | Iterator[BarBatch]: ...
+
+    # Optional: providers that can fetch several tickers in one request also define
+    #   fetch_history_many(symbols, start, end, interval) -> dict[str, BarBatch]
+    # and may cap a request with ``batch_size``. Symbols missing from the result are
+    # fetched one by one through fetch_history. Providers over large archives may return
+    # an iterator of BarBatch chunks; each chunk is upserted and committed as it arrives.
+
+
+class BarListener(Protocol):
+    """Callback notified with the bars an ingestion just committed."""
+
+    def __call__(self, db: Session, instrument: Instrument, interval: str, bars: list[BarRecord]) -> None: ...
 
 
 def _utcnow() -> datetime:
@@ -70,55 +183,72 @@ def get_or_create_instrument(
     return instrument
 
 
+BAR_COLUMNS = ("instrument_id", "ts", "open", "high", "low", "close", "volume", "source", "created_at")
+BAR_UPDATE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
 def _upsert_bars(
     db: Session,
     model,
     instrument_id: int,
-    bars: Iterable[BarRecord],
+    bars: Iterable[BarRecord] | BarBatch,
 ) -> int:
-    payload = []
-    for item in bars:
-        payload.append(
-            {
-                "instrument_id": instrument_id,
-                "ts": item.ts,
-                "open": float(item.open),
-                "high": float(item.high),
-                "low": float(item.low),
-                "close": float(item.close),
-                "volume": int(item.volume) if item.volume is not None else None,
-                "source": item.source,
-                "created_at": _utcnow(),
-            }
-        )
-
-    if not payload:
+    created_at = _utcnow()
+    span: list[datetime] = []
+
+    def rows():
+        # Positional tuples straight from the provider's records; no per-bar dicts.
+        lo = hi = None
+        for item in bars:
+            ts = item.ts
+            if lo is None:
+                lo = hi = ts
+            elif ts < lo:
+                lo = ts
+            elif ts > hi:
+                hi = ts
+            yield (
+                instrument_id,
+                ts,
+                float(item.open),
+                float(item.high),
+                float(item.low),
+                float(item.close),
+                int(item.volume) if item.volume is not None else None,
+                item.source,
+                created_at,
+            )
+        if lo is not None:
+            span.extend((lo, hi))
+
+    if isinstance(bars, BarBatch):
+        if not len(bars):
+            return 0
+        span.extend(bars.bounds())
+        source_rows = bars.rows(instrument_id, created_at)
+    else:
+        source_rows = rows()
+
+    def write(table, rows) -> int:
+        return bulk_upsert(
+            db,
+            table,
+            BAR_COLUMNS,
+            rows,
+            conflict_columns=("instrument_id", "ts", "source"),
+            update_columns=BAR_UPDATE_COLUMNS,
+        ).rows
+
+    # Backfilled 1m bars of a cold month go to its partition, not back into bars_1m.
+    affected = write_1m_rows(db, source_rows, write) if model is Bar1m else write(model.__table__, source_rows)
+    if not affected:
         return 0
+    # Revisions keep the row count and max id; the stamp tells the bar store they happened.
+    db.execute(update(Instrument).where(Instrument.id == instrument_id).values(updated_at=_utcnow()))
 
-    # SQLite has a default limit of 999 variables per statement
-    # Each bar record has 9 fields, so batch size is limited to ~100 bars
-    BATCH_SIZE = 100
-    total_affected = 0
-
-    for batch_start in range(0, len(payload), BATCH_SIZE):
-        batch = payload[batch_start : batch_start + BATCH_SIZE]
-
-        stmt = sqlite_insert(model).values(batch)
-        update_cols = {
-            "open": stmt.excluded.open,
-            "high": stmt.excluded.high,
-            "low": stmt.excluded.low,
-            "close": stmt.excluded.close,
-            "volume": stmt.excluded.volume,
-        }
-        stmt = stmt.on_conflict_do_update(
-            index_elements=["instrument_id", "ts", "source"],
-            set_=update_cols,
-        )
-        result = db.execute(stmt)
-        total_affected += result.rowcount or len(batch)
-
-    return total_affected
+    # Keep 5m/15m/1h (or 1w) rollups current for just the buckets these bars touch.
+    refresh_rollups(db, "1m" if model is Bar1m else "1d", instrument_id, span[0], span[1])
+    return affected
 
 
 def _record_ingestion_meta(
@@ -154,24 +284,106 @@ def _record_ingestion_meta(
     meta.last_error = error
 
 
+@dataclass
+class IngestionOutcome:
+    symbol: str
+    ingested: int = 0
+    error: str | None = None
+
+    @property
+    def status(self) -> str:
+        return "failed" if self.error is not None else "completed"
+
+
+@dataclass
+class BackfillOutcome:
+    symbol: str
+    ranges: int = 0  # Gap ranges fetched
+    ingested: int = 0
+    missing_before: int = 0
+    missing_after: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _IngestRun:
+    provider: MarketDataProvider
+    instrument: Instrument
+    market: str
+    symbol: str
+    interval: str
+    start: datetime | None
+    end: datetime
+    previous_success_ts: datetime | None
+    log: IngestionLog
+    # Resuming from a checkpoint with no trading session since: skip the provider call.
+    up_to_date: bool = False
+
+
 class MarketDataService:
     def __init__(self, providers: list[MarketDataProvider]) -> None:
         self.providers = providers
+        self.listeners: list[BarListener] = []
+        self._throttles: dict[str, ProviderThrottle] = {}
+        self._throttle_lock = threading.Lock()
+
+    def subscribe(self, listener: BarListener) -> None:
+        """Register a callback for bars committed by ingest_history."""
+        self.listeners.append(listener)
+
+    def _publish(self, db: Session, instrument: Instrument, interval: str, bars: list[BarRecord]) -> None:
+        for listener in self.listeners:
+            try:
+                listener(db, instrument, interval, bars)
+            except Exception:
+                # Subscribers must never fail an ingestion that already committed.
+                db.rollback()
+                logger.exception("bar listener failed for %s %s", instrument.symbol, interval)
+
+    def _update_bar_store(
+        self, db: Session, instrument: Instrument, interval: str, bars: list[BarRecord], fingerprints: tuple | None
+    ) -> None:
+        store = get_bar_store()
+        if store is None or fingerprints is None:
+            return
+        try:
+            store.apply(db, instrument.id, interval, bars, *fingerprints)
+        except Exception:
+            # The store is a cache over the committed table; the next read resyncs it.
+            logger.exception("bar store update failed for %s %s", instrument.symbol, interval)
 
     def _pick_provider(self, market: str, interval: str, provider_name: str | None) -> MarketDataProvider:
         market = _normalize_market(market)
         if provider_name:
             for provider in self.providers:
                 if provider.name == provider_name and provider.supports(market, interval):
-                    return provider
+                    return self._bind_market(provider, market)
             raise ValueError(f"Provider {provider_name} not available for {market} {interval}")
 
         for provider in self.providers:
             if provider.supports(market, interval):
-                return provider
+                return self._bind_market(provider, market)
         raise ValueError(f"No provider available for {market} {interval}")
 
-    def ingest_history(
+    @staticmethod
+    def _bind_market(provider: MarketDataProvider, market: str) -> MarketDataProvider:
+        # Providers that serve several markets from one source (local archives) read only this one.
+        bind = getattr(provider, "for_market", None)
+        return bind(market) if bind is not None else provider
+
+    def _throttle(self, provider: MarketDataProvider) -> ProviderThrottle:
+        with self._throttle_lock:
+            throttle = self._throttles.get(provider.name)
+            if throttle is None:
+                settings = get_settings()
+                throttle = ProviderThrottle(
+                    getattr(provider, "max_concurrency", settings.INGEST_PROVIDER_CONCURRENCY),
+                    getattr(provider, "requests_per_second", settings.INGEST_PROVIDER_RATE_PER_SEC),
+                )
+                self._throttles[provider.name] = throttle
+            return throttle
+
+    def _begin_ingest(
         self,
         db: Session,
         symbol: str,
@@ -179,8 +391,9 @@ class MarketDataService:
         interval: str,
         start: datetime | None,
         end: datetime | None,
-        provider_name: str | None = None,
-    ) -> int:
+        provider_name: str | None,
+        job_id: int | None = None,
+    ) -> _IngestRun:
         symbol = _normalize_symbol(symbol)
         market = _normalize_market(market)
         interval = str(interval or "").strip().lower()
@@ -201,6 +414,12 @@ class MarketDataService:
 
         effective_start = start or (meta.last_success_ts if meta else None)
         effective_end = end or _utcnow()
+        up_to_date = False
+        if start is None and effective_start is not None and interval in {"1m", "1d"}:
+            expected = get_calendar(market).expected_timestamps(
+                effective_start + timedelta(microseconds=1), effective_end, interval
+            )
+            up_to_date = not len(expected)
 
         log = IngestionLog(
             source=provider.name,
@@ -210,26 +429,231 @@ class MarketDataService:
             start_ts=effective_start,
             end_ts=effective_end,
             status="running",
+            job_id=job_id,
         )
         db.add(log)
         db.commit()
         db.refresh(log)
+        return _IngestRun(
+            provider=provider,
+            instrument=instrument,
+            market=market,
+            symbol=symbol,
+            interval=interval,
+            start=effective_start,
+            end=effective_end,
+            previous_success_ts=meta.last_success_ts if meta else None,
+            log=log,
+            up_to_date=up_to_date,
+        )
 
-        try:
-            bars = provider.fetch_history(symbol, effective_start, effective_end, interval)
-            if interval == "1m":
-                affected = _upsert_bars(db, Bar1m, instrument.id, bars)
+    def _fetch(self, run: _IngestRun):
+        if run.up_to_date:
+            return BarBatch.empty(run.provider.name)
+        with self._throttle(run.provider):
+            return run.provider.fetch_history(run.symbol, run.start, run.end, run.interval)
+
+    def _fetch_group(self, runs: list[_IngestRun]) -> dict[str, Any]:
+        first = runs[0]
+        with self._throttle(first.provider):
+            return first.provider.fetch_history_many([run.symbol for run in runs], first.start, first.end, first.interval)
+
+    @staticmethod
+    def _fetch_groups(runs: dict[int, _IngestRun]) -> Iterator[list[int]]:
+        """Split runs into provider requests: same provider and window share a batch call."""
+        groups: dict[tuple, list[int]] = {}
+        for index, run in runs.items():
+            if hasattr(run.provider, "fetch_history_many") and not run.up_to_date:
+                key = (run.provider.name, run.interval, run.start, run.end)
             else:
-                affected = _upsert_bars(db, Bar1d, instrument.id, bars)
+                key = (index,)
+            groups.setdefault(key, []).append(index)
+        for indexes in groups.values():
+            size = max(int(getattr(runs[indexes[0]].provider, "batch_size", len(indexes)) or 1), 1)
+            for offset in range(0, len(indexes), size):
+                yield indexes[offset : offset + size]
+
+    def _finish_ingest(self, db: Session, run: _IngestRun, fetch: Callable[[], Any]) -> int:
+        """Write one symbol's bars and close its log; ``fetch`` yields the bars or raises."""
+        provider, log = run.provider, run.log
+        model = Bar1m if run.interval == "1m" else Bar1d
+        affected, newest, pending = 0, None, []
+        try:
+            result = fetch()
+            # Providers reading large archives yield BarBatch chunks; each commits on its
+            # own so memory and the open transaction stay one chunk deep.
+            streamed = not isinstance(result, (list, BarBatch))
+            for bars in result if streamed else [result]:
+                if not len(bars):
+                    continue
+                before = self._store_fingerprint(db, run)
+                affected += _upsert_bars(db, model, run.instrument.id, bars)
+                fingerprints = None if before is None else (before, self._store_fingerprint(db, run))
+                if newest is None or to_micros(bars[-1].ts) > to_micros(newest):
+                    newest = bars[-1].ts
+                if streamed:
+                    db.commit()
+                    self._after_commit(db, run, bars, fingerprints)
+                else:
+                    pending.append((bars, fingerprints))
             log.status = "completed"
-            log.message = f"ingested {affected} bars"
-            last_ts = bars[-1].ts if bars else (meta.last_success_ts if meta else None)
-            _record_ingestion_meta(db, provider.name, market, symbol, interval, last_ts, None)
+            log.message = "up to date; no session since last bar" if run.up_to_date else f"ingested {affected} bars"
+            log.bar_count = affected
+            last_ts = newest or run.previous_success_ts
+            if last_ts is not None and run.previous_success_ts is not None:
+                # Backfilling an older range must not move the checkpoint backwards.
+                if to_micros(run.previous_success_ts) > to_micros(last_ts):
+                    last_ts = run.previous_success_ts
+            _record_ingestion_meta(db, provider.name, run.market, run.symbol, run.interval, last_ts, None)
             db.commit()
-            return affected
         except Exception as exc:
+            db.rollback()
             log.status = "failed"
             log.message = str(exc)
-            _record_ingestion_meta(db, provider.name, market, symbol, interval, None, str(exc))
+            _record_ingestion_meta(db, provider.name, run.market, run.symbol, run.interval, None, str(exc))
             db.commit()
             raise
+        for bars, fingerprints in pending:
+            self._after_commit(db, run, bars, fingerprints)
+        return affected
+
+    @staticmethod
+    def _store_fingerprint(db: Session, run: _IngestRun) -> list[int] | None:
+        # Read inside the writing transaction, so no other writer can land in between.
+        store = get_bar_store()
+        return None if store is None else store.db_fingerprint(db, run.instrument.id, run.interval)
+
+    def _after_commit(self, db: Session, run: _IngestRun, bars, fingerprints: tuple | None) -> None:
+        self._update_bar_store(db, run.instrument, run.interval, bars, fingerprints)
+        self._publish(db, run.instrument, run.interval, bars)
+
+    def ingest_history(
+        self,
+        db: Session,
+        symbol: str,
+        market: str,
+        interval: str,
+        start: datetime | None,
+        end: datetime | None,
+        provider_name: str | None = None,
+    ) -> int:
+        run = self._begin_ingest(db, symbol, market, interval, start, end, provider_name)
+        return self._finish_ingest(db, run, lambda: self._fetch(run))
+
+    def ingest_many(
+        self,
+        db: Session,
+        symbols: Iterable[str],
+        market: str,
+        interval: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        provider_name: str | None = None,
+        max_workers: int | None = None,
+        job_id: int | None = None,
+    ) -> list[IngestionOutcome]:
+        """Ingest several symbols, fetching concurrently under each provider's limits.
+
+        Provider calls run on a thread pool; every database write stays on the calling
+        thread's session, in completion order, with the same per-symbol IngestionLog
+        and DataSourceMeta bookkeeping as ``ingest_history``. Results follow input order.
+        Symbols that share a batch-capable provider and fetch window go out in one
+        ``fetch_history_many`` request; any the batch did not return are refetched alone.
+        ``job_id`` tags the IngestionLog rows so a queued job can report progress.
+        """
+        # One shared end keeps symbols without an explicit end in the same batch window.
+        end = end or _utcnow()
+        outcomes: list[IngestionOutcome] = []
+        runs: dict[int, _IngestRun] = {}
+        for index, symbol in enumerate(symbols):
+            outcomes.append(IngestionOutcome(symbol=_normalize_symbol(symbol)))
+            try:
+                runs[index] = self._begin_ingest(db, symbol, market, interval, start, end, provider_name, job_id)
+            except Exception as exc:
+                db.rollback()
+                outcomes[index].error = str(exc)
+        if not runs:
+            return outcomes
+
+        workers = max(1, min(max_workers or get_settings().INGEST_MAX_WORKERS, len(runs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+            pending: dict[Future, list[int] | int] = {}
+            for indexes in self._fetch_groups(runs):
+                if len(indexes) > 1:
+                    pending[pool.submit(self._fetch_group, [runs[index] for index in indexes])] = indexes
+                else:
+                    pending[pool.submit(self._fetch, runs[indexes[0]])] = indexes[0]
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    target = pending.pop(future)
+                    if isinstance(target, int):
+                        try:
+                            outcomes[target].ingested = self._finish_ingest(db, runs[target], future.result)
+                        except Exception as exc:
+                            outcomes[target].error = str(exc)
+                        continue
+                    try:
+                        batches = future.result()
+                    except Exception:
+                        logger.warning("batch fetch of %s symbols failed; fetching one by one", len(target), exc_info=True)
+                        batches = {}
+                    for index in target:
+                        bars = batches.get(runs[index].symbol)
+                        if bars is None:
+                            pending[pool.submit(self._fetch, runs[index])] = index
+                            continue
+                        try:
+                            outcomes[index].ingested = self._finish_ingest(db, runs[index], lambda bars=bars: bars)
+                        except Exception as exc:
+                            outcomes[index].error = str(exc)
+        return outcomes
+
+    def backfill_gaps(
+        self,
+        db: Session,
+        symbol: str,
+        market: str,
+        interval: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        provider_name: str | None = None,
+        max_attempts: int = 3,
+    ) -> BackfillOutcome:
+        """Refetch only the ranges the gap index reports missing in ``[start, end]``.
+
+        The index is refreshed first, then each range is ingested with explicit
+        bounds and re-checked; ranges a provider cannot fill count an attempt and
+        are skipped once ``max_attempts`` is reached.
+        """
+        symbol = _normalize_symbol(symbol)
+        market = _normalize_market(market)
+        outcome = BackfillOutcome(symbol=symbol)
+        instrument = (
+            db.query(Instrument).filter(Instrument.symbol == symbol, Instrument.market == market).first()
+        )
+        if instrument is None or interval not in {"1m", "1d"}:
+            return outcome
+
+        gaps = refresh_gap_index(db, instrument.id, interval, market, start, end)
+        # Gap ends are inclusive, but yfinance reads ``end`` as exclusive: fetch one bar past it.
+        step = timedelta(days=1) if interval == "1d" else timedelta(minutes=1)
+        outcome.missing_before = sum(gap.missing for gap in gaps)
+        for gap in read_gaps(db, instrument.id, interval, start, end, max_attempts=max_attempts):
+            # Index bounds are naive UTC; providers read naive bounds as exchange-local.
+            gap_start = gap.start_ts.replace(tzinfo=timezone.utc)
+            gap_end = gap.end_ts.replace(tzinfo=timezone.utc)
+            outcome.ranges += 1
+            try:
+                outcome.ingested += self.ingest_history(
+                    db, symbol, market, interval, gap_start, gap_end + step, provider_name
+                )
+            except Exception as exc:
+                outcome.errors.append(f"{gap_start.isoformat()}..{gap_end.isoformat()}: {exc}")
+            if refresh_gap_index(db, instrument.id, interval, market, gap_start, gap_end):
+                record_attempt(db, instrument.id, interval, gap_start, gap_end)
+        outcome.missing_after = sum(
+            row.missing for row in read_gaps(db, instrument.id, interval, start, end)
+        )
+        return outcome
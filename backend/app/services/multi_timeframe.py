@@ -0,0 +1,178 @@
+"""Higher-timeframe alignment for backtests running on a finer base interval."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+import numpy as np
+
+INTERVAL_DURATIONS: dict[str, timedelta] = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+    "1w": timedelta(weeks=1),
+}
+
+
+def interval_duration(interval: str) -> timedelta:
+    try:
+        return INTERVAL_DURATIONS[interval]
+    except KeyError as exc:
+        raise ValueError(f"Unsupported interval: {interval}") from exc
+
+
+def _epoch_seconds(values: Iterable[datetime]) -> np.ndarray:
+    # Bar timestamps are stored naive in UTC.
+    return np.fromiter(
+        (
+            (item if item.tzinfo else item.replace(tzinfo=timezone.utc)).timestamp()
+            for item in values
+        ),
+        dtype=np.float64,
+    )
+
+
+def build_alignment_index(
+    fine_ts: list[datetime],
+    coarse_ts: list[datetime],
+    coarse_duration: timedelta,
+) -> np.ndarray:
+    """Map each fine bar to the last coarse bar completed at or before it (-1 if none).
+
+    A coarse bar stamped ``t`` is complete at ``t + coarse_duration``, so a fine bar
+    never sees the coarse bar it falls inside of.
+    """
+    if not fine_ts:
+        return np.empty(0, dtype=np.int64)
+    if not coarse_ts:
+        return np.full(len(fine_ts), -1, dtype=np.int64)
+    coarse_end = _epoch_seconds(coarse_ts) + coarse_duration.total_seconds()
+    fine = _epoch_seconds(fine_ts)
+    return np.searchsorted(coarse_end, fine, side="right").astype(np.int64) - 1
+
+
+@dataclass
+class HigherTimeframeSeries:
+    """Coarse closes for one symbol plus their alignment against the base bars."""
+
+    interval: str
+    closes: np.ndarray
+    alignment: np.ndarray
+    cumsum: np.ndarray
+
+    @classmethod
+    def build(
+        cls,
+        interval: str,
+        coarse_ts: list[datetime],
+        coarse_closes: list[float],
+        fine_ts: list[datetime],
+    ) -> "HigherTimeframeSeries":
+        closes = np.asarray(coarse_closes, dtype=np.float64)
+        return cls(
+            interval=interval,
+            closes=closes,
+            alignment=build_alignment_index(fine_ts, coarse_ts, interval_duration(interval)),
+            cumsum=np.concatenate(([0.0], np.cumsum(closes))),
+        )
+
+    def position(self, bar_index: int) -> int:
+        return int(self.alignment[bar_index])
+
+    def close(self, bar_index: int) -> float | None:
+        pos = self.position(bar_index)
+        return float(self.closes[pos]) if pos >= 0 else None
+
+    def closes_upto(self, bar_index: int, count: int) -> list[float]:
+        pos = self.position(bar_index)
+        if pos < 0 or count <= 0:
+            return []
+        return self.closes[max(0, pos + 1 - count) : pos + 1].tolist()
+
+    def sma(self, bar_index: int, window: int) -> float | None:
+        pos = self.position(bar_index)
+        if window <= 0 or pos + 1 < window:
+            return None
+        return float((self.cumsum[pos + 1] - self.cumsum[pos + 1 - window]) / window)
+
+
+class TimeframeView:
+    """Cursor handed to custom strategies as ``params["timeframes"]``.
+
+    The engine seeks it to the current symbol and base bar before each signal call,
+    so lookups are O(1) and nothing is copied per bar.
+    """
+
+    def __init__(self, context: "TimeframeContext") -> None:
+        self._context = context
+        self._symbol: str | None = None
+        self._bar_index = -1
+
+    def seek(self, symbol: str, bar_index: int) -> None:
+        self._symbol = symbol
+        self._bar_index = bar_index
+
+    def _series(self, interval: str) -> HigherTimeframeSeries | None:
+        if self._symbol is None:
+            return None
+        return self._context.series.get(self._symbol, {}).get(interval)
+
+    def close(self, interval: str) -> float | None:
+        series = self._series(interval)
+        return series.close(self._bar_index) if series else None
+
+    def closes(self, interval: str, count: int) -> list[float]:
+        series = self._series(interval)
+        return series.closes_upto(self._bar_index, count) if series else []
+
+    def sma(self, interval: str, window: int) -> float | None:
+        series = self._series(interval)
+        return series.sma(self._bar_index, window) if series else None
+
+
+@dataclass
+class TimeframeContext:
+    """Per-symbol higher-timeframe series plus the built-in trend filter settings."""
+
+    series: dict[str, dict[str, HigherTimeframeSeries]]
+    trend_interval: str | None = None
+    trend_window: int = 20
+
+    def view(self) -> TimeframeView:
+        return TimeframeView(self)
+
+    def allows_entry(self, symbol: str, bar_index: int) -> bool:
+        """Built-in trend filter: only enter long above the coarse SMA."""
+        if not self.trend_interval:
+            return True
+        series = self.series.get(symbol, {}).get(self.trend_interval)
+        if series is None:
+            return False
+        close = series.close(bar_index)
+        average = series.sma(bar_index, self.trend_window)
+        return close is not None and average is not None and close > average
+
+
+def parse_higher_intervals(base_interval: str, parameters: dict[str, Any]) -> list[str]:
+    """Validated higher intervals requested via ``higher_intervals``/``trend_interval``."""
+    raw = parameters.get("higher_intervals") or []
+    if isinstance(raw, str):
+        raw = [raw]
+    requested = [str(item).strip().lower() for item in raw if str(item).strip()]
+    trend_interval = str(parameters.get("trend_interval") or "").strip().lower()
+    if trend_interval and trend_interval not in requested:
+        requested.append(trend_interval)
+
+    base = interval_duration(base_interval)
+    intervals: list[str] = []
+    for item in requested:
+        if item not in INTERVAL_DURATIONS:
+            raise ValueError(f"Unsupported higher interval: {item}")
+        if INTERVAL_DURATIONS[item] <= base:
+            raise ValueError(f"Higher interval {item} must be coarser than {base_interval}")
+        if item not in intervals:
+            intervals.append(item)
+    return intervals
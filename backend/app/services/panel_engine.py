@@ -0,0 +1,225 @@
+"""Cross-sectional (universe-ranking) strategies over a time x symbol close panel.
+
+Factors and ranks are computed for every timestamp and symbol at once; the
+share-based portfolio is only stepped at rebalance rows, each step vectorized
+across the universe, and equity between rebalances is a matrix product. Cost is
+O(bars x symbols) array work plus O(rebalances) Python iterations, so decades of
+daily bars over hundreds of symbols stay interactive.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import math
+from typing import Any
+
+import numpy as np
+
+from .vectorized_backtest import align_closes
+
+PANEL_STRATEGY_TYPES = {"momentum_rank", "mean_reversion_rank"}
+
+
+@dataclass
+class PricePanel:
+    """Closes as a (bars, symbols) matrix, forward-filled; NaN before a symbol's first bar."""
+
+    timeline: list[datetime]
+    symbols: list[str]
+    closes: np.ndarray
+
+    @classmethod
+    def build(cls, series: dict[str, tuple[list[datetime], list[float]]]) -> "PricePanel":
+        symbols = list(series)
+        timeline, matrix = align_closes([series[symbol] for symbol in symbols], fill_leading=False)
+        return cls(timeline=timeline, symbols=symbols, closes=matrix.T.copy())
+
+
+def momentum_factor(closes: np.ndarray, lookback: int, skip: int = 0) -> np.ndarray:
+    """Return from ``lookback`` bars ago to ``skip`` bars ago (12-1 momentum is 252/21)."""
+    out = np.full(closes.shape, np.nan)
+    if 0 <= skip < lookback < closes.shape[0]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[lookback:] = closes[lookback - skip : closes.shape[0] - skip] / closes[:-lookback] - 1.0
+    return out
+
+
+def mean_reversion_factor(closes: np.ndarray, lookback: int) -> np.ndarray:
+    """Negative deviation of the close from its trailing mean; the most oversold scores highest."""
+    out = np.full(closes.shape, np.nan)
+    if 0 < lookback <= closes.shape[0]:
+        # NaN (pre-listing) bars poison only the windows that contain them.
+        missing = np.isnan(closes)
+        zeros = np.zeros((1, closes.shape[1]))
+        csum = np.vstack((zeros, np.cumsum(np.where(missing, 0.0, closes), axis=0)))
+        cmiss = np.vstack((zeros, np.cumsum(missing, axis=0)))
+        gaps = cmiss[lookback:] - cmiss[:-lookback]
+        means = np.where(gaps == 0, (csum[lookback:] - csum[:-lookback]) / lookback, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[lookback - 1 :] = 1.0 - closes[lookback - 1 :] / means
+    return out
+
+
+def descending_order(factor: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row position of each symbol when sorted best-first, and the valid count per row.
+
+    NaN scores sort last; ties keep symbol order.
+    """
+    valid = np.isfinite(factor)
+    keyed = np.where(valid, -factor, np.inf)
+    order = np.argsort(keyed, axis=1, kind="stable")
+    position = np.empty_like(order)
+    np.put_along_axis(position, order, np.arange(factor.shape[1])[None, :].repeat(factor.shape[0], 0), axis=1)
+    return position, valid.sum(axis=1)
+
+
+def cross_sectional_rank(factor: np.ndarray) -> np.ndarray:
+    """Percentile rank per timestamp in [0, 1] (1 = best); NaN where the factor is undefined."""
+    position, counts = descending_order(factor)
+    denom = np.maximum(counts - 1, 1)[:, None]
+    ranks = 1.0 - position / denom
+    return np.where(np.isfinite(factor), ranks, np.nan)
+
+
+def top_fraction_mask(factor: np.ndarray, top_fraction: float) -> np.ndarray:
+    """Boolean (bars, symbols) mask of the best ``ceil(valid * top_fraction)`` symbols per row."""
+    position, counts = descending_order(factor)
+    take = np.where(counts > 0, np.ceil(counts * top_fraction), 0).astype(np.int64)
+    return (position < take[:, None]) & np.isfinite(factor)
+
+
+def panel_factor(strategy_type: str, parameters: dict[str, Any], closes: np.ndarray) -> np.ndarray:
+    strategy_type = (strategy_type or "").strip().lower()
+    if strategy_type == "momentum_rank":
+        lookback = max(int(parameters.get("lookback", 126)), 1)
+        skip = min(max(int(parameters.get("skip", 0)), 0), lookback - 1)
+        return momentum_factor(closes, lookback, skip)
+    if strategy_type == "mean_reversion_rank":
+        return mean_reversion_factor(closes, max(int(parameters.get("lookback", 5)), 2))
+    raise ValueError(f"Unsupported panel strategy_type: {strategy_type}")
+
+
+@dataclass
+class PanelSimulation:
+    equity: np.ndarray
+    final_value: float
+    trades: list[dict[str, Any]]
+    closed_trade_pnls: list[float]
+    rebalances: int
+    latest_ranks: list[dict[str, Any]] | None = None
+
+
+def simulate_panel(
+    panel: PricePanel,
+    targets: np.ndarray,
+    rebalance_rows: np.ndarray,
+    initial_capital: float,
+    gross_exposure: float,
+    commission_rate: float,
+) -> PanelSimulation:
+    """Equal-weight the selected symbols at each rebalance row; liquidate on the last bar.
+
+    Orders fill at the rebalance bar's close in whole shares, matching the
+    per-symbol engine's fill and commission conventions.
+    """
+    prices = np.nan_to_num(panel.closes, nan=0.0)
+    n_bars, n_symbols = prices.shape
+    shares = np.zeros(n_symbols)
+    cost = np.zeros(n_symbols)
+    cash = float(initial_capital)
+    equity = np.empty(n_bars)
+    trades: list[dict[str, Any]] = []
+    closed_pnls: list[float] = []
+
+    def trade(row: int, target: np.ndarray) -> None:
+        nonlocal cash, shares, cost
+        price = prices[row]
+        delta = target - shares
+        sells = np.flatnonzero(delta < 0)
+        buys = np.flatnonzero(delta > 0)
+        for idx in sells:
+            qty = -delta[idx]
+            notional = qty * price[idx]
+            commission = notional * commission_rate
+            pnl = notional - commission - qty * cost[idx]
+            cash += notional - commission
+            closed_pnls.append(float(pnl))
+            trades.append(_event(panel, row, idx, "SELL", qty, commission, pnl))
+        for idx in buys:
+            qty = delta[idx]
+            notional = qty * price[idx]
+            commission = notional * commission_rate
+            cash -= notional + commission
+            cost[idx] = (cost[idx] * shares[idx] + notional) / target[idx]
+            trades.append(_event(panel, row, idx, "BUY", qty, commission, 0.0))
+        cost = np.where(target > 0, cost, 0.0)
+        shares = target.astype(np.float64)
+
+    bounds = list(rebalance_rows) + [n_bars]
+    equity[: bounds[0]] = cash
+    for k, row in enumerate(rebalance_rows):
+        selected = np.flatnonzero(targets[k])
+        target = np.zeros(n_symbols)
+        if len(selected):
+            value = cash + float(shares @ prices[row])
+            budget = value * gross_exposure / len(selected)
+            price = prices[row, selected]
+            target[selected] = np.floor(budget / (price * (1.0 + commission_rate)))
+        trade(int(row), target)
+        end = bounds[k + 1]
+        equity[row:end] = cash + prices[row:end] @ shares
+
+    trade(n_bars - 1, np.zeros(n_symbols))
+    equity[-1] = cash
+    return PanelSimulation(
+        equity=equity,
+        final_value=cash,
+        trades=trades,
+        closed_trade_pnls=closed_pnls,
+        rebalances=len(rebalance_rows),
+    )
+
+
+def _event(panel: PricePanel, row: int, idx: int, action: str, qty: float, commission: float, pnl: float) -> dict[str, Any]:
+    return {
+        "symbol": panel.symbols[idx],
+        "action": action,
+        "quantity": float(qty),
+        "price": float(panel.closes[row, idx]),
+        "commission": float(commission),
+        "timestamp": panel.timeline[row],
+        "pnl": float(pnl),
+        "is_simulated": False,
+    }
+
+
+def run_panel_strategy(
+    strategy_type: str,
+    parameters: dict[str, Any],
+    panel: PricePanel,
+    initial_capital: float,
+) -> PanelSimulation:
+    top_fraction = min(max(float(parameters.get("top_fraction", 0.1)), 0.01), 1.0)
+    every = max(int(parameters.get("rebalance_every", 21)), 1)
+    gross_exposure = min(max(float(parameters.get("gross_exposure", 0.95)), 0.05), 1.0)
+    commission_rate = min(max(float(parameters.get("commission_rate", 0.001)), 0.0), 0.02)
+
+    factor = panel_factor(strategy_type, parameters, panel.closes)
+    has_score = np.isfinite(factor).any(axis=1)
+    first = int(np.argmax(has_score)) if has_score.any() else len(panel.timeline)
+    # The last bar is reserved for liquidation.
+    rebalance_rows = np.arange(first, max(len(panel.timeline) - 1, first), every)
+    targets = top_fraction_mask(factor[rebalance_rows], top_fraction)
+    simulation = simulate_panel(panel, targets, rebalance_rows, initial_capital, gross_exposure, commission_rate)
+    simulation.latest_ranks = rank_snapshot(panel, factor)
+    return simulation
+
+
+def rank_snapshot(panel: PricePanel, factor: np.ndarray, row: int = -1, limit: int = 20) -> list[dict[str, Any]]:
+    """Best-first ranking at one timestamp, for reporting."""
+    ranks = cross_sectional_rank(factor[[row]])[0]
+    order = [idx for idx in np.argsort(-np.nan_to_num(ranks, nan=-1.0), kind="stable") if math.isfinite(ranks[idx])]
+    return [
+        {"symbol": panel.symbols[idx], "factor": round(float(factor[row, idx]), 6), "rank": round(float(ranks[idx]), 4)}
+        for idx in order[:limit]
+    ]
@@ -0,0 +1,385 @@
+"""Paper trading: run strategies forward on bars as ingestion commits them."""
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime, timezone
+import logging
+import math
+from typing import Any, Callable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.market_data import Bar1d, Bar1m, Instrument
+from ..models.paper_trading import PaperTradingSession
+from ..models.portfolio import Holding, Portfolio, PortfolioTrade
+from ..models.strategy import Strategy
+from .market_data_service import BarRecord
+from .strategy_signals import compile_custom_signal, history_window, signal_for_strategy
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingSignal:
+    """Incremental form of the built-in strategy rules.
+
+    Each update costs O(1) for moving_average, rsi and momentum: only a bounded
+    window plus running sums are kept, and the signals match signal_for_strategy
+    evaluated over the full price history. Custom and expression strategies fall
+    back to evaluating their rules on the trailing history_window prices.
+    """
+
+    def __init__(
+        self,
+        strategy_type: str,
+        parameters: dict[str, Any],
+        state: dict[str, Any] | None = None,
+        custom_signal: Callable[[list[float], dict[str, Any]], str] | None = None,
+    ) -> None:
+        self.strategy_type = (strategy_type or "").strip().lower()
+        self.parameters = parameters
+        self.custom_signal = custom_signal
+        state = state or {}
+        self.count = int(state.get("count", 0))
+        self.window: deque[float] = deque(
+            (float(item) for item in state.get("window", [])),
+            maxlen=self._window_size(),
+        )
+        self.prev: float | None = state.get("prev")
+        self._resync()
+
+    def _window_size(self) -> int:
+        if self.strategy_type == "rsi":
+            return self._rsi_period()
+        return history_window(self.strategy_type, self.parameters)
+
+    def _rsi_period(self) -> int:
+        return max(2, int(self.parameters.get("rsi_period", 14)))
+
+    def _resync(self) -> None:
+        # Running sums are rebuilt from the window on load so float drift cannot
+        # accumulate across ingestion cycles.
+        values = list(self.window)
+        if self.strategy_type == "rsi":
+            self.gain_sum = sum(max(item, 0.0) for item in values)
+            self.loss_sum = sum(max(-item, 0.0) for item in values)
+        else:
+            self.short_window = int(self.parameters.get("short_window", 5))
+            self.long_window = int(self.parameters.get("long_window", 20))
+            self.short_sum = sum(values[-self.short_window :]) if self.short_window > 0 else 0.0
+            self.long_sum = sum(values[-self.long_window :]) if self.long_window > 0 else 0.0
+
+    def to_state(self) -> dict[str, Any]:
+        return {"count": self.count, "window": list(self.window), "prev": self.prev}
+
+    def update(self, price: float) -> str:
+        price = float(price)
+        self.count += 1
+        if self.strategy_type == "rsi":
+            return self._update_rsi(price)
+        if self.strategy_type == "momentum":
+            return self._update_momentum(price)
+        if self.strategy_type == "expression":
+            self.window.append(price)
+            return signal_for_strategy(self.strategy_type, list(self.window), self.parameters)
+        if self.strategy_type == "custom":
+            self.window.append(price)
+            if not self.custom_signal:
+                return "HOLD"
+            try:
+                raw_signal = str(self.custom_signal(list(self.window), self.parameters)).strip().upper()
+            except Exception:
+                return "HOLD"
+            return raw_signal if raw_signal in {"BUY", "SELL", "HOLD"} else "HOLD"
+        return self._update_moving_average(price)
+
+    def _update_moving_average(self, price: float) -> str:
+        window = self.window
+        if len(window) >= self.short_window > 0:
+            self.short_sum -= window[-self.short_window]
+        if len(window) >= self.long_window > 0:
+            self.long_sum -= window[-self.long_window]
+        window.append(price)
+        self.short_sum += price
+        self.long_sum += price
+        if self.count < max(self.short_window, self.long_window):
+            return "HOLD"
+        short_ma = self.short_sum / self.short_window
+        long_ma = self.long_sum / self.long_window
+        if short_ma > long_ma * 1.0001:
+            return "BUY"
+        if short_ma < long_ma * 0.9999:
+            return "SELL"
+        return "HOLD"
+
+    def _update_rsi(self, price: float) -> str:
+        period = self._rsi_period()
+        if self.prev is not None:
+            delta = price - self.prev
+            if len(self.window) >= period:
+                dropped = self.window[0]
+                self.gain_sum -= max(dropped, 0.0)
+                self.loss_sum -= max(-dropped, 0.0)
+            self.window.append(delta)
+            self.gain_sum += max(delta, 0.0)
+            self.loss_sum += max(-delta, 0.0)
+        self.prev = price
+
+        if self.count <= period:
+            rsi = 50.0
+        elif self.loss_sum / period <= 1e-12:
+            rsi = 100.0
+        else:
+            rs = (self.gain_sum / period) / (self.loss_sum / period)
+            rsi = 100.0 - (100.0 / (1.0 + rs))
+        if rsi <= float(self.parameters.get("rsi_buy", 30)):
+            return "BUY"
+        if rsi >= float(self.parameters.get("rsi_sell", 70)):
+            return "SELL"
+        return "HOLD"
+
+    def _update_momentum(self, price: float) -> str:
+        period = int(self.parameters.get("momentum_period", 10))
+        threshold = float(self.parameters.get("momentum_threshold", 0.015))
+        self.window.append(price)
+        if self.count <= period:
+            return "HOLD"
+        past_price = self.window[0]
+        change = (price - past_price) / past_price if past_price > 0 else 0.0
+        if change >= threshold:
+            return "BUY"
+        if change <= -threshold:
+            return "SELL"
+        return "HOLD"
+
+
+def _refresh_holding_snapshot(holding: Holding, price: float) -> None:
+    holding.current_price = price
+    holding.market_value = holding.quantity * price
+    holding.unrealized_pnl = (price - holding.average_cost) * holding.quantity
+
+
+def _as_naive_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+class PaperTradingEngine:
+    """Evaluates active paper sessions incrementally for each ingested batch."""
+
+    def on_bars(self, db: Session, instrument: Instrument, interval: str, bars: list[BarRecord]) -> int:
+        """MarketDataService listener; returns the number of simulated fills."""
+        sessions = (
+            db.query(PaperTradingSession)
+            .filter(
+                PaperTradingSession.market == instrument.market,
+                PaperTradingSession.symbol == instrument.symbol,
+                PaperTradingSession.interval == interval,
+                PaperTradingSession.status == "active",
+            )
+            .all()
+        )
+        if not sessions or not bars:
+            return 0
+
+        ordered = sorted(bars, key=lambda item: item.ts)
+        strategies = {
+            item.id: item
+            for item in db.query(Strategy).filter(Strategy.id.in_({s.strategy_id for s in sessions})).all()
+        }
+        portfolios = {
+            item.id: item
+            for item in db.query(Portfolio).filter(Portfolio.id.in_({s.portfolio_id for s in sessions})).all()
+        }
+        compiled: dict[int, Callable[[list[float], dict[str, Any]], str] | None] = {}
+
+        fills = 0
+        for session in sessions:
+            strategy = strategies.get(session.strategy_id)
+            portfolio = portfolios.get(session.portfolio_id)
+            if strategy is None or portfolio is None:
+                continue
+            if strategy.id not in compiled:
+                compiled[strategy.id] = self._compile(strategy)
+            fills += self._advance(db, session, strategy, portfolio, ordered, compiled[strategy.id])
+
+        for portfolio in portfolios.values():
+            self._refresh_portfolio_value(db, portfolio)
+        db.commit()
+        return fills
+
+    def warm_up(self, db: Session, session: PaperTradingSession, strategy: Strategy) -> None:
+        """Seed indicator state from stored bars so the session can trade on the next bar."""
+        instrument = (
+            db.query(Instrument)
+            .filter(Instrument.symbol == session.symbol, Instrument.market == session.market)
+            .first()
+        )
+        if instrument is None:
+            return
+        model = Bar1m if session.interval == "1m" else Bar1d
+        parameters = dict(session.parameters or {})
+        rows = (
+            db.query(model.ts, model.close)
+            .filter(model.instrument_id == instrument.id)
+            .order_by(model.ts.desc())
+            .limit(history_window(strategy.strategy_type, parameters) + 1)
+            .all()
+        )
+        signal = StreamingSignal(strategy.strategy_type, parameters)
+        for ts, close in reversed(rows):
+            signal.update(float(close))
+            session.last_bar_ts = ts
+        session.state = {**(session.state or {}), "signal": signal.to_state()}
+
+    def _compile(self, strategy: Strategy):
+        if (strategy.strategy_type or "").strip().lower() != "custom" or not strategy.code:
+            return None
+        try:
+            return compile_custom_signal(strategy.code)
+        except Exception:
+            logger.warning("paper trading: invalid custom code for strategy %s", strategy.id)
+            return None
+
+    def _advance(
+        self,
+        db: Session,
+        session: PaperTradingSession,
+        strategy: Strategy,
+        portfolio: Portfolio,
+        bars: list[BarRecord],
+        custom_signal,
+    ) -> int:
+        parameters = dict(session.parameters or {})
+        state = dict(session.state or {})
+        signal = StreamingSignal(strategy.strategy_type, parameters, state.get("signal"), custom_signal)
+        position = float(state.get("position", 0.0))
+        allocation = min(max(float(parameters.get("allocation_per_trade", 0.25)), 0.05), 0.95)
+        commission_rate = min(max(float(parameters.get("commission_rate", 0.001)), 0.0), 0.02)
+        last_ts = session.last_bar_ts
+
+        fills = 0
+        for bar in bars:
+            ts = _as_naive_utc(bar.ts)
+            if last_ts is not None and ts <= last_ts:
+                continue
+            last_ts = ts
+            price = float(bar.close)
+            action = signal.update(price)
+            if action == "BUY" and position <= 1e-8:
+                position = self._buy(db, portfolio, session.symbol, price, allocation, commission_rate, ts)
+                fills += 1 if position > 0 else 0
+            elif action == "SELL" and position > 1e-8:
+                self._sell(db, portfolio, session.symbol, position, price, commission_rate, ts)
+                position = 0.0
+                fills += 1
+
+        session.state = {**state, "signal": signal.to_state(), "position": position}
+        session.last_bar_ts = last_ts
+        session.fills = int(session.fills or 0) + fills
+        return fills
+
+    def _holding(self, db: Session, portfolio_id: int, symbol: str) -> Holding | None:
+        return (
+            db.query(Holding)
+            .filter(Holding.portfolio_id == portfolio_id, Holding.symbol == symbol)
+            .order_by(Holding.id.asc())
+            .first()
+        )
+
+    def _buy(
+        self,
+        db: Session,
+        portfolio: Portfolio,
+        symbol: str,
+        price: float,
+        allocation: float,
+        commission_rate: float,
+        ts: datetime,
+    ) -> float:
+        quantity = math.floor(portfolio.cash_balance * allocation / (price * (1.0 + commission_rate)))
+        if quantity < 1:
+            return 0.0
+        amount = quantity * price
+        commission = amount * commission_rate
+        holding = self._holding(db, portfolio.id, symbol)
+        if holding:
+            total_cost = holding.quantity * holding.average_cost + amount + commission
+            holding.quantity += quantity
+            holding.average_cost = total_cost / holding.quantity
+        else:
+            holding = Holding(
+                portfolio_id=portfolio.id,
+                symbol=symbol,
+                quantity=float(quantity),
+                average_cost=(amount + commission) / quantity,
+            )
+            db.add(holding)
+        _refresh_holding_snapshot(holding, price)
+        portfolio.cash_balance -= amount + commission
+        db.add(
+            PortfolioTrade(
+                portfolio_id=portfolio.id,
+                symbol=symbol,
+                action="BUY",
+                quantity=float(quantity),
+                price=price,
+                commission=commission,
+                amount=amount,
+                realized_pnl=0.0,
+                trade_time=ts,
+            )
+        )
+        db.flush()
+        return float(quantity)
+
+    def _sell(
+        self,
+        db: Session,
+        portfolio: Portfolio,
+        symbol: str,
+        quantity: float,
+        price: float,
+        commission_rate: float,
+        ts: datetime,
+    ) -> None:
+        holding = self._holding(db, portfolio.id, symbol)
+        if holding is None:
+            return
+        quantity = min(quantity, holding.quantity)
+        amount = quantity * price
+        commission = amount * commission_rate
+        realized_pnl = (price - holding.average_cost) * quantity - commission
+        portfolio.cash_balance += amount - commission
+        remaining = holding.quantity - quantity
+        if remaining <= 1e-8:
+            db.delete(holding)
+        else:
+            holding.quantity = remaining
+            _refresh_holding_snapshot(holding, price)
+        db.add(
+            PortfolioTrade(
+                portfolio_id=portfolio.id,
+                symbol=symbol,
+                action="SELL",
+                quantity=quantity,
+                price=price,
+                commission=commission,
+                amount=amount,
+                realized_pnl=realized_pnl,
+                trade_time=ts,
+            )
+        )
+        db.flush()
+
+    def _refresh_portfolio_value(self, db: Session, portfolio: Portfolio) -> None:
+        db.flush()
+        holdings_value = (
+            db.query(func.coalesce(func.sum(Holding.market_value), 0.0))
+            .filter(Holding.portfolio_id == portfolio.id)
+            .scalar()
+            or 0.0
+        )
+        portfolio.current_value = portfolio.cash_balance + holdings_value
+
+
+paper_trading_engine = PaperTradingEngine()
@@ -0,0 +1,67 @@
+"""Thread-safe throttles for outbound provider calls."""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, bursting up to ``capacity``.
+
+    ``acquire`` blocks the calling thread until a token is available; a non-positive
+    rate disables limiting.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = float(rate)
+        self.capacity = max(float(capacity if capacity is not None else max(self.rate, 1.0)), 1.0)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly going into debt; returns how long the caller must wait."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class ProviderThrottle:
+    """Concurrency cap plus token bucket for one provider; use as a context manager."""
+
+    def __init__(self, max_concurrency: int, rate_per_second: float, burst: float | None = None) -> None:
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.bucket = TokenBucket(rate_per_second, burst)
+
+    def __enter__(self) -> "ProviderThrottle":
+        self._slots.acquire()
+        try:
+            self.bucket.acquire()
+        except BaseException:
+            self._slots.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._slots.release()
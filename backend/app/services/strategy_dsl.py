@@ -0,0 +1,369 @@
+"""Declarative strategy expressions compiled to NumPy kernels.
+
+An ``expression`` strategy carries two boolean expressions in its parameters::
+
+    {"entry": "cross(sma(close, short_window), sma(close, long_window))",
+     "exit": "rsi(close, 14) > 70 or close < lowest(close, 20)"}
+
+Expressions are parsed with ``ast`` against a whitelist (no attribute access,
+subscripts, lambdas or arbitrary calls), so nothing user-supplied is executed.
+Each node compiles to a kernel over whole arrays; identical subexpressions are
+evaluated once per run and shared between the entry and exit rules. Names other
+than the price series resolve to numeric strategy parameters.
+"""
+from __future__ import annotations
+
+import ast
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+import numpy as np
+
+SERIES_NAMES = ("close", "open", "high", "low", "volume")
+MAX_EXPRESSION_LENGTH = 2000
+# Compilation recurses over the tree; bound nesting well below the interpreter limit.
+MAX_EXPRESSION_DEPTH = 50
+
+
+class StrategyExpressionError(ValueError):
+    """Raised when an expression is malformed or uses unsupported syntax."""
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    # NaNs (warm-up of nested indicators) poison only the windows that contain them.
+    missing = np.isnan(values)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+    cmiss = np.concatenate(([0], np.cumsum(missing)))
+    out = np.full(values.shape, np.nan)
+    if window <= len(values):
+        sums = csum[window:] - csum[:-window]
+        gaps = cmiss[window:] - cmiss[:-window]
+        out[window - 1 :] = np.where(gaps == 0, sums, np.nan)
+    return out
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if periods == 0:
+        return values.astype(np.float64)
+    if periods < len(values):
+        out[periods:] = values[:-periods]
+    return out
+
+
+def _sma(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling_sum(values, window) / window
+
+
+def _std(values: np.ndarray, window: int) -> np.ndarray:
+    mean = _sma(values, window)
+    variance = _rolling_sum(values * values, window) / window - mean * mean
+    return np.sqrt(np.clip(variance, 0.0, None))
+
+
+def _ema(values: np.ndarray, window: int) -> np.ndarray:
+    import pandas as pd
+
+    return pd.Series(values).ewm(span=window, adjust=False).mean().to_numpy()
+
+
+def _rsi(values: np.ndarray, window: int) -> np.ndarray:
+    """Simple-average RSI, matching ``strategy_signals.calc_rsi``."""
+    deltas = np.diff(values, prepend=np.nan)
+    avg_gain = _sma(np.where(np.isnan(deltas), np.nan, np.clip(deltas, 0.0, None)), window)
+    avg_loss = _sma(np.where(np.isnan(deltas), np.nan, np.clip(-deltas, 0.0, None)), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_loss <= 1e-12, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    return np.where(np.isnan(avg_loss), np.nan, rsi)
+
+
+def _rolling_extreme(values: np.ndarray, window: int, reducer: Callable) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if window <= len(values):
+        out[window - 1 :] = reducer(np.lib.stride_tricks.sliding_window_view(values, window), axis=1)
+    return out
+
+
+def _change(values: np.ndarray, periods: int) -> np.ndarray:
+    past = _shift(values, periods)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(past > 0, values / past - 1.0, np.nan)
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore"):
+        return (a > b) & (_shift(a, 1) <= _shift(b, 1))
+
+
+# name -> (kernel, warm-up bars per unit of window)
+_WINDOWED: dict[str, tuple[Callable[[np.ndarray, int], np.ndarray], int]] = {
+    "sma": (_sma, 1),
+    "ema": (_ema, 4),  # EMA memory is unbounded; 4 spans leave < 2% weight behind.
+    "std": (_std, 1),
+    "rsi": (_rsi, 1),
+    "highest": (lambda values, window: _rolling_extreme(values, window, np.max), 1),
+    "lowest": (lambda values, window: _rolling_extreme(values, window, np.min), 1),
+    "shift": (_shift, 1),
+    "change": (_change, 1),
+}
+_ELEMENTWISE: dict[str, tuple[Callable[..., np.ndarray], int]] = {
+    "cross": (_cross, 2),
+    "crossunder": (lambda a, b: _cross(b, a), 2),
+    "abs": (np.abs, 1),
+    "min": (np.fmin, 2),
+    "max": (np.fmax, 2),
+}
+_BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+}
+_COMPARE_OPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+}
+
+
+@dataclass
+class _Context:
+    data: dict[str, np.ndarray]
+    params: dict[str, Any]
+    memo: dict[str, Any]
+    length: int
+
+
+class Kernel:
+    """One compiled node. Evaluation is memoised by the node's canonical text."""
+
+    def __init__(self, key: str, fn: Callable[[_Context], Any], lookback: Callable[[dict[str, Any]], int]):
+        self.key = key
+        self._fn = fn
+        self.lookback = lookback
+
+    def __call__(self, ctx: _Context) -> Any:
+        if self.key not in ctx.memo:
+            ctx.memo[self.key] = self._fn(ctx)
+        return ctx.memo[self.key]
+
+
+def _param_value(params: dict[str, Any], name: str) -> float:
+    if name not in params:
+        raise StrategyExpressionError(f"Unknown name in expression: {name}")
+    try:
+        return float(params[name])
+    except (TypeError, ValueError) as exc:
+        raise StrategyExpressionError(f"Parameter {name} must be numeric") from exc
+
+
+class _Compiler:
+    def __init__(self) -> None:
+        self.series: set[str] = set()
+        self.params: set[str] = set()
+
+    def compile(self, node: ast.AST) -> Kernel:
+        key = ast.dump(node, annotate_fields=False)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = float(node.value)
+            return Kernel(key, lambda ctx: value, lambda params: 0)
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in SERIES_NAMES:
+                self.series.add(name)
+
+                def load(ctx: _Context, name: str = name) -> np.ndarray:
+                    if name not in ctx.data:
+                        raise StrategyExpressionError(f"Series {name} is not available")
+                    return ctx.data[name]
+
+                return Kernel(key, load, lambda params: 0)
+            self.params.add(name)
+            return Kernel(key, lambda ctx: _param_value(ctx.params, name), lambda params: 0)
+        if isinstance(node, ast.UnaryOp):
+            operand = self.compile(node.operand)
+            if isinstance(node.op, ast.USub):
+                return Kernel(key, lambda ctx: -operand(ctx), operand.lookback)
+            if isinstance(node.op, ast.Not):
+                return Kernel(key, lambda ctx: np.logical_not(operand(ctx)), operand.lookback)
+        if isinstance(node, ast.BinOp):
+            left, right = self.compile(node.left), self.compile(node.right)
+            lookback = lambda params: max(left.lookback(params), right.lookback(params))  # noqa: E731
+            if type(node.op) in _BINARY_OPS:
+                op = _BINARY_OPS[type(node.op)]
+
+                def arithmetic(ctx: _Context) -> Any:
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        return op(left(ctx), right(ctx))
+
+                return Kernel(key, arithmetic, lookback)
+            if isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+                logical = np.logical_and if isinstance(node.op, ast.BitAnd) else np.logical_or
+                return Kernel(key, lambda ctx: logical(left(ctx), right(ctx)), lookback)
+        if isinstance(node, ast.BoolOp):
+            values = [self.compile(item) for item in node.values]
+            logical = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+            def combine(ctx: _Context) -> np.ndarray:
+                result = values[0](ctx)
+                for item in values[1:]:
+                    result = logical(result, item(ctx))
+                return result
+
+            return Kernel(key, combine, lambda params: max(item.lookback(params) for item in values))
+        if isinstance(node, ast.Compare):
+            operands = [self.compile(node.left)] + [self.compile(item) for item in node.comparators]
+            ops = []
+            for op in node.ops:
+                if type(op) not in _COMPARE_OPS:
+                    raise StrategyExpressionError(f"Unsupported comparison: {type(op).__name__}")
+                ops.append(_COMPARE_OPS[type(op)])
+
+            def compare(ctx: _Context) -> np.ndarray:
+                result: Any = True
+                with np.errstate(invalid="ignore"):
+                    for op, left, right in zip(ops, operands, operands[1:]):
+                        result = np.logical_and(result, op(left(ctx), right(ctx)))
+                return result
+
+            return Kernel(key, compare, lambda params: max(item.lookback(params) for item in operands))
+        if isinstance(node, ast.Call):
+            return self._compile_call(node, key)
+        raise StrategyExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+    def _window(self, node: ast.AST) -> Callable[[dict[str, Any]], int]:
+        if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+            value = int(node.value)
+            return lambda params: value
+        if isinstance(node, ast.Name) and node.id not in SERIES_NAMES:
+            self.params.add(node.id)
+            return lambda params: int(_param_value(params, node.id))
+        raise StrategyExpressionError("Window arguments must be integer constants or parameter names")
+
+    def _compile_call(self, node: ast.Call, key: str) -> Kernel:
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise StrategyExpressionError("Only plain calls to built-in indicator functions are allowed")
+        name = node.func.id
+        if name in _WINDOWED:
+            kernel_fn, lookback_scale = _WINDOWED[name]
+            if len(node.args) != 2:
+                raise StrategyExpressionError(f"{name}(series, window) takes 2 arguments")
+            source = self.compile(node.args[0])
+            window = self._window(node.args[1])
+
+            def windowed(ctx: _Context) -> np.ndarray:
+                size = window(ctx.params)
+                if size < 1:
+                    raise StrategyExpressionError(f"{name} window must be positive")
+                values = np.broadcast_to(np.asarray(source(ctx), dtype=np.float64), (ctx.length,))
+                return kernel_fn(values, size)
+
+            def lookback(params: dict[str, Any]) -> int:
+                extra = 1 if name in {"rsi", "change"} else 0
+                return source.lookback(params) + window(params) * lookback_scale + extra
+
+            return Kernel(key, windowed, lookback)
+        if name in _ELEMENTWISE:
+            kernel_fn, arity = _ELEMENTWISE[name]
+            if len(node.args) != arity:
+                raise StrategyExpressionError(f"{name} takes {arity} argument(s)")
+            args = [self.compile(item) for item in node.args]
+            extra = 1 if name in {"cross", "crossunder"} else 0
+
+            def elementwise(ctx: _Context) -> np.ndarray:
+                with np.errstate(invalid="ignore"):
+                    return kernel_fn(*(item(ctx) for item in args))
+
+            return Kernel(key, elementwise, lambda params: max(item.lookback(params) for item in args) + extra)
+        raise StrategyExpressionError(f"Unknown function: {name}")
+
+
+@dataclass
+class StrategyExpression:
+    """Compiled entry/exit rules of an ``expression`` strategy."""
+
+    entry: Kernel
+    exit: Kernel
+    series: frozenset[str]
+    params: frozenset[str]
+
+    def lookback(self, params: dict[str, Any]) -> int:
+        """Bars of history needed before the rules produce their steady-state values."""
+        return max(self.entry.lookback(params), self.exit.lookback(params)) + 1
+
+    def signals(
+        self,
+        data: dict[str, np.ndarray],
+        params: dict[str, Any],
+        memo: dict[str, Any] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """BUY and SELL masks over the bars in ``data``; NaN comparisons are False (HOLD).
+
+        ``memo`` receives every evaluated subexpression keyed by its canonical text.
+        """
+        length = len(next(iter(data.values()))) if data else 0
+        ctx = _Context(
+            data={key: np.asarray(value, dtype=np.float64) for key, value in data.items()},
+            params=params,
+            memo={} if memo is None else memo,
+            length=length,
+        )
+        shape = (length,)
+        buy = np.broadcast_to(np.asarray(self.entry(ctx), dtype=bool), shape)
+        sell = np.broadcast_to(np.asarray(self.exit(ctx), dtype=bool), shape)
+        return buy, sell
+
+    def signal_at_end(self, data: dict[str, np.ndarray], params: dict[str, Any]) -> str:
+        buy, sell = self.signals(data, params)
+        if not len(buy):
+            return "HOLD"
+        if buy[-1]:
+            return "BUY"
+        if sell[-1]:
+            return "SELL"
+        return "HOLD"
+
+
+def _parse(text: str, label: str) -> ast.AST:
+    source = str(text or "").strip()
+    if not source:
+        raise StrategyExpressionError(f"{label} expression is required")
+    if len(source) > MAX_EXPRESSION_LENGTH:
+        raise StrategyExpressionError(f"{label} expression is too long")
+    try:
+        tree = ast.parse(source, mode="eval").body
+    except SyntaxError as exc:
+        raise StrategyExpressionError(f"Invalid {label} expression: {exc.msg}") from exc
+    except (RecursionError, MemoryError) as exc:
+        raise StrategyExpressionError(f"{label} expression is nested too deeply") from exc
+    stack = [(tree, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if depth > MAX_EXPRESSION_DEPTH:
+            raise StrategyExpressionError(f"{label} expression is nested too deeply")
+        stack.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+    return tree
+
+
+@lru_cache(maxsize=256)
+def compile_expression(entry: str, exit: str) -> StrategyExpression:
+    compiler = _Compiler()
+    entry_kernel = compiler.compile(_parse(entry, "entry"))
+    exit_kernel = compiler.compile(_parse(exit, "exit"))
+    return StrategyExpression(
+        entry=entry_kernel,
+        exit=exit_kernel,
+        series=frozenset(compiler.series),
+        params=frozenset(compiler.params),
+    )
+
+
+def compile_strategy_expression(parameters: dict[str, Any]) -> StrategyExpression:
+    """Compile the ``entry``/``exit`` parameters and check referenced parameters exist."""
+    expression = compile_expression(str(parameters.get("entry") or ""), str(parameters.get("exit") or ""))
+    missing = sorted(name for name in expression.params if name not in parameters)
+    if missing:
+        raise StrategyExpressionError(f"Expression references undefined parameters: {', '.join(missing)}")
+    return expression
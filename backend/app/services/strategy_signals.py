@@ -0,0 +1,179 @@
+"""Per-bar signal rules shared by the backtest engine and live paper trading."""
+from __future__ import annotations
+
+import math
+from typing import Any, Callable
+
+import numpy as np
+
+from .indicator_cache import IndicatorSeries
+from .strategy_dsl import StrategyExpressionError, compile_strategy_expression
+
+
+def mean(values: list[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def calc_rsi(prices: list[float], period: int) -> float:
+    if len(prices) <= period:
+        return 50.0
+    gains: list[float] = []
+    losses: list[float] = []
+    window = prices[-(period + 1) :]
+    for idx in range(1, len(window)):
+        delta = window[idx] - window[idx - 1]
+        if delta >= 0:
+            gains.append(delta)
+            losses.append(0.0)
+        else:
+            gains.append(0.0)
+            losses.append(abs(delta))
+    avg_gain = mean(gains)
+    avg_loss = mean(losses)
+    if avg_loss <= 1e-12:
+        return 100.0
+    rs = avg_gain / avg_loss
+    return 100.0 - (100.0 / (1.0 + rs))
+
+
+def signal_for_strategy(
+    strategy_type: str,
+    history: list[float],
+    parameters: dict[str, Any],
+    custom_signal: Callable[[list[float], dict[str, Any]], str] | None = None,
+) -> str:
+    strategy = (strategy_type or "").strip().lower()
+    price = history[-1]
+
+    if strategy == "custom":
+        if not custom_signal:
+            return "HOLD"
+        try:
+            raw_signal = str(custom_signal(history, parameters)).strip().upper()
+        except Exception:
+            return "HOLD"
+        return raw_signal if raw_signal in {"BUY", "SELL", "HOLD"} else "HOLD"
+
+    if strategy == "expression":
+        try:
+            expression = compile_strategy_expression(parameters)
+            window = history[-expression.lookback(parameters) :]
+            return expression.signal_at_end({"close": np.asarray(window, dtype=np.float64)}, parameters)
+        except StrategyExpressionError:
+            return "HOLD"
+
+    if strategy == "rsi":
+        period = int(parameters.get("rsi_period", 14))
+        buy_threshold = float(parameters.get("rsi_buy", 30))
+        sell_threshold = float(parameters.get("rsi_sell", 70))
+        rsi = calc_rsi(history, max(2, period))
+        if rsi <= buy_threshold:
+            return "BUY"
+        if rsi >= sell_threshold:
+            return "SELL"
+        return "HOLD"
+
+    if strategy == "momentum":
+        period = int(parameters.get("momentum_period", 10))
+        threshold = float(parameters.get("momentum_threshold", 0.015))
+        if len(history) <= period:
+            return "HOLD"
+        past_price = history[-(period + 1)]
+        change = (price - past_price) / past_price if past_price > 0 else 0.0
+        if change >= threshold:
+            return "BUY"
+        if change <= -threshold:
+            return "SELL"
+        return "HOLD"
+
+    # Default: moving-average crossover.
+    short_window = int(parameters.get("short_window", 5))
+    long_window = int(parameters.get("long_window", 20))
+    if len(history) < max(short_window, long_window):
+        return "HOLD"
+    short_ma = mean(history[-short_window:])
+    long_ma = mean(history[-long_window:])
+    if short_ma > long_ma * 1.0001:
+        return "BUY"
+    if short_ma < long_ma * 0.9999:
+        return "SELL"
+    return "HOLD"
+
+
+def signal_masks(
+    strategy_type: str,
+    parameters: dict[str, Any],
+    series: IndicatorSeries,
+) -> tuple[np.ndarray, np.ndarray] | None:
+    """BUY/SELL masks for every bar of ``series``, matching signal_for_strategy bar by bar.
+
+    Indicator arrays come from the shared indicator cache. Returns None when the
+    strategy has to run per bar (custom code, degenerate windows).
+    """
+    strategy = (strategy_type or "").strip().lower()
+    if strategy == "custom":
+        return None
+    if strategy == "expression":
+        expression = compile_strategy_expression(parameters)
+        if expression.series - {"close"}:
+            raise StrategyExpressionError("backtests provide the close series only")
+        return expression.signals({"close": series.closes}, parameters)
+    if strategy == "rsi":
+        rsi = series.rsi(max(2, int(parameters.get("rsi_period", 14))))
+        return rsi <= float(parameters.get("rsi_buy", 30)), rsi >= float(parameters.get("rsi_sell", 70))
+    if strategy == "momentum":
+        period = int(parameters.get("momentum_period", 10))
+        if period < 1:
+            return None
+        change = series.momentum(period)
+        threshold = float(parameters.get("momentum_threshold", 0.015))
+        return change >= threshold, change <= -threshold
+    short_window = int(parameters.get("short_window", 5))
+    long_window = int(parameters.get("long_window", 20))
+    if short_window < 1 or long_window < 1:
+        return None
+    short_ma = series.sma(short_window)
+    long_ma = series.sma(long_window)
+    return short_ma > long_ma * 1.0001, short_ma < long_ma * 0.9999
+
+
+def compile_custom_signal(code: str) -> Callable[[list[float], dict[str, Any]], str]:
+    safe_builtins = {
+        "abs": abs,
+        "min": min,
+        "max": max,
+        "sum": sum,
+        "len": len,
+        "range": range,
+        "float": float,
+        "int": int,
+        "round": round,
+    }
+    globals_dict: dict[str, Any] = {"__builtins__": safe_builtins, "math": math}
+    locals_dict: dict[str, Any] = {}
+    exec(code, globals_dict, locals_dict)
+    fn = locals_dict.get("signal") or globals_dict.get("signal")
+    if not callable(fn):
+        raise ValueError("custom strategy code must define callable signal(prices, params)")
+    return fn
+
+
+# Trailing prices kept for custom strategies, whose lookback is unknown.
+CUSTOM_HISTORY_WINDOW = 500
+
+
+def history_window(strategy_type: str, parameters: dict[str, Any]) -> int:
+    """Number of trailing prices a strategy needs to reproduce its next signal."""
+    strategy = (strategy_type or "").strip().lower()
+    if strategy == "rsi":
+        return max(2, int(parameters.get("rsi_period", 14))) + 1
+    if strategy == "momentum":
+        return int(parameters.get("momentum_period", 10)) + 1
+    if strategy == "custom":
+        return max(int(parameters.get("history_window", CUSTOM_HISTORY_WINDOW)), 1)
+    if strategy == "expression":
+        try:
+            return max(compile_strategy_expression(parameters).lookback(parameters), 1)
+        except StrategyExpressionError:
+            return CUSTOM_HISTORY_WINDOW
+    return max(int(parameters.get("short_window", 5)), int(parameters.get("long_window", 20)), 1)
@@ -0,0 +1,264 @@
+"""Durable task queue stored in the application database.
+
+Workers on any host that can reach the database claim jobs with a conditional
+UPDATE, so exactly one worker wins each job without relying on row locks that
+SQLite does not have. A claim grants a lease that the worker extends with
+heartbeats; a job whose lease expires (worker crashed or lost connectivity) is
+claimed again by the next worker until ``max_attempts`` is used up. Failures
+are retried with exponential backoff unless the handler raises
+``PermanentTaskError``. A handler whose heartbeats stopped may still be running
+when its job is reclaimed, so handlers fence their final writes with
+``hold_lease`` and raise ``LeaseLostError`` instead of committing them.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config import get_settings
+from ..models.task_queue import TaskJob
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[[Session, dict[str, Any]], dict[str, Any] | None]
+
+
+class PermanentTaskError(Exception):
+    """Raised by a handler when retrying the job cannot succeed (bad input, missing data)."""
+
+
+class LeaseLostError(Exception):
+    """Raised by a handler that found its job reclaimed by another worker; it committed nothing."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict[str, Any],
+    *,
+    priority: int = 0,
+    max_attempts: int | None = None,
+) -> TaskJob:
+    job = TaskJob(
+        kind=kind,
+        payload=payload,
+        status="queued",
+        priority=priority,
+        max_attempts=max(int(max_attempts or get_settings().TASK_MAX_ATTEMPTS), 1),
+        available_at=_utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(TaskJob.status == "queued", TaskJob.available_at <= now),
+        and_(
+            TaskJob.status == "running",
+            TaskJob.lease_expires_at < now,
+            TaskJob.attempts < TaskJob.max_attempts,
+        ),
+    )
+
+
+def expire_abandoned(db: Session) -> int:
+    """Fail running jobs whose lease expired after their last allowed attempt."""
+    now = _utcnow()
+    result = db.execute(
+        update(TaskJob)
+        .where(
+            TaskJob.status == "running",
+            TaskJob.lease_expires_at < now,
+            TaskJob.attempts >= TaskJob.max_attempts,
+        )
+        .values(status="failed", error="Lease expired on final attempt", finished_at=now, worker_id=None)
+    )
+    db.commit()
+    return int(result.rowcount or 0)
+
+
+def claim(
+    db: Session,
+    worker_id: str,
+    kinds: list[str] | None = None,
+    lease_seconds: int | None = None,
+) -> TaskJob | None:
+    """Atomically take the highest-priority available job, or None when the queue is empty."""
+    lease = int(lease_seconds or get_settings().TASK_LEASE_SECONDS)
+    expire_abandoned(db)
+    # Candidates are re-checked by the conditional UPDATE; losing a race to
+    # another worker just moves on to the next candidate.
+    for _ in range(5):
+        now = _utcnow()
+        query = db.query(TaskJob.id).filter(_claimable(now))
+        if kinds:
+            query = query.filter(TaskJob.kind.in_(kinds))
+        candidates = [row[0] for row in query.order_by(TaskJob.priority.desc(), TaskJob.id.asc()).limit(5).all()]
+        if not candidates:
+            return None
+        for job_id in candidates:
+            result = db.execute(
+                update(TaskJob)
+                .where(TaskJob.id == job_id, _claimable(now))
+                .values(
+                    status="running",
+                    worker_id=worker_id,
+                    attempts=TaskJob.attempts + 1,
+                    lease_expires_at=now + timedelta(seconds=lease),
+                    heartbeat_at=now,
+                    started_at=now,
+                    error=None,
+                )
+            )
+            db.commit()
+            if result.rowcount == 1:
+                return db.query(TaskJob).filter(TaskJob.id == job_id).populate_existing().first()
+    return None
+
+
+def heartbeat(db: Session, job_id: int, worker_id: str, lease_seconds: int | None = None) -> bool:
+    """Extend the lease; False means the job was reclaimed and results will be discarded."""
+    lease = int(lease_seconds or get_settings().TASK_LEASE_SECONDS)
+    now = _utcnow()
+    result = db.execute(
+        update(TaskJob)
+        .where(TaskJob.id == job_id, TaskJob.worker_id == worker_id, TaskJob.status == "running")
+        .values(lease_expires_at=now + timedelta(seconds=lease), heartbeat_at=now)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def hold_lease(db: Session, job_id: int, worker_id: str) -> bool:
+    """Re-assert the lease inside the caller's open transaction, without committing.
+
+    False means another worker owns the job now. On success the job row stays
+    write-locked until the caller commits, so it cannot be reclaimed in between.
+    """
+    result = db.execute(
+        update(TaskJob)
+        .where(TaskJob.id == job_id, TaskJob.worker_id == worker_id, TaskJob.status == "running")
+        .values(heartbeat_at=_utcnow())
+    )
+    return result.rowcount == 1
+
+
+def complete(db: Session, job_id: int, worker_id: str, result: dict[str, Any] | None) -> bool:
+    now = _utcnow()
+    outcome = db.execute(
+        update(TaskJob)
+        .where(TaskJob.id == job_id, TaskJob.worker_id == worker_id, TaskJob.status == "running")
+        .values(status="completed", result=result, finished_at=now, lease_expires_at=None)
+    )
+    db.commit()
+    return outcome.rowcount == 1
+
+
+def fail(db: Session, job_id: int, worker_id: str, error: str, *, permanent: bool = False) -> str | None:
+    """Record a failure; returns the job's new status, or None if the lease was lost."""
+    job = db.query(TaskJob).filter(TaskJob.id == job_id).populate_existing().first()
+    if job is None or job.worker_id != worker_id or job.status != "running":
+        return None
+    now = _utcnow()
+    if permanent or job.attempts >= job.max_attempts:
+        values: dict[str, Any] = {"status": "failed", "finished_at": now}
+    else:
+        delay = float(get_settings().TASK_RETRY_BASE_SECONDS) * (2 ** max(job.attempts - 1, 0))
+        values = {"status": "queued", "available_at": now + timedelta(seconds=delay)}
+    outcome = db.execute(
+        update(TaskJob)
+        .where(TaskJob.id == job_id, TaskJob.worker_id == worker_id, TaskJob.status == "running")
+        .values(error=error[:2000], lease_expires_at=None, worker_id=None, **values)
+    )
+    db.commit()
+    return values["status"] if outcome.rowcount == 1 else None
+
+
+@dataclass
+class TaskWorker:
+    """Claims jobs and runs the registered handler while a thread keeps the lease alive.
+
+    Handlers receive a copy of the job payload with ``job_id`` and ``worker_id`` filled
+    in, so they can tag the rows they write with the job that produced them and fence
+    those writes with ``hold_lease``.
+    """
+
+    session_factory: sessionmaker
+    handlers: dict[str, TaskHandler]
+    worker_id: str = field(default_factory=default_worker_id)
+    lease_seconds: int | None = None
+
+    def _lease(self) -> int:
+        return int(self.lease_seconds or get_settings().TASK_LEASE_SECONDS)
+
+    def _keep_alive(self, job_id: int, stop: threading.Event) -> None:
+        interval = max(self._lease() / 3.0, 0.5)
+        while not stop.wait(interval):
+            try:
+                with self.session_factory() as db:
+                    if not heartbeat(db, job_id, self.worker_id, self._lease()):
+                        logger.warning("[TASK] lost lease on job %s", job_id)
+                        return
+            except Exception:
+                logger.warning("[TASK] heartbeat failed for job %s", job_id, exc_info=True)
+
+    def run_once(self) -> dict[str, Any] | None:
+        """Process at most one job; returns a summary or None when nothing was claimable."""
+        with self.session_factory() as db:
+            job = claim(db, self.worker_id, list(self.handlers), self._lease())
+            if job is None:
+                return None
+            job_id, kind, payload, attempt = job.id, job.kind, dict(job.payload or {}), job.attempts
+            payload.setdefault("job_id", job_id)
+            payload.setdefault("worker_id", self.worker_id)
+
+        stop = threading.Event()
+        keeper = threading.Thread(target=self._keep_alive, args=(job_id, stop), daemon=True)
+        keeper.start()
+        started = time.perf_counter()
+        status: str | None
+        try:
+            with self.session_factory() as db:
+                result = self.handlers[kind](db, payload)
+            with self.session_factory() as db:
+                status = "completed" if complete(db, job_id, self.worker_id, result) else None
+        except LeaseLostError:
+            logger.warning("[TASK] job %s was reclaimed while running; results discarded", job_id)
+            status = None
+        except PermanentTaskError as exc:
+            with self.session_factory() as db:
+                status = fail(db, job_id, self.worker_id, str(exc), permanent=True)
+        except Exception as exc:
+            logger.exception("[TASK] job %s (%s) failed on attempt %s", job_id, kind, attempt)
+            with self.session_factory() as db:
+                status = fail(db, job_id, self.worker_id, f"{type(exc).__name__}: {exc}")
+        finally:
+            stop.set()
+            keeper.join(timeout=5)
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "attempt": attempt,
+            "status": status or "lease_lost",
+            "seconds": round(time.perf_counter() - started, 3),
+        }
@@ -0,0 +1,280 @@
+"""Exchange trading calendars for the CN (SSE/SZSE) and US (NYSE/Nasdaq) markets.
+
+A calendar knows the trading days (weekmask plus holidays), the intraday
+sessions with their lunch break, US early closes, and how each market's
+providers stamp bars:
+
+* daily bars carry local midnight of the session date, converted to UTC;
+* US minute bars are labelled with the minute they open (09:30 .. 15:59);
+* CN minute bars are labelled with the minute they close (09:31 .. 11:30 and
+  13:01 .. 15:00), plus a 09:30 bar for the opening call auction.
+
+``expected_timestamps`` turns that into the UTC microsecond stamps a complete
+series would have, vectorized over days x minutes, so gap detection compares
+like with like instead of assuming every minute or day trades.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from functools import cached_property, lru_cache
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from .bar_store import to_micros
+
+_MINUTE = 60 * 1_000_000
+_DAY = 86_400 * 1_000_000
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _dates(*values: str) -> frozenset[date]:
+    return frozenset(date.fromisoformat(value) for value in values)
+
+
+def _span(first: str, last: str) -> list[str]:
+    start, end = date.fromisoformat(first), date.fromisoformat(last)
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+
+# SSE/SZSE closures from the exchanges' annual holiday notices (weekends omitted;
+# the make-up working Saturdays are not trading days). Append each December.
+CN_HOLIDAYS = _dates(
+    "2023-01-02", *_span("2023-01-23", "2023-01-27"), "2023-04-05", *_span("2023-05-01", "2023-05-03"),
+    "2023-06-22", "2023-06-23", "2023-09-29", *_span("2023-10-02", "2023-10-06"),
+    "2024-01-01", "2024-02-09", *_span("2024-02-12", "2024-02-16"), "2024-04-04", "2024-04-05",
+    *_span("2024-05-01", "2024-05-03"), "2024-06-10", "2024-09-16", "2024-09-17",
+    *_span("2024-10-01", "2024-10-04"), "2024-10-07",
+    "2025-01-01", *_span("2025-01-28", "2025-01-31"), "2025-02-03", "2025-02-04", "2025-04-04",
+    "2025-05-01", "2025-05-02", "2025-05-05", "2025-06-02", *_span("2025-10-01", "2025-10-03"),
+    *_span("2025-10-06", "2025-10-08"),
+    "2026-01-01", "2026-01-02", *_span("2026-02-16", "2026-02-20"), "2026-02-23", "2026-04-06",
+    "2026-05-01", "2026-05-04", "2026-05-05", "2026-06-19", "2026-09-25", "2026-10-01", "2026-10-02",
+    *_span("2026-10-05", "2026-10-07"),
+)
+
+# Unscheduled NYSE closures (national days of mourning).
+US_SPECIAL_CLOSURES = _dates("2018-12-05", "2025-01-09")
+US_RULE_YEARS = range(2000, 2041)
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th ``weekday`` (Mon=0) of the month; n=-1 is the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def us_holidays(year: int) -> set[date]:
+    """NYSE full-day holidays for ``year`` under the current holiday rules."""
+    days = {
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)),
+    }
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:  # A Saturday New Year's Day is not observed on the Friday.
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return days
+
+
+def us_early_closes(year: int) -> dict[date, time]:
+    """13:00 closes: July 3, the day after Thanksgiving and Christmas Eve (Mon-Thu only)."""
+    closes = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1): time(13, 0)}
+    for day in (date(year, 7, 3), date(year, 12, 24)):
+        if day.weekday() <= 3:
+            closes[day] = time(13, 0)
+    return closes
+
+
+def _minutes(value: time) -> int:
+    # Rounds up, so time.max closes a session at 24:00.
+    return value.hour * 60 + value.minute + (1 if value.second or value.microsecond else 0)
+
+
+@dataclass(frozen=True)
+class TradingCalendar:
+    market: str
+    tz: str
+    sessions: tuple[tuple[time, time], ...]
+    holidays: frozenset[date] = frozenset()
+    early_closes: dict[date, time] = field(default_factory=dict)
+    # "start": a minute bar carries its opening minute; "end": its closing minute.
+    minute_label: str = "start"
+    # CN prints the opening call auction as an extra bar stamped at the open.
+    auction_bar: bool = False
+    weekmask: str = "1111100"
+
+    @cached_property
+    def _busdays(self) -> np.busdaycalendar:
+        return np.busdaycalendar(
+            weekmask=self.weekmask,
+            holidays=np.array(sorted(self.holidays), dtype="datetime64[D]"),
+        )
+
+    def is_trading_day(self, day: date) -> bool:
+        return bool(np.is_busday(np.datetime64(day, "D"), busdaycal=self._busdays))
+
+    def trading_days(self, first: date, last: date) -> np.ndarray:
+        """Trading days in ``[first, last]`` as ``datetime64[D]``."""
+        if last < first:
+            return np.array([], dtype="datetime64[D]")
+        days = np.arange(np.datetime64(first, "D"), np.datetime64(last, "D") + 1)
+        return days[np.is_busday(days, busdaycal=self._busdays)]
+
+    def _local_to_utc(self, local_micros: np.ndarray) -> np.ndarray:
+        import pandas as pd
+
+        stamps = pd.DatetimeIndex(local_micros.astype("datetime64[us]"))
+        return stamps.tz_localize(self.tz).tz_convert("UTC").as_unit("us").asi8
+
+    def _local_date(self, value: datetime) -> date:
+        import pandas as pd
+
+        return pd.Timestamp(to_micros(value), unit="us", tz="UTC").tz_convert(self.tz).date()
+
+    def _minute_labels(self) -> np.ndarray:
+        """Local minute-of-day labels of a full trading day, ascending."""
+        labels: list[np.ndarray] = []
+        for opens, closes in self.sessions:
+            first, last = _minutes(opens), _minutes(closes)
+            if self.minute_label == "end":
+                labels.append(np.arange(first + 1, last + 1))
+            else:
+                labels.append(np.arange(first, last))
+        if self.auction_bar:
+            labels.insert(0, np.array([_minutes(self.sessions[0][0])]))
+        return np.concatenate(labels).astype(np.int64)
+
+    def _close_minute(self, day: date) -> int:
+        return _minutes(self.early_closes.get(day, self.sessions[-1][1]))
+
+    def expected_timestamps(self, start: datetime, end: datetime, interval: str) -> np.ndarray:
+        """UTC microsecond stamps a complete ``1m``/``1d`` series has in ``[start, end]``."""
+        lo, hi = to_micros(start), to_micros(end)
+        if hi < lo:
+            return np.array([], dtype=np.int64)
+        days = self.trading_days(self._local_date(start), self._local_date(end))
+        if not len(days):
+            return np.array([], dtype=np.int64)
+        midnights = days.astype("datetime64[us]").astype(np.int64)
+        if interval == "1d":
+            stamps = self._local_to_utc(midnights)
+        elif interval == "1m":
+            labels = self._minute_labels()
+            local = midnights[:, None] + labels[None, :] * _MINUTE
+            keep = np.ones(local.shape, dtype=bool)
+            for row, day in enumerate(days.astype(date)):
+                if day in self.early_closes:
+                    close = self._close_minute(day)
+                    keep[row] = labels <= close if self.minute_label == "end" else labels < close
+            stamps = self._local_to_utc(local[keep])
+        else:
+            raise ValueError(f"interval must be 1m or 1d, got {interval}")
+        return stamps[(stamps >= lo) & (stamps <= hi)]
+
+    def expected_count(self, start: datetime, end: datetime, interval: str) -> int:
+        return int(len(self.expected_timestamps(start, end, interval)))
+
+    def session_bounds(self, lo: int, hi: int) -> tuple[np.ndarray, np.ndarray]:
+        """UTC micros of (open, close) for every session from the day before ``lo`` through ``hi``."""
+        first = np.datetime64(int(lo) - _DAY, "us").astype("datetime64[D]").astype(date)
+        last = np.datetime64(int(hi) + _DAY, "us").astype("datetime64[D]").astype(date)
+        days = self.trading_days(first, last)
+        if not len(days):
+            empty = np.array([], dtype=np.int64)
+            return empty, empty
+        midnights = days.astype("datetime64[us]").astype(np.int64)
+        opens = np.array([_minutes(start) for start, _ in self.sessions], dtype=np.int64)
+        closes = np.tile(np.array([_minutes(stop) for _, stop in self.sessions], dtype=np.int64), (len(days), 1))
+        for row, day in enumerate(days.astype(date)):
+            if day in self.early_closes:
+                closes[row, -1] = self._close_minute(day)
+        local_opens = (midnights[:, None] + opens[None, :] * _MINUTE).ravel()
+        local_closes = (midnights[:, None] + closes * _MINUTE).ravel()
+        return self._local_to_utc(local_opens), self._local_to_utc(local_closes)
+
+    def week_starts(self, micros: np.ndarray) -> np.ndarray:
+        """UTC micros of local Monday midnight for the week each UTC stamp falls in."""
+        # Daily stamps are few and repeat; converting the distinct ones avoids loading pandas.
+        zone = ZoneInfo(self.tz)
+        distinct, inverse = np.unique(micros, return_inverse=True)
+        starts = np.empty(len(distinct), dtype=np.int64)
+        for idx, value in enumerate(distinct.tolist()):
+            local = (_EPOCH + timedelta(microseconds=value)).astimezone(zone)
+            monday = datetime.combine(local.date() - timedelta(days=local.weekday()), time(), tzinfo=zone)
+            starts[idx] = to_micros(monday)
+        return starts[inverse.reshape(micros.shape)]
+
+    def missing_timestamps(self, start: datetime, end: datetime, interval: str, actual: np.ndarray) -> np.ndarray:
+        """Expected stamps in ``[start, end]`` that ``actual`` (UTC micros) does not have."""
+        expected = self.expected_timestamps(start, end, interval)
+        return expected[~np.isin(expected, actual)]
+
+
+def _us_calendar() -> TradingCalendar:
+    holidays: set[date] = set(US_SPECIAL_CLOSURES)
+    early_closes: dict[date, time] = {}
+    for year in US_RULE_YEARS:
+        holidays |= us_holidays(year)
+        early_closes.update(us_early_closes(year))
+    return TradingCalendar(
+        market="US",
+        tz="America/New_York",
+        sessions=((time(9, 30), time(16, 0)),),
+        holidays=frozenset(holidays),
+        early_closes={day: close for day, close in early_closes.items() if day not in holidays},
+    )
+
+
+def _cn_calendar() -> TradingCalendar:
+    return TradingCalendar(
+        market="CN",
+        tz="Asia/Shanghai",
+        sessions=((time(9, 30), time(11, 30)), (time(13, 0), time(15, 0))),
+        holidays=CN_HOLIDAYS,
+        minute_label="end",
+        auction_bar=True,
+    )
+
+
+@lru_cache()
+def get_calendar(market: str) -> TradingCalendar:
+    """Calendar for a market code; unknown markets trade 24h on weekdays in UTC."""
+    market = str(market or "").strip().upper()
+    if market == "US":
+        return _us_calendar()
+    if market == "CN":
+        return _cn_calendar()
+    return TradingCalendar(market=market, tz="UTC", sessions=((time(0, 0), time.max),))
@@ -0,0 +1,128 @@
+"""Walk-forward cross-validation for strategy tuning.
+
+Each trial is simulated once over the whole aligned timeline with vectorized
+signal kernels; fold metrics are slices of that single pass. Indicator arrays
+come from the shared indicator cache, so trials (and repeated tuning runs)
+reuse them and adding folds does not add passes over the bars.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from typing import Any
+
+import numpy as np
+
+from .indicator_cache import IndicatorSeries
+from .strategy_signals import signal_masks
+from .vectorized_backtest import positions_from_signals
+
+VALIDATION_STRATEGY_TYPES = {"moving_average", "rsi", "momentum", "expression"}
+
+
+@dataclass(frozen=True)
+class Fold:
+    """Step ranges ``[start, end)``; step ``j`` is the return from bar ``j`` to ``j + 1``."""
+
+    train: tuple[int, int]
+    test: tuple[int, int]
+
+
+def build_time_series_folds(bars: int, folds: int, mode: str = "expanding") -> list[Fold]:
+    """Split the timeline into ``folds + 1`` blocks and test each block after the first.
+
+    ``expanding`` trains on every earlier block, ``rolling`` only on the block before.
+    """
+    steps = bars - 1
+    if folds < 1 or steps < 2 * (folds + 1):
+        raise ValueError(f"Not enough bars ({bars}) for {folds} validation folds")
+    edges = np.linspace(0, steps, folds + 2).astype(int).tolist()
+    result: list[Fold] = []
+    for idx in range(1, folds + 1):
+        train_start = 0 if mode == "expanding" else edges[idx - 1]
+        result.append(Fold(train=(train_start, edges[idx]), test=(edges[idx], edges[idx + 1])))
+    return result
+
+
+def vectorized_positions(strategy_type: str, parameters: dict[str, Any], series: list[IndicatorSeries]) -> np.ndarray:
+    """0/1 positions per (symbol, bar) reproducing ``signal_for_strategy`` for vectorizable types."""
+    if (strategy_type or "").strip().lower() not in VALIDATION_STRATEGY_TYPES:
+        raise ValueError(f"Validation is not supported for strategy_type {strategy_type}")
+    buys: list[np.ndarray] = []
+    sells: list[np.ndarray] = []
+    for item in series:
+        masks = signal_masks(strategy_type, parameters, item)
+        if masks is None:
+            raise ValueError("Strategy parameters cannot be vectorized")
+        buys.append(masks[0])
+        sells.append(masks[1])
+    return positions_from_signals(np.stack(buys), np.stack(sells))
+
+
+def _window_metrics(
+    step_returns: np.ndarray,
+    trade_exits: np.ndarray,
+    trade_wins: np.ndarray,
+    window: tuple[int, int],
+    annualization: float,
+) -> dict[str, float]:
+    start, end = window
+    segment = step_returns[start:end]
+    equity = np.cumprod(1.0 + segment)
+    peaks = np.maximum(np.maximum.accumulate(equity), 1.0)
+    if len(segment) > 1:
+        std = float(segment.std(ddof=1))
+        sharpe = float(segment.mean()) / std * math.sqrt(annualization) if std > 1e-12 else 0.0
+    else:
+        sharpe = 0.0
+    closed = (trade_exits >= start) & (trade_exits < end)
+    closed_count = int(closed.sum())
+    return {
+        "total_return": round((float(equity[-1]) - 1.0) * 100.0, 4),
+        "sharpe_ratio": round(sharpe, 4),
+        "max_drawdown": round(float((1.0 - equity / peaks).max()) * 100.0, 4),
+        "win_rate": round(float(trade_wins[closed].sum()) / closed_count * 100.0, 4) if closed_count else 0.0,
+    }
+
+
+def evaluate_trial(
+    strategy_type: str,
+    parameters: dict[str, Any],
+    series: list[IndicatorSeries],
+    folds: list[Fold],
+    annualization: float,
+) -> dict[str, list[dict[str, float]]]:
+    """In-sample and out-of-sample metrics for every fold from one simulated pass."""
+    allocation = min(max(float(parameters.get("allocation_per_trade", 0.25)), 0.05), 0.95)
+    commission_rate = min(max(float(parameters.get("commission_rate", 0.001)), 0.0), 0.02)
+    closes = np.stack([item.closes for item in series])
+    n_symbols, n_bars = closes.shape
+
+    position = vectorized_positions(strategy_type, parameters, series)
+    previous = np.concatenate((np.zeros((n_symbols, 1), dtype=bool), position[:, :-1]), axis=1)
+    changed = position != previous
+    bar_returns = closes[:, 1:] / closes[:, :-1] - 1.0
+    # Like the engine, commission is charged on the trade's notional, ``allocation`` x equity.
+    step_returns = (
+        allocation * (position[:, :-1] * bar_returns - commission_rate * changed[:, 1:])
+    ).mean(axis=0)
+
+    # Round trips: exits are recorded at the step that realises them; open
+    # positions are closed on the last bar like the engine's forced liquidation.
+    exits: list[np.ndarray] = []
+    wins: list[np.ndarray] = []
+    for sym in range(n_symbols):
+        entries = np.flatnonzero(position[sym] & ~previous[sym])
+        exit_bars = np.flatnonzero(~position[sym] & previous[sym])
+        if len(exit_bars) < len(entries):
+            exit_bars = np.append(exit_bars, n_bars - 1)
+        exits.append(np.maximum(exit_bars - 1, 0))
+        wins.append(closes[sym, exit_bars] * (1.0 - commission_rate) > closes[sym, entries] * (1.0 + commission_rate))
+    trade_exits = np.concatenate(exits) if exits else np.empty(0, dtype=int)
+    trade_wins = np.concatenate(wins) if wins else np.empty(0, dtype=bool)
+
+    return {
+        "in_sample": [_window_metrics(step_returns, trade_exits, trade_wins, fold.train, annualization) for fold in folds],
+        "out_of_sample": [_window_metrics(step_returns, trade_exits, trade_wins, fold.test, annualization) for fold in folds],
+    }
+
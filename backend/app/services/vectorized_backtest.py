@@ -0,0 +1,219 @@
+"""Vectorized parameter sweeps over locally stored closes.
+
+These evaluate whole parameter grids with array operations instead of one engine
+run per cell. Positions are modelled as a constant ``allocation`` fraction of
+equity, so metrics approximate (rather than reproduce) the share-based engine in
+``api/v1/backtest.py``; trade counts match it exactly.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import math
+import time as time_module
+
+import numpy as np
+
+from .indicator_cache import IndicatorSeries
+
+# Upper bound on (cells x symbols x bars) materialised per batch, ~32MB of float64.
+BATCH_ELEMENTS = 4_000_000
+
+
+def align_closes(
+    series: list[tuple[list[datetime], list[float]]],
+    fill_leading: bool = True,
+) -> tuple[list[datetime], np.ndarray]:
+    """Forward-fill each symbol onto the union timeline.
+
+    Leading gaps take the first close, or stay NaN with ``fill_leading=False`` so
+    cross-sectional code can tell a symbol had not started trading yet.
+    """
+    timeline = sorted({ts for timestamps, _ in series for ts in timestamps})
+    if not timeline:
+        return [], np.empty((len(series), 0))
+
+    def _epoch(values: list[datetime]) -> np.ndarray:
+        return np.array(
+            [(item if item.tzinfo else item.replace(tzinfo=timezone.utc)).timestamp() for item in values],
+            dtype=np.float64,
+        )
+
+    union = _epoch(timeline)
+    matrix = np.empty((len(series), len(timeline)), dtype=np.float64)
+    for row, (timestamps, closes) in enumerate(series):
+        values = np.asarray(closes, dtype=np.float64)
+        pos = np.searchsorted(_epoch(timestamps), union, side="right") - 1
+        matrix[row] = values[np.clip(pos, 0, len(values) - 1)]
+        if not fill_leading:
+            matrix[row, pos < 0] = np.nan
+    return timeline, matrix
+
+
+def rolling_means(closes: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """Trailing means for every window at once; NaN until a window has enough bars."""
+    n = closes.shape[-1]
+    windows = np.asarray(windows, dtype=np.int64)
+    csum = np.concatenate(([0.0], np.cumsum(closes)))
+    end = np.arange(1, n + 1)
+    start = end[None, :] - windows[:, None]
+    valid = start >= 0
+    sums = csum[end][None, :] - csum[np.clip(start, 0, None)]
+    return np.where(valid, sums / windows[:, None], np.nan)
+
+
+def positions_from_signals(buy: np.ndarray, sell: np.ndarray) -> np.ndarray:
+    """0/1 long positions from BUY/SELL masks; HOLD bars keep the previous state (flat at start)."""
+    decided = buy | sell
+    idx = np.where(decided, np.arange(buy.shape[-1], dtype=np.int32), np.int32(0))
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    return np.take_along_axis(buy, idx, axis=-1)
+
+
+def crossover_positions(short_ma: np.ndarray, long_ma: np.ndarray) -> np.ndarray:
+    """0/1 long positions for MA crossover rows, holding state inside the 1bp dead band.
+
+    Bars without enough history compare False on both sides and so hold (flat).
+    """
+    return positions_from_signals(short_ma > long_ma * 1.0001, short_ma < long_ma * 0.9999)
+
+
+@dataclass
+class SensitivitySurface:
+    short_windows: list[int]
+    long_windows: list[int]
+    bars: int
+    symbols: int
+    seconds: float
+    surfaces: dict[str, np.ndarray]
+
+    def as_dict(self) -> dict:
+        def _matrix(values: np.ndarray) -> list[list[float | None]]:
+            return [
+                [None if math.isnan(item) else round(float(item), 4) for item in row]
+                for row in values.tolist()
+            ]
+
+        return {
+            "short_windows": self.short_windows,
+            "long_windows": self.long_windows,
+            "bars": self.bars,
+            "symbols": self.symbols,
+            "elapsed_ms": round(self.seconds * 1000.0, 2),
+            "surfaces": {name: _matrix(values) for name, values in self.surfaces.items()},
+        }
+
+
+def ma_crossover_surface(
+    closes: np.ndarray,
+    short_windows: list[int],
+    long_windows: list[int],
+    *,
+    allocation: float,
+    commission_rate: float,
+    annualization: float,
+    series: list[IndicatorSeries] | None = None,
+) -> SensitivitySurface:
+    """Metric matrices (short x long) for the moving-average crossover rule.
+
+    ``closes`` is a (symbols, bars) matrix aligned on one timeline. Cells with
+    ``short >= long`` are NaN. Signals use the same 1bp dead band as the engine and
+    execute on the signalling bar's close. When ``series`` (one per row of
+    ``closes``) is given, moving averages come from the shared indicator cache.
+    """
+    started = time_module.perf_counter()
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    n_symbols, n_bars = closes.shape
+    shape = (len(short_windows), len(long_windows))
+    surfaces = {name: np.full(shape, np.nan) for name in ("sharpe_ratio", "total_return", "max_drawdown", "trade_count")}
+
+    cells = [
+        (row, col)
+        for row, short in enumerate(short_windows)
+        for col, long in enumerate(long_windows)
+        if short < long
+    ]
+    if n_bars < 2 or not cells:
+        return SensitivitySurface(list(short_windows), list(long_windows), n_bars, n_symbols, 0.0, surfaces)
+
+    windows = np.array(sorted(set(short_windows) | set(long_windows)), dtype=np.int64)
+    slot = {int(window): idx for idx, window in enumerate(windows)}
+    if series is not None:
+        means = np.stack([np.stack([item.sma(int(window)) for window in windows]) for item in series])
+    else:
+        means = np.stack([rolling_means(closes[sym], windows) for sym in range(n_symbols)])  # (S, W, N)
+    bar_returns = closes[:, 1:] / closes[:, :-1] - 1.0  # (S, N-1)
+
+    # With one symbol positions are 0/1, so per-bar log growth takes one of four
+    # values (flat, held, held and traded, flat and traded). Return moments become
+    # mat-vec products and only the drawdown needs a materialised path.
+    # The engine charges commission on the trade's notional, ``allocation`` x equity.
+    cost = allocation * commission_rate
+    held_log = np.log1p(allocation * bar_returns)
+    traded_log = np.log1p(allocation * (bar_returns - commission_rate)) - held_log
+    flat_traded_log = math.log1p(-cost)
+    steps = n_bars - 1
+
+    batch = max(1, BATCH_ELEMENTS // (n_symbols * n_bars))
+    for offset in range(0, len(cells), batch):
+        chunk = cells[offset : offset + batch]
+        short_idx = np.array([slot[short_windows[row]] for row, _ in chunk])
+        long_idx = np.array([slot[long_windows[col]] for _, col in chunk])
+        trades = np.zeros(len(chunk))
+        if n_symbols > 1:
+            step_returns = np.zeros((len(chunk), steps))
+        for sym in range(n_symbols):
+            position = crossover_positions(means[sym, short_idx], means[sym, long_idx])
+            changed = position[:, 1:] != position[:, :-1]
+            # Open positions are force-closed on the last bar, as the engine does.
+            trades += changed.sum(axis=1) + position[:, 0] + position[:, -1]
+
+            # Return over bar j -> j+1 holds position[j] and pays for a change at j+1.
+            held = position[:, :-1].astype(np.float64)
+            traded = changed.astype(np.float64)
+            r = bar_returns[sym]
+            if n_symbols > 1:
+                step_returns += (allocation * held * r[None, :] - cost * traded) / n_symbols
+                continue
+            held_traded = held * traded
+            trade_count = traded.sum(axis=1)
+            sum_ret = allocation * (held @ r) - cost * trade_count
+            sum_sq = (
+                allocation**2 * (held @ (r * r))
+                - 2.0 * allocation * cost * (held_traded @ r)
+                + cost**2 * trade_count
+            )
+            log_path = held * held_log[sym] + held_traded * traded_log[sym] + (traded - held_traded) * flat_traded_log
+        if n_symbols > 1:
+            # Symbol returns add within a bar before compounding, so materialise the path.
+            sum_ret = step_returns.sum(axis=1)
+            sum_sq = np.einsum("ij,ij->i", step_returns, step_returns)
+            log_path = np.log1p(step_returns)
+
+        mean = sum_ret / steps
+        if steps > 1:
+            variance = np.clip((sum_sq - steps * mean * mean) / (steps - 1), 0.0, None)
+            std = np.sqrt(variance)
+        else:
+            std = np.zeros(len(chunk))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(std > 1e-12, mean / std * math.sqrt(annualization), 0.0)
+        np.cumsum(log_path, axis=1, out=log_path)
+        peaks = np.maximum(np.maximum.accumulate(log_path, axis=1), 0.0)
+        drawdown = 1.0 - np.exp(-(peaks - log_path).max(axis=1))
+
+        rows = np.array([row for row, _ in chunk])
+        cols = np.array([col for _, col in chunk])
+        surfaces["sharpe_ratio"][rows, cols] = sharpe
+        surfaces["total_return"][rows, cols] = np.expm1(log_path[:, -1]) * 100.0
+        surfaces["max_drawdown"][rows, cols] = drawdown * 100.0
+        surfaces["trade_count"][rows, cols] = trades
+
+    return SensitivitySurface(
+        short_windows=list(short_windows),
+        long_windows=list(long_windows),
+        bars=n_bars,
+        symbols=n_symbols,
+        seconds=time_module.perf_counter() - started,
+        surfaces=surfaces,
+    )
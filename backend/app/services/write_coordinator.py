@@ -0,0 +1,192 @@
+"""In-process single-writer queue with group commit for SQLite.
+
+SQLite admits one writer at a time, so concurrent request handlers that each
+open a write transaction mostly wait on each other's locks. ``WriteCoordinator``
+funnels small writes through one thread instead: callers submit a function that
+receives a ``Session`` and get a ``Future`` back. The writer drains up to
+``max_batch`` queued writes into a single transaction, isolating each one in a
+savepoint so a failing write (validation error, constraint) rolls back alone and
+its exception is delivered to its own future. One commit (one fsync) then covers
+the whole batch.
+
+Write functions run on the writer thread and must return plain values (schemas,
+ids, dicts), not ORM instances bound to the writer's session. If the group
+commit itself fails, every write in the batch is retried in its own transaction
+so one bad batch never fails unrelated callers.
+"""
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+
+T = TypeVar("T")
+
+
+class WriteQueueFull(RuntimeError):
+    """Raised when the bounded write queue cannot accept more work."""
+
+
+@dataclass
+class _PendingWrite:
+    fn: Callable[[Session], Any]
+    future: Future
+
+
+_STOP = object()
+
+
+class WriteCoordinator:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] | None = None,
+        max_queue: int = 1024,
+        max_batch: int = 64,
+        max_wait_seconds: float = 0.002,
+    ) -> None:
+        self._session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.stats = {"writes": 0, "batches": 0, "failed": 0, "fallbacks": 0}
+
+    def _new_session(self) -> Session:
+        if self._session_factory is not None:
+            return self._session_factory()
+        # Resolved per batch so a re-pointed SessionLocal (tests, scripts) is honoured.
+        from .. import database
+
+        return database.SessionLocal()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = 10.0) -> None:
+        """Finish queued writes, then stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, fn: Callable[[Session], T]) -> "Future[T]":
+        """Queue ``fn(session)`` for the writer thread; raises WriteQueueFull on backpressure."""
+        self.start()
+        pending = _PendingWrite(fn=fn, future=Future())
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full as exc:
+            raise WriteQueueFull("Write queue is full; retry shortly") from exc
+        return pending.future
+
+    def run(self, fn: Callable[[Session], T], timeout: float | None = None) -> T:
+        """Blocking submit for sync callers (scripts, worker threads)."""
+        return self.submit(fn).result(timeout)
+
+    async def write(self, fn: Callable[[Session], T]) -> T:
+        """Await a queued write without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn))
+
+    def _next_batch(self) -> tuple[list[_PendingWrite], bool]:
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        stop = False
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=self.max_wait_seconds) if self.max_wait_seconds else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._commit_batch(batch)
+            if stop:
+                return
+
+    def _commit_batch(self, batch: list[_PendingWrite]) -> None:
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes: list[tuple[_PendingWrite, bool, Any]] = []
+        db = self._new_session()
+        try:
+            for item in batch:
+                savepoint = db.begin_nested()
+                try:
+                    result = item.fn(db)
+                    db.flush()
+                    savepoint.commit()
+                    outcomes.append((item, True, result))
+                except BaseException as exc:  # noqa: BLE001 - delivered to the caller's future
+                    savepoint.rollback()
+                    outcomes.append((item, False, exc))
+            db.commit()
+        except Exception:
+            db.rollback()
+            db.close()
+            self.stats["fallbacks"] += 1
+            for item in batch:
+                self._commit_single(item)
+            return
+        finally:
+            db.close()
+
+        self.stats["batches"] += 1
+        for item, ok, value in outcomes:
+            self._resolve(item, ok, value)
+
+    def _commit_single(self, item: _PendingWrite) -> None:
+        db = self._new_session()
+        try:
+            result = item.fn(db)
+            db.commit()
+        except BaseException as exc:  # noqa: BLE001 - delivered to the caller's future
+            db.rollback()
+            self._resolve(item, False, exc)
+        else:
+            self.stats["batches"] += 1
+            self._resolve(item, True, result)
+        finally:
+            db.close()
+
+    def _resolve(self, item: _PendingWrite, ok: bool, value: Any) -> None:
+        if ok:
+            self.stats["writes"] += 1
+            item.future.set_result(value)
+        else:
+            self.stats["failed"] += 1
+            item.future.set_exception(value)
+
+
+@lru_cache()
+def get_write_coordinator() -> WriteCoordinator:
+    settings = get_settings()
+    return WriteCoordinator(
+        max_queue=settings.WRITE_QUEUE_SIZE,
+        max_batch=settings.WRITE_BATCH_MAX,
+        max_wait_seconds=settings.WRITE_BATCH_WAIT_MS / 1000.0,
+    )
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Database Concurrency Benchmark
+
+Measures bar-query throughput while a writer ingests 1m bars as fast as it can,
+once with the legacy rollback-journal engine and once with the WAL profile and
+split read/write engines. Each mode runs against its own temporary database.
+
+Usage:
+    python -m benchmarks.run_db_concurrency_benchmark
+    python -m benchmarks.run_db_concurrency_benchmark --seconds 10 --readers 8
+    python -m benchmarks.run_db_concurrency_benchmark --output results/db_bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add backend to path if running as script
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app.database import Base
+from app.db_profile import SqliteProfile, create_profiled_engine
+from app.models.market_data import Bar1m, Instrument
+
+SEED_BARS = 20_000
+
+
+def _engines(url: str, mode: str, readers: int):
+    if mode == "legacy":
+        # Pre-profile setup: one default engine shared by readers and the writer.
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 0.5})
+        return engine, engine
+    profile = SqliteProfile()
+    writer = create_profiled_engine(url, profile)
+    reader = create_profiled_engine(url, profile, read_only=True, pool_size=readers)
+    return writer, reader
+
+
+def _bar_rows(instrument_id: int, start: datetime, count: int) -> list[dict]:
+    return [
+        {
+            "instrument_id": instrument_id,
+            "ts": start + timedelta(minutes=idx),
+            "open": 100.0,
+            "high": 101.0,
+            "low": 99.0,
+            "close": 100.0 + (idx % 50) * 0.01,
+            "volume": 1000,
+            "source": "bench",
+        }
+        for idx in range(count)
+    ]
+
+
+def run_mode(mode: str, seconds: float, readers: int, batch_size: int) -> dict:
+    """Run one writer and ``readers`` query threads for ``seconds``; return throughput stats."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{(Path(tmp) / 'bench.db').as_posix()}"
+        writer, reader = _engines(url, mode, readers)
+        Base.metadata.create_all(bind=writer, tables=[Instrument.__table__, Bar1m.__table__])
+        with writer.begin() as conn:
+            instrument_id = conn.execute(
+                insert(Instrument).values(symbol="BENCH", market="US", name="BENCH")
+            ).inserted_primary_key[0]
+            conn.execute(insert(Bar1m), _bar_rows(instrument_id, datetime(2020, 1, 1), SEED_BARS))
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        stats = {"reads": 0, "read_errors": 0, "writes": 0, "write_errors": 0, "latencies": []}
+        window = timedelta(minutes=2000)
+
+        def write_loop() -> None:
+            cursor = datetime(2020, 1, 1) + timedelta(minutes=SEED_BARS)
+            while not stop.is_set():
+                rows = _bar_rows(instrument_id, cursor, batch_size)
+                try:
+                    with writer.begin() as conn:
+                        conn.execute(insert(Bar1m), rows)
+                except OperationalError:
+                    stats["write_errors"] += 1
+                    continue
+                cursor += timedelta(minutes=batch_size)
+                stats["writes"] += batch_size
+
+        def read_loop(offset: int) -> None:
+            start = datetime(2020, 1, 1) + timedelta(minutes=offset)
+            query = (
+                select(Bar1m.ts, Bar1m.close)
+                .where(Bar1m.instrument_id == instrument_id, Bar1m.ts >= start, Bar1m.ts <= start + window)
+                .order_by(Bar1m.ts.asc())
+            )
+            while not stop.is_set():
+                began = time.perf_counter()
+                try:
+                    with reader.connect() as conn:
+                        conn.execute(query).fetchall()
+                except OperationalError:
+                    with lock:
+                        stats["read_errors"] += 1
+                    continue
+                elapsed = time.perf_counter() - began
+                with lock:
+                    stats["reads"] += 1
+                    stats["latencies"].append(elapsed)
+
+        threads = [threading.Thread(target=write_loop)]
+        threads += [
+            threading.Thread(target=read_loop, args=((idx * 997) % (SEED_BARS - 2000),)) for idx in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        writer.dispose()
+        reader.dispose()
+
+    latencies = np.array(stats["latencies"] or [0.0]) * 1000
+    return {
+        "mode": mode,
+        "seconds": seconds,
+        "readers": readers,
+        "reads_per_second": round(stats["reads"] / seconds, 1),
+        "read_errors": stats["read_errors"],
+        "read_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "read_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "bars_written_per_second": round(stats["writes"] / seconds, 1),
+        "write_errors": stats["write_errors"],
+    }
+
+
+def print_report(results: list[dict]) -> None:
+    print("\n" + "=" * 72)
+    print("DB CONCURRENCY BENCHMARK (bar reads during 1m ingest)")
+    print("=" * 72)
+    print(f"{'mode':<8} {'reads/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'read err':>9} {'bars/s':>10} {'write err':>10}")
+    for row in results:
+        print(
+            f"{row['mode']:<8} {row['reads_per_second']:>10} {row['read_p50_ms']:>8} {row['read_p95_ms']:>8} "
+            f"{row['read_errors']:>9} {row['bars_written_per_second']:>10} {row['write_errors']:>10}"
+        )
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite read throughput during heavy ingest")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each mode")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads")
+    parser.add_argument("--batch-size", type=int, default=500, help="Bars per write transaction")
+    parser.add_argument("--mode", choices=["legacy", "wal"], action="append", help="Modes to run (default: both)")
+    parser.add_argument("--output", type=str, help="Output file path for results")
+    args = parser.parse_args()
+
+    results = [
+        run_mode(mode, args.seconds, args.readers, args.batch_size)
+        for mode in (args.mode or ["legacy", "wal"])
+    ]
+    print_report(results)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"timestamp": datetime.now().isoformat(), "results": results}
+        output_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"\nResults saved to: {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
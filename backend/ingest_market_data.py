@@ -5,8 +5,13 @@ import argparse
 from datetime import datetime
 
 from app.database import SessionLocal
-from app.services.market_data_providers import AkshareMarketDataProvider, UsYFinanceMarketDataProvider
+from app.services.market_data_providers import (
+    AkshareMarketDataProvider,
+    LocalFileMarketDataProvider,
+    UsYFinanceMarketDataProvider,
+)
 from app.services.market_data_service import MarketDataService
+from app.services.paper_trading import paper_trading_engine
 
 
 def _parse_datetime(value: str | None) -> datetime | None:
@@ -29,8 +34,9 @@ def main() -> int:
     end = _parse_datetime(args.end)
 
     service = MarketDataService(
-        providers=[AkshareMarketDataProvider(), UsYFinanceMarketDataProvider()]
+        providers=[AkshareMarketDataProvider(), UsYFinanceMarketDataProvider(), LocalFileMarketDataProvider()]
     )
+    service.subscribe(paper_trading_engine.on_bars)
 
     with SessionLocal() as db:
         count = service.ingest_history(
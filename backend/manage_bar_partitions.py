@@ -0,0 +1,59 @@
+"""Move cold 1m bars into monthly partitions and archive months past retention."""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from app.config import get_settings
+from app.database import SessionLocal, init_db
+from app.models.market_data import BarPartition
+from app.services.bar_partitions import apply_retention, compact, restore_partition
+
+
+def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Partition, archive and restore bars_1m months")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    compact_cmd = sub.add_parser("compact", help="Move months older than the hot window out of bars_1m")
+    compact_cmd.add_argument("--hot-months", type=int, default=settings.BAR_1M_HOT_MONTHS)
+
+    retention_cmd = sub.add_parser("retention", help="Roll up, export and drop partitions past retention")
+    retention_cmd.add_argument("--keep-months", type=int, default=settings.BAR_1M_RETENTION_MONTHS)
+    retention_cmd.add_argument("--archive-dir", default=settings.BAR_ARCHIVE_DIR)
+
+    restore_cmd = sub.add_parser("restore", help="Re-create an archived month from its export")
+    restore_cmd.add_argument("month", help="YYYY-MM")
+
+    sub.add_parser("list", help="Show the partition registry")
+
+    args = parser.parse_args()
+    init_db()
+    with SessionLocal() as db:
+        if args.command == "compact":
+            moved = compact(db, args.hot_months)
+            for month, rows in moved.items():
+                print(f"[OK] {month}: moved {rows} rows")
+            if not moved:
+                print("[OK] Nothing older than the hot window.")
+        elif args.command == "retention":
+            if args.keep_months <= 0:
+                print("[WARN] Retention is disabled (--keep-months / BAR_1M_RETENTION_MONTHS is 0).")
+                return 1
+            for month in apply_retention(db, args.keep_months, Path(args.archive_dir)):
+                print(f"[OK] {month}: archived")
+        elif args.command == "restore":
+            try:
+                rows = restore_partition(db, args.month)
+            except RuntimeError as exc:
+                print(f"[WARN] {exc}")
+                return 1
+            print(f"[OK] {args.month}: restored {rows} rows")
+        else:
+            for partition in db.query(BarPartition).order_by(BarPartition.month.asc()).all():
+                print(f"{partition.month} {partition.status:<8} rows={partition.row_count} {partition.archive_path or ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,42 @@
+"""Backfill materialized OHLCV rollups (5m/15m/1h/1w) from stored raw bars."""
+from __future__ import annotations
+
+import argparse
+
+from app.database import SessionLocal, init_db
+from app.models.market_data import Instrument
+from app.services.bar_rollups import ROLLUP_INTERVALS, rebuild_rollups
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild rollup tables from bars_1m / bars_1d")
+    parser.add_argument("--symbol", help="Only this ticker symbol (default: every instrument)")
+    parser.add_argument("--market", help="Market code filter, e.g. CN/US")
+    parser.add_argument(
+        "--interval",
+        action="append",
+        choices=list(ROLLUP_INTERVALS),
+        help="Rollup interval to rebuild; repeatable (default: all)",
+    )
+
+    args = parser.parse_args()
+    init_db()
+    with SessionLocal() as db:
+        query = db.query(Instrument)
+        if args.symbol:
+            query = query.filter(Instrument.symbol == args.symbol.strip().upper())
+        if args.market:
+            query = query.filter(Instrument.market == args.market.strip().upper())
+        instruments = query.order_by(Instrument.id.asc()).all()
+        if not instruments:
+            print("[WARN] No matching instruments.")
+            return 1
+        for instrument in instruments:
+            written = rebuild_rollups(db, instrument.id, args.interval)
+            summary = " ".join(f"{interval}={count}" for interval, count in written.items())
+            print(f"[OK] {instrument.symbol} ({instrument.market}) {summary}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+"""Backtest worker: pulls queued backtests (and ingestion jobs) from the shared database task queue.
+
+Start any number of these, on this host or others pointing at the same
+DATABASE_URL; each job is claimed by exactly one worker and re-queued if that
+worker stops heartbeating.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.api.v1.backtest import run_backtest_task
+from app.api.v1.market_data import run_ingest_task
+from app.config import get_settings
+from app.database import SessionLocal, init_db
+from app.services.task_queue import TaskWorker, default_worker_id
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_HEARTBEAT_DIR = PROJECT_ROOT / ".runtime" / "workers"
+# Ceiling for the back-off after consecutive poll failures (database unreachable, locked, ...).
+MAX_BACKOFF_SECONDS = 60.0
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _truthy(value: str | None) -> bool:
+    return str(value or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _write_json(path: Path, payload: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def main() -> None:
+    get_settings()
+    init_db()
+    worker_id = str(os.getenv("WORKER_ID", "")).strip() or default_worker_id()
+    poll_seconds = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+    run_once = _truthy(os.getenv("WORKER_RUN_ONCE", "false"))
+    heartbeat_dir = Path(os.getenv("WORKER_HEARTBEAT_DIR", str(DEFAULT_HEARTBEAT_DIR)))
+    heartbeat_path = heartbeat_dir / f"{worker_id.replace(':', '_')}.json"
+    worker = TaskWorker(
+        session_factory=SessionLocal,
+        handlers={"backtest": run_backtest_task, "ingest": run_ingest_task},
+        worker_id=worker_id,
+    )
+
+    print(f"[OK] Backtest worker {worker_id} started.")
+    processed = 0
+    failures = 0
+    while True:
+        try:
+            outcome = worker.run_once()
+        except Exception as exc:
+            # Handler errors are recorded on the job; this is the queue itself failing.
+            failures += 1
+            delay = min(max(poll_seconds, 0.1) * 2 ** failures, MAX_BACKOFF_SECONDS)
+            print(f"[WARN] Poll failed ({failures} in a row), retrying in {delay:.1f}s: {type(exc).__name__}: {exc}")
+            traceback.print_exc()
+            _write_json(
+                heartbeat_path,
+                {
+                    "status": "error",
+                    "timestamp_utc": _utcnow().isoformat(),
+                    "worker_id": worker_id,
+                    "jobs_processed": processed,
+                    "error": f"{type(exc).__name__}: {exc}",
+                },
+            )
+            if run_once:
+                break
+            time.sleep(delay)
+            continue
+        failures = 0
+        if outcome is not None:
+            processed += 1
+            print(f"[{'OK' if outcome['status'] == 'completed' else 'WARN'}] job {outcome['job_id']} {outcome}")
+        _write_json(
+            heartbeat_path,
+            {
+                "status": "busy" if outcome else "idle",
+                "timestamp_utc": _utcnow().isoformat(),
+                "worker_id": worker_id,
+                "jobs_processed": processed,
+                "last_job": outcome,
+            },
+        )
+        if outcome is None:
+            if run_once:
+                break
+            time.sleep(max(poll_seconds, 0.1))
+
+
+if __name__ == "__main__":
+    main()
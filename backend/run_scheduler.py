@@ -4,7 +4,7 @@ from __future__ import annotations
 import json
 import os
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from urllib.request import Request, urlopen
 
@@ -12,8 +12,13 @@ from sqlalchemy.orm import Session
 
 from app.config import get_settings
 from app.database import SessionLocal, init_db
-from app.services.market_data_providers import AkshareMarketDataProvider, UsYFinanceMarketDataProvider
+from app.services.market_data_providers import (
+    AkshareMarketDataProvider,
+    LocalFileMarketDataProvider,
+    UsYFinanceMarketDataProvider,
+)
 from app.services.market_data_service import MarketDataService
+from app.services.paper_trading import paper_trading_engine
 
 DEFAULT_CONFIG = Path(__file__).resolve().parent / "config" / "ingestion_jobs.json"
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -95,24 +100,45 @@ def run_job(db: Session, service: MarketDataService, job: dict) -> dict:
     else:
         end = None if end is None else end
 
-    for symbol in symbols:
-        try:
-            ingested = service.ingest_history(
-                db=db,
-                symbol=symbol,
-                market=market,
-                interval=interval,
-                start=start,
-                end=end,
-                provider_name=provider,
-            )
+    outcomes = service.ingest_many(
+        db=db,
+        symbols=symbols,
+        market=market,
+        interval=interval,
+        start=start,
+        end=end,
+        provider_name=provider,
+    )
+    for outcome in outcomes:
+        if outcome.error is None:
             summary["succeeded"] += 1
-            summary["ingested_total"] += int(ingested or 0)
-            print(f"[OK] {symbol} {market} {interval} ingested={ingested}")
-        except Exception as exc:
+            summary["ingested_total"] += int(outcome.ingested or 0)
+            print(f"[OK] {outcome.symbol} {market} {interval} ingested={outcome.ingested}")
+        else:
             summary["failed"] += 1
-            summary["errors"].append({"symbol": symbol, "message": str(exc)[:300]})
-            print(f"[ERR] {symbol} {market} {interval} {exc}")
+            summary["errors"].append({"symbol": outcome.symbol, "message": outcome.error[:300]})
+            print(f"[ERR] {outcome.symbol} {market} {interval} {outcome.error}")
+
+    if job.get("backfill_gaps"):
+        # Repair holes inside stored history: fetch only the ranges the gap index reports.
+        since = start or (_utcnow() - timedelta(days=int(job.get("gap_lookback_days", 30))))
+        gaps = {"ranges": 0, "ingested": 0, "missing_before": 0, "missing_after": 0}
+        for outcome in outcomes:
+            if outcome.error is not None:
+                continue
+            backfill = service.backfill_gaps(db, outcome.symbol, market, interval, start=since, end=end, provider_name=provider)
+            gaps["ranges"] += backfill.ranges
+            gaps["ingested"] += backfill.ingested
+            gaps["missing_before"] += backfill.missing_before
+            gaps["missing_after"] += backfill.missing_after
+            for message in backfill.errors:
+                summary["errors"].append({"symbol": outcome.symbol, "message": f"gap backfill: {message}"[:300]})
+            if backfill.ranges:
+                print(
+                    f"[OK] {outcome.symbol} {market} {interval} gaps ranges={backfill.ranges} "
+                    f"ingested={backfill.ingested} missing={backfill.missing_before}->{backfill.missing_after}"
+                )
+        summary["gaps"] = gaps
     summary["finished_at"] = _utcnow().isoformat()
     return summary
 
@@ -142,8 +168,9 @@ def main() -> None:
         return
 
     service = MarketDataService(
-        providers=[AkshareMarketDataProvider(), UsYFinanceMarketDataProvider()],
+        providers=[AkshareMarketDataProvider(), UsYFinanceMarketDataProvider(), LocalFileMarketDataProvider()],
     )
+    service.subscribe(paper_trading_engine.on_bars)
     last_run: dict[str, datetime] = {}
 
     print("[OK] Ingestion scheduler started.")
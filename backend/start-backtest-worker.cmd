@@ -0,0 +1,11 @@
+@echo off
+setlocal
+set "ROOT=%~dp0.."
+set "PY=%ROOT%\\venv\\Scripts\\python.exe"
+if not exist "%PY%" set "PY=python"
+cd /d "%~dp0"
+
+echo Starting StockTracker Backtest Worker...
+"%PY%" run_backtest_worker.py
+
+endlocal
@@ -4,7 +4,6 @@ import sys
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 BACKEND_DIR = Path(__file__).resolve().parents[1]
@@ -63,18 +62,28 @@ def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
     db_url = f"sqlite:///{db_path.as_posix()}"
     monkeypatch.setenv("DATABASE_URL", db_url)
     monkeypatch.setenv("AGENT_REQUIRE_LLM", "false")
+    monkeypatch.setenv("BAR_STORE_DIR", str(tmp_path / "bar_store"))
 
     from app.config import get_settings
+    from app.services.bar_store import get_bar_store
+    from app.services.indicator_cache import get_indicator_cache
 
     get_settings.cache_clear()
+    get_bar_store.cache_clear()
+    get_indicator_cache.cache_clear()
 
     import app.database as database
+    from app.db_profile import create_profiled_engine
 
-    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    engine = create_profiled_engine(db_url, database.profile)
+    read_engine = create_profiled_engine(db_url, database.profile, read_only=True, pool_size=4)
     testing_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    read_session = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
     database.engine = engine
+    database.read_engine = read_engine
     database.SessionLocal = testing_session
+    database.ReadSessionLocal = read_session
 
     # Ensure models are loaded into metadata before table creation.
     import app.models.portfolio  # noqa: F401
@@ -95,10 +104,20 @@ def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
         finally:
             db.close()
 
+    def override_get_read_db():
+        db = read_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
     app.dependency_overrides[database.get_db] = override_get_db
+    app.dependency_overrides[database.get_read_db] = override_get_read_db
 
     with TestClient(app) as test_client:
         yield test_client
 
     app.dependency_overrides.clear()
     database.Base.metadata.drop_all(bind=engine)
+    read_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,84 @@
+"""Tests for the backtest comparison overlay endpoint."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+
+def test_compare_aligns_forward_fills_and_downsamples():
+    from app.services.backtest_comparison import compare_equity_curves
+
+    days = [datetime(2024, 1, 1) + timedelta(days=idx) for idx in range(10)]
+    base = (days, [100.0, 101, 102, 101, 103, 104, 102, 105, 106, 107])
+    # Weekly-style curve that starts later and misses days: gaps forward-fill.
+    sparse = (days[2::2], [50.0, 49.0, 51.0, 52.0])
+    result = compare_equity_curves([base, sparse])
+    assert result.source_points == 10
+    assert np.isnan(result.equity[1, :2]).all()
+    assert result.equity[1, 2:].tolist() == [50.0, 50.0, 49.0, 49.0, 51.0, 51.0, 52.0, 52.0]
+    assert result.drawdowns[0, 3] == pytest.approx((101 / 102 - 1) * 100)
+    assert result.correlations[0, 0] == 1.0
+    # Only days both curves printed count; the sparse curve's filled days are not flat returns.
+    shared = np.array([102.0, 103, 102, 106]), np.array([50.0, 49, 51, 52])
+    expected = np.corrcoef(*(values[1:] / values[:-1] - 1.0 for values in shared))[0, 1]
+    assert result.correlations[0, 1] == pytest.approx(expected)
+
+    thin = compare_equity_curves([base, sparse], max_points=4, normalize=True)
+    assert thin.timestamps[0] == days[0] and thin.timestamps[-1] == days[-1]
+    assert len(thin.timestamps) == 4
+    assert thin.equity[0, 0] == 1.0 and thin.equity[1, -1] == pytest.approx(52.0 / 50.0)
+    # Stats use the full grid, not the downsampled one.
+    np.testing.assert_allclose(thin.correlations, result.correlations)
+
+
+def test_compare_endpoint_returns_columnar_overlay(client):
+    from app.database import SessionLocal
+    from app.models.backtest import Backtest
+
+    def curve(values, offset=0):
+        start = datetime(2024, 1, 1)
+        return [
+            {"timestamp": (start + timedelta(days=offset + idx)).isoformat(), "value": value}
+            for idx, value in enumerate(values)
+        ]
+
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={"name": "MA", "strategy_type": "moving_average", "parameters": {}},
+    ).json()["id"]
+    db = SessionLocal()
+    try:
+        ids = []
+        for values, offset in (([100, 110, 99, 120], 0), ([100, 105, 95, 118], 0), ([10, 12], 2)):
+            row = Backtest(
+                strategy_id=strategy_id,
+                symbols=["AAPL"],
+                start_date=datetime(2024, 1, 1).date(),
+                end_date=datetime(2024, 1, 4).date(),
+                initial_capital=100,
+                status="completed",
+                results={"equity_curve": curve(values, offset)},
+            )
+            db.add(row)
+            db.flush()
+            ids.append(row.id)
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post("/api/v1/backtests/compare", json={"backtest_ids": ids})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["backtest_ids"] == ids
+    assert body["points"] == body["source_points"] == 4
+    assert body["equity"][2] == [None, None, 10.0, 12.0]
+    assert body["drawdowns"][0][2] == pytest.approx(-10.0)
+    assert body["correlations"][0][1] > 0.9
+    assert body["correlations"][0][2] is None  # Only one shared return step.
+    assert body["items"][0]["relative_max_drawdown"] == 0.0
+    assert body["items"][1]["relative_max_drawdown"] < 0
+
+    assert client.post("/api/v1/backtests/compare", json={"backtest_ids": [ids[0], 9999]}).status_code == 404
+    assert client.post("/api/v1/backtests/compare", json={"backtest_ids": [ids[0], ids[0]]}).status_code == 400
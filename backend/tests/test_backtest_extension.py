@@ -0,0 +1,116 @@
+"""API tests for incremental backtest extension from checkpoints."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+CLOSES = [100, 102, 104, 101, 98, 97, 101, 105, 108, 103, 99, 102, 106, 109]
+
+
+def _seed_bars(closes: list[float], start_day: int = 1) -> None:
+    from app.database import SessionLocal
+    from app.models.market_data import Bar1d, Instrument
+
+    db = SessionLocal()
+    try:
+        instrument = db.query(Instrument).filter(Instrument.symbol == "AAPL").first()
+        if not instrument:
+            instrument = Instrument(symbol="AAPL", market="US", name="AAPL")
+            db.add(instrument)
+            db.flush()
+        for day, close in enumerate(closes, start=start_day):
+            db.add(
+                Bar1d(
+                    instrument_id=instrument.id,
+                    ts=datetime(2025, 3, day, tzinfo=timezone.utc),
+                    open=float(close),
+                    high=float(close) + 1,
+                    low=float(close) - 1,
+                    close=float(close),
+                    volume=1000,
+                    source="test",
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _run(client, strategy_id: int, end_date: str) -> dict:
+    response = client.post(
+        "/api/v1/backtests/",
+        json={
+            "strategy_id": strategy_id,
+            "symbols": ["AAPL"],
+            "start_date": "2025-03-01",
+            "end_date": end_date,
+            "initial_capital": 100000,
+            "parameters": {"market": "US", "interval": "1d"},
+        },
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_extend_matches_full_rerun(client):
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={
+            "name": "Extend MA",
+            "strategy_type": "moving_average",
+            "parameters": {"short_window": 2, "long_window": 3, "allocation_per_trade": 0.5},
+        },
+    ).json()["id"]
+
+    _seed_bars(CLOSES[:8])
+    partial = _run(client, strategy_id, "2025-03-08")
+    checkpoint = partial["results"]["checkpoint"]
+    assert checkpoint["last_ts"].startswith("2025-03-08")
+    assert len(checkpoint["history"]["AAPL"]) == 3
+    assert checkpoint["liquidation_trades"] == 1
+
+    _seed_bars(CLOSES[8:], start_day=9)
+    extended = client.post(f"/api/v1/backtests/{partial['id']}/extend", json={"end_date": "2025-03-14"})
+    assert extended.status_code == 200
+    extended_body = extended.json()
+    full = _run(client, strategy_id, "2025-03-14")
+
+    assert extended_body["end_date"] == "2025-03-14"
+    assert extended_body["results"]["extensions"] == 1
+    assert extended_body["results"]["bars"] == full["results"]["bars"]
+    assert extended_body["results"]["equity_curve"] == full["results"]["equity_curve"]
+    for key in ("final_value", "total_return", "sharpe_ratio", "max_drawdown", "win_rate", "trade_count"):
+        assert extended_body[key] == full[key]
+
+    extended_trades = client.get(f"/api/v1/backtests/{partial['id']}/trades").json()
+    full_trades = client.get(f"/api/v1/backtests/{full['id']}/trades").json()
+    strip = lambda rows: [(r["action"], r["quantity"], r["price"], r["timestamp"]) for r in rows]
+    assert strip(extended_trades) == strip(full_trades)
+
+    # Nothing new ingested: extension is a no-op.
+    again = client.post(f"/api/v1/backtests/{partial['id']}/extend", json={"end_date": "2025-03-14"})
+    assert again.status_code == 200
+    assert again.json()["results"]["extensions"] == 1
+
+
+def test_extend_requires_checkpoint(client):
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={"name": "No checkpoint", "strategy_type": "moving_average", "parameters": {}},
+    ).json()["id"]
+    _seed_bars(CLOSES[:5])
+    body = _run(client, strategy_id, "2025-03-05")
+
+    from app.database import SessionLocal
+    from app.models.backtest import Backtest
+
+    db = SessionLocal()
+    try:
+        item = db.query(Backtest).filter(Backtest.id == body["id"]).first()
+        item.results = {key: value for key, value in (item.results or {}).items() if key != "checkpoint"}
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post(f"/api/v1/backtests/{body['id']}/extend", json={})
+    assert response.status_code == 400
+    assert client.post("/api/v1/backtests/99999/extend", json={}).status_code == 404
@@ -0,0 +1,148 @@
+"""Tests for streamed bar export formats on GET /market-data/bars."""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+BARS_URL = "/api/v1/market-data/bars"
+PARAMS = {"symbol": "AAPL", "market": "US", "interval": "1m", "limit": 50}
+
+
+def _seed(count: int = 25) -> int:
+    from app.database import SessionLocal
+    from app.models.market_data import Bar1m, Instrument
+
+    with SessionLocal() as db:
+        instrument = Instrument(symbol="AAPL", market="US", name="Apple")
+        db.add(instrument)
+        db.flush()
+        first = datetime(2025, 1, 2, 14, 30)
+        db.add_all(
+            Bar1m(
+                instrument_id=instrument.id,
+                ts=first + timedelta(minutes=offset),
+                open=100.0 + offset,
+                high=101.5 + offset,
+                low=99.25 + offset,
+                close=100.5 + offset,
+                volume=None if offset == 3 else 1000 + offset,
+                source="stooq" if offset % 2 else "yfinance",
+            )
+            for offset in range(count)
+        )
+        db.commit()
+        return instrument.id
+
+
+@pytest.fixture(params=["store", "cursor"])
+def export_client(request, client, monkeypatch):
+    """Export through the mapped bar store and through the streaming table cursor."""
+    if request.param == "cursor":
+        from app.config import get_settings
+        from app.services.bar_store import get_bar_store
+
+        monkeypatch.setenv("BAR_STORE_DIR", "")
+        get_settings.cache_clear()
+        get_bar_store.cache_clear()
+        yield client
+        get_settings.cache_clear()
+        get_bar_store.cache_clear()
+    else:
+        yield client
+
+
+def test_streamed_formats_match_json_response(export_client):
+    _seed()
+    expected = export_client.get(BARS_URL, params=PARAMS).json()
+    assert len(expected) == 25
+
+    response = export_client.get(BARS_URL, params={**PARAMS, "format": "ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == expected
+
+    response = export_client.get(BARS_URL, params={**PARAMS, "format": "csv"})
+    assert response.headers["content-disposition"] == 'attachment; filename="AAPL_US_1m.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["ts"] for row in rows] == [item["ts"] for item in expected]
+    assert rows[3]["volume"] == "" and rows[4]["volume"] == "1004" and rows[1]["source"] == "stooq"
+    assert [float(row["high"]) for row in rows] == [item["high"] for item in expected]
+
+    columnar = export_client.get(BARS_URL, params={**PARAMS, "format": "columnar"}).json()
+    assert (columnar["symbol"], columnar["interval"], columnar["count"]) == ("AAPL", "1m", 25)
+    for name in ("ts", "open", "high", "low", "close", "volume", "source"):
+        assert columnar[name] == [item[name] for item in expected]
+
+
+def test_stream_honours_limit_and_range_across_chunks(client):
+    from app.database import ReadSessionLocal
+    from app.services.bar_export import bar_chunks
+
+    instrument_id = _seed()
+    with ReadSessionLocal() as db:
+        chunks = list(bar_chunks(db, instrument_id, "1m", datetime(2025, 1, 2, 14, 35), None, limit=12, chunk_rows=5))
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+    assert chunks[0].timestamps()[0] == datetime(2025, 1, 2, 14, 35)
+
+    response = client.get(BARS_URL, params={**PARAMS, "format": "columnar", "limit": 4, "start": "2025-01-02T14:40:00"})
+    assert response.json()["ts"] == [f"2025-01-02T14:{minute}:00" for minute in (40, 41, 42, 43)]
+    empty = client.get(BARS_URL, params={**PARAMS, "format": "columnar", "start": "2025-02-01T00:00:00"}).json()
+    assert empty["count"] == 0 and empty["close"] == []
+
+
+def test_rollup_intervals_stream_from_rollup_table(client):
+    from app.database import SessionLocal
+    from app.services.bar_rollups import rebuild_rollups
+
+    instrument_id = _seed(10)
+    with SessionLocal() as db:
+        rebuild_rollups(db, instrument_id, ["5m"])
+    expected = client.get(BARS_URL, params={**PARAMS, "interval": "5m"}).json()
+    response = client.get(BARS_URL, params={**PARAMS, "interval": "5m", "format": "ndjson"})
+    assert len(expected) == 4  # Two buckets, one rollup per source
+    assert [json.loads(line) for line in response.text.splitlines()] == expected
+
+
+def test_arrow_stream_round_trips_or_reports_missing_dependency(client):
+    from app.services.bar_export import arrow_available
+
+    _seed()
+    response = client.get(BARS_URL, params={**PARAMS, "format": "arrow"})
+    if not arrow_available():
+        assert response.status_code == 503
+        return
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 25
+    assert table.schema.metadata[b"symbol"] == b"AAPL"
+    assert table.column("volume").null_count == 1
+
+
+def test_json_limit_is_applied_in_the_read(export_client, request):
+    import app.database as database
+    from sqlalchemy import event
+
+    instrument_id = _seed()
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.read_engine, "before_cursor_execute", capture)
+    try:
+        rows = export_client.get(BARS_URL, params={**PARAMS, "limit": 3, "start": "2025-01-02T14:40:00"}).json()
+    finally:
+        event.remove(database.read_engine, "before_cursor_execute", capture)
+    assert [row["ts"] for row in rows] == [f"2025-01-02T14:{minute}:00" for minute in (40, 41, 42)]
+    if "cursor" in request.node.callspec.id:
+        assert any("bars_1m" in sql and "LIMIT" in sql for sql in statements)
+
+    from app.services.bar_rollups import read_interval_bars, rebuild_rollups
+
+    with database.SessionLocal() as db:
+        rebuild_rollups(db, instrument_id, ["5m"])
+        assert len(read_interval_bars(db, instrument_id, "5m", limit=3)) == 3
@@ -0,0 +1,128 @@
+"""Tests for the calendar-based gap index and targeted backfill."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+class DailyProvider:
+    """Serves US daily bars stamped at New York midnight, minus any ``holes``.
+
+    Like yfinance, ``end`` is exclusive.
+    """
+
+    name = "daily"
+    requests_per_second = 0
+
+    def __init__(self, holes: set[int]):
+        self.holes = holes
+        self.calls: list[tuple[datetime | None, datetime | None]] = []
+
+    def supports(self, market, interval):
+        return True
+
+    def fetch_history(self, symbol, start, end, interval):
+        from app.services.bar_store import to_micros
+        from app.services.market_data_service import BarRecord
+        from app.services.trading_calendar import get_calendar
+
+        self.calls.append((start, end))
+        stamps = get_calendar("US").expected_timestamps(
+            start or datetime(2025, 1, 1, tzinfo=timezone.utc), end, "1d"
+        )
+        if end is not None:
+            stamps = stamps[stamps < to_micros(end)]
+        return [
+            BarRecord(ts=ts.replace(tzinfo=timezone.utc), open=1.0, high=1.0, low=1.0, close=float(ts.day), volume=1, source=self.name)
+            for ts in (np.datetime64(int(value), "us").astype(datetime) for value in stamps)
+            if ts.day not in self.holes
+        ]
+
+
+def test_find_gaps_collapses_consecutive_expected_positions():
+    from app.services.bar_gaps import find_gaps
+
+    expected = np.arange(10, dtype=np.int64) * 60_000_000
+    stored = np.delete(expected, [0, 3, 4, 5, 9])
+    gaps = find_gaps(stored, expected)
+    assert [(gap.missing, gap.start.minute, gap.end.minute) for gap in gaps] == [(1, 0, 0), (3, 3, 5), (1, 9, 9)]
+    assert find_gaps(expected, expected) == []
+
+
+def test_backfill_fetches_only_missing_ranges(client):
+    import app.database as database
+    from app.models.market_data import BarGap, DataSourceMeta
+    from app.services.market_data_service import MarketDataService
+
+    # Jan 9 2025 was a market holiday, so missing Jan 8 and Jan 10 is one range.
+    provider = DailyProvider(holes={8, 10, 22})
+    service = MarketDataService(providers=[provider])
+    end = datetime(2025, 1, 31, 12, tzinfo=timezone.utc)
+    with database.SessionLocal() as db:
+        service.ingest_history(db, "AAPL", "US", "1d", None, end)
+        provider.holes = set()
+        provider.calls.clear()
+
+        outcome = service.backfill_gaps(db, "AAPL", "US", "1d")
+        assert (outcome.ranges, outcome.ingested, outcome.missing_before, outcome.missing_after) == (2, 3, 3, 0)
+        assert provider.calls == [
+            # Inclusive gap ends are widened by one bar for the exclusive provider bound.
+            (datetime(2025, 1, 8, 5, tzinfo=timezone.utc), datetime(2025, 1, 11, 5, tzinfo=timezone.utc)),
+            (datetime(2025, 1, 22, 5, tzinfo=timezone.utc), datetime(2025, 1, 23, 5, tzinfo=timezone.utc)),
+        ]
+        assert db.query(BarGap).count() == 0
+        # Filling old holes leaves the incremental checkpoint at the newest bar.
+        assert db.query(DataSourceMeta).one().last_success_ts == datetime(2025, 1, 31, 5)
+
+    status = client.get("/api/v1/market-data/status", params={"symbol": "AAPL", "market": "US", "interval": "1d"}).json()
+    assert status["gap_estimate"] == 0 and status["gaps"] == []
+
+
+def test_unfillable_gaps_stop_after_max_attempts(client):
+    import app.database as database
+    from app.models.market_data import BarGap
+    from app.services.market_data_service import MarketDataService
+
+    provider = DailyProvider(holes={15})
+    service = MarketDataService(providers=[provider])
+    with database.SessionLocal() as db:
+        service.ingest_history(db, "MSFT", "US", "1d", None, datetime(2025, 1, 20, tzinfo=timezone.utc))
+        provider.calls.clear()
+        for _ in range(4):
+            outcome = service.backfill_gaps(db, "MSFT", "US", "1d", max_attempts=2)
+        assert len(provider.calls) == 2
+        assert outcome.ranges == 0 and outcome.missing_after == 1
+        gap = db.query(BarGap).one()
+        assert (gap.start_ts, gap.missing, gap.attempts) == (datetime(2025, 1, 15, 5), 1, 2)
+
+    status = client.get(
+        "/api/v1/market-data/status",
+        params={"symbol": "MSFT", "market": "US", "interval": "1d", "start": "2025-01-13T00:00:00Z", "end": "2025-01-17T23:00:00Z"},
+    ).json()
+    assert status["total_bars"] == 4 and status["gap_estimate"] == 1
+    assert status["gaps"] == [{"start_ts": "2025-01-15T05:00:00", "end_ts": "2025-01-15T05:00:00", "missing": 1}]
+
+
+def test_akshare_minute_bounds_are_sent_as_beijing_time(monkeypatch):
+    import sys
+    import types
+
+    import pandas as pd
+
+    from app.services.market_data_providers import AkshareMarketDataProvider
+
+    requested = {}
+
+    def stock_zh_a_hist_min_em(**kwargs):
+        requested.update(kwargs)
+        return pd.DataFrame({"时间": []})
+
+    monkeypatch.setitem(sys.modules, "akshare", types.SimpleNamespace(stock_zh_a_hist_min_em=stock_zh_a_hist_min_em))
+    AkshareMarketDataProvider().fetch_history(
+        "600000",
+        datetime(2025, 1, 6, 1, 30, tzinfo=timezone.utc),
+        datetime(2025, 1, 6, 7, 1, tzinfo=timezone.utc),
+        "1m",
+    )
+    assert (requested["start_date"], requested["end_date"]) == ("2025-01-06 09:30:00", "2025-01-06 15:01:00")
@@ -0,0 +1,116 @@
+"""Tests for monthly 1m partitions, the range router and the retention policy."""
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+NOW = datetime(2025, 3, 20, tzinfo=timezone.utc)
+DAYS = (datetime(2025, 1, 2, 14, 30), datetime(2025, 2, 3, 14, 30), datetime(2025, 3, 3, 14, 30))
+
+
+class MinuteProvider:
+    name = "minutes"
+    requests_per_second = 0
+
+    def supports(self, market, interval):
+        return True
+
+    def fetch_history(self, symbol, start, end, interval):
+        from app.services.market_data_service import BarRecord
+
+        return [
+            BarRecord(ts=(day + timedelta(minutes=offset)).replace(tzinfo=timezone.utc), open=1.0, high=2.0, low=0.5, close=1.5, volume=10, source=self.name)
+            for day in DAYS
+            for offset in range(3)
+        ]
+
+
+def _seed(db):
+    from app.models.market_data import Instrument
+    from app.services.market_data_service import MarketDataService
+
+    MarketDataService(providers=[MinuteProvider()]).ingest_history(db, "AAPL", "US", "1m", None, NOW)
+    return db.query(Instrument).filter(Instrument.symbol == "AAPL").one().id
+
+
+def test_compact_moves_cold_months_and_router_reads_across_tables(client):
+    import app.database as database
+    from app.models.market_data import Bar1m, BarPartition
+    from app.services.bar_partitions import bar_tables, compact, partition_table, partitions_version
+    from app.services.bar_store import read_bars
+    from app.services.market_data_service import BarRecord, _upsert_bars
+
+    with database.SessionLocal() as db:
+        instrument_id = _seed(db)
+        assert len(read_bars(db, instrument_id, "1m")) == 9
+
+        assert compact(db, hot_months=1, now=NOW) == {"2025-01": 3, "2025-02": 3}
+        assert db.query(Bar1m).count() == 3
+        assert [(p.month, p.status, p.row_count) for p in db.query(BarPartition).order_by(BarPartition.month)] == [
+            ("2025-01", "active", 3),
+            ("2025-02", "active", 3),
+        ]
+        # Range queries only touch the months they overlap.
+        assert [table.name for table in bar_tables(db, "1m", datetime(2025, 2, 1), datetime(2025, 2, 28))] == [
+            "bars_1m",
+            "bars_1m_202502",
+        ]
+        columns = read_bars(db, instrument_id, "1m")
+        assert len(columns) == 9 and (columns.ts[1:] > columns.ts[:-1]).all()
+        assert read_bars(db, instrument_id, "1m", datetime(2025, 2, 1), datetime(2025, 2, 28)).timestamps()[0] == DAYS[1]
+
+        # A late bar for January goes to its partition, not back into the hot table.
+        version = partitions_version(db)
+        late = DAYS[0] + timedelta(minutes=5)
+        record = BarRecord(ts=late, open=1.0, high=1.0, low=1.0, close=1.0, volume=1, source="minutes")
+        assert _upsert_bars(db, Bar1m, instrument_id, [record]) == 1
+        db.commit()
+        assert db.query(Bar1m).count() == 3
+        assert db.execute(select(func.count()).select_from(partition_table("2025-01"))).scalar() == 4
+        assert db.query(BarPartition).filter(BarPartition.month == "2025-01").one().row_count == 4
+        # Revising it adds no row, and neither write invalidates other instruments' cached 1m bars.
+        _upsert_bars(db, Bar1m, instrument_id, [replace(record, close=1.2)])
+        db.commit()
+        assert db.query(BarPartition).filter(BarPartition.month == "2025-01").one().row_count == 4
+        assert partitions_version(db) == version
+        assert len(read_bars(db, instrument_id, "1m")) == 10
+
+    status = client.get("/api/v1/market-data/status", params={"symbol": "AAPL", "market": "US", "interval": "1m"}).json()
+    assert status["total_bars"] == 10
+    assert status["first_bar_ts"] == "2025-01-02T14:30:00" and status["last_bar_ts"] == "2025-03-03T14:32:00"
+
+
+def test_retention_archives_to_rollups_and_restore_round_trips(client, tmp_path):
+    import app.database as database
+    from app.models.market_data import BarPartition, BarRollup
+    from app.services.bar_partitions import apply_retention, compact, partition_table, restore_partition
+    from app.services.bar_rollups import rebuild_rollups
+    from app.services.bar_store import read_bars
+
+    with database.SessionLocal() as db:
+        instrument_id = _seed(db)
+        compact(db, hot_months=1, now=NOW)
+
+        assert apply_retention(db, 2, tmp_path, now=NOW) == ["2025-01"]
+        january = db.query(BarPartition).filter(BarPartition.month == "2025-01").one()
+        assert january.status == "archived" and january.archive_path.endswith("bars_1m_202501.npz")
+        assert not database.engine.dialect.has_table(db.connection(), partition_table("2025-01").name)
+        assert read_bars(db, instrument_id, "1m").timestamps()[0] == DAYS[1]
+
+        # January survives as rollups, and a full rebuild does not drop them.
+        def hourly():
+            return [
+                (row.ts, row.volume)
+                for row in db.query(BarRollup).filter(BarRollup.interval == "1h").order_by(BarRollup.ts)
+            ]
+
+        assert hourly()[0] == (DAYS[0], 30)
+        rebuild_rollups(db, instrument_id)
+        assert hourly() == [(day, 30) for day in DAYS]
+
+        assert restore_partition(db, "2025-01") == 3
+        columns = read_bars(db, instrument_id, "1m")
+        assert len(columns) == 9 and columns.timestamps()[0] == DAYS[0]
+        assert columns.volumes()[0] == 10 and columns.source_names()[0] == "minutes"
@@ -0,0 +1,176 @@
+"""Tests for incrementally maintained OHLCV rollups."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+class MinuteProvider:
+    name = "minutes"
+
+    def __init__(self) -> None:
+        self.bars = []
+
+    def supports(self, market: str, interval: str) -> bool:
+        return True
+
+    def fetch_history(self, symbol, start, end, interval):
+        return list(self.bars)
+
+
+def _minutes(start: datetime, closes: list[float]):
+    from app.services.market_data_service import BarRecord
+
+    return [
+        BarRecord(
+            ts=start + timedelta(minutes=idx),
+            open=close - 0.5,
+            high=close + 1,
+            low=close - 1,
+            close=close,
+            volume=10,
+            source="minutes",
+        )
+        for idx, close in enumerate(closes)
+    ]
+
+
+def test_bucket_start_aligns_weeks_to_monday():
+    import numpy as np
+
+    from app.services.bar_rollups import bucket_start
+    from app.services.bar_store import to_micros
+
+    wednesday = to_micros(datetime(2024, 1, 10, 15, 30))
+    monday = to_micros(datetime(2024, 1, 8))
+    assert bucket_start(np.array([wednesday]), "1w")[0] == monday
+    assert bucket_start(np.array([wednesday]), "1h")[0] == to_micros(datetime(2024, 1, 10, 15))
+
+
+def test_weekly_buckets_follow_the_exchange_local_date(client):
+    import numpy as np
+
+    import app.database as database
+    from app.models.market_data import Bar1d, BarRollup, Instrument
+    from app.services.bar_rollups import bucket_start, rebuild_rollups
+    from app.services.bar_store import to_micros
+    from app.services.trading_calendar import get_calendar
+
+    # CN daily bars carry Shanghai midnight: Monday 2024-01-08 is stored as Sunday 16:00 UTC.
+    days = np.array([to_micros(datetime(2024, 1, 7, 16) + timedelta(days=day)) for day in range(5)])
+    monday = to_micros(datetime(2024, 1, 7, 16))
+    assert bucket_start(days, "1w", get_calendar("CN")).tolist() == [monday] * 5
+
+    # US weeks start at New York midnight, whichever side of a DST change.
+    us = get_calendar("US")
+    before, after = to_micros(datetime(2024, 3, 8, 5)), to_micros(datetime(2024, 3, 11, 4))
+    assert bucket_start(np.array([before, after]), "1w", us).tolist() == [
+        to_micros(datetime(2024, 3, 4, 5)),
+        to_micros(datetime(2024, 3, 11, 4)),
+    ]
+
+    with database.SessionLocal() as db:
+        instrument = Instrument(symbol="600000", market="CN", name="SPDB")
+        db.add(instrument)
+        db.flush()
+        for day in (0, 1, 2, 3, 4, 7):
+            ts = datetime(2024, 1, 7, 16) + timedelta(days=day)
+            db.add(Bar1d(instrument_id=instrument.id, ts=ts, open=1, high=1, low=1, close=10.0 + day, source="test"))
+        db.commit()
+        assert rebuild_rollups(db, instrument.id, ["1w"]) == {"1w": 2}
+        weeks = db.query(BarRollup).filter(BarRollup.interval == "1w").order_by(BarRollup.ts).all()
+        assert [(row.ts, row.bar_count, row.close) for row in weeks] == [
+            (datetime(2024, 1, 7, 16), 5, 14.0),
+            (datetime(2024, 1, 14, 16), 1, 17.0),
+        ]
+
+
+def test_ingest_refreshes_only_affected_buckets_and_api_serves_rollups(client):
+    import app.database as database
+    from app.models.market_data import BarRollup
+    from app.services.market_data_service import MarketDataService
+
+    provider = MinuteProvider()
+    service = MarketDataService(providers=[provider])
+    start = datetime(2024, 1, 2, 9, 0, tzinfo=timezone.utc)
+    with database.SessionLocal() as db:
+        provider.bars = _minutes(start, [float(100 + idx) for idx in range(12)])
+        service.ingest_history(db, "AAPL", "US", "1m", None, None)
+        five = db.query(BarRollup).filter(BarRollup.interval == "5m").order_by(BarRollup.ts).all()
+        assert [(row.open, row.high, row.low, row.close, row.volume, row.bar_count) for row in five] == [
+            (99.5, 105.0, 99.0, 104.0, 50, 5),
+            (104.5, 110.0, 104.0, 109.0, 50, 5),
+            (109.5, 112.0, 109.0, 111.0, 20, 2),
+        ]
+        first_updated = five[0].updated_at
+
+        # Revise the last minute and add two more: only the third bucket changes.
+        provider.bars = _minutes(start + timedelta(minutes=11), [90.0, 112.0, 113.0])
+        service.ingest_history(db, "AAPL", "US", "1m", None, None)
+        db.expire_all()
+        five = db.query(BarRollup).filter(BarRollup.interval == "5m").order_by(BarRollup.ts).all()
+        assert five[0].updated_at == first_updated
+        assert (five[2].low, five[2].close, five[2].bar_count, five[2].volume) == (89.0, 113.0, 4, 40)
+        hour = db.query(BarRollup).filter(BarRollup.interval == "1h").one()
+        assert (hour.open, hour.close, hour.bar_count) == (99.5, 113.0, 14)
+
+    response = client.get(
+        "/api/v1/market-data/bars",
+        params={"symbol": "AAPL", "market": "US", "interval": "15m"},
+    )
+    assert response.status_code == 200, response.text
+    rows = response.json()
+    assert len(rows) == 1
+    assert rows[0]["interval"] == "15m" and rows[0]["high"] == 114.0 and rows[0]["volume"] == 140
+
+
+def test_rebuild_backfills_weekly_rollups_used_by_backtests(client):
+    import app.database as database
+    from app.models.market_data import Bar1d, BarRollup, Instrument
+    from app.services.bar_rollups import rebuild_rollups
+
+    with database.SessionLocal() as db:
+        instrument = Instrument(symbol="MSFT", market="US", name="MSFT")
+        db.add(instrument)
+        db.flush()
+        # New York midnight (EST) of each session date, as providers stamp daily bars.
+        monday = datetime(2024, 1, 1, 5)
+        for day in range(70):
+            close = 100.0 + (day % 7) + day * 0.5
+            db.add(
+                Bar1d(
+                    instrument_id=instrument.id,
+                    ts=monday + timedelta(days=day),
+                    open=close,
+                    high=close,
+                    low=close,
+                    close=close,
+                    volume=1,
+                    source="test",
+                )
+            )
+        db.commit()
+        assert rebuild_rollups(db, instrument.id, ["1w"]) == {"1w": 10}
+        weeks = db.query(BarRollup).filter(BarRollup.interval == "1w").order_by(BarRollup.ts).all()
+        assert weeks[1].ts == datetime(2024, 1, 8, 5) and weeks[1].bar_count == 7
+        assert weeks[1].close == pytest.approx(100.0 + 6 + 13 * 0.5)
+
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={"name": "Weekly MA", "strategy_type": "moving_average", "parameters": {"short_window": 2, "long_window": 3}},
+    ).json()["id"]
+    response = client.post(
+        "/api/v1/backtests/",
+        json={
+            "strategy_id": strategy_id,
+            "symbols": ["MSFT"],
+            "start_date": "2024-01-01",
+            "end_date": "2024-12-31",
+            "initial_capital": 10000,
+            "parameters": {"market": "US", "interval": "1w"},
+        },
+    )
+    assert response.status_code == 201, response.text
+    detail = client.get(f"/api/v1/backtests/{response.json()['id']}").json()
+    assert detail["results"]["bars"] == 10
@@ -0,0 +1,173 @@
+"""Tests for the memory-mapped columnar bar store."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+
+class ListProvider:
+    name = "listprov"
+
+    def __init__(self) -> None:
+        self.bars = []
+
+    def supports(self, market: str, interval: str) -> bool:
+        return True
+
+    def fetch_history(self, symbol, start, end, interval):
+        return list(self.bars)
+
+
+def _records(start_day: int, closes: list[float], source: str = "listprov"):
+    from app.services.market_data_service import BarRecord
+
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        BarRecord(
+            ts=base + timedelta(days=start_day + idx),
+            open=close,
+            high=close + 1,
+            low=close - 1,
+            close=close,
+            volume=None if idx == 0 else 100 + idx,
+            source=source,
+        )
+        for idx, close in enumerate(closes)
+    ]
+
+
+def test_ingest_appends_in_place_and_reads_are_zero_copy(client):
+    import app.database as database
+    from app.services.bar_store import get_bar_store, read_bars
+    from app.services.market_data_service import MarketDataService
+
+    provider = ListProvider()
+    service = MarketDataService(providers=[provider])
+    store = get_bar_store()
+    with database.SessionLocal() as db:
+        provider.bars = _records(0, [10.0, 11.0, 12.0])
+        service.ingest_history(db, "AAPL", "US", "1d", None, None)
+        instrument_id = db.execute(database.Base.metadata.tables["instruments"].select()).first().id
+        path = store.path(instrument_id, "1d")
+        inode = path.stat().st_ino
+
+        # New bars only: appended past the rows readers can see.
+        provider.bars = _records(3, [13.0])
+        service.ingest_history(db, "AAPL", "US", "1d", None, None)
+        assert path.stat().st_ino == inode
+
+        # Overlapping refresh: a visible bar is revised, so a fresh file is swapped in.
+        provider.bars = _records(2, [12.5, 13.0, 14.0])
+        service.ingest_history(db, "AAPL", "US", "1d", None, None)
+        assert path.stat().st_ino != inode
+
+        columns = read_bars(db, instrument_id, "1d")
+        assert columns.close.tolist() == [10.0, 11.0, 12.5, 13.0, 14.0]
+        assert columns.volumes()[:2] == [None, 101]
+        assert columns.source_names() == ["listprov"] * 5
+
+        window = read_bars(
+            db,
+            instrument_id,
+            "1d",
+            datetime(2024, 1, 2, tzinfo=timezone.utc),
+            datetime(2024, 1, 4),
+        )
+        assert window.timestamps() == [datetime(2024, 1, 2), datetime(2024, 1, 3), datetime(2024, 1, 4)]
+        # Views into the mapped file, not copies.
+        assert not window.close.flags.owndata and not window.close.flags.writeable
+
+
+def test_writes_outside_ingestion_trigger_a_resync(client):
+    import app.database as database
+    from app.models.market_data import Bar1d, Instrument
+    from app.services.bar_store import read_bars
+
+    with database.SessionLocal() as db:
+        instrument = Instrument(symbol="MSFT", market="US", name="MSFT")
+        db.add(instrument)
+        db.flush()
+        db.add(Bar1d(instrument_id=instrument.id, ts=datetime(2024, 1, 2), open=1, high=1, low=1, close=1.0, source="a"))
+        db.commit()
+        assert read_bars(db, instrument.id, "1d").close.tolist() == [1.0]
+
+        # Same timestamp from a second source plus a later bar, inserted directly.
+        db.add(Bar1d(instrument_id=instrument.id, ts=datetime(2024, 1, 2), open=2, high=2, low=2, close=2.0, source="b"))
+        db.add(Bar1d(instrument_id=instrument.id, ts=datetime(2024, 1, 3), open=3, high=3, low=3, close=3.0, source="a"))
+        db.commit()
+        columns = read_bars(db, instrument.id, "1d")
+        assert columns.close.tolist() == [1.0, 2.0, 3.0]
+        assert columns.source_names() == ["a", "b", "a"]
+
+
+def test_bars_api_reads_through_the_store(client):
+    import app.api.v1.market_data as market_data_api
+    from app.services.bar_store import get_bar_store
+    from app.services.market_data_service import MarketDataService
+
+    provider = ListProvider()
+    provider.bars = _records(0, [float(value) for value in range(1, 11)])
+    original = market_data_api.market_data_service
+    market_data_api.market_data_service = MarketDataService(providers=[provider])
+    try:
+        ingested = client.post(
+            "/api/v1/market-data/ingest",
+            json={"symbols": ["AAPL"], "market": "US", "interval": "1d"},
+        )
+        assert ingested.status_code == 200, ingested.text
+    finally:
+        market_data_api.market_data_service = original
+
+    assert list(get_bar_store().root.glob("*_1d.bars"))
+    response = client.get(
+        "/api/v1/market-data/bars",
+        params={"symbol": "AAPL", "market": "US", "interval": "1d", "start": "2024-01-03T00:00:00", "limit": 3},
+    )
+    assert response.status_code == 200
+    rows = response.json()
+    assert [row["close"] for row in rows] == [3.0, 4.0, 5.0]
+    assert rows[0]["source"] == "listprov" and rows[0]["volume"] == 102
+
+
+def test_revisions_outside_ingestion_trigger_a_resync(client):
+    import app.database as database
+    from app.models.market_data import Bar1d
+    from app.services.bar_store import read_bars
+    from app.services.market_data_service import _upsert_bars, get_or_create_instrument
+
+    with database.SessionLocal() as db:
+        instrument = get_or_create_instrument(db, "MSFT", "US")
+        _upsert_bars(db, Bar1d, instrument.id, _records(0, [10.0, 11.0]))
+        db.commit()
+        assert read_bars(db, instrument.id, "1d").close.tolist() == [10.0, 11.0]
+
+        # Same keys: only the values move.
+        _upsert_bars(db, Bar1d, instrument.id, _records(1, [11.5]))
+        db.commit()
+        assert read_bars(db, instrument.id, "1d").close.tolist() == [10.0, 11.5]
+
+
+def test_warm_reads_check_the_fingerprint_without_scanning_bars(client):
+    import app.database as database
+    from sqlalchemy import event
+
+    from app.models.market_data import Bar1d
+    from app.services.bar_store import read_bars
+    from app.services.market_data_service import _upsert_bars, get_or_create_instrument
+
+    with database.SessionLocal() as db:
+        instrument = get_or_create_instrument(db, "MSFT", "US")
+        _upsert_bars(db, Bar1d, instrument.id, _records(0, [10.0, 11.0, 12.0]))
+        db.commit()
+        read_bars(db, instrument.id, "1d")
+
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(database.engine, "before_cursor_execute", listener)
+        try:
+            assert read_bars(db, instrument.id, "1d").close.tolist() == [10.0, 11.0, 12.0]
+        finally:
+            event.remove(database.engine, "before_cursor_execute", listener)
+        assert statements and not any("bars_1d" in statement for statement in statements)
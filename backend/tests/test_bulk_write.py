@@ -0,0 +1,144 @@
+"""Tests for the bulk write path used by high-volume inserts."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+
+def test_bulk_insert_trades_round_trip(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models.backtest import Trade
+    from app.services.bulk_write import bulk_insert
+
+    engine = create_engine(f"sqlite:///{(tmp_path / 'bulk.db').as_posix()}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        start = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+        rows = [
+            (None, None, "AAPL", "BUY" if idx % 2 == 0 else "SELL", 1.0, 100.0 + idx, 0.1, start + timedelta(minutes=idx), 0.0, False)
+            for idx in range(20_000)
+        ]
+        stats = bulk_insert(
+            db,
+            Trade.__table__,
+            ("backtest_id", "portfolio_id", "symbol", "action", "quantity", "price", "commission", "timestamp", "pnl", "is_simulated"),
+            iter(rows),
+            chunk_rows=7_000,
+        )
+        db.commit()
+
+        assert stats.rows == 20_000
+        assert stats.rows_per_sec > 0
+        assert stats.as_dict()["table"] == "trades"
+        assert db.query(Trade).count() == 20_000
+
+        last = db.query(Trade).order_by(Trade.id.desc()).first()
+        assert last.price == 100.0 + 19_999
+        assert last.is_simulated is False
+        assert last.timestamp.replace(tzinfo=timezone.utc) == start + timedelta(minutes=19_999)
+        # Timestamps written by the bulk path must compare equal to ORM-bound values.
+        assert db.query(Trade).filter(Trade.timestamp == start).count() == 1
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_backtest_reports_trade_persistence(client):
+    from app.database import SessionLocal
+    from app.models.market_data import Bar1d, Instrument
+
+    strategy = client.post(
+        "/api/v1/strategies/",
+        json={
+            "name": "Bulk MA",
+            "strategy_type": "moving_average",
+            "parameters": {"short_window": 2, "long_window": 3},
+        },
+    ).json()
+
+    db = SessionLocal()
+    try:
+        instrument = Instrument(symbol="AAPL", market="US", name="AAPL")
+        db.add(instrument)
+        db.flush()
+        closes = [100, 102, 104, 101, 98, 97, 101, 105, 108, 103, 99, 102]
+        for day, close in enumerate(closes, start=1):
+            db.add(
+                Bar1d(
+                    instrument_id=instrument.id,
+                    ts=datetime(2025, 3, day, tzinfo=timezone.utc),
+                    open=float(close),
+                    high=float(close) + 1,
+                    low=float(close) - 1,
+                    close=float(close),
+                    volume=1000,
+                    source="test",
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+    run = client.post(
+        "/api/v1/backtests/",
+        json={
+            "strategy_id": strategy["id"],
+            "symbols": ["AAPL"],
+            "start_date": "2025-03-01",
+            "end_date": "2025-03-12",
+            "initial_capital": 100000,
+            "parameters": {"market": "US", "interval": "1d"},
+        },
+    )
+    assert run.status_code == 201
+    body = run.json()
+    persistence = body["results"]["trade_persistence"]
+    assert persistence["table"] == "trades"
+    assert persistence["rows"] == body["trade_count"]
+
+    trades = client.get(f"/api/v1/backtests/{body['id']}/trades").json()
+    assert len(trades) == body["trade_count"]
+    assert all(item["is_simulated"] is False for item in trades)
+
+
+def test_bulk_upsert_batches_by_variable_limit_and_updates_conflicts(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models.market_data import Bar1m, Instrument
+    from app.services.bulk_write import bulk_upsert, rows_per_statement
+    from app.services.market_data_service import BAR_COLUMNS, BAR_UPDATE_COLUMNS
+
+    assert rows_per_statement(999, len(BAR_COLUMNS)) == 111
+    assert rows_per_statement(250_000, len(BAR_COLUMNS)) == 1000
+
+    engine = create_engine(f"sqlite:///{(tmp_path / 'upsert.db').as_posix()}")
+    Base.metadata.create_all(bind=engine, tables=[Instrument.__table__, Bar1m.__table__])
+    db = sessionmaker(bind=engine)()
+    try:
+        db.add(Instrument(symbol="AAPL", market="US", name="AAPL"))
+        db.flush()
+        start = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+        created = datetime(2025, 1, 3)
+
+        def rows(first: int, count: int, close: float):
+            for idx in range(first, first + count):
+                yield (1, start + timedelta(minutes=idx), 1.0, 2.0, 0.5, close, idx, "test", created)
+
+        # 40 variables -> 4 rows per statement, so 23 rows leave a 3-row single-statement tail.
+        first = bulk_upsert(db, Bar1m.__table__, BAR_COLUMNS, rows(0, 23, 1.0), ("instrument_id", "ts", "source"), BAR_UPDATE_COLUMNS, max_variables=40, chunk_rows=10)
+        second = bulk_upsert(db, Bar1m.__table__, BAR_COLUMNS, rows(20, 10, 2.0), ("instrument_id", "ts", "source"), BAR_UPDATE_COLUMNS, max_variables=40)
+        db.commit()
+
+        assert (first.rows, second.rows) == (23, 10)
+        assert db.query(Bar1m).count() == 30
+        assert db.query(Bar1m).filter(Bar1m.close == 2.0).count() == 10
+        revised = db.query(Bar1m).filter(Bar1m.ts == start + timedelta(minutes=22)).one()
+        assert (revised.close, revised.volume) == (2.0, 22)
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,35 @@
+"""Tests for the SQLite WAL profile and read/write engine split."""
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def test_engines_verify_wal_profile_and_reader_is_read_only(client):
+    import app.database as database
+
+    verified = database.verify_database_profile()
+    assert verified["write"]["journal_mode"] == "wal"
+    assert verified["write"]["synchronous"] == 1
+    assert verified["read"]["query_only"] == 1
+    assert verified["read"]["busy_timeout"] == database.profile.busy_timeout_ms
+
+    with database.ReadSessionLocal() as db:
+        with pytest.raises(OperationalError):
+            db.execute(text("INSERT INTO instruments (symbol, market, name) VALUES ('X', 'US', 'X')"))
+
+
+def test_reads_proceed_while_a_write_transaction_is_open(client):
+    import app.database as database
+    from app.models.market_data import Instrument
+
+    with database.SessionLocal() as writer:
+        writer.add(Instrument(symbol="LOCK", market="US", name="LOCK"))
+        writer.flush()  # Holds the write lock until commit.
+        # WAL readers see the last committed snapshot without waiting on the writer.
+        response = client.get("/api/v1/market-data/instruments")
+        assert response.status_code == 200
+        assert response.json() == []
+        writer.commit()
+    assert [row["symbol"] for row in client.get("/api/v1/market-data/instruments").json()] == ["LOCK"]
@@ -0,0 +1,40 @@
+"""Tests for the shared indicator cache."""
+from __future__ import annotations
+
+import numpy as np
+
+
+def test_lru_evicts_by_bytes_and_keys_on_fingerprint():
+    from app.services.indicator_cache import IndicatorSeries, IndicatorStore
+
+    store = IndicatorStore(max_bytes=3 * 100 * 8)
+    closes = np.linspace(100.0, 120.0, 100)
+    series = IndicatorSeries(closes, 1, "1d", store=store)
+    first = series.sma(5)
+    assert series.sma(5) is first
+    assert not first.flags.writeable
+    series.sma(10)
+    series.rsi(14)
+    series.momentum(3)  # Fourth array exceeds the byte budget.
+    assert len(store) == 3
+    assert store.stats.evictions == 1
+
+    # Same instrument and params but different closes must not reuse the array.
+    changed = closes.copy()
+    changed[-1] += 1.0
+    other = IndicatorSeries(changed, 1, "1d", store=store)
+    assert other.sma(10)[-1] != series.sma(10)[-1]
+    assert other.computed == 1
+
+
+def test_disk_layer_survives_a_fresh_store(tmp_path):
+    from app.services.indicator_cache import IndicatorSeries, IndicatorStore
+
+    closes = np.arange(1.0, 51.0)
+    IndicatorSeries(closes, 7, "1d", store=IndicatorStore(max_bytes=1 << 20, disk_dir=tmp_path)).sma(5)
+
+    fresh = IndicatorStore(max_bytes=1 << 20, disk_dir=tmp_path)
+    series = IndicatorSeries(closes, 7, "1d", store=fresh)
+    np.testing.assert_allclose(series.sma(5)[4:], np.arange(3.0, 49.0))
+    assert series.computed == 0
+    assert fresh.stats.disk_hits == 1
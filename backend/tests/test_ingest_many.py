@@ -0,0 +1,193 @@
+"""Tests for concurrent multi-symbol ingestion."""
+from __future__ import annotations
+
+import gc
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+
+class SlowProvider:
+    name = "slow"
+    max_concurrency = 3
+    requests_per_second = 0  # Unlimited; the concurrency cap is what is under test.
+
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.threads: set[str] = set()
+        self._lock = threading.Lock()
+
+    def supports(self, market: str, interval: str) -> bool:
+        return True
+
+    def fetch_history(self, symbol, start, end, interval):
+        from app.services.market_data_service import BarRecord
+
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.threads.add(threading.current_thread().name)
+        try:
+            time.sleep(self.delay)
+            if symbol == "BROKEN":
+                raise RuntimeError("upstream 500")
+            base = datetime(2025, 1, 2, tzinfo=timezone.utc)
+            return [
+                BarRecord(ts=base + timedelta(days=idx), open=1.0, high=1.0, low=1.0, close=1.0 + idx, volume=1, source=self.name)
+                for idx in range(3)
+            ]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_token_bucket_spaces_calls_after_the_burst():
+    from app.services.rate_limit import TokenBucket
+
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=lambda: now[0], sleep=sleep)
+    assert [bucket.acquire() for _ in range(4)] == [0.0, 0.0, 0.5, 0.5]
+    now[0] += 10
+    assert bucket.acquire() == 0.0  # Refilled, but never beyond capacity.
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.5
+
+
+def test_ingest_many_fetches_concurrently_and_keeps_per_symbol_logs(client):
+    import app.database as database
+    from app.models.market_data import Bar1d, IngestionLog
+    from app.services.market_data_service import MarketDataService
+
+    provider = SlowProvider()
+    service = MarketDataService(providers=[provider])
+    symbols = ["aapl", "MSFT", "BROKEN", "NVDA", "AMZN", "META"]
+    # A full collection over the whole suite's heap can take longer than the bound itself.
+    gc.collect()
+    started = time.perf_counter()
+    with database.SessionLocal() as db:
+        outcomes = service.ingest_many(db, symbols, "US", "1d", max_workers=6)
+        elapsed = time.perf_counter() - started
+
+        assert [item.symbol for item in outcomes] == ["AAPL", "MSFT", "BROKEN", "NVDA", "AMZN", "META"]
+        assert [item.status for item in outcomes] == ["completed"] * 2 + ["failed"] + ["completed"] * 3
+        assert outcomes[2].error == "upstream 500"
+        assert all(item.ingested == 3 for item in outcomes if item.error is None)
+        assert db.query(Bar1d).count() == 15
+
+        logs = {row.symbol: row for row in db.query(IngestionLog).all()}
+        assert len(logs) == 6
+        assert logs["BROKEN"].status == "failed" and logs["BROKEN"].message == "upstream 500"
+        assert logs["AAPL"].message == "ingested 3 bars"
+
+    assert provider.peak == 3  # Capped by the provider, not the pool size.
+    assert all(name.startswith("ingest") for name in provider.threads)
+    assert elapsed < 6 * provider.delay
+
+
+def test_ingest_endpoint_reports_each_symbol(client):
+    import app.api.v1.market_data as market_data_api
+    from app.services.market_data_service import MarketDataService
+
+    original = market_data_api.market_data_service
+    market_data_api.market_data_service = MarketDataService(providers=[SlowProvider(delay=0)])
+    try:
+        response = client.post(
+            "/api/v1/market-data/ingest",
+            json={"symbols": ["AAPL", "BROKEN"], "market": "US", "interval": "1d"},
+        )
+    finally:
+        market_data_api.market_data_service = original
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"symbol": "AAPL", "market": "US", "interval": "1d", "ingested": 3, "status": "completed", "message": None},
+        {"symbol": "BROKEN", "market": "US", "interval": "1d", "ingested": 0, "status": "failed", "message": "upstream 500"},
+    ]
+
+
+def test_ingest_job_reports_progress_per_symbol(client):
+    import app.api.v1.market_data as market_data_api
+    import app.database as database
+    from app.api.v1.market_data import run_ingest_task
+    from app.models.market_data import IngestionLog
+    from app.services.market_data_service import MarketDataService
+    from app.services.task_queue import TaskWorker
+
+    queued = client.post(
+        "/api/v1/market-data/ingest/jobs",
+        json={"symbols": ["aapl", "BROKEN", "MSFT"], "market": "US", "interval": "1d"},
+    )
+    assert queued.status_code == 202
+    job = queued.json()
+    assert job["status"] == "queued"
+    assert [row["status"] for row in job["symbols"]] == ["pending"] * 3
+    assert (job["symbols_total"], job["symbols_done"], job["bars_ingested"]) == (3, 0, 0)
+
+    original = market_data_api.market_data_service
+    market_data_api.market_data_service = MarketDataService(providers=[SlowProvider(delay=0)])
+    try:
+        worker = TaskWorker(database.SessionLocal, {"ingest": run_ingest_task}, worker_id="w1")
+        assert worker.run_once()["status"] == "completed"
+    finally:
+        market_data_api.market_data_service = original
+
+    done = client.get(f"/api/v1/market-data/ingest/jobs/{job['job_id']}").json()
+    assert done["status"] == "completed"
+    assert (done["symbols_done"], done["symbols_failed"], done["bars_ingested"]) == (3, 1, 6)
+    by_symbol = {row["symbol"]: row for row in done["symbols"]}
+    assert by_symbol["AAPL"]["ingested"] == 3 and by_symbol["AAPL"]["source"] == "slow"
+    assert by_symbol["AAPL"]["last_success_ts"].startswith("2025-01-04")
+    assert by_symbol["BROKEN"]["status"] == "failed" and by_symbol["BROKEN"]["message"] == "upstream 500"
+
+    with database.SessionLocal() as db:
+        assert {row.job_id for row in db.query(IngestionLog).all()} == {job["job_id"]}
+    assert client.get("/api/v1/market-data/ingest/jobs/999999").status_code == 404
+
+
+def test_ingest_many_batches_symbols_per_provider_and_falls_back(client):
+    import app.database as database
+    from app.models.market_data import Bar1d
+    from app.services.market_data_service import MarketDataService
+
+    class BatchingProvider(SlowProvider):
+        batch_size = 3
+
+        def __init__(self, fail_batches: bool = False):
+            super().__init__(delay=0)
+            self.fail_batches = fail_batches
+            self.batch_calls: list[list[str]] = []
+            self.single_calls: list[str] = []
+
+        def fetch_history(self, symbol, start, end, interval):
+            self.single_calls.append(symbol)
+            return super().fetch_history(symbol, start, end, interval)
+
+        def fetch_history_many(self, symbols, start, end, interval):
+            self.batch_calls.append(list(symbols))
+            if self.fail_batches:
+                raise RuntimeError("batch endpoint down")
+            # The upstream silently drops one ticker; the service must refetch it alone.
+            return {symbol: SlowProvider.fetch_history(self, symbol, start, end, interval) for symbol in symbols if symbol != "MSFT"}
+
+    symbols = ["AAPL", "MSFT", "NVDA", "AMZN", "META"]
+    provider = BatchingProvider()
+    with database.SessionLocal() as db:
+        outcomes = MarketDataService(providers=[provider]).ingest_many(db, symbols, "US", "1d")
+        assert [item.ingested for item in outcomes] == [3] * 5
+        assert db.query(Bar1d).count() == 15
+    assert provider.batch_calls == [["AAPL", "MSFT", "NVDA"], ["AMZN", "META"]]
+    assert provider.single_calls == ["MSFT"]
+
+    provider = BatchingProvider(fail_batches=True)
+    with database.SessionLocal() as db:
+        outcomes = MarketDataService(providers=[provider]).ingest_many(db, ["TSLA", "BROKEN"], "US", "1d")
+    assert [item.status for item in outcomes] == ["completed", "failed"]
+    assert provider.batch_calls == [["TSLA", "BROKEN"]]
+    assert sorted(provider.single_calls) == ["BROKEN", "TSLA"]
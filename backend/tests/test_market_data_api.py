@@ -71,9 +71,10 @@ def test_market_data_status_and_ingestions(client):
         db.add(instrument)
         db.flush()
 
-        ts1 = datetime(2025, 1, 2, 1, 0, tzinfo=timezone.utc)
-        ts2 = datetime(2025, 1, 2, 1, 1, tzinfo=timezone.utc)
-        ts3 = datetime(2025, 1, 2, 1, 3, tzinfo=timezone.utc)
+        # 09:30 (opening auction), 09:31 and 09:33 Shanghai time; 09:32 is missing.
+        ts1 = datetime(2025, 1, 2, 1, 30, tzinfo=timezone.utc)
+        ts2 = datetime(2025, 1, 2, 1, 31, tzinfo=timezone.utc)
+        ts3 = datetime(2025, 1, 2, 1, 33, tzinfo=timezone.utc)
         db.add_all(
             [
                 Bar1m(
@@ -140,8 +141,8 @@ def test_market_data_status_and_ingestions(client):
             "symbol": "600001",
             "market": "CN",
             "interval": "1m",
-            "start": "2025-01-02T01:00:00Z",
-            "end": "2025-01-02T01:03:00Z",
+            "start": "2025-01-02T01:30:00Z",
+            "end": "2025-01-02T01:33:00Z",
         },
     )
     assert response.status_code == 200
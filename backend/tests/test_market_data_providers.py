@@ -41,3 +41,213 @@ def test_us_yfinance_provider_parses_history(monkeypatch):
     assert rows[0].source == "yfinance"
     assert rows[0].close == 100.5
     assert rows[1].volume == 1200
+
+
+def test_akshare_provider_localizes_filters_and_nulls_volume_columnwise(monkeypatch):
+    import numpy as np
+
+    from app.services.market_data_providers import AkshareMarketDataProvider
+
+    frame = pd.DataFrame(
+        {
+            "时间": ["2025-01-02 09:32:00", "2025-01-02 09:31:00", "2025-01-02 09:30:00", "2025-01-02 09:33:00"],
+            "开盘": [10.2, 10.1, 10.0, 10.3],
+            "最高": [10.3, 10.2, 10.1, 10.4],
+            "最低": [10.1, 10.0, 9.9, 10.2],
+            "收盘": [10.25, 10.15, 10.05, 10.35],
+            "成交量": [300.0, np.nan, 100.0, 400.0],
+        }
+    )
+    fake_ak = SimpleNamespace(stock_zh_a_hist_min_em=lambda **kwargs: frame)
+    monkeypatch.setitem(__import__("sys").modules, "akshare", fake_ak)
+
+    batch = AkshareMarketDataProvider().fetch_history(
+        symbol="600519",
+        start=datetime(2025, 1, 2, 9, 31),  # Naive bounds are Shanghai wall-clock, like the data.
+        end=datetime(2025, 1, 2, 1, 32, tzinfo=timezone.utc),
+        interval="1m",
+    )
+    assert len(batch) == 2
+    assert batch.timestamps() == [datetime(2025, 1, 2, 1, 31), datetime(2025, 1, 2, 1, 32)]
+    assert batch.close.tolist() == [10.15, 10.25]
+    assert batch.volumes() == [None, 300]
+    assert batch[-1].ts == datetime(2025, 1, 2, 1, 32, tzinfo=timezone.utc)
+    assert [bar.source for bar in batch] == ["akshare", "akshare"]
+
+
+def test_service_ingests_columnar_batches(client):
+    import numpy as np
+
+    import app.database as database
+    from app.services.bar_store import read_bars
+    from app.services.market_data_service import BarBatch, MarketDataService
+
+    class BatchProvider:
+        name = "batch"
+
+        def __init__(self):
+            self.batch = None
+
+        def supports(self, market, interval):
+            return True
+
+        def fetch_history(self, symbol, start, end, interval):
+            return self.batch
+
+    def make_batch(first_day: int, closes: list[float]) -> BarBatch:
+        day = 86_400_000_000
+        base = int(np.datetime64("2025-01-06", "us").astype(np.int64))
+        prices = np.array(closes, dtype=np.float64)
+        return BarBatch(
+            ts=base + day * np.arange(first_day, first_day + len(closes), dtype=np.int64),
+            open=prices,
+            high=prices + 1,
+            low=prices - 1,
+            close=prices,
+            volume=np.full(len(closes), 10, dtype=np.int64),
+            source="batch",
+        )
+
+    provider = BatchProvider()
+    service = MarketDataService(providers=[provider])
+    with database.SessionLocal() as db:
+        provider.batch = make_batch(0, [1.0, 2.0, 3.0])
+        assert service.ingest_history(db, "AAPL", "US", "1d", None, None) == 3
+        provider.batch = make_batch(2, [3.5, 4.0])
+        assert service.ingest_history(db, "AAPL", "US", "1d", None, None) == 2
+        instrument_id = db.execute(database.Base.metadata.tables["instruments"].select()).first().id
+        columns = read_bars(db, instrument_id, "1d")
+        assert columns.close.tolist() == [1.0, 2.0, 3.5, 4.0]
+        assert columns.volumes() == [10, 10, 10, 10]
+
+
+def test_us_yfinance_provider_splits_multi_ticker_download(monkeypatch):
+    import numpy as np
+
+    from app.services.market_data_providers import UsYFinanceMarketDataProvider
+
+    index = pd.to_datetime(["2025-01-02", "2025-01-03"])
+    columns = pd.MultiIndex.from_product([["AAPL", "MSFT", "GONE"], ["Open", "High", "Low", "Close", "Volume"]])
+    values = np.array(
+        [
+            [1, 2, 0.5, 1.5, 10, 5, 6, 4, 5.5, 20] + [np.nan] * 5,
+            [2, 3, 1.5, 2.5, 11, 6, 7, 5, 6.5, 21] + [np.nan] * 5,
+        ]
+    )
+    calls = []
+
+    def download(**kwargs):
+        calls.append(kwargs)
+        return pd.DataFrame(values, index=index, columns=columns)
+
+    monkeypatch.setitem(__import__("sys").modules, "yfinance", SimpleNamespace(download=download))
+
+    batches = UsYFinanceMarketDataProvider().fetch_history_many(["AAPL", "MSFT", "GONE", "NOPE"], None, None, "1d")
+    assert len(calls) == 1 and calls[0]["tickers"] == ["AAPL", "MSFT", "GONE", "NOPE"]
+    assert sorted(batches) == ["AAPL", "MSFT"]  # All-NaN and absent tickers fall back per symbol.
+    assert batches["MSFT"].close.tolist() == [5.5, 6.5]
+    assert batches["AAPL"].volumes() == [10, 11]
+
+
+def test_local_file_provider_infers_schema_and_timezone(tmp_path):
+    from app.services.market_data_providers import LocalFileMarketDataProvider
+
+    us = tmp_path / "US" / "1m"
+    us.mkdir(parents=True)
+    # Vendor-style split date/time columns, naive New York wall clock, a duplicated bar.
+    pd.DataFrame(
+        {
+            "Date": ["2025-01-02", "2025-01-02", "2025-01-02", "2025-01-02"],
+            "Time": ["09:30", "09:31", "09:31", "09:32"],
+            "Open": [1.0, 2.0, 2.5, 3.0],
+            "High": [1.0, 2.0, 2.5, 3.0],
+            "Low": [1.0, 2.0, 2.5, 3.0],
+            "Close": [1.0, 2.0, 2.5, None],
+            "Vol": [10, 20, 25, 30],
+        }
+    ).to_csv(us / "AAPL_2025.csv", index=False)
+    # Multi-ticker archive: epoch-millisecond stamps and a code column.
+    cn = tmp_path / "CN" / "1d"
+    cn.mkdir(parents=True)
+    pd.DataFrame(
+        {
+            "ts_code": ["600519.SH", "000001.SZ", "600519.SH"],
+            "trade_date": [20250102, 20250102, 20250103],
+            "open": [1.0, 9.0, 2.0],
+            "high": [1.0, 9.0, 2.0],
+            "low": [1.0, 9.0, 2.0],
+            "close": [1.0, 9.0, 2.0],
+            "volume": [100, 900, 200],
+        }
+    ).to_csv(cn / "daily.csv.gz", index=False)
+
+    provider = LocalFileMarketDataProvider(root=str(tmp_path))
+    assert provider.supports("US", "1m") and not provider.supports("US", "1d")
+
+    bars = [bar for chunk in provider.fetch_history("AAPL", None, None, "1m") for bar in chunk]
+    assert [(bar.ts, bar.close, bar.volume) for bar in bars] == [
+        (datetime(2025, 1, 2, 14, 30, tzinfo=timezone.utc), 1.0, 10),
+        (datetime(2025, 1, 2, 14, 31, tzinfo=timezone.utc), 2.5, 25),
+    ]
+
+    chunks = list(provider.fetch_history("600519", datetime(2025, 1, 2, 12, tzinfo=timezone.utc), None, "1d"))
+    bars = [bar for chunk in chunks for bar in chunk]
+    # Daily bars carry Shanghai midnight; the start bound drops Jan 2.
+    assert [(bar.ts, bar.close) for bar in bars] == [(datetime(2025, 1, 2, 16, tzinfo=timezone.utc), 2.0)]
+
+
+def test_local_file_provider_streams_chunks_through_ingestion(client, tmp_path):
+    import app.database as database
+    from app.models.market_data import Bar1m, IngestionLog
+    from app.services.market_data_providers import LocalFileMarketDataProvider
+    from app.services.market_data_service import MarketDataService
+
+    folder = tmp_path / "archive" / "US" / "1m"
+    folder.mkdir(parents=True)
+    first = pd.Timestamp("2025-01-02 14:30", tz="UTC")
+    stamps = pd.date_range(first, periods=25, freq="min")
+    pd.DataFrame(
+        {
+            "timestamp": (stamps.as_unit("s").asi8).tolist(),  # Epoch seconds
+            "open": range(25),
+            "high": range(25),
+            "low": range(25),
+            "close": range(25),
+            "volume": range(25),
+        }
+    ).to_csv(folder / "MSFT.csv", index=False)
+
+    provider = LocalFileMarketDataProvider(root=str(tmp_path / "archive"), chunk_rows=10)
+    service = MarketDataService(providers=[provider])
+    with database.SessionLocal() as db:
+        assert service.ingest_history(db, "MSFT", "US", "1m", None, None, provider_name="localfile") == 25
+        assert db.query(Bar1m).count() == 25
+        log = db.query(IngestionLog).one()
+        assert (log.status, log.bar_count) == ("completed", 25)
+
+    response = client.get("/api/v1/market-data/bars", params={"symbol": "MSFT", "market": "US", "limit": 100})
+    assert [item["close"] for item in response.json()] == [float(value) for value in range(25)]
+
+
+def test_local_file_provider_reads_only_the_requested_market(client, tmp_path):
+    import app.database as database
+    from app.models.market_data import Bar1d
+    from app.services.market_data_providers import LocalFileMarketDataProvider
+    from app.services.market_data_service import MarketDataService
+
+    columns = {"open": [1.0], "high": [1.0], "low": [1.0], "volume": [100]}
+    (tmp_path / "US" / "1d").mkdir(parents=True)
+    pd.DataFrame({"date": ["2025-01-02"], "close": [10.0], **columns}).to_csv(tmp_path / "US" / "1d" / "AAPL.csv", index=False)
+    # A CN multi-ticker archive that happens to carry an "AAPL" code.
+    (tmp_path / "CN" / "1d").mkdir(parents=True)
+    pd.DataFrame({"code": ["AAPL"], "date": ["2025-01-03"], "close": [99.0], **columns}).to_csv(
+        tmp_path / "CN" / "1d" / "all.csv", index=False
+    )
+
+    provider = LocalFileMarketDataProvider(root=str(tmp_path))
+    assert [market for market, _, _ in provider.for_market("US").files_for("AAPL", "1d")] == ["US"]
+
+    service = MarketDataService(providers=[provider])
+    with database.SessionLocal() as db:
+        assert service.ingest_history(db, "AAPL", "US", "1d", None, None) == 1
+        assert [bar.close for bar in db.query(Bar1d).all()] == [10.0]
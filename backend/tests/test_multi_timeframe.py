@@ -0,0 +1,134 @@
+"""Tests for higher-timeframe alignment in local backtests."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+DAILY_CLOSES = [10.0, 11.0, 12.0, 13.0, 14.0]
+MINUTE_CLOSES = [100.0, 99.0, 98.0, 101.0, 104.0, 106.0, 103.0, 99.0, 102.0, 105.0]
+
+
+def _seed(daily_closes: list[float]) -> None:
+    from app.database import SessionLocal
+    from app.models.market_data import Bar1d, Bar1m, Instrument
+
+    db = SessionLocal()
+    try:
+        instrument = Instrument(symbol="AAPL", market="US", name="AAPL")
+        db.add(instrument)
+        db.flush()
+        for day, close in enumerate(daily_closes, start=1):
+            db.add(
+                Bar1d(
+                    instrument_id=instrument.id,
+                    ts=datetime(2025, 1, day, tzinfo=timezone.utc),
+                    open=close,
+                    high=close,
+                    low=close,
+                    close=close,
+                    volume=1000,
+                    source="test",
+                )
+            )
+        for day in (2, 3, 4):
+            session_open = datetime(2025, 1, day, 14, 30, tzinfo=timezone.utc)
+            for idx, close in enumerate(MINUTE_CLOSES):
+                db.add(
+                    Bar1m(
+                        instrument_id=instrument.id,
+                        ts=session_open + timedelta(minutes=idx),
+                        open=close,
+                        high=close,
+                        low=close,
+                        close=close,
+                        volume=100,
+                        source="test",
+                    )
+                )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _run(client, strategy_id: int, parameters: dict) -> dict:
+    response = client.post(
+        "/api/v1/backtests/",
+        json={
+            "strategy_id": strategy_id,
+            "symbols": ["AAPL"],
+            "start_date": "2025-01-02",
+            "end_date": "2025-01-04",
+            "initial_capital": 100000,
+            "parameters": {"market": "US", "interval": "1m", **parameters},
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_alignment_index_uses_last_completed_coarse_bar():
+    from app.services.multi_timeframe import build_alignment_index
+
+    coarse = [datetime(2025, 1, day) for day in (1, 2, 3)]
+    fine = [
+        datetime(2025, 1, 1, 12, 0),
+        datetime(2025, 1, 2, 0, 0),
+        datetime(2025, 1, 3, 9, 30),
+        datetime(2025, 1, 9, 9, 30),
+    ]
+    index = build_alignment_index(fine, coarse, timedelta(days=1))
+    assert index.tolist() == [-1, 0, 1, 2]
+
+
+def test_custom_strategy_reads_daily_close_from_minute_bars(client):
+    _seed(DAILY_CLOSES)
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={
+            "name": "Daily gate",
+            "strategy_type": "custom",
+            "parameters": {"allocation_per_trade": 0.5},
+            "code": (
+                "def signal(prices, params):\n"
+                "    daily = params['timeframes'].close('1d')\n"
+                "    if daily is not None and daily >= 12:\n"
+                "        return 'BUY'\n"
+                "    return 'HOLD'\n"
+            ),
+        },
+    ).json()["id"]
+
+    run = _run(client, strategy_id, {"higher_intervals": ["1d"]})
+    trades = client.get(f"/api/v1/backtests/{run['id']}/trades").json()
+    # The 2025-01-03 daily bar only completes on 2025-01-04, so no entry before then.
+    assert trades[0]["action"] == "BUY"
+    assert trades[0]["timestamp"].startswith("2025-01-04")
+
+
+def test_trend_filter_blocks_entries_against_daily_trend(client):
+    _seed(list(reversed(DAILY_CLOSES)))
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={
+            "name": "MA with trend",
+            "strategy_type": "moving_average",
+            "parameters": {"short_window": 2, "long_window": 3, "allocation_per_trade": 0.5},
+        },
+    ).json()["id"]
+
+    unfiltered = _run(client, strategy_id, {})
+    assert unfiltered["trade_count"] > 0
+    filtered = _run(client, strategy_id, {"trend_interval": "1d", "trend_window": 2})
+    assert filtered["trade_count"] == 0
+
+    rejected = client.post(
+        "/api/v1/backtests/",
+        json={
+            "strategy_id": strategy_id,
+            "symbols": ["AAPL"],
+            "start_date": "2025-01-02",
+            "end_date": "2025-01-04",
+            "initial_capital": 100000,
+            "parameters": {"market": "US", "interval": "1d", "higher_intervals": ["1m"]},
+        },
+    )
+    assert rejected.status_code == 400
@@ -0,0 +1,135 @@
+"""Tests for the cross-sectional panel engine and rank strategies."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+
+def test_ranks_and_top_fraction_ignore_unlisted_symbols():
+    from app.services.panel_engine import cross_sectional_rank, top_fraction_mask
+
+    factor = np.array(
+        [
+            [0.3, np.nan, 0.1, 0.2, -0.5],
+            [np.nan, np.nan, np.nan, np.nan, np.nan],
+        ]
+    )
+    ranks = cross_sectional_rank(factor)
+    np.testing.assert_allclose(ranks[0], [1.0, np.nan, 1 / 3, 2 / 3, 0.0])
+    assert np.isnan(ranks[1]).all()
+
+    mask = top_fraction_mask(factor, 0.5)
+    assert mask[0].tolist() == [True, False, False, True, False]
+    assert not mask[1].any()
+
+
+def test_mean_reversion_scores_late_listed_symbols():
+    from app.services.panel_engine import PricePanel, cross_sectional_rank, mean_reversion_factor
+
+    start = datetime(2020, 1, 1)
+    days = [start + timedelta(days=idx) for idx in range(30)]
+    late = [100.0 - (idx % 4) for idx in range(20)]
+    panel = PricePanel.build({"A": (days, [50.0 + (idx % 3) for idx in range(30)]), "L": (days[10:], late)})
+
+    factor = mean_reversion_factor(panel.closes, 5)
+    # L lists on row 10: its windows are defined from row 14, once they hold no pre-listing bar.
+    assert np.isnan(factor[:14, 1]).all() and np.isfinite(factor[14:, 1]).all()
+    window = np.array(late[:5])
+    np.testing.assert_allclose(factor[14, 1], 1.0 - window[-1] / window.mean())
+    assert np.isfinite(cross_sectional_rank(factor)[14:]).all()
+
+
+def test_momentum_rank_rotates_into_the_leader():
+    from app.services.panel_engine import PricePanel, momentum_factor, run_panel_strategy
+
+    start = datetime(2020, 1, 1)
+    days = [start + timedelta(days=idx) for idx in range(60)]
+    # A leads for 30 bars, then B takes over; C is flat and lists late.
+    a = [100 * 1.01**idx if idx < 30 else 100 * 1.01**29 * 0.99 ** (idx - 29) for idx in range(60)]
+    b = [100 * 0.995**idx if idx < 30 else 100 * 0.995**29 * 1.02 ** (idx - 29) for idx in range(60)]
+    panel = PricePanel.build({"A": (days, a), "B": (days, b), "C": (days[20:], [50.0] * 40)})
+    assert np.isnan(panel.closes[:20, 2]).all()
+    assert np.isfinite(momentum_factor(panel.closes, 5)[25:]).all()
+
+    result = run_panel_strategy(
+        "momentum_rank",
+        {"lookback": 5, "top_fraction": 0.3, "rebalance_every": 5, "commission_rate": 0.0},
+        panel,
+        10_000.0,
+    )
+    buys = [(trade["timestamp"], trade["symbol"]) for trade in result.trades if trade["action"] == "BUY"]
+    assert buys[0] == (days[5], "A")
+    assert "B" in {symbol for ts, symbol in buys if ts >= days[35]}
+    # C has no momentum score until it has `lookback` bars of history.
+    assert all(ts >= days[25] for ts, symbol in buys if symbol == "C")
+    assert result.trades[-1]["timestamp"] == days[-1]
+    assert result.final_value == result.equity[-1]
+    # Between rebalances equity is marked to market from whole-share holdings.
+    held = 10_000.0 * 0.95 // a[5]
+    assert result.equity[6] == 10_000.0 - held * a[5] + held * a[6]
+
+
+def test_rank_strategy_backtest_via_api(client):
+    from app.database import SessionLocal
+    from app.models.market_data import Bar1d, Instrument
+
+    rng = np.random.default_rng(4)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    symbols = [f"S{idx:02d}" for idx in range(30)]
+    db = SessionLocal()
+    try:
+        for idx, symbol in enumerate(symbols):
+            instrument = Instrument(symbol=symbol, market="US", name=symbol)
+            db.add(instrument)
+            db.flush()
+            closes = 50.0 * np.cumprod(1.0 + rng.normal(0.0005 * idx, 0.01, 120))
+            for day, close in enumerate(closes):
+                db.add(
+                    Bar1d(
+                        instrument_id=instrument.id,
+                        ts=start + timedelta(days=day),
+                        open=close,
+                        high=close,
+                        low=close,
+                        close=float(close),
+                        volume=1000,
+                        source="test",
+                    )
+                )
+        db.commit()
+    finally:
+        db.close()
+
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={
+            "name": "Top decile momentum",
+            "strategy_type": "momentum_rank",
+            "parameters": {"lookback": 20, "top_fraction": 0.1, "rebalance_every": 10},
+        },
+    ).json()["id"]
+    response = client.post(
+        "/api/v1/backtests/",
+        json={
+            "strategy_id": strategy_id,
+            "symbols": symbols,
+            "start_date": "2024-01-01",
+            "end_date": "2024-12-31",
+            "initial_capital": 100000,
+            "parameters": {"market": "US"},
+        },
+    )
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert body["status"] == "completed"
+    assert body["trade_count"] > 0
+
+    detail = client.get(f"/api/v1/backtests/{body['id']}").json()
+    results = detail["results"]
+    assert results["rebalances"] == 10
+    assert len(results["equity_curve"]) == 120
+    assert len(results["latest_ranks"]) == 20
+    trades = client.get(f"/api/v1/backtests/{body['id']}/trades").json()
+    first_day = min(trade["timestamp"] for trade in trades)
+    assert len({t["symbol"] for t in trades if t["timestamp"] == first_day and t["action"] == "BUY"}) == 3
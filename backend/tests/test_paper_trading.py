@@ -0,0 +1,138 @@
+"""Tests for streaming paper trading driven by ingested bars."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import random
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "strategy_type,parameters",
+    [
+        ("moving_average", {"short_window": 3, "long_window": 7}),
+        ("rsi", {"rsi_period": 5, "rsi_buy": 40, "rsi_sell": 60}),
+        ("momentum", {"momentum_period": 4, "momentum_threshold": 0.01}),
+    ],
+)
+def test_streaming_signal_matches_full_history(strategy_type, parameters):
+    from app.services.paper_trading import StreamingSignal
+    from app.services.strategy_signals import signal_for_strategy
+
+    rng = random.Random(7)
+    prices = [100.0]
+    for _ in range(300):
+        prices.append(max(1.0, prices[-1] * (1.0 + rng.uniform(-0.03, 0.03))))
+
+    streaming = StreamingSignal(strategy_type, parameters)
+    for idx, price in enumerate(prices):
+        # Round-trip the state regularly, as each ingestion cycle does.
+        if idx % 50 == 0:
+            streaming = StreamingSignal(strategy_type, parameters, streaming.to_state())
+        expected = signal_for_strategy(strategy_type, prices[: idx + 1], parameters)
+        assert streaming.update(price) == expected
+
+
+def test_ingestion_drives_paper_fills(client):
+    from app.database import SessionLocal
+    from app.models.market_data import Bar1d, Instrument
+    from app.models.portfolio import PortfolioTrade
+    from app.services.market_data_service import BarRecord, MarketDataService
+    from app.services.paper_trading import paper_trading_engine
+
+    portfolio_id = client.post(
+        "/api/v1/portfolios/",
+        json={"name": "Paper", "initial_capital": 100000, "holdings": []},
+    ).json()["id"]
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={
+            "name": "Paper MA",
+            "strategy_type": "moving_average",
+            "parameters": {"short_window": 2, "long_window": 3, "allocation_per_trade": 0.5},
+        },
+    ).json()["id"]
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    db = SessionLocal()
+    try:
+        instrument = Instrument(symbol="AAPL", market="US", name="AAPL")
+        db.add(instrument)
+        db.flush()
+        for idx, close in enumerate([100.0, 99.0, 98.0]):
+            db.add(
+                Bar1d(
+                    instrument_id=instrument.id,
+                    ts=start + timedelta(days=idx),
+                    open=close,
+                    high=close,
+                    low=close,
+                    close=close,
+                    volume=1000,
+                    source="test",
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+    created = client.post(
+        "/api/v1/paper-trading/sessions",
+        json={
+            "strategy_id": strategy_id,
+            "portfolio_id": portfolio_id,
+            "symbols": ["AAPL"],
+            "market": "US",
+            "interval": "1d",
+        },
+    )
+    assert created.status_code == 201
+    session = created.json()[0]
+    assert session["state"]["signal"]["count"] == 3
+    assert session["last_bar_ts"].startswith("2025-01-03")
+
+    closes = [101.0, 104.0, 106.0, 103.0, 99.0]
+
+    class DummyProvider:
+        name = "dummy"
+
+        def supports(self, market: str, interval: str) -> bool:
+            return True
+
+        def fetch_history(self, symbol, start_ts, end_ts, interval):
+            return [
+                BarRecord(
+                    ts=start + timedelta(days=3 + idx),
+                    open=close,
+                    high=close,
+                    low=close,
+                    close=close,
+                    volume=1000,
+                    source=self.name,
+                )
+                for idx, close in enumerate(closes)
+            ]
+
+    service = MarketDataService(providers=[DummyProvider()])
+    service.subscribe(paper_trading_engine.on_bars)
+    db = SessionLocal()
+    try:
+        for _ in range(2):  # Re-ingesting the same bars must not replay fills.
+            service.ingest_history(db, "AAPL", "US", "1d", start, start + timedelta(days=10))
+        trades = db.query(PortfolioTrade).filter(PortfolioTrade.portfolio_id == portfolio_id).order_by(PortfolioTrade.id).all()
+        assert [item.action for item in trades] == ["BUY", "SELL"]
+        assert trades[0].price == 101.0
+        assert trades[1].price == 99.0
+    finally:
+        db.close()
+
+    body = client.get(f"/api/v1/paper-trading/sessions/{session['id']}").json()
+    assert body["fills"] == 2
+    assert body["state"]["position"] == 0.0
+
+    portfolio = client.get(f"/api/v1/portfolios/{portfolio_id}").json()
+    assert portfolio["cash_balance"] != 100000
+    assert portfolio["current_value"] == pytest.approx(portfolio["cash_balance"])
+
+    stopped = client.post(f"/api/v1/paper-trading/sessions/{session['id']}/stop")
+    assert stopped.json()["status"] == "stopped"
@@ -37,9 +37,14 @@ def test_run_job_normalizes_inputs_and_parses_dates():
     calls = []
 
     class FakeService:
-        def ingest_history(self, **kwargs):
-            calls.append(kwargs)
-            return 123
+        def ingest_many(self, symbols, **kwargs):
+            from app.services.market_data_service import IngestionOutcome
+
+            outcomes = []
+            for symbol in symbols:
+                calls.append({**kwargs, "symbol": symbol})
+                outcomes.append(IngestionOutcome(symbol=symbol, ingested=123))
+            return outcomes
 
     summary = run_job(
         db=None,
@@ -0,0 +1,165 @@
+"""Tests for the strategy expression DSL and its engine integration."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import random
+
+import numpy as np
+import pytest
+
+
+def _random_walk(count: int, seed: int) -> list[float]:
+    rng = random.Random(seed)
+    prices = [100.0]
+    for _ in range(count - 1):
+        prices.append(max(1.0, prices[-1] * (1.0 + rng.uniform(-0.03, 0.03))))
+    return prices
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "__import__('os').system('true')",
+        "close.real > 1",
+        "close[0] > 1",
+        "(lambda: 1)()",
+        "sma(close, 2.5) > 1",
+        "unknown(close, 3) > 1",
+    ],
+)
+def test_rejects_unsupported_syntax(source):
+    from app.services.strategy_dsl import StrategyExpressionError, compile_strategy_expression
+
+    with pytest.raises(StrategyExpressionError):
+        compile_strategy_expression({"entry": source, "exit": "close < 0"})
+
+
+@pytest.mark.parametrize("source", ["-" * 900 + "close > 1", "close" + " + 1" * 60 + " > 1"])
+def test_rejects_deeply_nested_expressions(source):
+    from app.services.strategy_dsl import StrategyExpressionError, compile_strategy_expression
+
+    with pytest.raises(StrategyExpressionError, match="nested too deeply"):
+        compile_strategy_expression({"entry": source, "exit": "close < 0"})
+
+
+def test_undefined_parameters_are_reported():
+    from app.services.strategy_dsl import StrategyExpressionError, compile_strategy_expression
+
+    with pytest.raises(StrategyExpressionError, match="slow"):
+        compile_strategy_expression({"entry": "sma(close, fast) > sma(close, slow)", "exit": "close < 0", "fast": 3})
+
+
+def test_shared_subexpressions_are_evaluated_once():
+    from app.services.strategy_dsl import compile_strategy_expression
+
+    class CountingMemo(dict):
+        writes = 0
+
+        def __setitem__(self, key, value):
+            CountingMemo.writes += 1
+            super().__setitem__(key, value)
+
+    params = {"entry": "cross(sma(close, 3), sma(close, 8))", "exit": "crossunder(sma(close, 3), sma(close, 8))"}
+    memo = CountingMemo()
+    compile_strategy_expression(params).signals({"close": np.array(_random_walk(50, 1))}, params, memo=memo)
+    # close, both SMAs, cross and crossunder: each evaluated exactly once.
+    assert CountingMemo.writes == len(memo) == 5
+
+
+def test_vectorized_signals_match_per_bar_evaluation():
+    from app.services.strategy_dsl import compile_strategy_expression
+    from app.services.strategy_signals import signal_for_strategy
+
+    params = {
+        "entry": "cross(sma(close, fast), sma(close, slow)) and rsi(close, 5) < 70",
+        "exit": "close < lowest(shift(close, 1), 4) or change(close, 3) < -0.04",
+        "fast": 3,
+        "slow": 8,
+    }
+    prices = _random_walk(200, 2)
+    buy, sell = compile_strategy_expression(params).signals({"close": np.array(prices)}, params)
+    vectorized = ["BUY" if b else "SELL" if s else "HOLD" for b, s in zip(buy, sell)]
+    per_bar = [signal_for_strategy("expression", prices[: idx + 1], params) for idx in range(len(prices))]
+    assert vectorized == per_bar
+    assert "BUY" in vectorized and "SELL" in vectorized
+
+
+def test_expression_backtest_matches_builtin_moving_average(client):
+    from app.database import SessionLocal
+    from app.models.market_data import Bar1d, Instrument
+
+    db = SessionLocal()
+    try:
+        instrument = Instrument(symbol="AAPL", market="US", name="AAPL")
+        db.add(instrument)
+        db.flush()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for day, close in enumerate(_random_walk(120, 3)):
+            db.add(
+                Bar1d(
+                    instrument_id=instrument.id,
+                    ts=start + timedelta(days=day),
+                    open=close,
+                    high=close,
+                    low=close,
+                    close=close,
+                    volume=1000,
+                    source="test",
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+    common = {"short_window": 3, "long_window": 8, "allocation_per_trade": 0.5}
+    builtin_id = client.post(
+        "/api/v1/strategies/",
+        json={"name": "MA", "strategy_type": "moving_average", "parameters": common},
+    ).json()["id"]
+    expression_id = client.post(
+        "/api/v1/strategies/",
+        json={
+            "name": "MA expression",
+            "strategy_type": "expression",
+            "parameters": {
+                **common,
+                "entry": "sma(close, short_window) > sma(close, long_window) * 1.0001",
+                "exit": "sma(close, short_window) < sma(close, long_window) * 0.9999",
+            },
+        },
+    ).json()["id"]
+
+    def run(strategy_id: int, parameters: dict | None = None):
+        return client.post(
+            "/api/v1/backtests/",
+            json={
+                "strategy_id": strategy_id,
+                "symbols": ["AAPL"],
+                "start_date": "2024-01-01",
+                "end_date": "2024-12-31",
+                "initial_capital": 100000,
+                "parameters": {"market": "US", **(parameters or {})},
+            },
+        )
+
+    builtin = run(builtin_id).json()
+    expression = run(expression_id).json()
+    assert expression["trade_count"] == builtin["trade_count"] > 0
+    assert expression["final_value"] == pytest.approx(builtin["final_value"])
+
+    invalid = run(expression_id, {"entry": "open > close"})
+    assert invalid.status_code == 400
+
+
+def test_agent_sanitizes_expression_strategies():
+    from app.services.agent_service import _normalize_strategy_type, _sanitize_parameters
+
+    assert _normalize_strategy_type("expression") == "expression"
+    params = _sanitize_parameters(
+        "expression",
+        {"entry": "rsi(close, 14) < 30", "exit": "rsi(close, 14) > 70", "allocation_per_trade": 2},
+        "",
+    )
+    assert params["allocation_per_trade"] == 0.95
+    with pytest.raises(ValueError):
+        _sanitize_parameters("expression", {"entry": "os.system('x')", "exit": "close < 0"}, "")
@@ -0,0 +1,238 @@
+"""Tests for the database task queue and the backtest worker handler."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+
+def _seed_bars(symbol: str, closes: list[float]) -> None:
+    from app.database import SessionLocal
+    from app.models.market_data import Bar1d, Instrument
+
+    db = SessionLocal()
+    try:
+        instrument = Instrument(symbol=symbol, market="US", name=symbol)
+        db.add(instrument)
+        db.flush()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for day, close in enumerate(closes):
+            db.add(
+                Bar1d(
+                    instrument_id=instrument.id,
+                    ts=start + timedelta(days=day),
+                    open=close,
+                    high=close,
+                    low=close,
+                    close=close,
+                    volume=1000,
+                    source="test",
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_claim_is_exclusive_and_expired_leases_are_reclaimed(client):
+    import app.database as database
+    from app.models.task_queue import TaskJob
+    from app.services import task_queue
+
+    with database.SessionLocal() as db:
+        job_id = task_queue.enqueue(db, "noop", {"value": 1}, max_attempts=2).id
+        first = task_queue.claim(db, "worker-a", lease_seconds=30)
+        assert first is not None and first.id == job_id and first.attempts == 1
+        assert task_queue.claim(db, "worker-b", lease_seconds=30) is None
+
+        # worker-a stops heartbeating: once the lease lapses worker-b takes over.
+        db.query(TaskJob).filter(TaskJob.id == job_id).update(
+            {"lease_expires_at": datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)}
+        )
+        db.commit()
+        second = task_queue.claim(db, "worker-b", lease_seconds=30)
+        assert second is not None and second.worker_id == "worker-b" and second.attempts == 2
+
+        # The stale worker can no longer extend the lease or publish results.
+        assert not task_queue.heartbeat(db, job_id, "worker-a")
+        assert not task_queue.complete(db, job_id, "worker-a", {"stale": True})
+        assert task_queue.heartbeat(db, job_id, "worker-b")
+        assert task_queue.complete(db, job_id, "worker-b", {"ok": True})
+        job = db.query(TaskJob).filter(TaskJob.id == job_id).populate_existing().one()
+        assert (job.status, job.result) == ("completed", {"ok": True})
+
+
+def test_worker_retries_with_backoff_then_fails(client, monkeypatch):
+    import app.database as database
+    from app.config import get_settings
+    from app.models.task_queue import TaskJob
+    from app.services import task_queue
+
+    monkeypatch.setattr(get_settings(), "TASK_RETRY_BASE_SECONDS", 0.0)
+    calls: list[dict] = []
+
+    def flaky(db, payload):
+        calls.append(payload)
+        raise RuntimeError("provider timeout")
+
+    worker = task_queue.TaskWorker(database.SessionLocal, {"flaky": flaky}, worker_id="w1", lease_seconds=30)
+    with database.SessionLocal() as db:
+        job_id = task_queue.enqueue(db, "flaky", {"n": 1}, max_attempts=2).id
+        task_queue.enqueue(db, "other", {})
+
+    assert worker.run_once()["status"] == "queued"
+    assert worker.run_once()["status"] == "failed"
+    # Jobs of kinds the worker has no handler for are left for other workers.
+    assert worker.run_once() is None
+    assert len(calls) == 2
+    with database.SessionLocal() as db:
+        job = db.query(TaskJob).filter(TaskJob.id == job_id).one()
+        assert job.attempts == 2
+        assert "provider timeout" in job.error
+
+
+def test_queued_backtest_is_executed_by_worker(client):
+    import app.database as database
+    from app.api.v1.backtest import run_backtest_task
+    from app.services.task_queue import TaskWorker
+
+    _seed_bars("AAPL", [100.0, 101.0, 99.0, 103.0, 104.0, 102.0, 106.0, 107.0, 105.0, 109.0])
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={"name": "MA", "strategy_type": "moving_average", "parameters": {"short_window": 2, "long_window": 3}},
+    ).json()["id"]
+    payload = {
+        "strategy_id": strategy_id,
+        "symbols": ["AAPL"],
+        "start_date": "2024-01-01",
+        "end_date": "2024-12-31",
+        "initial_capital": 100000,
+        "parameters": {"market": "US"},
+    }
+    expected = client.post("/api/v1/backtests/", json=payload).json()
+
+    queued = client.post("/api/v1/backtests/jobs", json=payload)
+    assert queued.status_code == 202, queued.text
+    job = queued.json()
+    assert job["status"] == "queued"
+    assert client.get(f"/api/v1/backtests/{job['backtest_id']}").json()["status"] == "pending"
+
+    missing = client.post("/api/v1/backtests/jobs", json={**payload, "symbols": ["MSFT"]}).json()
+
+    worker = TaskWorker(database.SessionLocal, {"backtest": run_backtest_task}, worker_id="w1")
+    assert worker.run_once()["status"] == "completed"
+    # Missing bars cannot be fixed by retrying, so the job fails on its first attempt.
+    assert worker.run_once()["status"] == "failed"
+
+    done = client.get(f"/api/v1/backtests/jobs/{job['job_id']}").json()
+    assert done["status"] == "completed" and done["attempts"] == 1
+    backtest = client.get(f"/api/v1/backtests/{job['backtest_id']}").json()
+    assert backtest["status"] == "completed"
+    assert backtest["final_value"] == expected["final_value"]
+    assert backtest["trade_count"] == expected["trade_count"]
+
+    failed = client.get(f"/api/v1/backtests/jobs/{missing['job_id']}").json()
+    assert failed["status"] == "failed" and failed["attempts"] == 1
+    assert client.get(f"/api/v1/backtests/{missing['backtest_id']}").json()["status"] == "failed"
+
+
+def test_worker_that_lost_its_lease_does_not_persist_trades(client):
+    import app.database as database
+    from sqlalchemy import update
+
+    from app.api.v1.backtest import run_backtest_task
+    from app.models.backtest import Trade
+    from app.models.task_queue import TaskJob
+    from app.services.task_queue import TaskWorker, claim
+
+    _seed_bars("AAPL", [100.0, 101.0, 99.0, 103.0, 104.0, 102.0, 106.0, 107.0, 105.0, 109.0])
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={"name": "MA", "strategy_type": "moving_average", "parameters": {"short_window": 2, "long_window": 3}},
+    ).json()["id"]
+    queued = client.post(
+        "/api/v1/backtests/jobs",
+        json={
+            "strategy_id": strategy_id,
+            "symbols": ["AAPL"],
+            "start_date": "2024-01-01",
+            "end_date": "2024-12-31",
+            "initial_capital": 100000,
+            "parameters": {"market": "US"},
+        },
+    ).json()
+    job_id, backtest_id = queued["job_id"], queued["backtest_id"]
+    payloads = []
+
+    def stalled(db, payload):
+        # Heartbeats stopped: the lease runs out and w2 takes the job while w1 is still simulating.
+        payloads.append(payload)
+        with database.SessionLocal() as other:
+            other.execute(update(TaskJob).where(TaskJob.id == job_id).values(lease_expires_at=datetime(2000, 1, 1)))
+            other.commit()
+            assert claim(other, "w2").id == job_id
+        return run_backtest_task(db, payload)
+
+    assert TaskWorker(database.SessionLocal, {"backtest": stalled}, worker_id="w1").run_once()["status"] == "lease_lost"
+    with database.SessionLocal() as db:
+        assert db.query(Trade).filter(Trade.backtest_id == backtest_id).count() == 0
+        result = run_backtest_task(db, {**payloads[0], "worker_id": "w2"})
+        assert result["status"] == "completed" and result["trade_count"] > 0
+        assert db.query(Trade).filter(Trade.backtest_id == backtest_id).count() == result["trade_count"]
+
+
+def test_stale_worker_cannot_mark_a_reclaimed_backtest_failed_or_running(client, monkeypatch):
+    import app.database as database
+    import pytest
+    from sqlalchemy import update
+
+    import app.api.v1.backtest as backtest_api
+    from app.models.backtest import Backtest
+    from app.models.task_queue import TaskJob
+    from app.services.task_queue import LeaseLostError, TaskWorker, claim
+
+    _seed_bars("AAPL", [100.0, 101.0, 99.0, 103.0, 104.0, 102.0, 106.0, 107.0, 105.0, 109.0])
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={"name": "MA", "strategy_type": "moving_average", "parameters": {"short_window": 2, "long_window": 3}},
+    ).json()["id"]
+    queued = client.post(
+        "/api/v1/backtests/jobs",
+        json={
+            "strategy_id": strategy_id,
+            "symbols": ["AAPL"],
+            "start_date": "2024-01-01",
+            "end_date": "2024-12-31",
+            "initial_capital": 100000,
+            "parameters": {"market": "US"},
+        },
+    ).json()
+    job_id, backtest_id = queued["job_id"], queued["backtest_id"]
+    engine = backtest_api._run_backtest_local
+    payloads = []
+
+    def reclaimed_then_crashes(**kwargs):
+        # w2 takes the job over while w1's simulation is still running; then w1's engine blows up.
+        with database.SessionLocal() as other:
+            other.execute(update(TaskJob).where(TaskJob.id == job_id).values(lease_expires_at=datetime(2000, 1, 1)))
+            other.commit()
+            assert claim(other, "w2").id == job_id
+        raise RuntimeError("engine crashed")
+
+    def handler(db, payload):
+        payloads.append(payload)
+        return backtest_api.run_backtest_task(db, payload)
+
+    monkeypatch.setattr(backtest_api, "_run_backtest_local", reclaimed_then_crashes)
+    assert TaskWorker(database.SessionLocal, {"backtest": handler}, worker_id="w1").run_once()["status"] == "lease_lost"
+    with database.SessionLocal() as db:
+        assert db.get(Backtest, backtest_id).status == "running"
+
+        # A stale retry by w1 is turned away before it flips the row back to running.
+        db.execute(update(Backtest).where(Backtest.id == backtest_id).values(status="pending"))
+        db.commit()
+        with pytest.raises(LeaseLostError):
+            backtest_api.run_backtest_task(db, payloads[0])
+        assert db.get(Backtest, backtest_id).status == "pending"
+
+        monkeypatch.setattr(backtest_api, "_run_backtest_local", engine)
+        result = backtest_api.run_backtest_task(db, {**payloads[0], "worker_id": "w2"})
+        assert result["status"] == "completed"
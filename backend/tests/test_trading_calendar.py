@@ -0,0 +1,110 @@
+"""Tests for the CN/US exchange trading calendars and their consumers."""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+
+def _utc(micros) -> list[datetime]:
+    return [np.datetime64(int(value), "us").astype(datetime) for value in micros]
+
+
+def test_us_calendar_holidays_early_closes_and_dst():
+    from app.services.trading_calendar import get_calendar
+
+    us = get_calendar("US")
+    assert len(us.trading_days(date(2024, 1, 1), date(2024, 12, 31))) == 252
+    assert not us.is_trading_day(date(2025, 4, 18))  # Good Friday
+    assert not us.is_trading_day(date(2025, 1, 9))  # National day of mourning
+    assert us.is_trading_day(date(2021, 12, 31))  # Saturday New Year's Day is not observed
+
+    # Thanksgiving week: three full days, the holiday, then a 13:00 close.
+    week = us.expected_timestamps(datetime(2024, 11, 25), datetime(2024, 11, 30), "1m")
+    assert len(week) == 3 * 390 + 210
+    assert _utc(week[-1:]) == [datetime(2024, 11, 29, 17, 59)]
+
+    # 09:30 New York is 14:30 UTC in winter and 13:30 UTC in summer.
+    assert _utc(us.expected_timestamps(datetime(2025, 1, 2), datetime(2025, 1, 3), "1m")[:1]) == [datetime(2025, 1, 2, 14, 30)]
+    assert _utc(us.expected_timestamps(datetime(2025, 7, 1), datetime(2025, 7, 2), "1m")[:1]) == [datetime(2025, 7, 1, 13, 30)]
+    assert _utc(us.expected_timestamps(datetime(2025, 1, 1), datetime(2025, 1, 8), "1d")) == [
+        datetime(2025, 1, day, 5) for day in (2, 3, 6, 7)
+    ]
+
+
+def test_cn_calendar_lunch_break_auction_bar_and_holidays():
+    from app.services.trading_calendar import get_calendar
+
+    cn = get_calendar("CN")
+    assert len(cn.trading_days(date(2024, 1, 1), date(2024, 12, 31))) == 242
+    day = cn.expected_timestamps(
+        datetime(2025, 1, 2, tzinfo=timezone.utc), datetime(2025, 1, 2, 12, tzinfo=timezone.utc), "1m"
+    )
+    assert len(day) == 241
+    stamps = _utc(day)
+    assert stamps[:2] == [datetime(2025, 1, 2, 1, 30), datetime(2025, 1, 2, 1, 31)]
+    assert stamps[120:122] == [datetime(2025, 1, 2, 3, 30), datetime(2025, 1, 2, 5, 1)]  # 11:30 then 13:01
+    assert stamps[-1] == datetime(2025, 1, 2, 7, 0)
+    assert not len(cn.expected_timestamps(datetime(2025, 1, 28), datetime(2025, 2, 4, 12), "1d"))
+
+    actual = np.delete(day, [5, 6, 200])
+    missing = cn.missing_timestamps(datetime(2025, 1, 2), datetime(2025, 1, 2, 12), "1m", actual)
+    assert missing.tolist() == day[[5, 6, 200]].tolist()
+
+
+def test_rollup_hours_follow_sessions():
+    from app.services.bar_rollups import bucket_start
+    from app.services.bar_store import to_micros
+    from app.services.trading_calendar import get_calendar
+
+    def buckets(market, stamps):
+        micros = np.array([to_micros(value) for value in stamps])
+        return _utc(bucket_start(micros, "1h", get_calendar(market)))
+
+    # CN minute bars carry their closing minute: 10:30 closes the first hour, 13:01 opens the afternoon.
+    assert buckets("CN", [datetime(2025, 1, 2, 1, 30), datetime(2025, 1, 2, 2, 30), datetime(2025, 1, 2, 2, 31), datetime(2025, 1, 2, 5, 1)]) == [
+        datetime(2025, 1, 2, 1, 30),
+        datetime(2025, 1, 2, 1, 30),
+        datetime(2025, 1, 2, 2, 30),
+        datetime(2025, 1, 2, 5, 0),
+    ]
+    # US hours start at 09:30; pre-market bars keep clock-aligned buckets.
+    assert buckets("US", [datetime(2025, 1, 2, 15, 29), datetime(2025, 1, 2, 20, 59), datetime(2025, 1, 2, 9, 15)]) == [
+        datetime(2025, 1, 2, 14, 30),
+        datetime(2025, 1, 2, 20, 30),
+        datetime(2025, 1, 2, 9, 0),
+    ]
+
+
+def test_incremental_ingest_skips_provider_when_no_session_since_checkpoint(client):
+    import app.database as database
+    from app.models.market_data import IngestionLog
+    from app.services.market_data_service import BarRecord, MarketDataService
+
+    class CountingProvider:
+        name = "counting"
+        requests_per_second = 0
+
+        def __init__(self):
+            self.calls = 0
+
+        def supports(self, market, interval):
+            return True
+
+        def fetch_history(self, symbol, start, end, interval):
+            self.calls += 1
+            return [BarRecord(ts=datetime(2025, 1, 3, 5, tzinfo=timezone.utc), open=1, high=1, low=1, close=1, volume=1, source=self.name)]
+
+    provider = CountingProvider()
+    service = MarketDataService(providers=[provider])
+    saturday = datetime(2025, 1, 4, 18, tzinfo=timezone.utc)
+    with database.SessionLocal() as db:
+        assert service.ingest_history(db, "AAPL", "US", "1d", None, saturday) == 1
+        # Friday's bar is stored; nothing trades again before Monday.
+        assert service.ingest_history(db, "AAPL", "US", "1d", None, saturday + timedelta(hours=30)) == 0
+        assert provider.calls == 1
+        last = db.query(IngestionLog).order_by(IngestionLog.id.desc()).first()
+        assert last.status == "completed" and last.message.startswith("up to date")
+
+        service.ingest_history(db, "AAPL", "US", "1d", None, datetime(2025, 1, 6, 12, tzinfo=timezone.utc))
+        assert provider.calls == 2
@@ -0,0 +1,153 @@
+"""Tests for walk-forward validation in strategy tuning."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import random
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize(
+    "strategy_type,parameters",
+    [
+        ("moving_average", {"short_window": 3, "long_window": 8}),
+        ("rsi", {"rsi_period": 5, "rsi_buy": 40, "rsi_sell": 60}),
+        ("momentum", {"momentum_period": 4, "momentum_threshold": 0.01}),
+    ],
+)
+def test_vectorized_positions_match_signal_rules(strategy_type, parameters):
+    from app.services.indicator_cache import IndicatorSeries, IndicatorStore
+    from app.services.strategy_signals import signal_for_strategy
+    from app.services.tune_validation import vectorized_positions
+
+    rng = random.Random(5)
+    prices = [100.0]
+    for _ in range(250):
+        prices.append(max(1.0, prices[-1] * (1.0 + rng.uniform(-0.03, 0.03))))
+
+    expected: list[bool] = []
+    held = False
+    for idx in range(len(prices)):
+        signal = signal_for_strategy(strategy_type, prices[: idx + 1], parameters)
+        if signal == "BUY":
+            held = True
+        elif signal == "SELL":
+            held = False
+        expected.append(held)
+
+    series = IndicatorSeries(np.array(prices), "TEST", "1d", store=IndicatorStore(max_bytes=1 << 20))
+    positions = vectorized_positions(strategy_type, parameters, [series])
+    assert positions[0].tolist() == expected
+
+
+def test_trial_return_matches_engine_with_commission():
+    from app.api.v1.backtest import BarPoint, _run_backtest_local
+    from app.models.strategy import Strategy
+    from app.services.indicator_cache import IndicatorSeries, IndicatorStore
+    from app.services.tune_validation import Fold, evaluate_trial
+
+    rng = random.Random(11)
+    prices = [100.0]
+    for _ in range(199):
+        prices.append(max(1.0, prices[-1] * (1.0 + rng.uniform(-0.03, 0.03))))
+    parameters = {"short_window": 3, "long_window": 8, "allocation_per_trade": 0.25, "commission_rate": 0.01}
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    bars = [BarPoint(ts=start + timedelta(days=idx), close=price) for idx, price in enumerate(prices)]
+    strategy = Strategy(name="MA", strategy_type="moving_average", parameters={})
+    run = _run_backtest_local(strategy, ["TEST"], {"TEST": bars}, 100000.0, parameters, "1d")
+    assert run["trade_count"] > 10
+
+    series = IndicatorSeries(np.array(prices), "TEST", "1d", store=IndicatorStore(max_bytes=1 << 20))
+    whole = Fold(train=(0, len(prices) - 1), test=(0, len(prices) - 1))
+    trial = evaluate_trial("moving_average", parameters, [series], [whole], 252.0)
+    # Residual: the engine holds whole shares and pays for the forced final exit.
+    assert trial["in_sample"][0]["total_return"] == pytest.approx(run["total_return"], abs=0.5)
+
+
+def test_time_series_folds_are_contiguous_and_ordered():
+    from app.services.tune_validation import build_time_series_folds
+
+    folds = build_time_series_folds(101, 3)
+    assert [fold.test for fold in folds] == [(25, 50), (50, 75), (75, 100)]
+    assert all(fold.train == (0, fold.test[0]) for fold in folds)
+    rolling = build_time_series_folds(101, 3, mode="rolling")
+    assert rolling[2].train == (50, 75)
+    with pytest.raises(ValueError):
+        build_time_series_folds(5, 3)
+
+
+def test_tune_with_validation_reports_in_and_out_of_sample(client):
+    from app.database import SessionLocal
+    from app.models.backtest import Backtest
+    from app.models.market_data import Bar1d, Instrument
+
+    rng = random.Random(9)
+    close = 100.0
+    db = SessionLocal()
+    try:
+        instrument = Instrument(symbol="AAPL", market="US", name="AAPL")
+        db.add(instrument)
+        db.flush()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for day in range(160):
+            close = max(1.0, close * (1.0 + rng.uniform(-0.03, 0.03)))
+            db.add(
+                Bar1d(
+                    instrument_id=instrument.id,
+                    ts=start + timedelta(days=day),
+                    open=close,
+                    high=close,
+                    low=close,
+                    close=close,
+                    volume=1000,
+                    source="test",
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+    strategy_id = client.post(
+        "/api/v1/strategies/",
+        json={"name": "CV MA", "strategy_type": "moving_average", "parameters": {"short_window": 3, "long_window": 10}},
+    ).json()["id"]
+
+    request = {
+        "strategy_id": strategy_id,
+        "symbols": ["AAPL"],
+        "start_date": "2024-01-01",
+        "end_date": "2024-12-31",
+        "initial_capital": 100000,
+        "market": "US",
+        "objective": "sharpe_ratio",
+        "max_trials": 9,
+        "top_k": 2,
+        "parameter_grid": {"short_window": [2, 3, 5], "long_window": [8, 13, 21]},
+        "validation": {"folds": 3},
+    }
+    tuned = client.post("/api/v1/agent/strategy/tune", json=request)
+    assert tuned.status_code == 200, tuned.text
+    body = tuned.json()
+    assert body["validation"]["trials_evaluated"] == 9
+    assert body["validation"]["backtests_run"] == 2
+    # 3 short + 3 long windows, each computed once for all trials and folds.
+    assert body["validation"]["indicator_arrays"] == 6
+
+    trials = body["top_trials"]
+    assert len(trials) == 2
+    assert trials[0]["out_of_sample_objective"] >= trials[1]["out_of_sample_objective"]
+    assert len(trials[0]["folds"]) == 3
+    assert set(trials[0]["folds"][0]["out_of_sample"]) == {"total_return", "sharpe_ratio", "max_drawdown", "win_rate"}
+
+    db = SessionLocal()
+    try:
+        assert db.query(Backtest).count() == 2
+    finally:
+        db.close()
+
+    # Repeated tuning over the same bars is served entirely from the indicator cache.
+    repeated = client.post("/api/v1/agent/strategy/tune", json=request).json()
+    assert repeated["validation"]["indicator_arrays"] == 0
+    assert repeated["top_trials"][0]["parameters"] == trials[0]["parameters"]
@@ -0,0 +1,130 @@
+"""Tests for the single-writer group-commit coordinator."""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+def _portfolio_engine(tmp_path):
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.db_profile import SqliteProfile, create_profiled_engine
+    from app.models.portfolio import Holding, Portfolio, PortfolioTrade
+
+    engine = create_profiled_engine(f"sqlite:///{(tmp_path / 'writes.db').as_posix()}", SqliteProfile())
+    Base.metadata.create_all(bind=engine, tables=[Portfolio.__table__, Holding.__table__, PortfolioTrade.__table__])
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_batches_share_commits_and_failures_stay_isolated(tmp_path):
+    from sqlalchemy import event
+
+    from app.models.portfolio import Portfolio
+    from app.services.write_coordinator import WriteCoordinator
+
+    engine, factory = _portfolio_engine(tmp_path)
+    engine.dispose()
+    traced: list[str] = []
+
+    @event.listens_for(engine, "connect")
+    def trace(dbapi_connection, _record):
+        dbapi_connection.set_trace_callback(traced.append)
+
+    coordinator = WriteCoordinator(session_factory=factory, max_batch=32, max_wait_seconds=0.01)
+    gate = threading.Event()
+    # Park the writer so the following submissions queue up behind it.
+    blocker = coordinator.submit(lambda db: gate.wait(5))
+
+    def create(index: int):
+        def write(db):
+            if index == 7:
+                db.add(Portfolio(name="broken", initial_capital=1, cash_balance=1, current_value=1))
+                db.flush()
+                raise ValueError("rejected")
+            row = Portfolio(name=f"p{index}", initial_capital=100, cash_balance=100, current_value=100)
+            db.add(row)
+            db.flush()
+            return row.id
+
+        return write
+
+    futures = [coordinator.submit(create(index)) for index in range(20)]
+    gate.set()
+    assert blocker.result(5) is True
+    ids = []
+    for index, future in enumerate(futures):
+        if index == 7:
+            with pytest.raises(ValueError, match="rejected"):
+                future.result(5)
+        else:
+            ids.append(future.result(5))
+    coordinator.stop()
+
+    assert len(set(ids)) == 19
+    assert coordinator.stats["failed"] == 1
+    # What SQLite actually ran: every savepoint sits inside an explicit BEGIN, so
+    # releasing it commits nothing, and 21 writes cost a handful of real commits.
+    open_transaction = False
+    for statement in traced:
+        keyword = statement.strip().upper()
+        if keyword == "BEGIN":
+            open_transaction = True
+        elif keyword in {"COMMIT", "ROLLBACK"}:
+            open_transaction = False
+        elif keyword.startswith("SAVEPOINT"):
+            assert open_transaction, traced
+    assert 1 <= sum(statement.strip().upper() == "COMMIT" for statement in traced) <= 3
+    with factory() as db:
+        names = sorted(name for (name,) in db.query(Portfolio.name).all())
+    assert "broken" not in names and len(names) == 19
+    engine.dispose()
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    from app.services.write_coordinator import WriteCoordinator, WriteQueueFull
+
+    engine, factory = _portfolio_engine(tmp_path)
+    coordinator = WriteCoordinator(session_factory=factory, max_queue=2, max_batch=1)
+    gate = threading.Event()
+    coordinator.submit(lambda db: gate.wait(5))
+    queued = []
+    with pytest.raises(WriteQueueFull):
+        for _ in range(5):
+            queued.append(coordinator.submit(lambda db: None))
+    gate.set()
+    for future in queued:
+        future.result(5)
+    coordinator.stop()
+    engine.dispose()
+
+
+def test_concurrent_trades_keep_the_ledger_consistent(client):
+    portfolio_id = client.post(
+        "/api/v1/portfolios/",
+        json={"name": "Busy", "initial_capital": 10000, "holdings": []},
+    ).json()["id"]
+
+    def buy(index: int) -> int:
+        response = client.post(
+            f"/api/v1/portfolios/{portfolio_id}/trades",
+            json={"symbol": "AAPL" if index % 2 else "MSFT", "action": "BUY", "quantity": 1, "price": 10},
+        )
+        return response.status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = list(pool.map(buy, range(40)))
+    assert statuses == [201] * 40
+
+    portfolio = client.get(f"/api/v1/portfolios/{portfolio_id}").json()
+    assert portfolio["cash_balance"] == pytest.approx(9600.0)
+    assert sorted((row["symbol"], row["quantity"]) for row in portfolio["holdings"]) == [("AAPL", 20.0), ("MSFT", 20.0)]
+    assert len(client.get(f"/api/v1/portfolios/{portfolio_id}/trades", params={"limit": 200}).json()) == 40
+
+    oversell = client.post(
+        f"/api/v1/portfolios/{portfolio_id}/trades",
+        json={"symbol": "AAPL", "action": "SELL", "quantity": 50, "price": 10},
+    )
+    assert oversell.status_code == 400